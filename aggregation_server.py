@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+OpenCV Müşteri Analiz Sistemi - Merkez Toplama Sunucusu
+Mağazalardaki store_sync bileşeninden gelen saatlik ziyaretçi farklarını
+ve olayları tek veritabanında birleştirir; tüm mağazalar (veya tek mağaza)
+için aralık sorgularına cevap verir. Genel merkezin data/csv_backups
+dosyalarını elle kopyalaması yerine kullanılır.
+
+- Her mağaza için onaylanan son ziyaretçi id'si ve olay sırası tutulur.
+  Sadece tam olarak kalınan yerden başlayan paketler uygulanır; tekrar
+  gönderilen veya sıra dışı paketler sayımı bozmaz, cevapta sunucunun
+  id'leri döner ve mağaza oradan devam eder.
+- Farklar saat ve gün rollup'larına eklenir; hafta / ay günlükten toplanır.
+
+Kullanım:
+    python aggregation_server.py [--host 0.0.0.0] [--port 8770] [--db data/merkez.db] [--token GİZLİ]
+
+Endpoint'ler:
+    POST /api/sync        Mağaza paketi (gzip'li JSON, store_sync protokolü)
+    GET  /api/stores      Mağazalar, son senkronizasyon ve bugünkü ziyaretçi
+    GET  /api/query       ?start=2025-07-01&end=2025-08-01&bucket=day&store=&metric=visitors&group=store
+    GET  /api/events      ?store=&kind=alert&limit=100
+    GET  /health, /metrics
+"""
+
+import argparse
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import visitor_db
+from analytics_rollups import (floor_bucket, bucket_labels, source_granularity, source_range, fold_series,
+                               METRICS)
+from metrics import metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from store_sync import decode_payload, SYNC_BUCKET_FORMAT
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+AGGREGATION_HOST = getattr(SETTINGS, 'AGGREGATION_HOST', '0.0.0.0')
+AGGREGATION_PORT = getattr(SETTINGS, 'AGGREGATION_PORT', 8770)
+AGGREGATION_DB_PATH = getattr(SETTINGS, 'AGGREGATION_DB_PATH', 'data/merkez.db')
+AGGREGATION_TOKEN = getattr(SETTINGS, 'SYNC_TOKEN', None)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_EVENTS_LIMIT = 1000
+QUERY_BUCKETS = ('hour', 'day', 'week', 'month')
+
+SYNC_RECEIVED = metrics_registry.counter('aggregation_batches_total', 'Mağazalardan alınan paketler', ('result',))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS store_rollups (
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        store_id TEXT NOT NULL,
+        camera_index INTEGER NOT NULL,
+        visitors INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL,
+        PRIMARY KEY (granularity, bucket, store_id, camera_index)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS store_state (
+        store_id TEXT PRIMARY KEY,
+        visitor_id INTEGER NOT NULL,
+        event_seq INTEGER NOT NULL,
+        last_sync REAL,
+        batches INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS store_events (
+        store_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        payload TEXT NOT NULL,
+        PRIMARY KEY (store_id, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_store_events_time ON store_events(timestamp);
+"""
+
+
+class AggregationStore:
+    """Mağaza paketlerini birleştiren ve sorgulayan merkez veritabanı"""
+
+    def __init__(self, db_path=AGGREGATION_DB_PATH):
+        self.db_path = db_path
+        self.logger = get_logger("aggregation")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = visitor_db.connect(db_path)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def ingest(self, payload):
+        """
+        Mağaza paketini uygula.
+
+        Args:
+            payload: store_sync paketi
+
+        Returns:
+            dict: Mağazanın sunucuda onaylanan {'visitor_id', 'event_seq'} değerleri
+        """
+        store = str(payload['store'])
+        from_id, to_id = int(payload['from_id']), int(payload['to_id'])
+        rollups = payload['rollups']
+
+        with self._lock:
+            conn = visitor_db.connect(self.db_path)
+            try:
+                with conn:
+                    row = conn.execute("SELECT visitor_id, event_seq FROM store_state WHERE store_id = ?",
+                                       (store,)).fetchone()
+                    visitor_id, event_seq = (row[0], row[1]) if row else (0, 0)
+
+                    applied = from_id == visitor_id and to_id > visitor_id
+                    if applied:
+                        deltas = {}
+                        for bucket, camera, visitors, confidence_sum in zip(
+                                rollups['bucket'], rollups['camera'], rollups['visitors'],
+                                rollups['confidence_sum']):
+                            datetime.strptime(bucket, SYNC_BUCKET_FORMAT)  # Geçersiz etiket -> ValueError
+                            for granularity, label in (('hour', bucket), ('day', bucket[:10])):
+                                delta = deltas.setdefault((granularity, label, int(camera)), [0, 0.0])
+                                delta[0] += int(visitors)
+                                delta[1] += float(confidence_sum)
+                        conn.executemany("""
+                            INSERT INTO store_rollups (granularity, bucket, store_id, camera_index, visitors,
+                                                       confidence_sum)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (granularity, bucket, store_id, camera_index) DO UPDATE SET
+                                visitors = visitors + excluded.visitors,
+                                confidence_sum = confidence_sum + excluded.confidence_sum
+                        """, [(granularity, label, store, camera, visitors, confidence_sum)
+                              for (granularity, label, camera), (visitors, confidence_sum) in deltas.items()])
+                        visitor_id = to_id
+
+                    events = [event for event in payload['events'] if int(event[0]) > event_seq]
+                    if events:
+                        conn.executemany("INSERT OR IGNORE INTO store_events (store_id, seq, kind, timestamp, "
+                                         "payload) VALUES (?, ?, ?, ?, ?)",
+                                         [(store, int(seq), str(kind), float(timestamp), json.dumps(data))
+                                          for seq, kind, timestamp, data in events])
+                        event_seq = max(int(event[0]) for event in events)
+
+                    conn.execute("""
+                        INSERT INTO store_state (store_id, visitor_id, event_seq, last_sync, batches)
+                        VALUES (?, ?, ?, ?, 1)
+                        ON CONFLICT (store_id) DO UPDATE SET
+                            visitor_id = excluded.visitor_id, event_seq = excluded.event_seq,
+                            last_sync = excluded.last_sync, batches = batches + 1
+                    """, (store, visitor_id, event_seq, time.time()))
+            finally:
+                conn.close()
+
+        if applied:
+            result = 'applied'
+        elif to_id == from_id:
+            result = 'empty'
+        else:
+            # Tekrar gönderim veya sıra dışı paket: mağaza sunucunun id'sinden devam eder
+            result = 'duplicate' if to_id <= visitor_id else 'out_of_order'
+        SYNC_RECEIVED.labels(result=result).inc()
+        return {'visitor_id': visitor_id, 'event_seq': event_seq}
+
+    def query(self, start, end, bucket='day', store=None, metric='visitors', group_by_store=False):
+        """
+        Tüm mağazalar (veya tek mağaza) için aralıktaki kovalar.
+
+        Args:
+            start, end: datetime, [start, end) aralığı
+            bucket: hour | day | week | month
+            store: Mağaza id'si (None = tüm mağazalar toplamı)
+            metric: visitors | avg_confidence
+            group_by_store: Mağaza bazında ayrı seriler de dön
+
+        Returns:
+            dict: {'series': [...], 'stores': {mağaza: [...]}} (stores sadece group_by_store ile)
+        """
+        if bucket not in QUERY_BUCKETS:
+            raise ValueError(f"Geçersiz bucket: {bucket}")
+        if metric not in METRICS:
+            raise ValueError(f"Geçersiz metrik: {metric}")
+        start = floor_bucket(start, bucket)
+        if end <= start:
+            raise ValueError("Bitiş başlangıçtan sonra olmalı")
+
+        labels = bucket_labels(start, end, bucket)
+        source = source_granularity(bucket)
+        query = ("SELECT store_id, bucket, SUM(visitors), SUM(confidence_sum) FROM store_rollups "
+                 "WHERE granularity = ? AND bucket >= ? AND bucket < ?")
+        params = [source, *source_range(start, end, source)]
+        if store is not None:
+            query += " AND store_id = ?"
+            params.append(str(store))
+        query += " GROUP BY store_id, bucket"
+
+        conn = visitor_db.connect(self.db_path)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        result = {'series': fold_series([row[1:] for row in rows], labels, source, bucket, metric)}
+        if group_by_store:
+            by_store = {}
+            for row in rows:
+                by_store.setdefault(row[0], []).append(row[1:])
+            result['stores'] = {store_id: fold_series(store_rows, labels, source, bucket, metric)
+                                for store_id, store_rows in sorted(by_store.items())}
+        return result
+
+    def stores(self):
+        """
+        Bilinen mağazalar.
+
+        Returns:
+            list: [{'store_id', 'visitor_id', 'event_seq', 'last_sync', 'batches', 'today'}]
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        conn = visitor_db.connect(self.db_path)
+        try:
+            rows = conn.execute("""
+                SELECT s.store_id, s.visitor_id, s.event_seq, s.last_sync, s.batches,
+                       COALESCE((SELECT SUM(visitors) FROM store_rollups r
+                                 WHERE r.granularity = 'day' AND r.bucket = ? AND r.store_id = s.store_id), 0)
+                FROM store_state s ORDER BY s.store_id
+            """, (today,)).fetchall()
+        finally:
+            conn.close()
+        return [{'store_id': store_id, 'visitor_id': visitor_id, 'event_seq': event_seq,
+                 'last_sync': datetime.fromtimestamp(last_sync).isoformat() if last_sync else None,
+                 'batches': batches, 'today': today_visitors}
+                for store_id, visitor_id, event_seq, last_sync, batches, today_visitors in rows]
+
+    def events(self, store=None, kind=None, limit=100):
+        """
+        Son olaylar (yeniden eskiye).
+
+        Returns:
+            list: [{'store_id', 'seq', 'kind', 'timestamp', 'data'}]
+        """
+        query = "SELECT store_id, seq, kind, timestamp, payload FROM store_events WHERE 1 = 1"
+        params = []
+        if store is not None:
+            query += " AND store_id = ?"
+            params.append(str(store))
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY timestamp DESC LIMIT ?"
+        params.append(min(int(limit), MAX_EVENTS_LIMIT))
+
+        conn = visitor_db.connect(self.db_path)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return [{'store_id': store_id, 'seq': seq, 'kind': kind, 'timestamp': timestamp, 'data': json.loads(payload)}
+                for store_id, seq, kind, timestamp, payload in rows]
+
+
+class AggregationRequestHandler(BaseHTTPRequestHandler):
+    """Senkronizasyon ve birleşik sorgu endpoint'leri"""
+
+    store = None
+    token = None
+
+    def do_POST(self):
+        """POST /api/sync"""
+        if urlparse(self.path).path != '/api/sync':
+            self.send_error(404)
+            return
+        if self.token and not hmac.compare_digest(self.headers.get('X-Sync-Token', ''), self.token):
+            self._send_json(403, {'success': False, 'message': 'Geçersiz token'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_json(413, {'success': False, 'message': 'Geçersiz paket boyutu'})
+            return
+        try:
+            body = self.rfile.read(length)
+            payload = decode_payload(body) if self.headers.get('Content-Encoding') == 'gzip' else json.loads(body)
+            self._send_json(200, {'success': True, 'data': self.store.ingest(payload)})
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            self._send_json(400, {'success': False, 'message': f'Geçersiz paket: {e}'})
+        except sqlite3.Error as e:
+            self.store.logger.error(f"Paket kaydetme hatası: {e}")
+            self._send_json(500, {'success': False, 'message': 'Veritabanı hatası'})
+
+    def do_GET(self):
+        """Sorgu endpoint'leri"""
+        url = urlparse(self.path)
+        args = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path in ('/', '/health'):
+                self._send_json(200, {'healthy': True, 'stores': len(self.store.stores())})
+            elif url.path == '/metrics':
+                self._send(200, METRICS_CONTENT_TYPE, metrics_registry.render().encode('utf-8'))
+            elif url.path == '/api/stores':
+                self._send_json(200, {'success': True, 'data': self.store.stores()})
+            elif url.path == '/api/query':
+                end = datetime.fromisoformat(args['end']) if 'end' in args else datetime.now()
+                start = (datetime.fromisoformat(args['start']) if 'start' in args
+                         else floor_bucket(end, 'day') - timedelta(days=6))
+                bucket = args.get('bucket', 'day')
+                metric = args.get('metric', 'visitors')
+                result = self.store.query(start, end, bucket, args.get('store'), metric,
+                                          group_by_store=args.get('group') == 'store')
+                self._send_json(200, {'success': True, 'data': {'bucket': bucket, 'metric': metric,
+                                                                'store': args.get('store'), **result}})
+            elif url.path == '/api/events':
+                events = self.store.events(args.get('store'), args.get('kind'), int(args.get('limit', 100)))
+                self._send_json(200, {'success': True, 'data': events})
+            else:
+                self.send_error(404)
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'success': False, 'message': f'Geçersiz parametre: {e}'})
+        except sqlite3.Error as e:
+            self.store.logger.error(f"Sorgu hatası: {e}")
+            self._send_json(500, {'success': False, 'message': 'Veritabanı hatası'})
+
+    def _send_json(self, status, data):
+        self._send(status, 'application/json', json.dumps(data).encode('utf-8'))
+
+    def _send(self, status, content_type, body):
+        """Yanıtı gönder"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """HTTP erişim loglarını sustur"""
+        pass
+
+
+def create_server(store, host=AGGREGATION_HOST, port=AGGREGATION_PORT, token=AGGREGATION_TOKEN):
+    """
+    Toplama sunucusunu oluştur (serve_forever çağıran başlatır).
+
+    Returns:
+        ThreadingHTTPServer
+    """
+    handler = type('BoundAggregationHandler', (AggregationRequestHandler,), {'store': store, 'token': token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Müşteri analiz - merkez toplama sunucusu")
+    parser.add_argument('--host', default=AGGREGATION_HOST)
+    parser.add_argument('--port', type=int, default=AGGREGATION_PORT)
+    parser.add_argument('--db', default=AGGREGATION_DB_PATH, help="Merkez veritabanı")
+    parser.add_argument('--token', default=AGGREGATION_TOKEN, help="Mağazaların göndereceği X-Sync-Token")
+    args = parser.parse_args()
+
+    store = AggregationStore(args.db)
+    server = create_server(store, args.host, args.port, args.token)
+    store.logger.info(f"🏢 Merkez toplama sunucusu: http://{args.host}:{args.port} ({args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
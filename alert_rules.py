@@ -0,0 +1,383 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Kuyruk / Doluluk Alarm Kuralları
+Bölge bazlı kayan pencere toplamları üzerinde kural değerlendirir:
+"kasada 2 dakika boyunca 4'ten fazla kişi" gibi.
+
+- Her bölge için frame başına kişi sayısı (ve bölgeye yeni giren track
+  sayısı) kayan pencerelere yazılır. Pencereler ring buffer (deque) +
+  monoton deque'lerle tutulur; ekleme ve min/max/ortalama O(1) amortize.
+- Aynı bölge ve pencere süresini kullanan kurallar pencereyi paylaşır.
+- Koşul `debounce` saniye kesintisiz sağlanınca alarm verilir; koşul
+  kalkınca 'resolved' olayı gönderilir, `cooldown` dolmadan tekrar alarm
+  verilmez.
+- Olaylar WebSocket ('alert') ve isteğe bağlı webhook ile gönderilir;
+  webhook istekleri pipeline'ı bekletmemek için ayrı thread'de yapılır.
+
+Kural dosyası (data/alert_rules.json):
+    [{"name": "Kasa kuyruğu", "zone": [0.6, 0.5, 1.0, 1.0],
+      "aggregate": "min", "window": 120, "op": ">", "threshold": 4,
+      "debounce": 0, "cooldown": 300, "webhook": "http://127.0.0.1:9000/hook"}]
+
+    zone: normalize [x0, y0, x1, y1] (ayak noktası bu dikdörtgende olan kişiler)
+          veya kameranın bölge dosyasındaki (zones.py) bölge adı, ör. "Kasa"
+    aggregate: current | avg | max | min | entries (pencerede bölgeye giren track sayısı)
+"""
+
+import collections
+import json
+import operator
+import queue
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+from metrics import metrics_registry, stage_timer
+from occupancy_heatmap import foot_points
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+ALERT_RULES_FILE = getattr(SETTINGS, 'ALERT_RULES_FILE', 'data/alert_rules.json')
+ALERT_WEBHOOK_TIMEOUT = getattr(SETTINGS, 'ALERT_WEBHOOK_TIMEOUT', 3.0)
+WINDOW_MIN_COVERAGE = 0.9   # Pencere bu oranda dolmadan min/avg kuralları değerlendirilmez
+WEBHOOK_QUEUE_SIZE = 64
+RECENT_EVENTS = 50
+
+AGGREGATES = ('current', 'avg', 'max', 'min', 'entries')
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+ALERTS_FIRED = metrics_registry.counter('alerts_fired_total', 'Verilen alarmlar', labels=('rule',))
+WEBHOOK_FAILURES = metrics_registry.counter('alert_webhook_failures_total', 'Gönderilemeyen webhook istekleri')
+
+
+class RollingWindow:
+    """Zaman pencereli örnekler üzerinde O(1) amortize min / max / toplam"""
+
+    __slots__ = ('seconds', 'started_at', '_samples', '_max', '_min', '_sum')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started_at = None
+        self._samples = collections.deque()  # (zaman, değer)
+        self._max = collections.deque()      # Azalan değerli (zaman, değer)
+        self._min = collections.deque()      # Artan değerli (zaman, değer)
+        self._sum = 0.0
+
+    def push(self, timestamp, value):
+        """Örnek ekle ve pencereden çıkanları at"""
+        if self.started_at is None:
+            self.started_at = timestamp
+
+        self._samples.append((timestamp, value))
+        self._sum += value
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((timestamp, value))
+
+        # Son eklenen örnek her zaman pencerede kalır (window=0 -> sadece son örnek)
+        cutoff = timestamp - self.seconds
+        while self._samples[0][0] < cutoff:
+            self._sum -= self._samples.popleft()[1]
+        while self._max[0][0] < cutoff:
+            self._max.popleft()
+        while self._min[0][0] < cutoff:
+            self._min.popleft()
+
+    def covered(self, now):
+        """Pencere süresinin yeterince gözlemlenip gözlemlenmediği"""
+        return self.started_at is not None and now - self.started_at >= self.seconds * WINDOW_MIN_COVERAGE
+
+    def value(self, aggregate):
+        """Penceredeki toplam değer"""
+        if not self._samples:
+            return 0.0
+        if aggregate == 'max':
+            return self._max[0][1]
+        if aggregate == 'min':
+            return self._min[0][1]
+        if aggregate == 'avg':
+            return self._sum / len(self._samples)
+        if aggregate == 'entries':
+            return self._sum
+        return self._samples[-1][1]
+
+    def reset(self):
+        self.started_at = None
+        self._samples.clear()
+        self._max.clear()
+        self._min.clear()
+        self._sum = 0.0
+
+
+class AlertRule:
+    """Tek alarm kuralı ve durumu"""
+
+    def __init__(self, name, zone, aggregate='current', window=0, op='>', threshold=0,
+                 debounce=0, cooldown=300, webhook=None, camera=None):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Geçersiz aggregate: {aggregate}")
+        if op not in OPERATORS:
+            raise ValueError(f"Geçersiz operatör: {op}")
+        self.name = name
+        self.zone = zone if isinstance(zone, str) else tuple(float(v) for v in zone)
+        self.aggregate = aggregate
+        self.window = float(window)
+        self.op = op
+        self.threshold = threshold
+        self.debounce = float(debounce)
+        self.cooldown = float(cooldown)
+        self.webhook = webhook
+        self.camera = camera
+
+        self._compare = OPERATORS[op]
+        self.firing = False
+        self.pending_since = None
+        self.last_fired = None
+        self.last_value = 0.0
+
+    @classmethod
+    def from_dict(cls, config):
+        """JSON kural tanımından oluştur"""
+        return cls(**config)
+
+    def evaluate(self, value, now, covered):
+        """
+        Kural durumunu güncelle.
+
+        Returns:
+            str: 'firing', 'resolved' veya None
+        """
+        self.last_value = value
+        active = covered and self._compare(value, self.threshold)
+
+        if not active:
+            self.pending_since = None
+            if self.firing:
+                self.firing = False
+                return 'resolved'
+            return None
+
+        if self.firing:
+            return None
+        if self.pending_since is None:
+            self.pending_since = now
+        if now - self.pending_since < self.debounce:
+            return None
+        if self.last_fired is not None and now - self.last_fired < self.cooldown:
+            return None
+
+        self.firing = True
+        self.last_fired = now
+        return 'firing'
+
+    def reset(self):
+        self.firing = False
+        self.pending_since = None
+        self.last_value = 0.0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'zone': self.zone if isinstance(self.zone, str) else list(self.zone),
+            'aggregate': self.aggregate,
+            'window': self.window,
+            'op': self.op,
+            'threshold': self.threshold,
+            'firing': self.firing,
+            'value': round(float(self.last_value), 2)
+        }
+
+
+class AlertEngine:
+    """Kamera başına kural motoru"""
+
+    def __init__(self, rules=(), camera_id='0', on_event=None, zone_map=None):
+        """
+        Args:
+            rules: AlertRule listesi (camera alanı başka kameraya ait olanlar atlanır)
+            on_event: on_event(event_dict) callback'i (ör. WebSocket yayını)
+            zone_map: İsimli bölge kuralları için kameranın ZoneMap'i
+        """
+        self.camera_id = str(camera_id)
+        self.on_event = on_event
+        self.zone_map = zone_map
+        self.logger = get_logger("alerts")
+        self.rules = []
+        for rule in rules:
+            if rule.camera is not None and str(rule.camera) != self.camera_id:
+                continue
+            if isinstance(rule.zone, str) and (zone_map is None or rule.zone not in zone_map.names.values()):
+                self.logger.error(f"Alarm kuralı atlandı ({rule.name}): tanımsız bölge {rule.zone}")
+                continue
+            self.rules.append(rule)
+        self.recent_events = collections.deque(maxlen=RECENT_EVENTS)
+
+        # Dikdörtgenler tek numpy dizisinde: tüm kişiler x tüm bölgeler tek işlemde.
+        # İsimli bölgeler dikdörtgenlerden sonra gelir; üyelik maskeden okunan bölge id'siyle
+        rects = sorted({rule.zone for rule in self.rules if not isinstance(rule.zone, str)})
+        names = sorted({rule.zone for rule in self.rules if isinstance(rule.zone, str)})
+        zones = rects + names
+        self._zone_index = {zone: i for i, zone in enumerate(zones)}
+        self._zones = np.array(rects, dtype=np.float32).reshape(-1, 4)
+        self._named_ids = np.array([zone_map.zone_id(name) for name in names], dtype=np.uint8)
+        self._windows = {}   # (bölge, pencere, giriş mi) -> RollingWindow
+        self._bindings = []  # (kural, pencere)
+        for rule in self.rules:
+            key = (self._zone_index[rule.zone], rule.window, rule.aggregate == 'entries')
+            if key not in self._windows:
+                self._windows[key] = RollingWindow(rule.window)
+            self._bindings.append((rule, self._windows[key]))
+        self._previous_members = [set() for _ in zones]
+
+        self._webhook_queue = queue.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+        self._webhook_thread = None
+
+    @classmethod
+    def from_file(cls, path=ALERT_RULES_FILE, **kwargs):
+        """Kural dosyasından oluştur (dosya yoksa kuralsız motor)"""
+        rules = []
+        path = Path(path)
+        if path.exists():
+            try:
+                rules = [AlertRule.from_dict(config) for config in json.loads(path.read_text(encoding='utf-8'))]
+            except Exception as e:
+                get_logger("alerts").error(f"Alarm kuralları okuma hatası: {e}")
+        return cls(rules, **kwargs)
+
+    def update(self, frame_shape, detections, track_ids=None, timestamp=None):
+        """
+        Frame'in bölge sayılarını pencerelere yaz ve kuralları değerlendir.
+
+        Args:
+            frame_shape: Tespitlerin yapıldığı frame'in şekli
+            detections: Sayılacak kişilerin tespitleri
+            track_ids: Tespitlerle aynı sırada track id'leri ('entries' kuralları için)
+            timestamp: Frame zamanı (unix saniye)
+        """
+        if not self.rules:
+            return
+        now = timestamp if timestamp is not None else time.time()
+
+        with stage_timer('alerts'):
+            counts, entries = self._zone_counts(frame_shape, detections, track_ids)
+            for (zone, _, is_entries), window in self._windows.items():
+                window.push(now, entries[zone] if is_entries else counts[zone])
+
+            for rule, window in self._bindings:
+                state = rule.evaluate(window.value(rule.aggregate), now, window.covered(now))
+                if state is not None:
+                    self._publish(rule, state, now)
+
+    def _zone_counts(self, frame_shape, detections, track_ids):
+        """
+        Returns:
+            tuple: (bölge başına kişi sayısı, bölge başına yeni giren track sayısı)
+        """
+        zone_count = len(self._zones)
+        if not detections:
+            for members in self._previous_members:
+                members.clear()
+            return [0] * zone_count, [0] * zone_count
+
+        points = foot_points(frame_shape, detections)
+        zones = self._zones
+        inside = ((points[:, None, 0] >= zones[None, :, 0]) & (points[:, None, 0] < zones[None, :, 2]) &
+                  (points[:, None, 1] >= zones[None, :, 1]) & (points[:, None, 1] < zones[None, :, 3]))
+        if len(self._named_ids):
+            named = self.zone_map.lookup(points)[:, None] == self._named_ids[None, :]
+            inside = np.concatenate([inside, named], axis=1)
+        counts = inside.sum(axis=0).tolist()
+
+        entries = [0] * zone_count
+        if track_ids is not None:
+            for zone in range(zone_count):
+                members = {track_ids[i] for i in np.flatnonzero(inside[:, zone])}
+                entries[zone] = len(members - self._previous_members[zone])
+                self._previous_members[zone] = members
+        return counts, entries
+
+    def _publish(self, rule, state, now):
+        """Alarm olayını WebSocket callback'ine ve webhook kuyruğuna gönder"""
+        event = {
+            'rule': rule.name,
+            'state': state,
+            'camera_id': self.camera_id,
+            'aggregate': rule.aggregate,
+            'window': rule.window,
+            'value': round(float(rule.last_value), 2),
+            'threshold': rule.threshold,
+            'timestamp': now
+        }
+        self.recent_events.append(event)
+        if state == 'firing':
+            ALERTS_FIRED.labels(rule=rule.name).inc()
+            self.logger.info(f"🚨 Alarm: {rule.name} ({rule.aggregate}={event['value']} {rule.op} {rule.threshold})")
+
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                self.logger.error(f"Alarm bildirimi hatası: {e}")
+
+        if rule.webhook:
+            self._start_webhook_thread()
+            try:
+                self._webhook_queue.put_nowait((rule.webhook, event))
+            except queue.Full:
+                WEBHOOK_FAILURES.inc()
+
+    def _start_webhook_thread(self):
+        if self._webhook_thread is None:
+            self._webhook_thread = threading.Thread(target=self._webhook_loop, name='alert-webhooks', daemon=True)
+            self._webhook_thread.start()
+
+    def _webhook_loop(self):
+        while True:
+            item = self._webhook_queue.get()
+            if item is None:
+                break
+            url, event = item
+            try:
+                request = urllib.request.Request(url, data=json.dumps(event).encode('utf-8'),
+                                                 headers={'Content-Type': 'application/json'}, method='POST')
+                with urllib.request.urlopen(request, timeout=ALERT_WEBHOOK_TIMEOUT) as response:
+                    response.read()
+            except Exception as e:
+                WEBHOOK_FAILURES.inc()
+                self.logger.error(f"Webhook hatası ({url}): {e}")
+            finally:
+                self._webhook_queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Bekleyen webhook isteklerinin bitmesini bekle (testler ve kapanış için)"""
+        deadline = time.time() + timeout
+        while self._webhook_queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def reset(self):
+        """Pencereleri ve kural durumlarını sıfırla (sistem durdurulunca)"""
+        for window in self._windows.values():
+            window.reset()
+        for rule in self.rules:
+            rule.reset()
+        for members in self._previous_members:
+            members.clear()
+
+    def get_status(self):
+        """
+        Kurallar ve son olaylar.
+
+        Returns:
+            dict
+        """
+        return {
+            'camera_id': self.camera_id,
+            'rules': [rule.to_dict() for rule in self.rules],
+            'windows': len(self._windows),
+            'recent_events': list(self.recent_events)
+        }
@@ -0,0 +1,321 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Ziyaretçi Rollup Tabloları
+visitors tablosu dakika / saat / gün kovalarına artımlı olarak özetlenir;
+geçmiş dönem sorguları ham tablo yerine bu özetlerden cevaplanır.
+
+- visitors satırları id sırasıyla işlenir (son işlenen id saklanır); her
+  yenilemede sadece yeni satırlar tek INSERT ... ON CONFLICT ile eklenir.
+- Hafta ve ay kovaları günlük özetlerden hesaplanır.
+- Tamamen geçmişte kalan aralıkların sonuçları değişmez: sürüm numarasından
+  bağımsız önbelleklenir ve HTTP tarafında uzun süreli cache'lenebilir.
+  Açık kovaya dokunan sorgular rollup sürümüyle önbelleklenir.
+
+Tablolar (şema: db_migrations):
+    visitor_rollups(granularity, bucket, camera_index, visitors, confidence_sum)
+    rollup_state(name, value)     - last_visitor_id, version
+"""
+
+import collections
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import visitor_db
+from db_migrations import migrate
+from metrics import metrics_registry, stage_timer, DB_QUERIES
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+ROLLUP_REFRESH_SECONDS = getattr(SETTINGS, 'ROLLUP_REFRESH_SECONDS', 5.0)
+ROLLUP_LATE_SECONDS = 120       # Bu süreden eski kovalara yeni ziyaretçi yazılmaz (kapanmış sayılır)
+QUERY_CACHE_SIZE = 256
+MAX_POINTS = 5000
+
+ROLLUP_GRANULARITIES = {
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+}
+BUCKETS = ('minute', 'hour', 'day', 'week', 'month')
+METRICS = ('visitors', 'avg_confidence')
+
+QUERY_CACHE_HITS = metrics_registry.counter('analytics_query_cache_hits_total', 'Önbellekten cevaplanan sorgular')
+QUERY_CACHE_MISSES = metrics_registry.counter('analytics_query_cache_misses_total', 'Rollup tablosundan hesaplanan sorgular')
+
+OLDEST_NEW_VISITOR_QUERY = "SELECT MIN(entry_time) FROM visitors WHERE id > ? AND id <= ?"
+
+
+def rollup_insert_query(fmt):
+    """Yeni ziyaretçi id aralığını (birincil anahtar) verilen kova formatında rollup'a ekleyen sorgu"""
+    return f"""
+        INSERT INTO visitor_rollups (granularity, bucket, camera_index, visitors, confidence_sum)
+        SELECT ?, strftime('{fmt}', entry_time), COALESCE(camera_index, 0),
+               COUNT(*), SUM(confidence_avg)
+        FROM visitors
+        WHERE id > ? AND id <= ? AND confidence_avg > 0.0
+        GROUP BY 2, 3
+        ON CONFLICT (granularity, bucket, camera_index) DO UPDATE SET
+            visitors = visitors + excluded.visitors,
+            confidence_sum = confidence_sum + excluded.confidence_sum
+    """
+
+
+def rollup_range_query(camera=None):
+    """Rollup kovalarını okuyan sorgu (parametreler: granularity, başlangıç, bitiş[, kamera])"""
+    query = ("SELECT bucket, SUM(visitors), SUM(confidence_sum) FROM visitor_rollups "
+             "WHERE granularity = ? AND bucket >= ? AND bucket < ?")
+    if camera is not None:
+        query += " AND camera_index = ?"
+    return query + " GROUP BY bucket"
+
+
+def floor_bucket(moment, bucket):
+    """Zamanı kova başlangıcına yuvarla"""
+    if bucket == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def parse_time(value):
+    """
+    Sorgu parametresindeki ISO zaman. Kayıtlar saat dilimsiz yerel saatle
+    tutulur; saat dilimli değerler (ör. ...+03:00, ...Z) yerel saate çevrilir.
+    """
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00') if value.endswith('Z') else value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def shift_years(moment, years):
+    """Aynı tarihin `years` yıl öncesi / sonrası (29 Şubat artık olmayan yılda 28 Şubat olur)"""
+    try:
+        return moment.replace(year=moment.year + years)
+    except ValueError:
+        return moment.replace(year=moment.year + years, day=28)
+
+
+def next_bucket(moment, bucket):
+    """Bir sonraki kovanın başlangıcı (moment kova başı olmalı)"""
+    if bucket == 'minute':
+        return moment + timedelta(minutes=1)
+    if bucket == 'hour':
+        return moment + timedelta(hours=1)
+    if bucket == 'week':
+        return moment + timedelta(days=7)
+    if bucket == 'month':
+        return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return moment + timedelta(days=1)
+
+
+def bucket_label(moment, bucket):
+    """API'de kullanılan kova etiketi"""
+    if bucket == 'month':
+        return moment.strftime('%Y-%m')
+    if bucket == 'week':
+        return moment.strftime('%Y-%m-%d')
+    return moment.strftime(ROLLUP_GRANULARITIES[bucket])
+
+
+def bucket_labels(start, end, bucket):
+    """[start, end) aralığındaki kova etiketleri (start kova başı olmalı)"""
+    labels = []
+    moment = start
+    while moment < end:
+        labels.append(bucket_label(moment, bucket))
+        if len(labels) > MAX_POINTS:
+            raise ValueError(f"Aralık çok büyük (en fazla {MAX_POINTS} kova)")
+        moment = next_bucket(moment, bucket)
+    return labels
+
+
+def source_granularity(bucket):
+    """İstenen kova boyutunun okunacağı rollup granülaritesi (hafta / ay günlükten)"""
+    return bucket if bucket in ROLLUP_GRANULARITIES else 'day'
+
+
+def source_range(start, end, source):
+    """Rollup tablosundaki bucket >= ? AND bucket < ? sınırları"""
+    fmt = ROLLUP_GRANULARITIES[source]
+    if end != floor_bucket(end, source):
+        end = next_bucket(floor_bucket(end, source), source)
+    return start.strftime(fmt), end.strftime(fmt)
+
+
+def fold_series(rows, labels, source, bucket, metric):
+    """
+    (bucket, visitors, confidence_sum) satırlarını istenen kovalara topla.
+
+    Returns:
+        list: [{'bucket', 'value'}] (boş kovalar 0)
+    """
+    fmt = ROLLUP_GRANULARITIES[source]
+    totals = {label: [0, 0.0] for label in labels}
+    for row_bucket, visitors, confidence_sum in rows:
+        if source != bucket:
+            moment = floor_bucket(datetime.strptime(row_bucket, fmt), bucket)
+            row_bucket = bucket_label(moment, bucket)
+        total = totals.get(row_bucket)
+        if total is not None:
+            total[0] += visitors
+            total[1] += confidence_sum
+
+    if metric == 'avg_confidence':
+        return [{'bucket': label, 'value': round(conf / count, 3) if count else 0.0}
+                for label, (count, conf) in totals.items()]
+    return [{'bucket': label, 'value': count} for label, (count, _) in totals.items()]
+
+
+class RollupStore:
+    """Rollup tablolarını güncel tutan ve aralık sorgularını cevaplayan sınıf"""
+
+    def __init__(self, db_path=visitor_db.DB_PATH):
+        self.db_path = db_path
+        self.logger = get_logger("rollups")
+        self.version = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._cache = collections.OrderedDict()  # anahtar -> sonuç (LRU)
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = visitor_db.connect(self.db_path)
+        if not self._schema_ready:
+            migrate(conn)
+            self._schema_ready = True
+        return conn
+
+    def refresh(self, force=False):
+        """
+        Yeni ziyaretçi satırlarını rollup tablolarına ekle.
+
+        Args:
+            force: ROLLUP_REFRESH_SECONDS beklemeden yenile
+
+        Returns:
+            int: Eklenen ziyaretçi satırı sayısı
+        """
+        with self._lock:
+            if not force and time.time() - self._last_refresh < ROLLUP_REFRESH_SECONDS:
+                return 0
+            self._last_refresh = time.time()
+
+            conn = self._connect()
+            try:
+                state = dict(conn.execute("SELECT name, value FROM rollup_state").fetchall())
+                last_id = state.get('last_visitor_id', 0)
+                self.version = state.get('version', 0)
+                max_id = conn.execute(visitor_db.MAX_VISITOR_ID_QUERY).fetchone()[0] or 0
+                if max_id <= last_id:
+                    return 0
+                oldest = conn.execute(OLDEST_NEW_VISITOR_QUERY, (last_id, max_id)).fetchone()[0]
+
+                with stage_timer('db_write'), conn:
+                    for granularity, fmt in ROLLUP_GRANULARITIES.items():
+                        conn.execute(rollup_insert_query(fmt), (granularity, last_id, max_id))
+                    conn.executemany("INSERT OR REPLACE INTO rollup_state (name, value) VALUES (?, ?)",
+                                     [('last_visitor_id', max_id), ('version', self.version + 1)])
+                self.version += 1
+                self._evict_from(oldest)
+                return max_id - last_id
+            except sqlite3.Error as e:
+                self.logger.error(f"Rollup güncelleme hatası: {e}")
+                return 0
+            finally:
+                conn.close()
+
+    def _evict_from(self, oldest_entry):
+        """
+        Geç gelen (ör. senkronize edilen) satırların düştüğü değişmez aralıkları
+        önbellekten at (kilit tutulurken).
+        """
+        try:
+            oldest = datetime.fromisoformat(str(oldest_entry))
+        except ValueError:
+            self._cache.clear()
+            return
+        for key in [key for key in self._cache if key[-1] is None and key[1] > oldest]:
+            del self._cache[key]
+
+    def query(self, start, end, bucket='hour', camera=None, metric='visitors'):
+        """
+        Aralıktaki kovaların değerleri (boş kovalar 0).
+
+        Args:
+            start, end: datetime, [start, end) aralığı
+            bucket: minute | hour | day | week | month
+            camera: Kamera indeksi (None = tüm kameralar)
+            metric: visitors | avg_confidence
+
+        Returns:
+            dict: {'series': [{'bucket', 'value'}], 'immutable': bool, 'etag': str, 'version': int}
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"Geçersiz bucket: {bucket}")
+        if metric not in METRICS:
+            raise ValueError(f"Geçersiz metrik: {metric}")
+        start = floor_bucket(start, bucket)
+        if end <= start:
+            raise ValueError("Bitiş başlangıçtan sonra olmalı")
+
+        self.refresh()
+
+        # Aralığın sonu kapanmış kovalardaysa sonuç bir daha değişmez
+        immutable = end <= datetime.now() - timedelta(seconds=ROLLUP_LATE_SECONDS)
+        key = (start, end, bucket, camera, metric, None if immutable else self.version)
+
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                QUERY_CACHE_HITS.inc()
+                return result
+
+        QUERY_CACHE_MISSES.inc()
+        series = self._compute(start, end, bucket, camera, metric)
+        # ETag içerikten: geç gelen veriyle değişen aralık yeni ETag alır
+        etag = hashlib.sha1(repr((key[:5], series)).encode('utf-8')).hexdigest()[:16]
+        result = {'series': series, 'immutable': immutable, 'etag': etag, 'version': self.version}
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, start, end, bucket, camera, metric):
+        """Rollup tablosundan kovaları oku ve istenen kova boyutuna topla"""
+        labels = bucket_labels(start, end, bucket)
+        source = source_granularity(bucket)
+        query = rollup_range_query(camera)
+        params = [source, *source_range(start, end, source)]
+        if camera is not None:
+            params.append(int(camera))
+
+        DB_QUERIES.inc()
+        conn = self._connect()
+        try:
+            with stage_timer('db_query'):
+                rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        return fold_series(rows, labels, source, bucket, metric)
+
+    def get_stats(self):
+        """Rollup ve önbellek durumu"""
+        return {
+            'version': self.version,
+            'cached_queries': len(self._cache),
+            'cache_hits': QUERY_CACHE_HITS.value,
+            'cache_misses': QUERY_CACHE_MISSES.value
+        }
@@ -0,0 +1,204 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Async (ASGI) Sunucu Modu
+ModernWebApp'in rotalarını ve WebSocket olaylarını asyncio üzerinde sunar.
+
+Threading modunda her MJPEG izleyicisi ve long-polling client'ı bir OS thread'i
+tutar. Bu modda video akışı, snapshot ve istatistik endpoint'leri tek event
+loop üzerinde çalışır; veritabanı ve JPEG encode işleri sabit boyutlu bir
+thread havuzunda yapılır.
+
+Kullanım:
+    python web_app.py --async
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+import uvicorn
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from metrics import SOCKET_MESSAGES
+from stream_renditions import StreamSession, mjpeg_part
+from src.utils.logger import get_logger
+from src.core.visitor_tracker import visitor_tracker
+
+# DB sorguları ve JPEG encode için sabit thread sayısı
+BLOCKING_WORKERS = 4
+FRAME_POLL_INTERVAL = 0.01
+NO_FRAME_POLL_INTERVAL = 0.1
+
+
+class AsyncWebApp:
+    """ModernWebApp bileşenlerini ASGI üzerinden sunan sarmalayıcı"""
+
+    def __init__(self, web_app):
+        """
+        Args:
+            web_app: Pipeline'ı ve veri fonksiyonlarını sağlayan ModernWebApp
+        """
+        self.web_app = web_app
+        self.logger = get_logger("asgi")
+        self.executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix='asgi-blocking')
+        self.loop = None
+
+        # WebSocket: Flask-SocketIO ile aynı olay isimleri
+        self.sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+        self._setup_socket_events()
+
+        # Hızlı yollar async, geri kalan rotalar Flask uygulamasına düşer
+        routes = [
+            Route('/video_feed', self.video_feed),
+            Route('/api/stream/stats', self.stream_stats),
+            Route('/api/camera/snapshot', self.camera_snapshot),
+            Route('/api/stats/current', self.current_stats),
+            Route('/api/stats/hourly', self.hourly_stats),
+            Route('/api/stats/weekly', self.weekly_stats),
+            Mount('/', app=WsgiToAsgi(web_app.app)),
+        ]
+        self.http_app = Starlette(routes=routes, on_startup=[self._on_startup])
+        self.asgi_app = socketio.ASGIApp(self.sio, other_asgi_app=self.http_app)
+
+        # Pipeline thread'lerinden gelen yayınlar event loop'a aktarılır
+        web_app.external_emitter = self.emit_threadsafe
+
+    async def _on_startup(self):
+        """Event loop referansını sakla"""
+        self.loop = asyncio.get_running_loop()
+
+    def _run_blocking(self, func, *args):
+        """Bloklayan fonksiyonu sabit thread havuzunda çalıştır"""
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def emit_threadsafe(self, event, data):
+        """Herhangi bir thread'den tüm client'lara yayın yap"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.sio.emit(event, data), self.loop)
+
+    async def _reply(self, sid, event, data):
+        """Tek client'a mesaj gönder (sayaçlı)"""
+        SOCKET_MESSAGES.labels(event=event).inc()
+        await self.sio.emit(event, data, to=sid)
+
+    def _setup_socket_events(self):
+        """Setup WebSocket events"""
+
+        @self.sio.event
+        async def connect(sid, environ, auth=None):
+            """Client bağlandığında"""
+            self.logger.info(f"Web client bağlandı: {sid}")
+            self.web_app.socket_clients.add(sid)
+            await self._reply(sid, 'connection_status', {'status': 'connected'})
+            stats = await self._run_blocking(visitor_tracker.get_current_stats)
+            await self._reply(sid, 'stats_update', stats)
+
+        @self.sio.event
+        async def disconnect(sid):
+            """Client bağlantısı kesildiğinde"""
+            self.logger.info(f"Web client bağlantısı kesildi: {sid}")
+            self.web_app.socket_clients.discard(sid)
+
+        @self.sio.on('request_stats')
+        async def request_stats(sid, *args):
+            """İstatistik güncellemesi istendi"""
+            try:
+                stats = await self._run_blocking(self.web_app.get_live_stats)
+                await self._reply(sid, 'stats_update', stats)
+            except Exception as e:
+                self.logger.error(f"Stats gönderme hatası: {e}")
+
+        @self.sio.on('request_hourly_data')
+        async def request_hourly_data(sid, *args):
+            """Saatlik veri istendi"""
+            try:
+                hourly_data = await self._run_blocking(self.web_app._get_hourly_distribution)
+                await self._reply(sid, 'hourly_update', hourly_data)
+            except Exception as e:
+                self.logger.error(f"Hourly data gönderme hatası: {e}")
+
+    async def video_feed(self, request):
+        """Video stream endpoint (izleyici başına thread yok)"""
+        session = StreamSession.from_request_args(self.web_app.stream_encoder, request.query_params,
+                                                  request.headers.get('user-agent', ''), self.logger,
+                                                  self.web_app.stream_overlay_default)
+        return StreamingResponse(self._generate_frames(session),
+                                 media_type='multipart/x-mixed-replace; boundary=frame')
+
+    async def stream_stats(self, request):
+        """Rendition başına izleyici, encode CPU'su ve bant genişliği"""
+        return JSONResponse({'success': True, 'data': self.web_app.stream_encoder.get_stats()})
+
+    async def _generate_frames(self, session):
+        """Yeni frame geldikçe oturumun rendition'ındaki paylaşılan JPEG'i gönder"""
+        last_seq = None
+        try:
+            while True:
+                wait = session.wait_time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                if self.web_app.frame_seq == last_seq:
+                    await asyncio.sleep(FRAME_POLL_INTERVAL)
+                    continue
+
+                seq, jpeg = await self._run_blocking(session.next_frame)
+                if jpeg is None:
+                    await asyncio.sleep(NO_FRAME_POLL_INTERVAL)
+                    continue
+
+                last_seq = seq
+                part = mjpeg_part(seq, jpeg)
+
+                # Starlette her parçanın gönderimini bekler; dönüş süresi = yazma süresi
+                yielded_at = time.perf_counter()
+                yield part
+                session.record_sent(len(part), time.perf_counter() - yielded_at)
+        finally:
+            session.close()
+
+    async def camera_snapshot(self, request):
+        """Anlık kamera görüntüsü"""
+        try:
+            jpeg = await self._run_blocking(self.web_app.get_snapshot_jpeg)
+            if jpeg is None:
+                return JSONResponse({'success': False, 'message': 'Kamera aktif değil'})
+            return Response(jpeg, media_type='image/jpeg')
+        except Exception as e:
+            return JSONResponse({'success': False, 'message': str(e)})
+
+    async def current_stats(self, request):
+        """Mevcut istatistikleri getir"""
+        try:
+            data = await self._run_blocking(self.web_app.get_dashboard_stats)
+            return JSONResponse({'success': True, 'data': data})
+        except Exception as e:
+            self.logger.error(f"Stats getirme hatası: {e}")
+            return JSONResponse({'success': False, 'message': str(e)})
+
+    async def hourly_stats(self, request):
+        """Saatlik istatistikleri getir"""
+        try:
+            data = await self._run_blocking(self.web_app._get_hourly_distribution)
+            return JSONResponse({'success': True, 'data': data})
+        except Exception as e:
+            return JSONResponse({'success': False, 'message': str(e)})
+
+    async def weekly_stats(self, request):
+        """Haftalık istatistikleri getir"""
+        try:
+            data = await self._run_blocking(self.web_app._get_weekly_trend)
+            return JSONResponse({'success': True, 'data': data})
+        except Exception as e:
+            return JSONResponse({'success': False, 'message': str(e)})
+
+
+def run_async(web_app, host='0.0.0.0', port=5000):
+    """ModernWebApp'i uvicorn (tek event loop) ile başlat"""
+    async_app = AsyncWebApp(web_app)
+    web_app.logger.info(f"🚀 Async Web App başlatılıyor: http://{host}:{port}")
+    uvicorn.run(async_app.asgi_app, host=host, port=port, log_level='warning')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Analytics sorgu benchmark'ı
+Geçici bir veritabanına N günlük sentetik ziyaretçi yazar; yıllık / aylık
+/ saatlik görünümleri ham visitors tablosu üzerinde GROUP BY ile ve
+rollup tablosundan (ilk sorgu ve önbellekten) cevaplama sürelerini
+karşılaştırır.
+
+Kullanım:
+    python bench_analytics_query.py [--days 730] [--per-day 800]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from analytics_rollups import RollupStore, floor_bucket
+
+
+def create_database(path, days, per_day, seed=0):
+    """Son `days` günün ziyaretçilerini yaz (mağaza saatlerinde, 2 kamera)"""
+    rng = np.random.default_rng(seed)
+    today = floor_bucket(datetime.now(), 'day')
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE visitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_time TIMESTAMP,
+            confidence_avg REAL,
+            bounding_box TEXT,
+            camera_index INTEGER,
+            detection_count INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX idx_visitors_entry_time ON visitors(entry_time)")
+    for day in range(days, -1, -1):
+        date = today - timedelta(days=day)
+        seconds = np.sort(rng.uniform(9 * 3600, 21 * 3600, per_day))
+        rows = [((date + timedelta(seconds=float(s))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                 float(rng.uniform(0.4, 0.95)), '[]', int(rng.integers(0, 2)), 1) for s in seconds]
+        conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                         "detection_count) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+RAW_FORMATS = {'month': '%Y-%m', 'day': '%Y-%m-%d', 'hour': '%Y-%m-%d %H:00'}
+
+
+def raw_query(path, start, end, bucket):
+    """Rollup olmadan: ham tabloda GROUP BY"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"""
+            SELECT strftime('{RAW_FORMATS[bucket]}', entry_time) AS bucket, COUNT(*)
+            FROM visitors
+            WHERE entry_time >= ? AND entry_time < ? AND confidence_avg > 0.0
+            GROUP BY bucket
+        """, (start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
+    finally:
+        conn.close()
+
+
+def timed(func, repeats=5):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Analytics sorgu benchmark'ı")
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--per-day', type=int, default=800)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        t0 = time.perf_counter()
+        create_database(path, args.days, args.per_day)
+        print(f"🗄️  {args.days * args.per_day} ziyaretçi yazıldı ({time.perf_counter() - t0:.1f}s)")
+
+        store = RollupStore(path)
+        t0 = time.perf_counter()
+        added = store.refresh(force=True)
+        print(f"🧮 İlk rollup: {added} satır, {time.perf_counter() - t0:.2f}s")
+
+        today = floor_bucket(datetime.now(), 'day')
+        year_start = today.replace(month=1, day=1)
+        views = [
+            ('Yıl / ay', year_start.replace(year=year_start.year - 1), year_start, 'month'),
+            ('Yıl / gün', today - timedelta(days=365), today, 'day'),
+            ('Ay / saat', today - timedelta(days=30), today, 'hour'),
+            ('Bugün / saat', today, today + timedelta(days=1), 'hour'),
+        ]
+
+        print("-" * 64)
+        print(f"{'Görünüm':<14}{'Ham SQL ms':>12}{'Rollup ms':>12}{'Önbellek ms':>13}{'Değişmez':>11}")
+        for name, start, end, bucket in views:
+            raw_ms = timed(lambda: raw_query(path, start, end, bucket))
+            store._cache.clear()
+            t0 = time.perf_counter()
+            result = store.query(start, end, bucket)
+            rollup_ms = (time.perf_counter() - t0) * 1000
+            cached_ms = timed(lambda: store.query(start, end, bucket), repeats=100)
+
+            expected = sum(count for _, count in raw_query(path, start, end, bucket))
+            actual = sum(point['value'] for point in result['series'])
+            check = '' if expected == actual else f"  ❌ {actual} != {expected}"
+            print(f"{name:<14}{raw_ms:>12.2f}{rollup_ms:>12.2f}{cached_ms:>13.3f}"
+                  f"{'evet' if result['immutable'] else 'hayır':>11}{check}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Klip pre-roll buffer'ı bellek benchmark'ı
+Farklı pre-roll sürelerinde, encode edilmiş JPEG ring buffer'ının bellek
+kullanımını ham (BGR) frame tutmakla karşılaştırır.
+
+Kullanım:
+    python bench_clip_buffer.py [--video data/replay/magaza.mp4] [--seconds 5 10 30 60]
+                                [--fps 10] [--rendition 640] [--quality 70]
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+import numpy as np
+
+from clip_recorder import FrameRingBuffer
+from stream_renditions import RenditionEncoder, RENDITIONS
+
+SAMPLE_FRAMES = 120
+
+
+def load_frames(video_path, count, width=1280, height=720):
+    """Videodan frame yükle; video yoksa gürültülü hareketli sahne üret"""
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames
+
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    for i in range(count):
+        frame = np.roll(background, i * 4, axis=1)
+        noise = rng.integers(0, 12, frame.shape, dtype=np.uint8)
+        frames.append(cv2.add(frame, noise))
+    return frames
+
+
+def encode_frames(frames, rendition, quality):
+    """Frame'leri klip kaydedicinin kullandığı encoder ile JPEG'e çevir"""
+    state = {'seq': 0, 'frame': None}
+    encoder = RenditionEncoder(lambda: (state['seq'], state['frame'], None))
+    jpegs = []
+    for index, frame in enumerate(frames):
+        state.update(seq=index + 1, frame=frame)
+        jpegs.append(encoder.get(rendition, quality)[1])
+    return jpegs
+
+
+def measure(jpegs, frame_count):
+    """
+    frame_count kadar JPEG'i sınırsız buffer'a koy ve belleği ölç.
+
+    Returns:
+        tuple: (buffer byte sayısı, tracemalloc ile ölçülen byte)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ring = FrameRingBuffer(max_bytes=float('inf'))
+    for index in range(frame_count):
+        # Her frame ayrı bytes nesnesi olsun (gerçek kullanımdaki gibi)
+        ring.push(index, float(index), bytes(bytearray(jpegs[index % len(jpegs)])))
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return ring.nbytes, traced
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Klip buffer bellek benchmark'ı")
+    parser.add_argument('--video', help="Kullanılacak video (yoksa sentetik sahne)")
+    parser.add_argument('--seconds', type=float, nargs='+', default=[5, 10, 30, 60])
+    parser.add_argument('--fps', type=float, default=10.0)
+    parser.add_argument('--rendition', default='640', choices=sorted(RENDITIONS))
+    parser.add_argument('--quality', type=int, default=70)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, SAMPLE_FRAMES)
+    if not frames:
+        print(f"❌ Video okunamadı: {args.video}")
+        return 1
+
+    jpegs = encode_frames(frames, args.rendition, args.quality)
+    h, w = frames[0].shape[:2]
+    target_width = RENDITIONS[args.rendition] or w
+    raw_frame_bytes = target_width * int(round(h * target_width / w)) * 3
+    avg_jpeg = sum(len(j) for j in jpegs) / len(jpegs)
+
+    print(f"🎞️  Kaynak {w}x{h}, rendition {args.rendition}@{args.quality}, {args.fps:.0f} FPS")
+    print(f"📦 Ortalama JPEG {avg_jpeg / 1024:.1f} KB, ham frame {raw_frame_bytes / 1024:.0f} KB")
+    print("-" * 64)
+    print(f"{'Pre-roll':>9}{'Frame':>8}{'JPEG MB':>10}{'Ölçülen MB':>12}{'Ham MB':>10}{'Oran':>9}")
+
+    for seconds in args.seconds:
+        count = int(seconds * args.fps)
+        jpeg_bytes, traced = measure(jpegs, count)
+        raw_bytes = raw_frame_bytes * count
+        print(f"{seconds:>8.0f}s{count:>8}{jpeg_bytes / 2**20:>10.2f}{traced / 2**20:>12.2f}"
+              f"{raw_bytes / 2**20:>10.1f}{raw_bytes / max(traced, 1):>8.1f}x")
+
+    print("-" * 64)
+    print("CLIP_BUFFER_MB en az 'Ölçülen MB' kadar olmalı (sahne hareketine göre %50 pay bırakın)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
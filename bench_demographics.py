@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Demografik analiz aşaması benchmark'ı
+Sentetik bir sahnede (hareket eden kişiler, 720p frame) ana pipeline'ın
+FPS'ini demografik aşama kapalıyken ve açıkken karşılaştırır; aşamanın
+kuyruk derinliğini, parti boyutunu ve kesit başına model süresini raporlar.
+
+models/ altındaki yaş/cinsiyet modelleri yoksa model çağrısı yerine kesit
+başına --synthetic-ms süren bir matris yükü kullanılır.
+
+Kullanım:
+    python bench_demographics.py [--frames 600] [--people 6] [--synthetic-ms 15]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+import numpy as np
+
+import demographics
+import visitor_db
+from db_migrations import migrate
+from demographics import DemographicsStage
+from iou_tracker import IouTracker
+
+FRAME_SHAPE = (720, 1280, 3)
+
+
+def synthetic_scene(frames, people, seed=0):
+    """
+    Soldan sağa yürüyen kişiler; her kişi ~150 frame sahnede kalır.
+
+    Returns:
+        list: Frame başına tespit listesi
+    """
+    rng = np.random.default_rng(seed)
+    height, width = FRAME_SHAPE[:2]
+    walkers = []
+    scene = []
+    for index in range(frames):
+        if len(walkers) < people and rng.random() < 0.05:
+            walkers.append([float(rng.integers(-40, 0)), float(rng.integers(100, 300)),
+                            float(rng.uniform(6, 10)), float(rng.integers(260, 380))])
+        detections = []
+        for walker in walkers:
+            walker[0] += walker[2]
+            h = walker[3]
+            detections.append({'bbox': [int(walker[0]), int(walker[1]), int(h * 0.4), int(h)],
+                               'confidence': float(rng.uniform(0.5, 0.95))})
+        walkers = [w for w in walkers if w[0] < width]
+        scene.append(detections)
+    return scene
+
+
+def primary_work(frame):
+    """Ana pipeline'daki ön işleme + model maliyetine benzer yük"""
+    resized = cv2.resize(frame, (640, 384))
+    blurred = cv2.GaussianBlur(resized, (9, 9), 0)
+    return cv2.dnn.blobFromImage(blurred, 1 / 255.0, (640, 384))
+
+
+def synthetic_analyze(stage, per_crop_ms):
+    """Model dosyaları yoksa kesit başına sabit süren CPU yükü"""
+    matrix = np.random.default_rng(0).standard_normal((256, 256)).astype(np.float32)
+    t0 = time.perf_counter()
+    for _ in range(50):
+        matrix @ matrix
+    per_call = (time.perf_counter() - t0) / 50
+    repeats = max(int(per_crop_ms / 1000 / per_call), 1)
+
+    def analyze(batch):
+        start = time.perf_counter()
+        for _ in range(repeats * len(batch)):
+            matrix @ matrix
+        elapsed = time.perf_counter() - start
+        demographics.DEMOGRAPHICS_BATCH_SECONDS.observe(elapsed)
+        stage.stats['batches'] += 1
+        stage.stats['processed'] += len(batch)
+        stage.stats['model_seconds'] += elapsed
+        return [('25-32', 'Kadın', 0.9)] * len(batch)
+
+    return analyze
+
+
+def run(scene, frame, db_path, stage_factory=None):
+    """
+    Sahneyi işle; onaylanan her track için visitors'a satır yaz (visitor_tracker yerine).
+
+    Returns:
+        tuple: (FPS, aşama veya None)
+    """
+    tracker = IouTracker()
+    rows = visitor_db.VisitorRows(db_path)
+    rows.start()
+    stage = stage_factory(tracker, rows) if stage_factory else None
+    conn = visitor_db.connect(db_path)
+
+    wall_start = time.time()
+    start = time.perf_counter()
+    for index, detections in enumerate(scene):
+        timestamp = wall_start + index / 30.0
+        primary_work(frame)
+        track_update = tracker.update(detections, timestamp)
+        for index, _ in track_update.confirmed:
+            with conn:
+                conn.execute("INSERT INTO visitors (entry_time) VALUES (?)", (visitor_db.format_time(timestamp),))
+            rows.counted(1, [detections[index]], detections, track_update.track_ids, timestamp)
+        if stage is not None:
+            stage.update(frame, detections, track_update, timestamp)
+    elapsed = time.perf_counter() - start
+
+    if stage is not None:
+        stage.stop()
+    conn.close()
+    return len(scene) / elapsed, stage
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Demografik analiz benchmark'ı")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--people', type=int, default=6)
+    parser.add_argument('--synthetic-ms', type=float, default=15.0)
+    parser.add_argument('--batch-size', type=int, default=demographics.DEMOGRAPHICS_BATCH_SIZE)
+    parser.add_argument('--repeats', type=int, default=3, help="Mod başına tekrar (medyan alınır)")
+    args = parser.parse_args()
+
+    scene = synthetic_scene(args.frames, args.people)
+    frame = np.random.default_rng(1).integers(0, 255, FRAME_SHAPE, dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.db')
+        conn = sqlite3.connect(db_path)
+        migrate(conn)
+        conn.close()
+
+        synthetic = []
+
+        def make_stage(tracker, rows):
+            stage = DemographicsStage(tracker, batch_size=args.batch_size, batch_wait=0.5, db_path=db_path,
+                                      rows=rows)
+            if not stage.load():
+                stage.enabled = True
+                stage._analyze = synthetic_analyze(stage, args.synthetic_ms)
+                synthetic.append(True)
+            stage.start()
+            return stage
+
+        run(scene[:60], frame, db_path)  # Isınma
+        baseline_runs, stage_runs = [], []
+        for _ in range(args.repeats):
+            baseline_runs.append(run(scene, frame, db_path)[0])
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("DELETE FROM visitors")
+            fps, stage = run(scene, frame, db_path, make_stage)
+            stage_runs.append(fps)
+        baseline_fps, stage_fps = float(np.median(baseline_runs)), float(np.median(stage_runs))
+
+        with sqlite3.connect(db_path) as conn:
+            total, labelled = conn.execute("SELECT COUNT(*), COUNT(age_group) FROM visitors").fetchone()
+
+    stats = stage.get_stats()
+    model = f"sentetik ({args.synthetic_ms:.0f} ms/kesit)" if synthetic else "Caffe yaş/cinsiyet"
+    print(f"🎞️  {args.frames} frame x {args.repeats}, en fazla {args.people} kişi, model: {model}")
+    print("-" * 60)
+    print(f"{'Mod':<24}{'FPS':>10}")
+    print(f"{'Sadece ana pipeline':<24}{baseline_fps:>10.1f}")
+    print(f"{'+ demografik aşama':<24}{stage_fps:>10.1f}")
+    print(f"📉 FPS farkı: {(stage_fps - baseline_fps) / baseline_fps * 100:+.1f}%")
+    print("-" * 60)
+    print(f"🧠 {stats['processed']} kesit, ortalama parti {stats['avg_batch_size']}, "
+          f"{stats['avg_ms_per_crop']} ms/kesit, kalan kuyruk {stats['queue_depth']}")
+    print(f"💾 Etiketlenen satır: {stats['written']} (eşleşmeyen {stats['unmatched']}), "
+          f"tabloda {labelled}/{total}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Detector process havuzu ölçekleme benchmark'ı
+Kayıtlı videodan okunan frame'leri tek process'te ve 2/4/8 worker'lı havuzda
+işleyip FPS ve hızlanma oranını raporlar.
+
+--cores verilirse her çekirdek sayısı için process (ve worker'ları) o kadar
+çekirdeğe sabitlenir (Linux), tek process ile çekirdek sayısı kadar worker'lı
+havuz karşılaştırılır: havuzun 2, 4 ve 8 çekirdekte ölçeklemesi.
+
+Kullanım:
+    python bench_detector_pool.py data/replay/magaza.mp4 [--frames 300] [--workers 2 4 8]
+    python bench_detector_pool.py data/replay/magaza.mp4 --cores 2 4 8 --output logs/detector_pool_scaling.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+
+from detector_pool import DetectorPool
+
+
+def load_frames(video_path, max_frames):
+    """Videodan frame'leri belleğe yükle (disk okuması ölçüme karışmasın)"""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_single_process(frames):
+    """
+    Mevcut davranış: tespit ana process'te.
+
+    Returns:
+        float: FPS
+    """
+    from src.core.detector import HumanDetector
+
+    detector = HumanDetector()
+    if not detector.initialize():
+        raise RuntimeError("YOLOv8 modeli yüklenemedi")
+
+    detector.detect_humans(frames[0], draw_boxes=False)  # ısınma
+    start = time.perf_counter()
+    for frame in frames:
+        detector.detect_humans(frame, draw_boxes=False)
+    elapsed = time.perf_counter() - start
+    detector.cleanup()
+    return len(frames) / elapsed
+
+
+def bench_pool(frames, num_workers):
+    """
+    Havuz modu: frame'ler slot boşaldıkça gönderilir (atlama yok).
+
+    Returns:
+        tuple: (FPS, sıra hatası sayısı)
+    """
+    results = []
+    done = threading.Event()
+
+    def on_result(seq, frame, detections):
+        results.append(seq)
+        if len(results) == len(frames):
+            done.set()
+
+    pool = DetectorPool(num_workers, on_result=on_result)
+    if not pool.start(frames[0].shape, frames[0].dtype):
+        raise RuntimeError("Detector havuzu başlatılamadı")
+
+    start = time.perf_counter()
+    for frame in frames:
+        while pool.submit(frame) is None:
+            time.sleep(0.001)
+    done.wait(timeout=600)
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    order_errors = sum(1 for i, seq in enumerate(results) if seq != i)
+    return len(results) / elapsed, order_errors
+
+
+def bench_scaling(frames, core_counts):
+    """
+    Her çekirdek sayısında tek process ve çekirdek sayısı kadar worker'lı havuz.
+    Worker'lar ana process'in CPU sabitlemesini devralır.
+
+    Returns:
+        list: {'cores', 'single_fps', 'pool_fps', 'speedup', 'order_errors'} sözlükleri
+    """
+    available = sorted(os.sched_getaffinity(0))
+    rows = []
+    print(f"{'Çekirdek':<10}{'Tek FPS':>10}{'Havuz FPS':>12}{'Hızlanma':>11}{'Sıra hatası':>14}")
+    try:
+        for cores in core_counts:
+            if cores > len(available):
+                print(f"⚠️  {cores} çekirdek istendi, {len(available)} kullanılabilir; atlanıyor")
+                continue
+            os.sched_setaffinity(0, set(available[:cores]))
+            single = bench_single_process(frames)
+            fps, order_errors = bench_pool(frames, cores)
+            row = {'cores': cores, 'single_fps': round(single, 2), 'pool_fps': round(fps, 2),
+                   'speedup': round(fps / single, 2), 'order_errors': order_errors}
+            rows.append(row)
+            print(f"{cores:<10}{single:>10.1f}{fps:>12.1f}{row['speedup']:>10.2f}x{order_errors:>14}")
+    finally:
+        os.sched_setaffinity(0, set(available))
+    return rows
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Detector havuzu ölçekleme benchmark'ı")
+    parser.add_argument('video', help="Tekrar oynatılacak video dosyası")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--cores', type=int, nargs='+',
+                        help="Çekirdek sayısı başına ölçekleme (process bu çekirdeklere sabitlenir, Linux)")
+    parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f"❌ Video okunamadı: {args.video}")
+        return 1
+
+    h, w = frames[0].shape[:2]
+    print(f"🎞️  {len(frames)} frame ({w}x{h}), CPU çekirdeği: {os.cpu_count()}")
+    print("-" * 50)
+
+    if args.cores:
+        if not hasattr(os, 'sched_setaffinity'):
+            print("❌ --cores için CPU sabitleme (sched_setaffinity) gerekli (Linux)")
+            return 1
+        rows = bench_scaling(frames, args.cores)
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.output).write_text(json.dumps({
+                'created_at': datetime.now().isoformat(), 'video': args.video,
+                'frames': len(frames), 'resolution': f"{w}x{h}", 'results': rows
+            }, ensure_ascii=False, indent=2), encoding='utf-8')
+            print(f"\n📝 Sonuçlar: {args.output}")
+        return 0
+
+    baseline = bench_single_process(frames)
+    print(f"{'Mod':<16}{'FPS':>10}{'Hızlanma':>12}{'Sıra hatası':>14}")
+    print(f"{'tek process':<16}{baseline:>10.1f}{1.0:>11.2f}x{'-':>14}")
+
+    for workers in args.workers:
+        if workers > (os.cpu_count() or 1):
+            print(f"⚠️  {workers} worker > {os.cpu_count()} çekirdek (sonuç yanıltıcı olabilir)")
+        fps, order_errors = bench_pool(frames, workers)
+        print(f"{f'{workers} worker':<16}{fps:>10.1f}{fps / baseline:>11.2f}x{order_errors:>14}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Çalışan filtresi maliyet benchmark'ı
+
+1) Galeri eşleştirme: farklı galeri boyutlarında, frame'deki yüz sayısına
+   göre tek matris çarpımlı eşleştirme süresi (sentetik embedding'ler).
+2) Pipeline: kayıtlı videoda visitor_tracker.process_detections süresi
+   filtre olmadan ve filtre ile (yüz kontrolleri dahil) karşılaştırılır.
+
+Kullanım:
+    python bench_employee_filter.py                         # sadece galeri eşleştirme
+    python bench_employee_filter.py --video data/replay/magaza.mp4 --frames 500
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from employee_gallery import EmployeeGallery, EmployeeFilter, face_recognition
+from iou_tracker import IouTracker
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) * 1000 if len(values) else 0.0
+
+
+def bench_gallery_match(sizes, faces_per_frame, repeats=2000):
+    """Sentetik galeriyle eşleştirme süresi (mikro saniye)"""
+    rng = np.random.default_rng(0)
+    print(f"{'Galeri':>8}{'Yüz/frame':>11}{'Ortalama µs':>14}{'p99 µs':>10}")
+    for size in sizes:
+        gallery = EmployeeGallery(directory='.')
+        gallery._set([f"calisan_{i // 3}" for i in range(size)],
+                     rng.normal(0, 0.1, (size, 128)).astype(np.float32))
+        for faces in faces_per_frame:
+            encodings = rng.normal(0, 0.1, (faces, 128)).astype(np.float32)
+            times = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                gallery.match(encodings)
+                times.append(time.perf_counter() - t0)
+            print(f"{size:>8}{faces:>11}{np.mean(times) * 1e6:>14.1f}{np.percentile(times, 99) * 1e6:>10.1f}")
+
+
+def load_detections(video_path, max_frames):
+    """Videodaki frame'leri ve tespitlerini önceden hesapla (model süresi ölçüme karışmasın)"""
+    import cv2
+    from src.core.detector import HumanDetector
+
+    detector = HumanDetector()
+    if not detector.initialize():
+        raise RuntimeError("YOLOv8 modeli yüklenemedi")
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detections, _ = detector.detect_humans(frame, draw_boxes=False)
+        frames.append((frame, detections))
+    cap.release()
+    detector.cleanup()
+    return frames
+
+
+def bench_pipeline(frames):
+    """
+    Frame başına visitor_tracker süresi: filtresiz ve filtreli.
+
+    Returns:
+        tuple: (filtresiz süreler, filtreli süreler, filtre istatistikleri)
+    """
+    from src.core.visitor_tracker import visitor_tracker
+
+    baseline = []
+    for frame, detections in frames:
+        t0 = time.perf_counter()
+        if detections:
+            visitor_tracker.process_detections(detections, datetime.now())
+        baseline.append(time.perf_counter() - t0)
+
+    tracker = IouTracker()
+    employee_filter = EmployeeFilter(tracker)
+    employee_filter.load()
+
+    filtered = []
+    for frame, detections in frames:
+        t0 = time.perf_counter()
+        track_update = tracker.update(detections)
+        counted = employee_filter.filter(frame, detections, track_update)
+        if counted:
+            visitor_tracker.process_detections(counted, datetime.now())
+        filtered.append(time.perf_counter() - t0)
+
+    return baseline, filtered, employee_filter.get_stats()
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Çalışan filtresi benchmark'ı")
+    parser.add_argument('--video', help="Pipeline ölçümü için video")
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print("🧮 Galeri eşleştirme (tek matris çarpımı)")
+    bench_gallery_match(args.gallery_sizes, [1, 4])
+
+    if not args.video:
+        return 0
+
+    if face_recognition is None:
+        print("⚠️  face_recognition kurulu değil: filtre devre dışı, sadece track maliyeti ölçülür")
+
+    frames = load_detections(args.video, args.frames)
+    baseline, filtered, stats = bench_pipeline(frames)
+
+    print("-" * 60)
+    print(f"🎞️  {len(frames)} frame, galeri: {stats['gallery_faces']} yüz / {stats['gallery_people']} kişi")
+    print(f"{'Mod':<22}{'Ort. ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print(f"{'process_detections':<22}{np.mean(baseline) * 1000:>10.3f}"
+          f"{percentile(baseline, 95):>10.3f}{percentile(baseline, 99):>10.3f}")
+    print(f"{'filtre + process':<22}{np.mean(filtered) * 1000:>10.3f}"
+          f"{percentile(filtered, 95):>10.3f}{percentile(filtered, 99):>10.3f}")
+    print(f"➕ Ek gecikme: {(np.mean(filtered) - np.mean(baseline)) * 1000:.3f} ms/frame, "
+          f"{stats['face_checks']} yüz kontrolü (ortalama {stats['avg_face_check_ms']:.1f} ms), "
+          f"{stats['employee_tracks']} çalışan track'i")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
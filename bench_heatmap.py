@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Doluluk ısı haritası maliyet benchmark'ı
+Frame başına güncelleme süresini (kişi sayısına göre), PNG çizimini
+(önbellek ıskası / isabeti) ve saatlik sıkıştırılmış kaydın süresi ile
+boyutunu ölçer. Sentetik tespitler kullanılır, kamera gerekmez.
+
+Kullanım:
+    python bench_heatmap.py [--frames 5000] [--people 0 5 20 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from occupancy_heatmap import OccupancyHeatmap, HEATMAP_PNG_WIDTH
+
+FRAME_SHAPE = (1080, 1920, 3)
+
+
+def random_detections(rng, people):
+    """Frame içinde rastgele kişi kutuları"""
+    height, width = FRAME_SHAPE[:2]
+    detections = []
+    for _ in range(people):
+        h = int(rng.integers(200, 500))
+        w = h * 2 // 5
+        detections.append({'bbox': [int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h],
+                           'confidence': 0.8})
+    return detections
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Isı haritası benchmark'ı")
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--people', type=int, nargs='+', default=[0, 5, 20, 50])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        heatmap = OccupancyHeatmap(camera_id='bench', directory=directory)
+
+        print(f"{'Kişi':>6}{'Ort. µs':>10}{'p99 µs':>10}")
+        timestamp = time.time()
+        for people in args.people:
+            scenes = [random_detections(rng, people) for _ in range(200)]
+            times = []
+            for index in range(args.frames):
+                timestamp += 1 / 30.0
+                t0 = time.perf_counter()
+                heatmap.update(FRAME_SHAPE, scenes[index % len(scenes)], timestamp)
+                times.append(time.perf_counter() - t0)
+            print(f"{people:>6}{np.mean(times) * 1e6:>10.1f}{np.percentile(times, 99) * 1e6:>10.1f}")
+
+        print("-" * 40)
+        t0 = time.perf_counter()
+        png, _ = heatmap.render_png(HEATMAP_PNG_WIDTH)
+        miss = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            heatmap.render_png(HEATMAP_PNG_WIDTH)
+        hit = (time.perf_counter() - t0) / 1000
+        print(f"🖼️  PNG ({HEATMAP_PNG_WIDTH} px, {len(png) / 1024:.1f} KB): çizim {miss * 1000:.2f} ms, "
+              f"önbellekten {hit * 1e6:.1f} µs")
+
+        t0 = time.perf_counter()
+        heatmap.save()
+        saved = time.perf_counter() - t0
+        sizes = [os.path.getsize(os.path.join(heatmap.directory, name)) for name in os.listdir(heatmap.directory)]
+        print(f"💾 Kaydetme {saved * 1000:.1f} ms, {len(sizes)} dosya, toplam {sum(sizes) / 1024:.1f} KB")
+        print(f"📍 Bölgeler: {heatmap.region_shares()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Sunucu tarafı overlay vs. client tarafı overlay CPU benchmark'ı
+Aynı frame dizisini V izleyiciye (rendition'lara dağıtılmış) gönderiyormuş
+gibi RenditionEncoder üzerinden encode eder ve frame başına harcanan CPU'yu
+ölçer:
+
+    server   - kutular sunucuda çizilir (tüm izleyiciler ?overlay=1)
+    client   - ham akış + tespit kanalı (JSON, izleyici başına serileştirme)
+    mixed    - izleyicilerin yarısı overlay ister (sunucu iki ayrı encode yapar)
+
+Kullanım:
+    python bench_overlay.py [--video data/replay/magaza.mp4] [--viewers 1 4 16] [--frames 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+import numpy as np
+
+from detection_channel import build_detection_event, pack_detection_event
+from iou_tracker import IouTracker
+from stream_renditions import RenditionEncoder, RENDITION_ORDER, DEFAULT_QUALITY
+
+PEOPLE = 6
+
+
+def load_frames(video_path, max_frames, width=1280, height=720):
+    """Videodan frame yükle; video yoksa hareketli sentetik sahne üret"""
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames
+
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    for i in range(max_frames):
+        frame = np.roll(background, i * 4, axis=1)
+        frames.append(frame)
+    return frames
+
+
+def synthetic_detections(index, frame_shape):
+    """Sahnede yürüyen kişiler gibi hareket eden kutular"""
+    height, width = frame_shape[:2]
+    detections = []
+    for person in range(PEOPLE):
+        x = (person * width // PEOPLE + index * 3) % (width - 120)
+        y = height // 4 + (person * 37) % (height // 3)
+        detections.append({'bbox': [x, y, 110, 260], 'confidence': 0.6 + person * 0.05})
+    return detections
+
+
+def run_mode(frames, viewers, mode):
+    """
+    Bir modu çalıştır.
+
+    Returns:
+        float: Frame başına CPU (ms)
+    """
+    state = {'seq': 0, 'frame': None, 'annotations': None}
+    encoder = RenditionEncoder(lambda: (state['seq'], state['frame'], state['annotations']))
+    tracker = IouTracker()
+
+    # İzleyicileri rendition'lara dağıt
+    sessions = []
+    for i in range(viewers):
+        rendition = RENDITION_ORDER[i % len(RENDITION_ORDER)]
+        if mode == 'server':
+            overlay = True
+        elif mode == 'client':
+            overlay = False
+        else:
+            overlay = i % 2 == 0
+        sessions.append((rendition, overlay))
+
+    cpu_start = time.process_time()
+    for index, frame in enumerate(frames):
+        detections = synthetic_detections(index, frame.shape)
+        track_ids = tracker.update(detections).track_ids
+        state.update(seq=index + 1, frame=frame, annotations=(detections, track_ids))
+
+        for rendition, overlay in sessions:
+            encoder.get(rendition, DEFAULT_QUALITY, overlay)
+
+        if mode != 'server':
+            # Tespit kanalı: olay bir kez oluşturulur, her sokete ayrı yazılır
+            event = build_detection_event(index + 1, time.time(), frame.shape, detections, track_ids)
+            for _ in sessions:
+                json.dumps(event, separators=(',', ':'))
+    cpu_elapsed = time.process_time() - cpu_start
+
+    return cpu_elapsed / len(frames) * 1000
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Overlay CPU benchmark'ı")
+    parser.add_argument('--video', help="Kullanılacak video (yoksa sentetik sahne)")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f"❌ Video okunamadı: {args.video}")
+        return 1
+
+    h, w = frames[0].shape[:2]
+    sample = build_detection_event(1, time.time(), frames[0].shape, synthetic_detections(0, frames[0].shape),
+                                   list(range(1, PEOPLE + 1)))
+    print(f"🎞️  {len(frames)} frame ({w}x{h}), {PEOPLE} kişi/frame")
+    print(f"📦 Tespit olayı: JSON {len(json.dumps(sample, separators=(',', ':')))} B, "
+          f"binary {len(pack_detection_event(sample))} B")
+    print("-" * 72)
+    print(f"{'İzleyici':>9}{'server ms/f':>13}{'client ms/f':>13}{'mixed ms/f':>12}"
+          f"{'Tasarruf/izl. ms':>18}{'Tasarruf %':>12}")
+
+    for viewers in args.viewers:
+        server = run_mode(frames, viewers, 'server')
+        client = run_mode(frames, viewers, 'client')
+        mixed = run_mode(frames, viewers, 'mixed')
+        saved = (server - client) / viewers
+        print(f"{viewers:>9}{server:>13.2f}{client:>13.2f}{mixed:>12.2f}"
+              f"{saved:>18.3f}{(server - client) / server * 100:>11.1f}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+İşleme hattı benchmark'ı
+Kamera hızında gelen frame'leri, tüm adımları kamera callback'inde sırayla
+çalıştıran eski yolla ve aşamaları kendi thread'lerinde çalıştıran
+Pipeline ile işler: saniyede işlenen frame, atılan frame, sayım aşamasının
+frame kaybı ve aşama başına meşguliyet raporlanır. Dedektör ve çıkışlar
+sabit süre uyuyan sahte aşamalardır (model veya kamera gerekmez); hareket
+kapısı durağan ve hareketli sahnede ayrıca denenir.
+
+Kullanım:
+    python bench_pipeline.py [--seconds 5] [--fps 30] [--detector-ms 40] [--sink-ms 15]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from pipeline import Pipeline, FunctionStage, DetectorStage, MotionGate, Packet
+
+FRAME_SHAPE = (720, 1280, 3)
+
+
+class FakeDetector:
+    """Sabit süre uyuyan, frame başına bir kutu döndüren dedektör"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def detect_humans(self, frame, draw_boxes=False):
+        time.sleep(self.seconds)
+        return [{'bbox': [100, 100, 80, 200], 'confidence': 0.9}], frame
+
+
+def camera(submit, fps, seconds, frames):
+    """Kamera thread'i gibi sabit hızda frame ver (callback beklenir, kamera kaçırır)"""
+    interval = 1.0 / fps
+    started = time.perf_counter()
+    offered = 0
+    next_at = started
+    while time.perf_counter() - started < seconds:
+        now = time.perf_counter()
+        if now < next_at:
+            time.sleep(next_at - now)
+        submit(frames[offered % len(frames)])
+        offered += 1
+        # Callback kamera aralığından uzun sürdüyse aradaki frame'ler kaçırılır
+        next_at += interval * max(1, int((time.perf_counter() - next_at) / interval) + 1)
+    return offered, time.perf_counter() - started
+
+
+def serial_run(args, frames):
+    """Eski yol: tespit + takip + çıkışlar kamera callback'inde"""
+    detector = FakeDetector(args.detector_ms / 1000)
+    counted = []
+
+    def callback(frame):
+        detections, _ = detector.detect_humans(frame)
+        time.sleep(args.tracker_ms / 1000)
+        time.sleep(args.sink_ms / 1000)
+        counted.append(len(detections))
+
+    offered, elapsed = camera(callback, args.fps, args.seconds, frames)
+    expected = int(args.fps * elapsed)
+    return {'processed': len(counted), 'fps': len(counted) / elapsed, 'missed': expected - len(counted),
+            'sink_lost': 0}
+
+
+def pipeline_run(args, frames):
+    """Pipeline: dedektör / takip / çıkış ayrı thread'lerde"""
+    counted = []
+    seen = []
+
+    def tracker(packet):
+        time.sleep(args.tracker_ms / 1000)
+        seen.append(packet.seq)
+        return packet
+
+    def sink(packet):
+        time.sleep(args.sink_ms / 1000)
+        counted.append(packet.seq)
+        return packet
+
+    pipeline = Pipeline([DetectorStage(FakeDetector(args.detector_ms / 1000)),
+                         FunctionStage('tracker', tracker, queue_size=8),
+                         FunctionStage('visitors', sink, queue_size=16)], name='bench')
+    pipeline.start()
+    offered, elapsed = camera(pipeline.submit, args.fps, args.seconds, frames)
+    pipeline.stop()
+    stats = pipeline.get_stats()
+    return {'processed': len(counted), 'fps': len(counted) / elapsed,
+            'missed': offered - len(counted), 'sink_lost': len(seen) - len(counted), 'stats': stats}
+
+
+def bench_motion_gate(frames):
+    """Durağan sahnede frame'lerin çoğu elenmeli, hareketli sahnede hepsi geçmeli"""
+    rng = np.random.default_rng(1)
+    static = [np.clip(frames[0].astype(np.int16) + rng.integers(-3, 4, FRAME_SHAPE), 0, 255).astype(np.uint8)
+              for _ in range(60)]
+    moving = []
+    for index in range(60):
+        frame = frames[0].copy()
+        x = 40 + index * 18
+        frame[200:600, x:x + 120] = 30
+        moving.append(frame)
+
+    results = {}
+    for name, scene in (('durağan', static), ('hareketli', moving)):
+        gate = MotionGate(max_skip=30)
+        t0 = time.perf_counter()
+        passed = sum(gate.process(Packet(index, 0.0, frame)) is not None for index, frame in enumerate(scene))
+        results[name] = (passed, (time.perf_counter() - t0) / len(scene) * 1e6)
+    return results
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="İşleme hattı benchmark'ı")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--fps', type=float, default=30.0, help="Kamera hızı")
+    parser.add_argument('--detector-ms', type=float, default=40.0)
+    parser.add_argument('--tracker-ms', type=float, default=5.0)
+    parser.add_argument('--sink-ms', type=float, default=15.0, help="DB / WebSocket çıkışları")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8) for _ in range(4)]
+    print(f"📷 Kamera {args.fps:.0f} fps, dedektör {args.detector_ms:.0f} ms, takip {args.tracker_ms:.0f} ms, "
+          f"çıkışlar {args.sink_ms:.0f} ms ({args.seconds:.0f} s)")
+
+    serial = serial_run(args, frames)
+    piped = pipeline_run(args, frames)
+    print(f"{'Yol':>10}{'İşlenen':>9}{'fps':>8}{'Atlanan':>9}{'Sayım kaybı':>13}")
+    for name, result in (('sıralı', serial), ('pipeline', piped)):
+        print(f"{name:>10}{result['processed']:>9}{result['fps']:>8.1f}{result['missed']:>9}{result['sink_lost']:>13}")
+
+    print("\n🔗 Aşamalar")
+    print(f"{'Aşama':>10}{'Mod':>9}{'İşlenen':>9}{'Atılan':>8}{'ort. ms':>9}{'Doluluk':>9}")
+    for stage in piped['stats']['stages']:
+        print(f"{stage['name']:>10}{stage['mode']:>9}{stage['processed']:>9}{stage['dropped']:>8}"
+              f"{stage['avg_ms']:>9.1f}{stage['utilization']:>9.0%}")
+
+    gate = bench_motion_gate(frames)
+    print(f"\n🚪 Hareket kapısı: durağan sahnede {gate['durağan'][0]}/60, "
+          f"hareketli sahnede {gate['hareketli'][0]}/60 frame geçti ({gate['durağan'][1]:.0f} µs/frame)")
+
+    # Dedektör darboğaz olduğunda hat dedektör hızına yaklaşmalı; sayım aşaması frame kaybetmemeli
+    detector_fps = 1000 / args.detector_ms
+    ok_pipeline = piped['fps'] > serial['fps'] * 1.2 and piped['fps'] >= detector_fps * 0.8 and piped['sink_lost'] == 0
+    ok_gate = gate['durağan'][0] <= 5 and gate['hareketli'][0] >= 55
+    print(f"{'✅' if ok_pipeline else '❌'} Pipeline {piped['fps']:.1f} fps (sıralı {serial['fps']:.1f}, "
+          f"dedektör sınırı {detector_fps:.0f})")
+    print(f"{'✅' if ok_gate else '❌'} Hareket kapısı durağan sahneyi eliyor")
+    return ok_pipeline and ok_gate
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
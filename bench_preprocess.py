@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Model girdisi hazırlama benchmark'ı
+Her frame'de yeni dizi ayıran klasik yolu (resize + copyMakeBorder +
+cvtColor + astype + transpose) kalıcı tamponlu Letterbox ile karşılaştırır:
+frame başına süre ve ayrılan bellek (tracemalloc). İki yolun aynı girdiyi
+ürettiği ve kutuların frame koordinatlarına doğru geri çevrildiği de
+doğrulanır. Sentetik frame'ler kullanılır, kamera veya model gerekmez.
+
+Kullanım:
+    python bench_preprocess.py [--frames 300] [--camera 1280x720]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+import numpy as np
+
+from preprocess import Letterbox, LETTERBOX_VALUE, letterbox_geometry
+
+PROCESS_SIZES = ((640, 480), (320, 240))
+
+
+def naive_preprocess(frame, size):
+    """Her adımda yeni dizi ayıran klasik yol"""
+    scale, (content_w, content_h), (pad_x, pad_y), (input_w, input_h) = letterbox_geometry(frame.shape, size)
+    resized = cv2.resize(frame, (content_w, content_h), interpolation=cv2.INTER_LINEAR)
+    padded = cv2.copyMakeBorder(resized, pad_y, input_h - content_h - pad_y, pad_x, input_w - content_w - pad_x,
+                                cv2.BORDER_CONSTANT, value=(LETTERBOX_VALUE,) * 3)
+    rgb = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+    blob = rgb.astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob.transpose(2, 0, 1))[None]
+
+
+def measure(function, frames):
+    """
+    Returns:
+        tuple: (ortalama µs, p99 µs, frame başına ayrılan KB)
+    """
+    function(frames[0])  # ısınma (Letterbox tamponları burada ayrılır)
+    times = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        function(frame)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    peaks = []
+    for frame in frames[:50]:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return np.mean(times) * 1e6, np.percentile(times, 99) * 1e6, np.mean(peaks) / 1024
+
+
+def check_round_trip(letterbox, frame_shape):
+    """Frame kutusu -> girdi koordinatı -> frame kutusu aynı kalmalı"""
+    height, width = frame_shape[:2]
+    boxes = np.array([[10, 20, 100, 300, 0.9], [width - 50, height - 120, 80, 200, 0.8]], dtype=np.float32)
+    expected = boxes.copy()
+    expected[1, 2:4] = (50, 120)   # Frame dışına taşan kısım kırpılır
+    corners = letterbox.to_input(boxes.copy())
+    corners[:, 2:4] += corners[:, :2]
+    restored = letterbox.to_frame(letterbox.to_input(boxes.copy()))
+    restored_xyxy = letterbox.to_frame(corners, xyxy=True)
+    restored_xyxy[:, 2:4] -= restored_xyxy[:, :2]
+    return (np.allclose(restored[:, :4], expected[:, :4], atol=0.01) and
+            np.allclose(restored_xyxy[:, :4], expected[:, :4], atol=0.01) and
+            np.allclose(restored[:, 4], boxes[:, 4]))
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Model girdisi hazırlama benchmark'ı")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--camera', default='1280x720', help="Kamera çözünürlüğü (GxY)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.camera.split('x'))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(8)]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+
+    success = True
+    print(f"📷 Kamera {width}x{height}, {args.frames} frame")
+    print(f"{'Hedef':>9}{'Yol':>11}{'Ort. µs':>10}{'p99 µs':>10}{'KB/frame':>10}")
+    for size in PROCESS_SIZES:
+        letterbox = Letterbox(size)
+        rows = [('klasik', measure(lambda frame: naive_preprocess(frame, size), frames)),
+                ('letterbox', measure(letterbox, frames))]
+        for name, (mean, p99, allocated) in rows:
+            print(f"{size[0]:>5}x{size[1]:<3}{name:>11}{mean:>10.1f}{p99:>10.1f}{allocated:>10.1f}")
+
+        same = np.allclose(letterbox(frames[0]), naive_preprocess(frames[0], size), atol=1e-6)
+        round_trip = check_round_trip(letterbox, frames[0].shape)
+        faster = rows[1][1][0] < rows[0][1][0]
+        success = success and same and round_trip and faster
+        print(f"{'✅' if same and round_trip and faster else '❌'} girdi {letterbox.get_info()['input_shape']}, "
+              f"aynı çıktı: {same}, kutu geri dönüşümü: {round_trip}, "
+              f"hızlanma {rows[0][1][0] / rows[1][1][0]:.1f}x")
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
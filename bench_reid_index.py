@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Re-ID indeksi recall / gecikme benchmark'ı
+Sentetik görünüm vektörleriyle (kıyafet stili kümeleri + kişi gürültüsü)
+N kayıtlı ziyaretçilik indeks kurar; nprobe değerlerine göre tam taramaya
+karşı recall@1, recall@10 ve sorgu gecikmesini raporlar. İndeksin diske
+kaydedilip yeniden yüklenme süresini de ölçer.
+
+Kullanım:
+    python bench_reid_index.py [--count 100000] [--queries 1000] [--nprobe 1 2 4 8 16 32]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from reid_index import ReidIndex, HIST_DIM, _normalize
+
+STYLE_GROUPS = 64
+
+
+def synthetic_embeddings(count, dim, seed=0):
+    """Kümelenmiş birim vektörler (gerçek embedding dağılımına benzer)"""
+    rng = np.random.default_rng(seed)
+    styles = _normalize(rng.standard_normal((STYLE_GROUPS, dim)).astype(np.float32))
+    labels = rng.integers(0, STYLE_GROUPS, count)
+    # Gürültü boyuta göre ölçeklenir: aynı stildeki iki kişinin benzerliği ~0.6
+    noise = rng.standard_normal((count, dim)).astype(np.float32) / np.sqrt(dim)
+    return _normalize(styles[labels] + 0.8 * noise).astype(np.float32)
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) if len(values) else 0.0
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Re-ID indeksi benchmark'ı")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--dim', type=int, default=HIST_DIM)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.count, args.dim)
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(args.count, args.queries, replace=False)
+    # Aynı kişinin başka bir ziyaretteki görünümü: kayıtlı vektör + küçük gürültü (benzerlik ~0.95)
+    noise = rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim)
+    queries = _normalize(vectors[query_rows] + 0.3 * noise)
+    queries = queries.astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"🧮 {args.count} vektör x {args.dim} boyut (float16 memmap: "
+              f"{args.count * args.dim * 2 / 2**20:.1f} MB)")
+
+        start = time.perf_counter()
+        index = ReidIndex(directory, dim=args.dim)
+        for row, vector in enumerate(vectors):
+            index.add(vector, person_id=row + 1, timestamp=0.0)
+        print(f"⏱️  Ekleme + eğitim: {time.perf_counter() - start:.1f}s, "
+              f"{len(index.index.centroids)} küme")
+
+        # Referans: depodaki float16 vektörlerle tam tarama
+        stored = np.asarray(index.store.vectors[:args.count], dtype=np.float32)
+        truth = np.argsort(-(queries @ stored.T), axis=1)[:, :10]
+
+        brute_times = []
+        for query in queries[:200]:
+            t0 = time.perf_counter()
+            np.argpartition(-(stored @ query), 10)
+            brute_times.append(time.perf_counter() - t0)
+
+        print("-" * 66)
+        print(f"{'nprobe':>7}{'recall@1':>10}{'recall@10':>11}{'p50 ms':>9}{'p99 ms':>9}{'aday/sorgu':>12}")
+        print(f"{'tam':>7}{1.0:>10.3f}{1.0:>11.3f}{percentile(brute_times, 50) * 1000:>9.3f}"
+              f"{percentile(brute_times, 99) * 1000:>9.3f}{args.count:>12}")
+
+        for nprobe in args.nprobe:
+            hits1 = hits10 = 0
+            latencies = []
+            for i, query in enumerate(queries):
+                t0 = time.perf_counter()
+                rows, _ = index.index.search(query, k=10, nprobe=nprobe)
+                latencies.append(time.perf_counter() - t0)
+                if len(rows) and rows[0] == truth[i, 0]:
+                    hits1 += 1
+                hits10 += len(set(rows.tolist()) & set(truth[i].tolist()))
+
+            sizes = np.bincount(index.index.assignments[:args.count])
+            candidates = int(np.sort(sizes)[::-1][:nprobe].sum())
+            print(f"{nprobe:>7}{hits1 / args.queries:>10.3f}{hits10 / (10 * args.queries):>11.3f}"
+                  f"{percentile(latencies, 50) * 1000:>9.3f}{percentile(latencies, 99) * 1000:>9.3f}"
+                  f"{f'≤{candidates}':>12}")
+
+        # Kalıcılık: kaydet ve yeniden yükle (eğitim tekrarlanmamalı)
+        start = time.perf_counter()
+        index.save()
+        saved_in = time.perf_counter() - start
+        del index
+
+        start = time.perf_counter()
+        reloaded = ReidIndex(directory, dim=args.dim)
+        loaded_in = time.perf_counter() - start
+        rows, _ = reloaded.index.search(queries[0], k=1)
+        print("-" * 66)
+        print(f"💾 Kaydetme {saved_in * 1000:.0f} ms, yükleme {loaded_in * 1000:.0f} ms, "
+              f"{len(reloaded)} vektör, ilk sorgu doğru: {bool(len(rows) and rows[0] == truth[0, 0])}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Rapor üretimi benchmark'ı
+Bir yıllık sentetik veritabanında günlük / haftalık / aylık rapor üretim
+süresini ölçer: ilk üretim, veri değişmeden tekrar (önbellek) ve yeni
+ziyaretçi eklendikten sonra (sadece etkilenen dönemler yeniden yazılır).
+
+Kullanım:
+    python bench_reports.py [--days 365] [--per-day 800]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from analytics_rollups import RollupStore
+from bench_analytics_query import create_database
+from occupancy_heatmap import OccupancyHeatmap
+from reports import ReportEngine, period_name
+
+
+def timed_generate(engine, kind, period):
+    t0 = time.perf_counter()
+    result = engine.generate(kind, period)
+    return (time.perf_counter() - t0) * 1000, result['changed']
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Rapor üretimi benchmark'ı")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-day', type=int, default=800)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.db')
+        create_database(db_path, args.days, args.per_day)
+        rollups = RollupStore(db_path)
+        rollups.refresh(force=True)
+        engine = ReportEngine(rollups, OccupancyHeatmap(directory=os.path.join(directory, 'heatmaps')),
+                              directory=os.path.join(directory, 'reports'))
+
+        last_month = datetime.now().replace(day=1) - timedelta(days=1)
+        periods = [('daily', period_name('daily', datetime.now() - timedelta(days=1))),
+                   ('weekly', period_name('weekly', datetime.now() - timedelta(days=7))),
+                   ('monthly', period_name('monthly', last_month))]
+
+        print(f"🗄️  {args.days * args.per_day} ziyaretçi, {args.days} gün")
+        print("-" * 60)
+        print(f"{'Rapor':<20}{'İlk ms':>10}{'Tekrar ms':>12}{'Yazıldı':>10}")
+        for kind, period in periods:
+            first_ms, _ = timed_generate(engine, kind, period)
+            again_ms, changed = timed_generate(engine, kind, period)
+            print(f"{kind + ' ' + period:<20}{first_ms:>10.1f}{again_ms:>12.1f}{'evet' if changed else 'hayır':>10}")
+
+        # Dünün verisine geç gelen ziyaretçi: sadece o günü içeren raporlar değişmeli
+        yesterday = datetime.now() - timedelta(days=1)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                         "detection_count) VALUES (?, 0.9, '[]', 0, 1)",
+                         (yesterday.replace(hour=12).strftime('%Y-%m-%d %H:%M:%S.%f'),))
+        rollups.refresh(force=True)
+
+        print("-" * 60)
+        print("➕ Dün için 1 yeni ziyaretçi eklendi")
+        for kind, period in periods:
+            elapsed, changed = timed_generate(engine, kind, period)
+            print(f"{kind + ' ' + period:<20}{elapsed:>10.1f}{'':>12}{'evet' if changed else 'hayır':>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
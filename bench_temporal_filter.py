@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Zamansal doğrulama benchmark'ı
+Sayıma giden track'leri (her biri bir ziyaretçi satırı = bir DB yazımı)
+filtresiz ve TemporalFilter ile karşılaştırır.
+
+1) Sentetik sahne (varsayılan): gerçek kişiler ara ara kaybolarak yürür;
+   1-3 frame'lik titreyen yanlış tespitler, sürekli düşük güvenli bir
+   "manken" ve yer tutucu kutular eklenir. Gerçek kişiler bilindiği için
+   doğruluk (precision / recall) ve yazım sayıları raporlanır.
+2) Kayıtlı video (--video): HumanDetector tespitleri üzerinde yazım
+   sayıları ve elenen tespitler (gerçek kişi sayısı bilinmez).
+
+Kullanım:
+    python bench_temporal_filter.py [--frames 18000] [--window 8] [--min-hits 5]
+    python bench_temporal_filter.py --video data/replay/magaza.mp4 --frames 3000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from iou_tracker import IouTracker
+from temporal_filter import TemporalFilter, PLACEHOLDER_BBOX
+
+FPS = 10
+FRAME_SIZE = (1280, 720)
+
+
+def synthetic_scene(frames, seed=0):
+    """
+    Returns:
+        list: Frame başına [(tespit, gerçek kişi id'si veya None), ...]
+    """
+    rng = np.random.default_rng(seed)
+    width, height = FRAME_SIZE
+    scene = [[] for _ in range(frames)]
+
+    # Gerçek kişiler: ortalama 6 saniyede bir giren, 8-20 saniyede sahneyi geçenler
+    person = 0
+    start = 0
+    while True:
+        start += int(rng.exponential(6 * FPS)) + 1
+        if start >= frames:
+            break
+        person += 1
+        duration = int(rng.uniform(8, 20) * FPS)
+        y = rng.uniform(150, 450)
+        base_confidence = rng.uniform(0.6, 0.9)
+        for step in range(min(duration, frames - start)):
+            if rng.random() < 0.15:     # Kaçırılan tespit (örtüşme, bulanıklık)
+                continue
+            x = 20 + (width - 160) * step / duration
+            confidence = float(np.clip(base_confidence + rng.normal(0, 0.08), 0.05, 0.99))
+            scene[start + step].append(({'bbox': [int(x), int(y), 90, 230], 'confidence': confidence}, person))
+
+    for index in range(frames):
+        # Titreyen yanlış tespit: 1-3 frame görünür
+        if rng.random() < 0.04:
+            box = [int(rng.uniform(0, width - 100)), int(rng.uniform(0, height - 250)), 80, 200]
+            confidence = float(rng.uniform(0.3, 0.6))
+            for offset in range(int(rng.integers(1, 4))):
+                if index + offset < frames:
+                    scene[index + offset].append(({'bbox': list(box), 'confidence': confidence}, None))
+        # Vitrin mankeni: sürekli, düşük güvenle
+        if rng.random() < 0.7:
+            scene[index].append(({'bbox': [1150, 300, 90, 240], 'confidence': float(rng.uniform(0.25, 0.42))}, None))
+        # Yer tutucu kutu
+        if rng.random() < 0.01:
+            scene[index].append(({'bbox': list(PLACEHOLDER_BBOX), 'confidence': 0.0}, None))
+    return scene, person
+
+
+def run(scene, temporal):
+    """
+    Sahneyi işle ve sayıma giden track'leri topla.
+
+    Returns:
+        tuple: (track id -> gerçek kişi sayacı, frame başına süre listesi, filtre)
+    """
+    tracker = IouTracker()
+    temporal_filter = TemporalFilter(tracker, **temporal) if temporal else None
+    origins = {}
+    times = []
+    timestamp = 0.0
+    for items in scene:
+        timestamp += 1.0 / FPS
+        detections = [detection for detection, _ in items]
+        t0 = time.perf_counter()
+        track_update = tracker.update(detections, timestamp)
+        if temporal_filter is not None:
+            _, counted_update = temporal_filter.apply(detections, track_update)
+            positions = [track_update.track_ids.index(track_id) for track_id in counted_update.track_ids]
+        else:
+            positions = range(len(detections))
+        times.append(time.perf_counter() - t0)
+        for position in positions:
+            track_id = track_update.track_ids[position]
+            votes = origins.setdefault(track_id, {})
+            truth = items[position][1]
+            votes[truth] = votes.get(truth, 0) + 1
+    return origins, times, temporal_filter
+
+
+def accuracy(origins, people):
+    """
+    Returns:
+        dict: yazım (track) sayısı, doğru / yanlış / tekrar ziyaretçi, precision, recall
+    """
+    owners = [max(votes, key=votes.get) for votes in origins.values()]
+    real = [owner for owner in owners if owner is not None]
+    found = len(set(real))
+    return {
+        'writes': len(owners),
+        'false': len(owners) - len(real),
+        'duplicates': len(real) - found,
+        'precision': found / len(owners) if owners else 1.0,
+        'recall': found / people if people else 1.0,
+    }
+
+
+def bench_synthetic(args, temporal):
+    scene, people = synthetic_scene(args.frames)
+    print(f"🎬 Sentetik sahne: {args.frames} frame ({args.frames / FPS / 60:.0f} dk), {people} gerçek ziyaretçi")
+    print(f"{'Yol':>12}{'Yazım':>8}{'Yanlış':>8}{'Tekrar':>8}{'Precision':>11}{'Recall':>8}{'µs/frame':>10}")
+    results = {}
+    for name, config in (('filtresiz', None), ('zamansal', temporal)):
+        origins, times, _ = run(scene, config)
+        results[name] = accuracy(origins, people)
+        r = results[name]
+        print(f"{name:>12}{r['writes']:>8}{r['false']:>8}{r['duplicates']:>8}{r['precision']:>11.1%}"
+              f"{r['recall']:>8.1%}{np.mean(times) * 1e6:>10.1f}")
+
+    base, filtered = results['filtresiz'], results['zamansal']
+    ok = filtered['writes'] < base['writes'] and filtered['precision'] > base['precision'] and \
+        filtered['recall'] >= base['recall'] - 0.02
+    print(f"{'✅' if ok else '❌'} DB yazımı {base['writes']} -> {filtered['writes']} "
+          f"(%{(1 - filtered['writes'] / base['writes']) * 100:.0f} az), "
+          f"recall kaybı {(base['recall'] - filtered['recall']) * 100:.1f} puan")
+    return ok
+
+
+def bench_video(args, temporal):
+    from bench_employee_filter import load_detections
+
+    frames = load_detections(args.video, args.frames)
+    scene = [[(detection, None) for detection in detections] for _, detections in frames]
+    print(f"🎬 {args.video}: {len(scene)} frame")
+    base_origins, _, _ = run(scene, None)
+    origins, times, temporal_filter = run(scene, temporal)
+    stats = temporal_filter.get_stats()
+    print(f"   Ziyaretçi yazımı (track): filtresiz {len(base_origins)}, zamansal {len(origins)}")
+    print(f"   Elenen tespitler: yer tutucu {stats['placeholder']}, kararsız {stats['unstable']}, "
+          f"düşük güven {stats['low_confidence']} (geçme oranı {stats['pass_rate']:.1%})")
+    print(f"   Frame başına {np.mean(times) * 1e6:.1f} µs")
+    return len(origins) <= len(base_origins)
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Zamansal doğrulama benchmark'ı")
+    parser.add_argument('--video', help="Kayıtlı video (HumanDetector gerekir)")
+    parser.add_argument('--frames', type=int, default=18000)
+    parser.add_argument('--window', type=int, default=8, help="N")
+    parser.add_argument('--min-hits', type=int, default=5, help="K")
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    args = parser.parse_args()
+
+    temporal = {'window': args.window, 'min_hits': args.min_hits, 'min_confidence': args.min_confidence}
+    print(f"⚙️  K / N = {args.min_hits} / {args.window}, EMA güven eşiği {args.min_confidence}")
+    return bench_video(args, temporal) if args.video else bench_synthetic(args, temporal)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
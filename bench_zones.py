@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Bölge atama ve bölge kırılımı benchmark'ı
+Frame başına bölge atamasını (etiket maskesi / poligon başına
+pointPolygonTest) ve bölge kırılımını (zone_id üzerinde GROUP BY / her
+satırın JSON kutusunu yeniden okuma) karşılaştırır; sonuçların aynı
+olduğunu doğrular. Sentetik tespitler ve veritabanı kullanılır.
+
+Kullanım:
+    python bench_zones.py [--rows 200000] [--people 5 20 50]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cv2
+import numpy as np
+
+import visitor_db
+from db_migrations import migrate
+from occupancy_heatmap import foot_points
+from zones import ZoneMap, ZoneTagger, backfill_zones, zone_breakdown
+
+FRAME_SHAPE = (720, 1280, 3)
+ZONES = [
+    {'id': 1, 'name': 'Giriş', 'rect': [0.0, 0.6, 0.3, 1.0]},
+    {'id': 2, 'name': 'Kasa', 'polygon': [[0.6, 0.5], [1.0, 0.5], [1.0, 1.0], [0.7, 1.0]]},
+    {'id': 3, 'name': 'Vitrin', 'polygon': [[0.3, 0.2], [0.5, 0.1], [0.7, 0.3], [0.5, 0.5], [0.3, 0.4]]},
+    {'id': 4, 'name': 'Reyon', 'rect': [0.0, 0.0, 1.0, 0.6]},
+]
+
+
+def random_detections(rng, people):
+    """Frame içinde rastgele kişi kutuları"""
+    height, width = FRAME_SHAPE[:2]
+    detections = []
+    for _ in range(people):
+        h = int(rng.integers(100, 400))
+        w = h * 2 // 5
+        detections.append({'bbox': [int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h],
+                           'confidence': 0.8})
+    return detections
+
+
+def polygon_assign(polygons, frame_shape, detections):
+    """Maskesiz yöntem: her kişi için bölgeleri sırayla pointPolygonTest ile dene"""
+    points = foot_points(frame_shape, detections)
+    result = []
+    for x, y in points:
+        zone_id = 0
+        for candidate, polygon in polygons:
+            if cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0:
+                zone_id = candidate
+                break
+        result.append(zone_id)
+    return result
+
+
+def zone_polygons(zones):
+    polygons = []
+    for zone in zones:
+        if 'rect' in zone:
+            x0, y0, x1, y1 = zone['rect']
+            shape = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+        else:
+            shape = zone['polygon']
+        polygons.append((zone['id'], np.array(shape, dtype=np.float32)))
+    return polygons
+
+
+def bench_assign(zone_map, people_counts, frames, rng):
+    print("🗺️  Frame başına bölge atama")
+    print(f"{'Kişi':>6}{'Maske µs':>10}{'Poligon µs':>12}{'Uyum':>8}")
+    polygons = zone_polygons(ZONES)
+    success = True
+    for people in people_counts:
+        scenes = [random_detections(rng, people) for _ in range(100)]
+        mask_times, polygon_times, same, total = [], [], 0, 0
+        for index in range(frames):
+            detections = scenes[index % len(scenes)]
+            t0 = time.perf_counter()
+            masked = zone_map.assign(FRAME_SHAPE, detections)
+            t1 = time.perf_counter()
+            tested = polygon_assign(polygons, FRAME_SHAPE, detections)
+            t2 = time.perf_counter()
+            mask_times.append(t1 - t0)
+            polygon_times.append(t2 - t1)
+            same += int(np.sum(masked == np.array(tested, dtype=np.uint8)))
+            total += len(detections)
+        # Maske ~%0.3 çözünürlüklü: sadece kenara çok yakın noktalar farklı olabilir
+        agreement = same / total if total else 1.0
+        success = success and agreement >= 0.98
+        print(f"{people:>6}{np.mean(mask_times) * 1e6:>10.1f}{np.mean(polygon_times) * 1e6:>12.1f}{agreement:>8.1%}")
+    return success
+
+
+def create_database(path, rows, rng):
+    """Son 30 güne yayılmış, 1280x720 kutulu ziyaretçiler"""
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    start = datetime.now() - timedelta(days=30)
+    seconds = np.sort(rng.uniform(0, 30 * 86400 - 3600, rows))
+    records = []
+    for second in seconds:
+        detection = random_detections(rng, 1)[0]
+        records.append(((start + timedelta(seconds=float(second))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                        0.8, json.dumps([detection['bbox']]), 0, 1))
+    conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                     "detection_count) VALUES (?, ?, ?, ?, ?)", records)
+    conn.commit()
+    conn.close()
+    return start
+
+
+def json_breakdown(path, zone_map, start, end):
+    """Eski yöntem: aralıktaki her satırın kutusunu okuyup bölgesini yeniden hesapla"""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT bounding_box FROM visitors WHERE entry_time >= ? AND entry_time < ? "
+                            "AND confidence_avg > 0.0",
+                            (start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
+    finally:
+        conn.close()
+    counts = {}
+    for (bounding_box,) in rows:
+        zone_id = int(zone_map.assign(FRAME_SHAPE, [{'bbox': json.loads(bounding_box)[0]}])[0])
+        counts[zone_id] = counts.get(zone_id, 0) + 1
+    return counts
+
+
+def bench_breakdown(zone_map, rows, rng):
+    print(f"\n📊 Bölge kırılımı ({rows} ziyaretçi)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        start = create_database(path, rows, rng)
+
+        t0 = time.perf_counter()
+        tagged = backfill_zones({0: zone_map}, path, frame_shape=FRAME_SHAPE, min_age_seconds=0)
+        print(f"   Eski kayıtların tek seferlik etiketlenmesi: {tagged} satır, {time.perf_counter() - t0:.2f} s")
+
+        success = True
+        print(f"{'Aralık':>8}{'GROUP BY ms':>13}{'JSON ms':>10}")
+        for days in (1, 7, 30):
+            end = start + timedelta(days=30)
+            range_start = end - timedelta(days=days)
+            t0 = time.perf_counter()
+            breakdown = zone_breakdown(range_start, end, 0, path)
+            t1 = time.perf_counter()
+            expected = json_breakdown(path, zone_map, range_start, end)
+            t2 = time.perf_counter()
+            actual = {row['zone_id']: row['visitors'] for row in breakdown}
+            success = success and actual == expected
+            print(f"{days:>6} g{(t1 - t0) * 1000:>13.1f}{(t2 - t1) * 1000:>10.1f}")
+
+        names = {row['name']: row['visitors'] for row in zone_breakdown(start, start + timedelta(days=30), 0, path)}
+        print(f"   {names}")
+        success = success and test_tagger(zone_map, path)
+    return success
+
+
+class _Track:
+    def __init__(self, track_id):
+        self.track_id = track_id
+
+
+class _Update:
+    def __init__(self, confirmed):
+        self.confirmed = confirmed
+
+
+def test_tagger(zone_map, path):
+    """Canlı etiketleyici: onaylanan track'in bölgesi, track'in sayıldığı satıra (satır id'siyle) yazılmalı"""
+    now = time.time()
+    detections = [{'bbox': [1000, 500, 80, 200], 'confidence': 0.9},   # Kasa
+                  {'bbox': [100, 500, 60, 180], 'confidence': 0.9},    # Giriş (çalışan)
+                  {'bbox': [150, 520, 60, 180], 'confidence': 0.9}]    # Giriş
+    rows = visitor_db.VisitorRows(path)
+    rows.start()
+    tagger = ZoneTagger(zone_map, path, exclude=lambda track_id: track_id == 2, rows=rows)
+    tagger.update(FRAME_SHAPE, detections, _Update([(0, _Track(1)), (1, _Track(2)), (2, _Track(3))]), now)
+
+    # Aynı anda sayılan iki kişi: satırlar sayım sırasıyla (önce track 3, sonra track 1) yazılır
+    rows.counted(1, [detections[2]], detections, [1, 2, 3], now)
+    rows.counted(1, [detections[0], detections[2]], detections, [1, 2, 3], now)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                     "detection_count) VALUES (?, 0.9, '[]', 0, 1)",
+                     [(datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S.%f'),)] * 2)
+    conn.commit()
+
+    tagger.flush()
+    zone_ids = [row[0] for row in conn.execute("SELECT zone_id FROM visitors ORDER BY id DESC LIMIT 2")]
+    conn.close()
+
+    ok = zone_ids == [2, 1] and tagger.stats['tagged'] == 2
+    print(f"{'✅' if ok else '❌'} Canlı etiketleme: {zone_ids} (çalışan atlandı)")
+    return ok
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Bölge benchmark'ı")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--people', type=int, nargs='+', default=[5, 20, 50])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    zone_map = ZoneMap('0', ZONES)
+    results = [bench_assign(zone_map, args.people, args.frames, rng),
+               bench_breakdown(zone_map, args.rows, rng)]
+    print(f"\n{'✅' if all(results) else '❌'} Maske ve GROUP BY sonuçları eski yöntemle aynı")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,385 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Olay Tetiklemeli Klip Kaydı
+Son birkaç saniyenin encode edilmiş frame'leri bellekte (byte sınırlı) bir
+ring buffer'da tutulur. Yeni ziyaretçi geldiğinde olaydan N saniye önce ve
+sonrasını kapsayan klip, arka plandaki yazıcı thread'i tarafından diske yazılır.
+
+- Frame'ler paylaşımlı RenditionEncoder'dan alınır; aynı rendition/kaliteyi
+  izleyen bir client varsa ek encode yapılmaz, buffer'daki JPEG'ler tekrar
+  encode edilmeden dosyaya yazılır.
+- Pipeline thread'i sadece trigger() çağırır (kilit + liste dilimi).
+- Klip dizini disk kotasını aşınca en eski klipler silinir.
+
+Klip formatı:
+    clip_YYYYmmdd_HHMMSS_<id>.mjpeg  - art arda JPEG'ler (ffplay -f mjpeg ile oynatılabilir)
+    clip_YYYYmmdd_HHMMSS_<id>.json   - frame indeksi (seq, zaman, offset, boyut) ve olay bilgisi
+"""
+
+import collections
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from metrics import metrics_registry
+from stream_renditions import mjpeg_part
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+CLIP_DIR = getattr(SETTINGS, 'CLIP_DIR', 'data/clips')
+CLIP_PRE_SECONDS = getattr(SETTINGS, 'CLIP_PRE_SECONDS', 5.0)
+CLIP_POST_SECONDS = getattr(SETTINGS, 'CLIP_POST_SECONDS', 5.0)
+CLIP_MAX_SECONDS = getattr(SETTINGS, 'CLIP_MAX_SECONDS', 60.0)  # Art arda olaylarda klip bu kadar uzayabilir
+CLIP_FPS = getattr(SETTINGS, 'CLIP_FPS', 10.0)
+CLIP_RENDITION = getattr(SETTINGS, 'CLIP_RENDITION', '640')
+CLIP_QUALITY = getattr(SETTINGS, 'CLIP_QUALITY', 70)
+CLIP_BUFFER_MB = getattr(SETTINGS, 'CLIP_BUFFER_MB', 32)
+CLIP_DISK_MB = getattr(SETTINGS, 'CLIP_DISK_MB', 2048)
+
+WRITE_QUEUE_SIZE = 8
+FRAME_POLL_INTERVAL = 0.01
+STOP_TIMEOUT = 10.0          # Durdururken yazıcının kuyrukta yer açması için beklenen süre
+
+CLIPS_WRITTEN = metrics_registry.counter('clips_written_total', 'Diske yazılan klipler')
+CLIPS_DROPPED = metrics_registry.counter('clips_dropped_total', 'Yazma kuyruğu dolu olduğu için atlanan klipler')
+CLIPS_DELETED = metrics_registry.counter('clips_deleted_total', 'Disk kotası nedeniyle silinen klipler')
+
+
+class FrameRingBuffer:
+    """Encode edilmiş frame'leri byte sınırı içinde tutan ring buffer"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._frames = collections.deque()  # (seq, timestamp, jpeg)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def push(self, seq, timestamp, jpeg):
+        """Frame ekle; sınır aşılırsa en eskileri at"""
+        with self._lock:
+            self._frames.append((seq, timestamp, jpeg))
+            self._bytes += len(jpeg)
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                self._bytes -= len(self._frames.popleft()[2])
+
+    def since(self, timestamp):
+        """
+        Verilen zamandan sonraki frame'ler (bytes nesneleri kopyalanmaz).
+
+        Returns:
+            list: [(seq, timestamp, jpeg), ...]
+        """
+        with self._lock:
+            return [frame for frame in self._frames if frame[1] >= timestamp]
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    @property
+    def duration(self):
+        """Buffer'ın kapsadığı süre (saniye)"""
+        with self._lock:
+            if len(self._frames) < 2:
+                return 0.0
+            return self._frames[-1][1] - self._frames[0][1]
+
+    def __len__(self):
+        return len(self._frames)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+
+class _Clip:
+    """Kaydı süren klip"""
+
+    __slots__ = ('clip_id', 'started_at', 'end_at', 'frames', 'events')
+
+    def __init__(self, clip_id, started_at, end_at, frames, event):
+        self.clip_id = clip_id
+        self.started_at = started_at
+        self.end_at = end_at
+        self.frames = frames
+        self.events = [event]
+
+
+class ClipRecorder:
+    """Pre-roll buffer'lı, olay tetiklemeli klip kaydedici"""
+
+    def __init__(self, encoder, output_dir=CLIP_DIR, pre_seconds=CLIP_PRE_SECONDS,
+                 post_seconds=CLIP_POST_SECONDS, fps=CLIP_FPS, rendition=CLIP_RENDITION,
+                 quality=CLIP_QUALITY, buffer_mb=CLIP_BUFFER_MB, disk_mb=CLIP_DISK_MB):
+        """
+        Args:
+            encoder: Paylaşımlı RenditionEncoder
+            output_dir: Klip dizini
+            pre_seconds / post_seconds: Olay öncesi / sonrası kaydedilecek süre
+            fps: Buffer'a alınacak en yüksek frame hızı
+            buffer_mb: Bellekteki ring buffer sınırı
+            disk_mb: Klip dizini için disk kotası
+        """
+        self.encoder = encoder
+        self.output_dir = Path(output_dir)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.frame_interval = 1.0 / fps if fps else 0.0
+        self.rendition = rendition
+        self.quality = quality
+        self.max_disk_bytes = int(disk_mb * 1024 * 1024)
+
+        self.buffer = FrameRingBuffer(int(buffer_mb * 1024 * 1024))
+        self.logger = get_logger("clips")
+
+        self._clip = None
+        self._clip_lock = threading.Lock()
+        self._clip_counter = 0
+        self._write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._running = False
+        self._threads = []
+        self._warned_short_buffer = False
+
+        metrics_registry.gauge('clip_buffer_bytes', 'Klip ring buffer bellek kullanımı',
+                               func=lambda: self.buffer.nbytes)
+
+    def start(self):
+        """Buffer doldurma ve yazıcı thread'lerini başlat"""
+        if self._running:
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='clip-buffer', daemon=True),
+            threading.Thread(target=self._writer_loop, name='clip-writer', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(f"🎬 Klip kaydı aktif: {self.pre_seconds:.0f}s öncesi + {self.post_seconds:.0f}s sonrası "
+                         f"({self.rendition}@{self.quality}, {self.output_dir})")
+
+    def stop(self):
+        """Süren klibi kapat, bekleyen yazmaları bitir ve thread'leri durdur"""
+        if not self._running:
+            return
+        self._running = False
+        with self._clip_lock:
+            self._finish_clip()
+        try:
+            self._write_queue.put(None, timeout=STOP_TIMEOUT)
+        except queue.Full:
+            # Yazıcı yetişemiyor: bekleyen klipler atılır, durdurma bloklanmaz
+            dropped = self._drain_write_queue()
+            self.logger.warning(f"Klip yazıcısı yetişemedi, {dropped} klip yazılmadan atlandı")
+            try:
+                self._write_queue.put_nowait(None)
+            except queue.Full:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+        self.buffer.clear()
+
+    def trigger(self, reason='new_visitor', details=None, timestamp=None):
+        """
+        Olay bildir (pipeline thread'inden çağrılabilir, bloklamaz).
+        Süren bir klip varsa bitiş zamanı uzatılır.
+        """
+        if not self._running:
+            return
+        now = timestamp if timestamp is not None else time.time()
+        event = {'reason': reason, 'time': now, 'details': details or {}}
+
+        with self._clip_lock:
+            if self._clip is not None:
+                self._clip.end_at = min(now + self.post_seconds, self._clip.started_at + CLIP_MAX_SECONDS)
+                self._clip.events.append(event)
+                return
+
+            started_at = now - self.pre_seconds
+            frames = self.buffer.since(started_at)
+            buffer_full = self.buffer.nbytes >= self.buffer.max_bytes * 0.9
+            if buffer_full and frames and frames[0][1] - started_at > 1.0 and not self._warned_short_buffer:
+                self._warned_short_buffer = True
+                self.logger.warning(f"Klip buffer'ı {self.pre_seconds:.0f}s öncesini tutmuyor "
+                                    f"({self.buffer.duration:.1f}s); CLIP_BUFFER_MB artırılmalı")
+
+            self._clip_counter += 1
+            self._clip = _Clip(self._clip_counter, started_at, now + self.post_seconds, frames, event)
+
+    def _capture_loop(self):
+        """Encoder'dan yeni frame'leri çekip buffer'a ve süren klibe ekle"""
+        last_seq = None
+        next_at = 0.0
+        while self._running:
+            try:
+                now = time.time()
+                if now < next_at:
+                    time.sleep(min(next_at - now, 0.1))
+                    continue
+
+                seq, jpeg = self.encoder.get(self.rendition, self.quality)
+                if jpeg is None or seq == last_seq:
+                    time.sleep(FRAME_POLL_INTERVAL)
+                    continue
+
+                last_seq = seq
+                next_at = now + self.frame_interval
+
+                # Buffer ve klip birlikte güncellenir (trigger aynı frame'i iki kez almasın)
+                with self._clip_lock:
+                    self.buffer.push(seq, now, jpeg)
+                    if self._clip is not None:
+                        self._clip.frames.append((seq, now, jpeg))
+                        if now >= self._clip.end_at:
+                            self._finish_clip()
+            except Exception as e:
+                self.logger.error(f"Klip buffer hatası: {e}")
+                time.sleep(0.1)
+
+    def _finish_clip(self):
+        """Süren klibi yazma kuyruğuna ver (_clip_lock altında çağrılır)"""
+        clip, self._clip = self._clip, None
+        if clip is None or not clip.frames:
+            return
+        try:
+            self._write_queue.put_nowait(clip)
+        except queue.Full:
+            CLIPS_DROPPED.inc()
+            self.logger.warning(f"Klip yazma kuyruğu dolu, klip {clip.clip_id} atlandı")
+
+    def _drain_write_queue(self):
+        """Yazılmayı bekleyen klipleri kuyruktan at"""
+        dropped = 0
+        while True:
+            try:
+                clip = self._write_queue.get_nowait()
+            except queue.Empty:
+                return dropped
+            if clip is not None:
+                dropped += 1
+                CLIPS_DROPPED.inc()
+
+    def _writer_loop(self):
+        """Klipleri diske yaz ve disk kotasını uygula"""
+        while True:
+            clip = self._write_queue.get()
+            if clip is None:
+                break
+            try:
+                self._write_clip(clip)
+                self._enforce_disk_cap()
+            except Exception as e:
+                self.logger.error(f"Klip yazma hatası: {e}")
+
+    def _write_clip(self, clip):
+        """Buffer'daki JPEG'leri olduğu gibi .mjpeg dosyasına ve indeksi .json'a yaz"""
+        stamp = datetime.fromtimestamp(clip.events[0]['time']).strftime('%Y%m%d_%H%M%S')
+        name = f"clip_{stamp}_{clip.clip_id}"
+        video_path = self.output_dir / f"{name}.mjpeg"
+
+        index = []
+        offset = 0
+        with open(video_path, 'wb') as f:
+            for seq, timestamp, jpeg in clip.frames:
+                f.write(jpeg)
+                index.append({'seq': seq, 'ts': round(timestamp, 3), 'offset': offset, 'size': len(jpeg)})
+                offset += len(jpeg)
+
+        metadata = {
+            'name': name,
+            'start': clip.frames[0][1],
+            'end': clip.frames[-1][1],
+            'duration': round(clip.frames[-1][1] - clip.frames[0][1], 2),
+            'rendition': self.rendition,
+            'quality': self.quality,
+            'bytes': offset,
+            'events': clip.events,
+            'frames': index
+        }
+        with open(self.output_dir / f"{name}.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+
+        CLIPS_WRITTEN.inc()
+        self.logger.info(f"🎬 Klip kaydedildi: {video_path.name} ({len(index)} frame, "
+                         f"{metadata['duration']:.1f}s, {offset / 1024:.0f} KB)")
+
+    def _enforce_disk_cap(self):
+        """Klip dizini kotayı aşarsa en eski klipleri (video + indeks) sil"""
+        clips = {}  # isim -> (video + indeks boyutu, en eski değişiklik zamanı)
+        for path in self.output_dir.glob('clip_*'):
+            if path.suffix not in ('.mjpeg', '.json'):
+                continue
+            stat = path.stat()
+            size, mtime = clips.get(path.stem, (0, stat.st_mtime))
+            clips[path.stem] = (size + stat.st_size, min(mtime, stat.st_mtime))
+
+        total = sum(size for size, _ in clips.values())
+        for name in sorted(clips, key=lambda stem: clips[stem][1]):
+            if total <= self.max_disk_bytes:
+                break
+            total -= clips[name][0]
+            (self.output_dir / f"{name}.mjpeg").unlink(missing_ok=True)
+            (self.output_dir / f"{name}.json").unlink(missing_ok=True)
+            CLIPS_DELETED.inc()
+            self.logger.info(f"🗑️ Disk kotası: {name} silindi")
+
+    def get_memory_info(self):
+        """
+        Pre-roll buffer'ı ve yazılmayı bekleyen klipler.
+
+        Returns:
+            dict
+        """
+        return {
+            'buffer_frames': len(self.buffer),
+            'buffer_kb': round(self.buffer.nbytes / 1024, 1),
+            'buffer_limit_kb': round(self.buffer.max_bytes / 1024, 1),
+            'write_queue': self._write_queue.qsize()
+        }
+
+    def list_clips(self):
+        """
+        Kayıtlı kliplerin özeti (yeniden eskiye).
+
+        Returns:
+            list: Klip meta verileri (frame indeksi hariç)
+        """
+        clips = []
+        for path in sorted(self.output_dir.glob('clip_*.json'), reverse=True):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            metadata.pop('frames', None)
+            clips.append(metadata)
+        return clips
+
+    def clip_path(self, name):
+        """İsimden klip dosya yolu (dizin dışına çıkışı engeller)"""
+        path = self.output_dir / f"{Path(name).name}.mjpeg"
+        return path if path.exists() else None
+
+    def iter_playback(self, name, speed=1.0):
+        """
+        Klibi kayıt hızında multipart MJPEG parçaları olarak oynat
+        (tarayıcıda <img> ile izlenebilir).
+        """
+        path = self.clip_path(name)
+        if path is None:
+            return
+        with open(path.with_suffix('.json'), encoding='utf-8') as f:
+            frames = json.load(f)['frames']
+
+        with open(path, 'rb') as f:
+            previous_ts = None
+            for frame in frames:
+                if previous_ts is not None:
+                    time.sleep(max(0.0, (frame['ts'] - previous_ts) / speed))
+                previous_ts = frame['ts']
+                f.seek(frame['offset'])
+                yield mjpeg_part(frame['seq'], f.read(frame['size']))
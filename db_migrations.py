@@ -0,0 +1,215 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Veritabanı Şema Migration'ları
+musteri_analiz.db şemasının sürümlü değişiklikleri. Uygulanan her
+migration schema_migrations tablosuna yazılır; migrate() sadece henüz
+uygulanmamış olanları sırayla ve her birini kendi transaction'ında çalıştırır.
+
+Migration'lar tekrar çalıştırılabilir yazılır (IF NOT EXISTS, eksik kolon
+kontrolü): db_manager ya da eski sürümlerin ensure_schema() fonksiyonları
+ve rollup / senkronizasyon şemaları aynı nesneleri daha önce oluşturmuş
+olabilir. Rollup ve senkronizasyon tabloları da buradan gelir;
+RollupStore ve StoreSync ilk bağlantıda migrate() çağırır.
+
+Yeni sorgu eklerken gereken indeks buraya yeni bir migration olarak eklenir;
+test_query_plans.py tüm üretim sorgularının planını bu şema üzerinde kontrol eder.
+
+Kullanım:
+    python db_migrations.py [--db data/musteri_analiz.db] [--status]
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime
+
+import visitor_db
+from src.utils.logger import get_logger
+
+VISITORS_TABLE = """
+    CREATE TABLE IF NOT EXISTS visitors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entry_time TIMESTAMP,
+        confidence_avg REAL,
+        bounding_box TEXT,
+        camera_index INTEGER,
+        detection_count INTEGER
+    )
+"""
+
+
+def _add_columns(columns):
+    return lambda conn: visitor_db.ensure_columns(conn, columns, commit=False)
+
+
+# (sürüm, açıklama, SQL ifadeleri listesi veya conn alan fonksiyon)
+MIGRATIONS = [
+    (1, 'visitors tablosu', [VISITORS_TABLE]),
+    (2, 'giriş zamanı indeksi (aralık sorguları, son ziyaretçiler)',
+     ["CREATE INDEX IF NOT EXISTS idx_visitors_entry_time ON visitors(entry_time)"]),
+    (3, 'bölge kolonu', _add_columns({'zone_id': 'INTEGER'})),
+    (4, 'bölge isimleri tablosu ve bölge kırılım indeksi', [
+        """
+        CREATE TABLE IF NOT EXISTS zones (
+            camera_index INTEGER NOT NULL,
+            zone_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (camera_index, zone_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_visitors_time_zone ON visitors(entry_time, zone_id)",
+    ]),
+    (5, 'demografi kolonları',
+     _add_columns({'age_group': 'TEXT', 'gender': 'TEXT', 'demographics_confidence': 'REAL'})),
+    (6, 'kamera indeksi (export kamera listesi)',
+     ["CREATE INDEX IF NOT EXISTS idx_visitors_camera ON visitors(camera_index)"]),
+    (7, 'ziyaretçi rollup tabloları (analytics_rollups)', [
+        """
+        CREATE TABLE IF NOT EXISTS visitor_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            camera_index INTEGER NOT NULL,
+            visitors INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            PRIMARY KEY (granularity, bucket, camera_index)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        """,
+    ]),
+    (8, 'mağaza senkronizasyonu olay kuyruğu ve durumu (store_sync)', [
+        """
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            payload TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def applied_versions(conn):
+    """
+    Returns:
+        dict: {sürüm: (açıklama, uygulanma zamanı)}
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    rows = conn.execute("SELECT version, description, applied_at FROM schema_migrations").fetchall()
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """
+    Uygulanmamış migration'ları sırayla çalıştır.
+
+    Aynı veritabanını açan birden fazla process (web app, headless servis)
+    aynı anda başlarsa BEGIN IMMEDIATE ile sıraya girer.
+
+    Returns:
+        list: Bu çağrıda uygulanan sürümler
+    """
+    logger = get_logger("migrations")
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None     # Transaction'ları kendimiz yönetiyoruz
+    applied = []
+    try:
+        applied_versions(conn)
+        for version, description, change in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Kilidi beklerken başka bir process uygulamış olabilir
+                if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                    conn.execute("COMMIT")
+                    continue
+                if callable(change):
+                    change(conn)
+                else:
+                    for statement in change:
+                        conn.execute(statement)
+                conn.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                             (version, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+            logger.info(f"🗄️  Migration {version} uygulandı: {description}")
+    finally:
+        conn.isolation_level = previous_isolation
+    return applied
+
+
+def migrate_database(db_path=visitor_db.DB_PATH):
+    """
+    Veritabanını son şemaya getir.
+
+    Returns:
+        list: Uygulanan sürümler (hata olursa boş; uygulama eski şemayla çalışmaya devam eder)
+    """
+    try:
+        conn = visitor_db.connect(db_path)
+        try:
+            return migrate(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        get_logger("migrations").error(f"Migration hatası: {e}")
+        return []
+
+
+def list_indexes(conn, table='visitors'):
+    """
+    Returns:
+        dict: {indeks adı: [kolonlar]}
+    """
+    indexes = {}
+    for row in conn.execute(f"PRAGMA index_list({table})"):
+        indexes[row[1]] = [column[2] for column in conn.execute(f"PRAGMA index_info({row[1]})")]
+    return indexes
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Veritabanı şema migration'ları")
+    parser.add_argument('--db', default=visitor_db.DB_PATH)
+    parser.add_argument('--status', action='store_true', help="Uygulamadan durumu göster")
+    args = parser.parse_args()
+
+    conn = visitor_db.connect(args.db)
+    try:
+        if not args.status:
+            applied = migrate(conn)
+            print(f"✅ {len(applied)} migration uygulandı" if applied else "✅ Şema güncel")
+        done = applied_versions(conn)
+        for version, description, _ in MIGRATIONS:
+            mark = f"uygulandı {done[version][1]}" if version in done else 'bekliyor'
+            print(f"   {version:>3}  {description:<55} {mark}")
+        print("\n📇 visitors indeksleri")
+        for name, columns in list_indexes(conn).items():
+            print(f"   {name}: {', '.join(columns)}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Demografik Analiz (Yaş / Cinsiyet)
+Ana sayım pipeline'ını yavaşlatmadan çalışan ikincil analiz aşaması.
+
+- Her onaylı track için takip süresince en iyi kesit (güven x boyut x
+  netlik) saklanır; track bitince (veya DEMOGRAPHICS_COLLECT_SECONDS
+  dolunca) tek kesit kuyruğa alınır.
+- Düşük öncelikli worker thread'i kuyruktan kamera/track fark etmeksizin
+  DEMOGRAPHICS_BATCH_SIZE kadar kesiti tek cv2.dnn çağrısıyla işler.
+- Sonuçlar track'in sayıldığı ziyaretçi satırına (VisitorRows'un bağladığı
+  satır id'si) age_group / gender olarak toplu (tek transaction) yazılır;
+  satırı henüz yazılmamış sonuçlar sonraki turda tekrar denenir. Kolonlar
+  db_migrations'tan gelir.
+
+Modeller (models/ altında, yoksa aşama devre dışı):
+    age_deploy.prototxt, age_net.caffemodel
+    gender_deploy.prototxt, gender_net.caffemodel
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import visitor_db
+from detection_format import detection_bbox, detection_confidence
+from metrics import metrics_registry
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+MODEL_DIR = getattr(SETTINGS, 'DEMOGRAPHICS_MODEL_DIR', 'models')
+DEMOGRAPHICS_BATCH_SIZE = getattr(SETTINGS, 'DEMOGRAPHICS_BATCH_SIZE', 16)
+DEMOGRAPHICS_BATCH_WAIT = getattr(SETTINGS, 'DEMOGRAPHICS_BATCH_WAIT', 2.0)  # Parti dolmasa da en fazla bu kadar bekle
+DEMOGRAPHICS_COLLECT_SECONDS = getattr(SETTINGS, 'DEMOGRAPHICS_COLLECT_SECONDS', 5.0)
+DEMOGRAPHICS_NICE = getattr(SETTINGS, 'DEMOGRAPHICS_NICE', 10)
+QUEUE_SIZE = 256
+ROW_RETRY_SECONDS = 2.0  # Satırı bekleyen sonuç varken kuyruk bu aralıkla yoklanır
+
+MODEL_INPUT_SIZE = (227, 227)
+MODEL_MEAN = (78.4263377603, 87.7689143744, 114.895847746)
+AGE_GROUPS = ('0-2', '4-6', '8-12', '15-20', '25-32', '38-43', '48-53', '60+')
+GENDERS = ('Erkek', 'Kadın')
+HEAD_REGION = 0.3        # Kişi kutusunun baş/yüz bölgesi (üst kısım)
+MIN_HEAD_SIZE = 24
+RESULT_COLUMNS = {'age_group': 'TEXT', 'gender': 'TEXT', 'demographics_confidence': 'REAL'}
+
+DEMOGRAPHICS_PROCESSED = metrics_registry.counter('demographics_processed_total', 'Analiz edilen kesitler')
+DEMOGRAPHICS_DROPPED = metrics_registry.counter('demographics_dropped_total', 'Kuyruk dolu olduğu için atlanan kesitler')
+DEMOGRAPHICS_BATCH_SECONDS = metrics_registry.histogram(
+    'demographics_batch_seconds', 'Parti başına model süresi',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+
+def crop_quality(frame_shape, bbox, confidence):
+    """
+    Kesit kalite skoru (kopyalamadan önce hesaplanır, ucuz).
+    Büyük, kenara kesilmemiş ve yüksek güvenli kutular tercih edilir.
+    """
+    x, y, w, h = bbox
+    inside = x >= 0 and y >= 0 and x + w <= frame_shape[1] and y + h <= frame_shape[0]
+    return confidence * min(h, 400) * (1.0 if inside else 0.5)
+
+
+def head_crop(frame, bbox):
+    """
+    Kişi kutusunun baş bölgesini kes (kopya).
+
+    Returns:
+        np.ndarray veya None
+    """
+    x, y, w, h = (int(v) for v in bbox)
+    head_h = int(h * HEAD_REGION)
+    # Baş, kutu genişliğinin ortasındaki kare bölge
+    side = min(w, head_h)
+    cx = x + w // 2
+    x0, y0 = max(cx - side // 2, 0), max(y, 0)
+    x1, y1 = min(cx + side // 2, frame.shape[1]), min(y + side, frame.shape[0])
+    if x1 - x0 < MIN_HEAD_SIZE or y1 - y0 < MIN_HEAD_SIZE:
+        return None
+    return frame[y0:y1, x0:x1].copy()
+
+
+class _Candidate:
+    """Track için şimdiye kadarki en iyi kesit"""
+
+    __slots__ = ('track_id', 'counted_at', 'quality', 'crop', 'sharpness')
+
+    def __init__(self, track_id, counted_at):
+        self.track_id = track_id
+        self.counted_at = counted_at
+        self.quality = -1.0
+        self.crop = None
+        self.sharpness = 0.0
+
+
+class DemographicsStage:
+    """Track başına en iyi kesiti seçip toplu yaş/cinsiyet analizi yapan aşama"""
+
+    def __init__(self, tracker, model_dir=MODEL_DIR, batch_size=DEMOGRAPHICS_BATCH_SIZE,
+                 batch_wait=DEMOGRAPHICS_BATCH_WAIT, db_path=visitor_db.DB_PATH, exclude=None, on_result=None,
+                 rows=None):
+        """
+        Args:
+            tracker: Track id'lerini veren IouTracker
+            exclude: exclude(track_id) True dönerse track analiz edilmez (ör. çalışanlar)
+            on_result: on_result(track_id, age_group, gender) callback'i (worker thread'inden)
+            rows: Sayılan track'lerin satır id'lerini veren VisitorRows (None -> sonuçlar yazılmaz)
+        """
+        self.tracker = tracker
+        self.rows = rows
+        self.exclude = exclude
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.db_path = db_path
+        self.on_result = on_result
+        self.logger = get_logger("demographics")
+
+        self.age_net = None
+        self.gender_net = None
+        self.enabled = False
+
+        self._candidates = {}  # track_id -> _Candidate (pipeline thread'i yazar)
+        self._done = set()     # Kuyruğa alınmış track'ler
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._unbound = []     # Satırı henüz bağlanmamış (aday, sonuç) çiftleri (worker thread'i)
+        self._thread = None
+        self._running = False
+
+        self.stats = {'processed': 0, 'batches': 0, 'model_seconds': 0.0, 'written': 0,
+                      'unmatched': 0, 'started_at': time.time()}
+        metrics_registry.gauge('demographics_queue_depth', 'Analiz bekleyen kesitler',
+                               func=self._queue.qsize)
+
+    def load(self):
+        """
+        Modelleri yükle.
+
+        Returns:
+            bool: Aşama kullanılabilirse True
+        """
+        paths = {name: os.path.join(self.model_dir, name) for name in
+                 ('age_deploy.prototxt', 'age_net.caffemodel', 'gender_deploy.prototxt', 'gender_net.caffemodel')}
+        missing = [name for name, path in paths.items() if not os.path.exists(path)]
+        if missing:
+            self.logger.info(f"Demografik analiz devre dışı (eksik model: {', '.join(missing)})")
+            self.enabled = False
+            return False
+
+        try:
+            self.age_net = cv2.dnn.readNetFromCaffe(paths['age_deploy.prototxt'], paths['age_net.caffemodel'])
+            self.gender_net = cv2.dnn.readNetFromCaffe(paths['gender_deploy.prototxt'],
+                                                       paths['gender_net.caffemodel'])
+            self.enabled = True
+        except Exception as e:
+            self.logger.error(f"Demografik model yükleme hatası: {e}")
+            self.enabled = False
+        return self.enabled
+
+    def start(self):
+        """Worker thread'ini başlat"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._worker_loop, name='demographics', daemon=True)
+        self._thread.start()
+        self.logger.info(f"🧠 Demografik analiz aktif (parti: {self.batch_size})")
+
+    def stop(self):
+        """Bekleyen kesitleri bitir ve thread'i durdur"""
+        if self._thread is None:
+            return
+        for track_id in list(self._candidates):
+            self._enqueue(track_id)
+        self._done.clear()
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    # --- Pipeline thread'i tarafı (ucuz) ---
+
+    def update(self, frame, detections, track_update, timestamp=None):
+        """
+        Onaylı track'lerin kesitlerini en iyi aday olarak değerlendir,
+        biten track'lerin adayını kuyruğa al.
+
+        Args:
+            frame: Ham frame
+            detections: Tespit listesi
+            track_update: Aynı frame için IouTracker.update() sonucu
+        """
+        if not self.enabled:
+            return
+        now = timestamp if timestamp is not None else time.time()
+
+        for track in track_update.ended_tracks:
+            self._enqueue(track.track_id)
+            self._done.discard(track.track_id)
+
+        for index, track_id in enumerate(track_update.track_ids):
+            if track_id in self._done:
+                continue
+            candidate = self._candidates.get(track_id)
+            if candidate is None:
+                track = self.tracker.tracks.get(track_id)
+                if track is None or track.hits < self.tracker.confirm_hits:
+                    continue
+                candidate = self._candidates[track_id] = _Candidate(track_id, now)
+
+            detection = detections[index]
+            bbox = detection_bbox(detection)
+            quality = crop_quality(frame.shape, bbox, detection_confidence(detection))
+            if quality > candidate.quality:
+                crop = head_crop(frame, bbox)
+                if crop is not None:
+                    candidate.quality = quality
+                    candidate.crop = crop
+
+            # Uzun süre kalan kişiler için sonucu bekletme
+            if now - candidate.counted_at >= DEMOGRAPHICS_COLLECT_SECONDS:
+                self._enqueue(track_id)
+
+    def _enqueue(self, track_id):
+        candidate = self._candidates.pop(track_id, None)
+        if candidate is None:
+            return
+        self._done.add(track_id)
+        if candidate.crop is None or (self.exclude is not None and self.exclude(track_id)):
+            return
+        try:
+            self._queue.put_nowait(candidate)
+        except queue.Full:
+            DEMOGRAPHICS_DROPPED.inc()
+
+    # --- Worker thread'i tarafı ---
+
+    def _lower_priority(self):
+        """Worker thread'inin CPU önceliğini düşür (Linux'ta thread bazında)"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), DEMOGRAPHICS_NICE)
+        except (AttributeError, OSError):
+            pass
+
+    def _next_batch(self):
+        """
+        Kuyruktan bir parti topla: ilk kesit gelince batch_wait süresince
+        (veya parti dolana kadar) bekle.
+
+        Returns:
+            list veya None (durdurma sinyali); satır bekleyen sonuç varken kuyruk boşsa boş liste
+        """
+        try:
+            first = self._queue.get(timeout=ROW_RETRY_SECONDS if self._unbound else None)
+        except queue.Empty:
+            return []
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker_loop(self):
+        self._lower_priority()
+        conn = visitor_db.connect(self.db_path)
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                try:
+                    results = self._analyze(batch) if batch else []
+                    self._write_results(conn, batch, results)
+                except Exception as e:
+                    self.logger.error(f"Demografik analiz hatası: {e}")
+        finally:
+            conn.close()
+
+    def _analyze(self, batch):
+        """
+        Tüm partiyi tek forward ile işle.
+
+        Returns:
+            list: [(yaş grubu, cinsiyet, güven), ...]
+        """
+        start = time.perf_counter()
+        blob = cv2.dnn.blobFromImages([candidate.crop for candidate in batch], 1.0, MODEL_INPUT_SIZE,
+                                      MODEL_MEAN, swapRB=False)
+        self.gender_net.setInput(blob)
+        gender_probs = self.gender_net.forward()
+        self.age_net.setInput(blob)
+        age_probs = self.age_net.forward()
+        elapsed = time.perf_counter() - start
+
+        DEMOGRAPHICS_BATCH_SECONDS.observe(elapsed)
+        DEMOGRAPHICS_PROCESSED.inc(len(batch))
+        self.stats['batches'] += 1
+        self.stats['processed'] += len(batch)
+        self.stats['model_seconds'] += elapsed
+
+        results = []
+        for gender_row, age_row in zip(gender_probs, age_probs):
+            gender_index = int(np.argmax(gender_row))
+            age_index = int(np.argmax(age_row))
+            confidence = float(min(gender_row[gender_index], age_row[age_index]))
+            results.append((AGE_GROUPS[age_index], GENDERS[gender_index], confidence))
+        return results
+
+    def _write_results(self, conn, batch, results):
+        """Sonuçları track'lerin ziyaretçi satırlarına (satır id'siyle) tek transaction'da yaz"""
+        if self.on_result is not None:
+            for candidate, (age_group, gender, _) in zip(batch, results):
+                self.on_result(candidate.track_id, age_group, gender)
+        if self.rows is None:
+            return
+
+        self.rows.bind(conn)
+        pending, self._unbound = self._unbound + list(zip(batch, results)), []
+        now = time.time()
+        updates = []
+        for candidate, result in pending:
+            row_id = self.rows.row_id(candidate.track_id)
+            if row_id is not None:
+                age_group, gender, confidence = result
+                updates.append((age_group, gender, round(confidence, 3), row_id))
+            elif now - candidate.counted_at < visitor_db.ROW_BIND_SECONDS:
+                # Track henüz sayılmadı veya satırı db_manager tamponunda
+                self._unbound.append((candidate, result))
+            else:
+                self.stats['unmatched'] += 1
+
+        visitor_db.update_visitors(conn, list(RESULT_COLUMNS), updates)
+        self.stats['written'] += len(updates)
+
+    def get_stats(self):
+        """
+        Aşama durumu: kuyruk derinliği ve throughput.
+
+        Returns:
+            dict
+        """
+        batches = self.stats['batches']
+        processed = self.stats['processed']
+        uptime = max(time.time() - self.stats['started_at'], 1e-6)
+        return {
+            'enabled': self.enabled,
+            'queue_depth': self._queue.qsize(),
+            'collecting_tracks': len(self._candidates),
+            'processed': processed,
+            'written': self.stats['written'],
+            'unmatched': self.stats['unmatched'],
+            'awaiting_rows': len(self._unbound),
+            'avg_batch_size': round(processed / batches, 1) if batches else 0.0,
+            'avg_ms_per_crop': round(self.stats['model_seconds'] / processed * 1000, 2) if processed else 0.0,
+            'crops_per_minute': round(processed / uptime * 60, 1)
+        }
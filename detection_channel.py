@@ -0,0 +1,109 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Tespit Olay Kanalı
+Her işlenen frame için kutu, güven skoru ve track id bilgisini WebSocket
+üzerinden gönderir. Dashboard'lar kutuları ham video akışının üzerine
+kendileri çizer; sunucu çizim ve işaretli frame encode'u yapmaz.
+
+Olaylar:
+    detections      JSON: {'seq', 'ts', 'w', 'h', 'boxes': [[x, y, w, h, conf, track_id], ...]}
+    detections_bin  Paketlenmiş (little-endian) byte dizisi:
+                        başlık: uint32 seq, float64 ts, uint16 w, uint16 h, uint16 n
+                        kutu:   uint16 x, uint16 y, uint16 w, uint16 h, uint8 conf (%), uint32 track_id
+
+Video akışındaki her parça 'X-Frame-Seq' başlığı taşır; client kutuları
+aynı seq'e sahip frame ile eşleştirir.
+"""
+
+import struct
+
+from detection_format import detection_bbox, detection_confidence
+
+DETECTION_EVENT = 'detections'
+DETECTION_EVENT_BINARY = 'detections_bin'
+CHANNEL_FORMATS = ('json', 'binary', 'both')
+
+HEADER = struct.Struct('<IdHHH')
+BOX = struct.Struct('<HHHHBI')
+UINT16_MAX = 0xFFFF
+
+
+def _clamp16(value):
+    return min(max(int(value), 0), UINT16_MAX)
+
+
+def build_detection_event(seq, timestamp, frame_shape, detections, track_ids=None):
+    """
+    JSON tespit olayı oluştur.
+
+    Args:
+        seq: Frame sıra numarası (video akışındaki X-Frame-Seq ile aynı)
+        timestamp: Frame zamanı (unix saniye)
+        frame_shape: Kamera frame'inin (yükseklik, genişlik, ...) boyutu
+        detections: Tespit listesi
+        track_ids: Tespitlerle aynı sırada track id'leri
+
+    Returns:
+        dict: Olay verisi
+    """
+    boxes = []
+    for index, detection in enumerate(detections or ()):
+        x, y, w, h = detection_bbox(detection)
+        track_id = track_ids[index] if track_ids is not None else None
+        boxes.append([int(x), int(y), int(w), int(h),
+                      round(detection_confidence(detection), 2), track_id or 0])
+
+    return {
+        'seq': seq,
+        'ts': round(timestamp, 3),
+        'w': int(frame_shape[1]),
+        'h': int(frame_shape[0]),
+        'boxes': boxes
+    }
+
+
+def pack_detection_event(event):
+    """
+    JSON olayını kompakt binary forma çevir (kutu başına 13 byte).
+
+    Returns:
+        bytes: Paketlenmiş olay
+    """
+    boxes = event['boxes']
+    parts = [HEADER.pack(event['seq'] & 0xFFFFFFFF, event['ts'], _clamp16(event['w']),
+                         _clamp16(event['h']), len(boxes))]
+    for x, y, w, h, confidence, track_id in boxes:
+        parts.append(BOX.pack(_clamp16(x), _clamp16(y), _clamp16(w), _clamp16(h),
+                              min(max(int(round(confidence * 100)), 0), 100), track_id & 0xFFFFFFFF))
+    return b''.join(parts)
+
+
+def unpack_detection_event(data):
+    """
+    Binary olayı JSON formuna geri çevir (test ve Python client'lar için).
+
+    Returns:
+        dict: Olay verisi
+    """
+    seq, timestamp, width, height, count = HEADER.unpack_from(data, 0)
+    boxes = []
+    offset = HEADER.size
+    for _ in range(count):
+        x, y, w, h, confidence, track_id = BOX.unpack_from(data, offset)
+        boxes.append([x, y, w, h, confidence / 100.0, track_id])
+        offset += BOX.size
+    return {'seq': seq, 'ts': timestamp, 'w': width, 'h': height, 'boxes': boxes}
+
+
+def encode_for_channel(event, channel_format):
+    """
+    Kanal formatına göre gönderilecek (olay adı, veri) çiftleri.
+
+    Returns:
+        list: [(event_name, payload), ...]
+    """
+    messages = []
+    if channel_format in ('json', 'both'):
+        messages.append((DETECTION_EVENT, event))
+    if channel_format in ('binary', 'both'):
+        messages.append((DETECTION_EVENT_BINARY, pack_detection_event(event)))
+    return messages
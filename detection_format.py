@@ -0,0 +1,88 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Tespit Veri Formatı
+HumanDetector tespitleri ile kompakt numpy dizileri arasında dönüşüm.
+
+Tespit sözlüğü:  {'bbox': [x, y, w, h], 'confidence': 0.87}
+Kompakt dizi:    float32 (N, 5) -> x, y, w, h, confidence
+"""
+
+import numpy as np
+import cv2
+
+DETECTION_COLUMNS = 5
+BOX_COLOR = (0, 255, 0)  # Yeşil çerçeve (BGR)
+
+
+def detection_bbox(detection):
+    """
+    Tespitin [x, y, w, h] kutusunu getir.
+
+    Returns:
+        tuple: (x, y, w, h)
+    """
+    if isinstance(detection, dict):
+        bbox = detection.get('bbox', detection.get('box'))
+    else:
+        bbox = detection[:4]
+    x, y, w, h = bbox
+    return float(x), float(y), float(w), float(h)
+
+
+def detection_confidence(detection):
+    """Tespitin güven skorunu getir"""
+    if isinstance(detection, dict):
+        return float(detection.get('confidence', 0.0))
+    return float(detection[4]) if len(detection) > 4 else 0.0
+
+
+def detections_to_array(detections):
+    """
+    Tespit listesini kompakt diziye çevir (process'ler arası taşıma için).
+
+    Returns:
+        np.ndarray: float32 (N, 5)
+    """
+    if not detections:
+        return np.empty((0, DETECTION_COLUMNS), dtype=np.float32)
+
+    array = np.empty((len(detections), DETECTION_COLUMNS), dtype=np.float32)
+    for i, detection in enumerate(detections):
+        array[i, :4] = detection_bbox(detection)
+        array[i, 4] = detection_confidence(detection)
+    return array
+
+
+def array_to_detections(array):
+    """
+    Kompakt diziyi visitor_tracker'ın beklediği tespit listesine çevir.
+
+    Returns:
+        list: [{'bbox': [x, y, w, h], 'confidence': c}, ...]
+    """
+    return [{'bbox': [int(x), int(y), int(w), int(h)], 'confidence': float(conf)}
+            for x, y, w, h, conf in array.tolist()]
+
+
+def draw_detections(frame, detections, scale=1.0, track_ids=None):
+    """
+    Tespit kutularını frame üzerine çiz (yerinde değiştirir).
+
+    Args:
+        frame: Çizilecek görüntü
+        detections: Tespit listesi (kamera çözünürlüğünde)
+        scale: Küçültülmüş rendition'lar için koordinat ölçeği
+        track_ids: Etikette gösterilecek track id'leri (tespitlerle aynı sırada)
+
+    Returns:
+        np.ndarray: Aynı frame
+    """
+    for index, detection in enumerate(detections):
+        x, y, w, h = (int(v * scale) for v in detection_bbox(detection))
+        confidence = detection_confidence(detection)
+        label = f"Person {confidence:.0%}"
+        if track_ids is not None and track_ids[index] is not None:
+            label = f"#{track_ids[index]} {label}"
+        cv2.rectangle(frame, (x, y), (x + w, y + h), BOX_COLOR, 2)
+        cv2.putText(frame, label, (x, max(y - 8, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, BOX_COLOR, 2)
+    return frame
@@ -0,0 +1,359 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Process Havuzu ile Tespit
+HumanDetector'ı ayrı process'lerde çalıştırarak GIL çekişmesini ortadan kaldırır.
+
+Veri akışı:
+    ana process  --(frame -> shared memory slotu)--> worker process
+    ana process  <--(seq, slot, float32 (N, 5) dizi)-- worker process
+
+Frame'ler pickle edilmez; kuyruktan sadece slot numarası ve frame şekli geçer.
+Sonuçlar frame sıra numarasına göre yeniden sıralanıp callback'e verilir.
+
+Her slotun paylaşılan bir nesil sayacı vardır; slota yeni frame yazılmadan
+önce artırılır. Worker sayacı okumadan önce ve sonra kontrol eder: kayıp
+sayılıp geri alınan slot o okurken yeniden kullanıldıysa sonuç atılır.
+"""
+
+import heapq
+import os
+import queue
+import sys
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detection_format import detections_to_array, array_to_detections
+from metrics import metrics_registry, observe_stage, FRAMES_DROPPED
+from src.utils.logger import get_logger
+
+SLOTS_PER_WORKER = 2
+RESULT_POLL_TIMEOUT = 0.2
+LOST_RESULT_TIMEOUT = 5.0  # Gönderildikten bu kadar sonra sonucu gelmeyen frame atlanır, slotu geri alınır
+RESTART_BACKOFF = 5.0      # Aynı worker en fazla bu aralıkla yeniden başlatılır (model yüklenemiyorsa)
+
+POOL_PENDING = metrics_registry.gauge(
+    'detector_pool_pending_frames', 'Havuzda işlenmeyi bekleyen frame sayısı')
+WORKER_RESTARTS = metrics_registry.counter(
+    'detector_pool_worker_restarts_total', 'Ölen ve yeniden başlatılan detector worker sayısı')
+
+
+def _worker_main(shm_name, slot_size, generations, task_queue, result_queue, project_root):
+    """
+    Worker process ana döngüsü. Her worker kendi HumanDetector'ını yükler.
+    """
+    sys.path.insert(0, project_root)
+    from src.core.detector import HumanDetector
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    detector = HumanDetector()
+    ready = detector.initialize()
+    result_queue.put(('ready', os.getpid(), ready))
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            seq, slot, generation, shape, dtype = task
+            if generations[slot] != generation:
+                # Slot kayıp sayılıp başka frame'e verilmiş
+                continue
+            frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=slot * slot_size)
+
+            start = time.perf_counter()
+            try:
+                detections, _ = detector.detect_humans(frame, draw_boxes=False)
+                result = detections_to_array(detections)
+                error = None
+            except Exception as e:
+                result = detections_to_array([])
+                error = str(e)
+
+            # Frame view'ı slot serbest kalmadan önce bırak
+            del frame
+            if generations[slot] != generation:
+                # Okurken slota yeni frame yazıldı: sonuç karışık veriden
+                continue
+            result_queue.put((seq, slot, result, time.perf_counter() - start, error))
+    finally:
+        detector.cleanup()
+        shm.close()
+
+
+class DetectorPool:
+    """Shared memory frame slotlarıyla beslenen HumanDetector process havuzu"""
+
+    def __init__(self, num_workers=2, on_result=None, slots_per_worker=SLOTS_PER_WORKER):
+        """
+        Args:
+            num_workers: Worker process sayısı
+            on_result: Sıralı sonuç callback'i: on_result(seq, frame, detections)
+            slots_per_worker: Worker başına frame slotu (2 = bir işlenirken biri bekler)
+        """
+        self.num_workers = max(1, int(num_workers))
+        self.num_slots = self.num_workers * max(1, slots_per_worker)
+        self.on_result = on_result
+
+        self._ctx = mp.get_context('spawn')
+        self._shm = None
+        self._slot_size = 0
+        self._generations = None    # Slot başına nesil sayacı (process'ler arası paylaşılan)
+        self._free_slots = queue.Queue()
+        self._task_queue = None
+        self._result_queue = None
+        self._workers = []
+        self._restarted_at = []
+        self.restarts = 0
+
+        # Sıra numarası ve yeniden sıralama tamponu
+        self._next_seq = 0
+        self._next_to_emit = 0
+        self._reorder_heap = []
+        self._pending_frames = {}
+        self._in_flight = {}        # seq -> (slot, gönderilme zamanı)
+        self._abandoned = set()     # Sonucu beklenmeyen (kayıp sayılan) sıra numaraları
+        self._submit_lock = threading.Lock()
+
+        self._collector = None
+        self._running = False
+        self.logger = get_logger("detector_pool")
+
+    def start(self, frame_shape, dtype=np.uint8, timeout=60.0):
+        """
+        Shared memory'yi ayır ve worker'ları başlat.
+
+        Args:
+            frame_shape: Kamera frame şekli, örn. (720, 1280, 3)
+            timeout: Worker'ların model yüklemesi için beklenecek süre
+
+        Returns:
+            bool: Tüm worker'lar hazırsa True
+        """
+        self._slot_size = int(np.prod(frame_shape)) * np.dtype(dtype).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=self._slot_size * self.num_slots)
+        self._generations = self._ctx.RawArray('Q', self.num_slots)
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._workers = [self._spawn_worker(i) for i in range(self.num_workers)]
+        self._restarted_at = [0.0] * self.num_workers
+
+        # Worker'ların model yüklemesini bekle
+        ready_count = 0
+        deadline = time.time() + timeout
+        while ready_count < self.num_workers and time.time() < deadline:
+            try:
+                message = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if message[0] == 'ready':
+                if not message[2]:
+                    self.logger.error(f"Worker {message[1]} modeli yükleyemedi")
+                    self.close()
+                    return False
+                ready_count += 1
+
+        if ready_count < self.num_workers:
+            self.logger.error("Detector worker'ları zamanında hazır olmadı")
+            self.close()
+            return False
+
+        self._running = True
+        self._collector = threading.Thread(target=self._collect_results, name='detector-pool-collector',
+                                           daemon=True)
+        self._collector.start()
+
+        self.logger.info(f"🧵 Detector havuzu hazır: {self.num_workers} worker, {self.num_slots} slot")
+        return True
+
+    def _spawn_worker(self, index):
+        """Worker process'ini başlat"""
+        worker = self._ctx.Process(
+            target=_worker_main,
+            args=(self._shm.name, self._slot_size, self._generations, self._task_queue, self._result_queue,
+                  os.path.dirname(os.path.abspath(__file__))),
+            name=f'detector-worker-{index}', daemon=True)
+        worker.start()
+        return worker
+
+    def _restart_dead_workers(self):
+        """Ölen worker'ları yeniden başlat (elindeki frame kayıp sayılır ve slotu geri alınır)"""
+        now = time.time()
+        for index, worker in enumerate(self._workers):
+            if worker.is_alive() or now - self._restarted_at[index] < RESTART_BACKOFF:
+                continue
+            self.logger.error(f"Detector worker {index} öldü (çıkış kodu {worker.exitcode}), yeniden başlatılıyor")
+            worker.join(timeout=0)
+            self._workers[index] = self._spawn_worker(index)
+            self._restarted_at[index] = now
+            self.restarts += 1
+            WORKER_RESTARTS.inc()
+
+    def submit(self, frame):
+        """
+        Frame'i işlenmek üzere havuza gönder. Boş slot yoksa frame atlanır
+        (kamera thread'i hiçbir zaman bloklanmaz).
+
+        Returns:
+            int: Frame sıra numarası, atlandıysa None
+        """
+        if not self._running:
+            return None
+
+        if frame.nbytes > self._slot_size:
+            self.logger.error(f"Frame boyutu slottan büyük: {frame.shape}")
+            return None
+
+        try:
+            slot = self._free_slots.get_nowait()
+        except queue.Empty:
+            FRAMES_DROPPED.inc()
+            return None
+
+        # Slotu hâlâ okuyan (kayıp sayılmış) worker yazımı fark etsin
+        generation = self._generations[slot] + 1
+        self._generations[slot] = generation
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf,
+                          offset=slot * self._slot_size)
+        np.copyto(view, frame)
+        del view
+
+        with self._submit_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending_frames[seq] = frame
+            self._in_flight[seq] = (slot, time.time())
+            POOL_PENDING.set(len(self._pending_frames))
+
+        self._task_queue.put((seq, slot, generation, frame.shape, frame.dtype.str))
+        return seq
+
+    def _collect_results(self):
+        """Worker sonuçlarını topla, slotları serbest bırak ve sırayla yayınla"""
+        while self._running:
+            try:
+                message = self._result_queue.get(timeout=RESULT_POLL_TIMEOUT)
+            except queue.Empty:
+                self._restart_dead_workers()
+                self._skip_lost_results()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if message[0] == 'ready':
+                if not message[2]:
+                    self.logger.error(f"Yeniden başlatılan worker {message[1]} modeli yükleyemedi")
+                continue
+
+            seq, slot, result, elapsed, error = message
+            with self._submit_lock:
+                in_flight = self._in_flight.pop(seq, None)
+            if in_flight is None:
+                # Kayıp sayılıp slotu geri alınmış frame'in geç gelen sonucu
+                continue
+            self._free_slots.put(slot)
+            observe_stage('inference', elapsed)
+
+            if error:
+                self.logger.error(f"Worker tespit hatası (frame {seq}): {error}")
+
+            heapq.heappush(self._reorder_heap, (seq, result))
+            self._emit_in_order()
+            self._restart_dead_workers()
+            self._skip_lost_results()
+
+    def _skip_lost_results(self):
+        """
+        Sonucu gelmeyen frame'ler (çöken / takılan worker) sıralamayı bekletmesin:
+        atlanır ve slotları havuza geri verilir. Takılan worker slotu hâlâ
+        okuyor olabilir; slota yazılan yeni frame nesil sayacını artırdığı
+        için o worker'ın sonucu atılır.
+        """
+        now = time.time()
+        with self._submit_lock:
+            lost = sorted(seq for seq, (_, submitted_at) in self._in_flight.items()
+                          if now - submitted_at >= LOST_RESULT_TIMEOUT)
+            for seq in lost:
+                slot, _ = self._in_flight.pop(seq)
+                self._free_slots.put(slot)
+                self._pending_frames.pop(seq, None)
+            self._abandoned.update(lost)
+        if not lost:
+            return
+        self.logger.warning(f"{len(lost)} frame sonucu kayıp ({lost[0]}-{lost[-1]}), atlanıyor; slotlar geri alındı")
+        FRAMES_DROPPED.inc(len(lost))
+        self._emit_in_order()
+
+    def _emit_in_order(self):
+        """Sıradaki frame'in sonucu geldiyse (ve ardışık olanlar) callback'e ver; kayıp olanlar atlanır"""
+        while True:
+            if self._next_to_emit in self._abandoned:
+                self._abandoned.discard(self._next_to_emit)
+                self._next_to_emit += 1
+                continue
+            if not self._reorder_heap or self._reorder_heap[0][0] != self._next_to_emit:
+                break
+            seq, result = heapq.heappop(self._reorder_heap)
+            with self._submit_lock:
+                frame = self._pending_frames.pop(seq, None)
+                POOL_PENDING.set(len(self._pending_frames))
+            self._next_to_emit += 1
+
+            if self.on_result is None:
+                continue
+            try:
+                self.on_result(seq, frame, array_to_detections(result))
+            except Exception as e:
+                self.logger.error(f"Sonuç callback hatası: {e}")
+
+    def get_memory_info(self):
+        """
+        Shared memory slotları ve sıralama tamponu.
+
+        Returns:
+            dict
+        """
+        return {
+            'slots': self.num_slots,
+            'free_slots': self._free_slots.qsize(),
+            'shared_memory_kb': round(self._slot_size * self.num_slots / 1024, 1) if self._shm is not None else 0.0,
+            'pending_frames': len(self._pending_frames),
+            'in_flight': len(self._in_flight),
+            'reorder_buffer': len(self._reorder_heap),
+            'worker_restarts': self.restarts
+        }
+
+    def close(self):
+        """Worker'ları durdur ve shared memory'yi serbest bırak"""
+        self._running = False
+
+        if self._task_queue is not None:
+            for _ in self._workers:
+                self._task_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+        if self._collector is not None and self._collector is not threading.current_thread():
+            self._collector.join(timeout=2.0)
+        self._collector = None
+
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        self._generations = None
+
+        self._pending_frames.clear()
+        self._in_flight.clear()
+        self._abandoned.clear()
+        self._reorder_heap = []
+        self.logger.info("Detector havuzu kapatıldı")
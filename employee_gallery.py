@@ -0,0 +1,362 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Çalışan Filtresi
+Girişten geçen personelin ziyaretçi olarak sayılmasını engeller.
+
+- Galeri: data/employees/<isim>/*.jpg fotoğraflarından yüz embedding'leri
+  bir kez hesaplanır. Yüz verisi diske açık yazılmaz: önbellek (gallery.enc)
+  EMPLOYEE_GALLERY_KEY anahtarıyla şifrelenir, fotoğraf listesinden sadece
+  SHA-256 özeti tutulur. Anahtar veya cryptography yoksa önbellek yazılmaz,
+  embedding'ler her açılışta yeniden hesaplanıp sadece bellekte tutulur.
+  Fotoğraflar değişmedikçe önbellekten yüklenir.
+- Eşleştirme: bulunan tüm yüzler için galeriye olan mesafeler tek bir
+  matris çarpımıyla hesaplanır.
+- Yüz tespiti her frame'de değil, sadece yeni onaylanan track'lerde (yüz
+  bulunamazsa birkaç kez daha) çalışır. Karar verilene kadar track'in
+  tespitleri visitor_tracker'a gönderilmez.
+
+face_recognition kurulu değilse veya galeri boşsa filtre devre dışıdır ve
+tespitler olduğu gibi geçer.
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from detection_format import detection_bbox
+from metrics import metrics_registry, stage_timer
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+try:
+    import face_recognition
+except ImportError:
+    face_recognition = None
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+EMPLOYEE_DIR = getattr(SETTINGS, 'EMPLOYEE_DIR', 'data/employees')
+EMPLOYEE_MATCH_DISTANCE = getattr(SETTINGS, 'EMPLOYEE_MATCH_DISTANCE', 0.5)
+GALLERY_KEY_ENV = 'EMPLOYEE_GALLERY_KEY'   # Fernet anahtarı (Fernet.generate_key())
+LEGACY_CACHE_NAME = 'gallery.npz'          # Eski, şifresiz önbellek (bulunursa silinir)
+FACE_MAX_ATTEMPTS = 3      # Yüz bulunamazsa track bu kadar denemeden sonra ziyaretçi sayılır
+FACE_RETRY_FRAMES = 5      # Denemeler arası frame sayısı
+FACE_REGION = 0.45         # Kişi kutusunun yüz aranacak üst kısmı
+FACE_SEARCH_WIDTH = 160    # Yüz arama bölgesi en fazla bu genişliğe küçültülür
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+FACE_CHECK_SECONDS = metrics_registry.histogram(
+    'employee_face_check_seconds', 'Track başına yüz tespiti + galeri eşleştirme süresi')
+FACE_CHECKS = metrics_registry.counter('employee_face_checks_total', 'Yapılan yüz kontrolleri')
+EMPLOYEES_FILTERED = metrics_registry.counter(
+    'employee_tracks_filtered_total', 'Çalışan olarak tanınıp sayımdan çıkarılan track\'ler')
+
+# Track kararları
+PENDING, VISITOR, EMPLOYEE = 'pending', 'visitor', 'employee'
+
+
+class EmployeeGallery:
+    """Çalışan yüz embedding'lerinin önbellekli matrisi"""
+
+    def __init__(self, directory=EMPLOYEE_DIR, key=None):
+        """
+        Args:
+            directory: Çalışan fotoğrafları dizini
+            key: Önbellek şifreleme anahtarı (varsayılan: EMPLOYEE_GALLERY_KEY ortam değişkeni / ayarı)
+        """
+        self.directory = Path(directory)
+        self.cache_path = self.directory / 'gallery.enc'
+        self.logger = get_logger("employees")
+        key = key or os.environ.get(GALLERY_KEY_ENV) or getattr(SETTINGS, GALLERY_KEY_ENV, None)
+        self._cipher = None
+        if key and Fernet is not None:
+            try:
+                self._cipher = Fernet(key)
+            except ValueError as e:
+                self.logger.error(f"{GALLERY_KEY_ENV} geçersiz, galeri önbelleği kullanılmayacak: {e}")
+        self.names = []
+        self.matrix = np.empty((0, 128), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _image_files(self):
+        if not self.directory.exists():
+            return []
+        return sorted(path for path in self.directory.glob('*/*')
+                      if path.suffix.lower() in IMAGE_EXTENSIONS)
+
+    def _fingerprint(self, files):
+        """Fotoğraf listesinin (yol, boyut, değişiklik zamanı) SHA-256 özeti"""
+        entries = [[str(path.relative_to(self.directory)), path.stat().st_size, int(path.stat().st_mtime)]
+                   for path in files]
+        return hashlib.sha256(json.dumps(entries).encode('utf-8')).hexdigest()
+
+    def _read_cache(self, fingerprint):
+        """
+        Şifreli önbelleği çöz.
+
+        Returns:
+            tuple: (isimler, matris); önbellek yok, eski veya çözülemiyorsa None
+        """
+        if self._cipher is None or not self.cache_path.exists():
+            return None
+        try:
+            data = np.load(io.BytesIO(self._cipher.decrypt(self.cache_path.read_bytes())), allow_pickle=False)
+            if str(data['fingerprint']) == fingerprint:
+                return list(data['names']), data['matrix']
+        except InvalidToken:
+            self.logger.warning("Galeri önbelleği bu anahtarla çözülemedi, yeniden hesaplanacak")
+        except Exception as e:
+            self.logger.warning(f"Galeri önbelleği okunamadı: {e}")
+        return None
+
+    def _write_cache(self, names, matrix, fingerprint):
+        """Galeriyi şifreleyip yaz (anahtar yoksa diske hiçbir şey yazılmaz)"""
+        if self._cipher is None:
+            self.logger.info(f"Galeri önbelleği yazılmadı: {GALLERY_KEY_ENV} veya cryptography yok "
+                             f"(yüz verisi sadece bellekte)")
+            return
+        buffer = io.BytesIO()
+        np.savez(buffer, names=np.asarray(names, dtype=str), matrix=matrix, fingerprint=np.asarray(fingerprint))
+        temp_path = self.cache_path.with_suffix('.tmp')
+        temp_path.write_bytes(self._cipher.encrypt(buffer.getvalue()))
+        os.replace(temp_path, self.cache_path)
+
+    def load(self):
+        """
+        Galeriyi önbellekten yükle; fotoğraflar değiştiyse yeniden hesapla.
+
+        Returns:
+            int: Galerideki yüz sayısı
+        """
+        files = self._image_files()
+        fingerprint = self._fingerprint(files)
+
+        legacy_path = self.directory / LEGACY_CACHE_NAME
+        if legacy_path.exists():
+            legacy_path.unlink()
+            self.logger.info(f"Şifresiz eski galeri önbelleği silindi: {legacy_path}")
+
+        cached = self._read_cache(fingerprint)
+        if cached is not None:
+            self._set(*cached)
+            self.logger.info(f"👔 Çalışan galerisi önbellekten yüklendi: {len(self)} yüz")
+            return len(self)
+
+        if face_recognition is None or not files:
+            self._set([], np.empty((0, 128), dtype=np.float32))
+            return 0
+
+        start = time.perf_counter()
+        names, encodings = [], []
+        for path in files:
+            try:
+                image = face_recognition.load_image_file(str(path))
+                found = face_recognition.face_encodings(image)
+            except Exception as e:
+                self.logger.warning(f"Fotoğraf okunamadı ({path.name}): {e}")
+                continue
+            if len(found) != 1:
+                self.logger.warning(f"{path}: {len(found)} yüz bulundu, tek yüzlü fotoğraf gerekli")
+                continue
+            names.append(path.parent.name)
+            encodings.append(found[0])
+
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self._set(names, matrix)
+        self._write_cache(names, matrix, fingerprint)
+        self.logger.info(f"👔 Çalışan galerisi oluşturuldu: {len(names)} yüz, "
+                         f"{len(set(names))} kişi ({time.perf_counter() - start:.1f}s)")
+        return len(self)
+
+    def _set(self, names, matrix):
+        self.names = names
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def match(self, encodings, max_distance=EMPLOYEE_MATCH_DISTANCE):
+        """
+        Yüz embedding'lerini galeriyle tek seferde karşılaştır.
+
+        Args:
+            encodings: (F, 128) yüz embedding'leri
+
+        Returns:
+            list: Her yüz için (çalışan adı veya None, mesafe)
+        """
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        if not len(self) or not len(encodings):
+            return [(None, float('inf'))] * len(encodings)
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab  (F x N tek matris çarpımı)
+        sq_distances = (np.einsum('ij,ij->i', encodings, encodings)[:, None] + self._sq_norms[None, :]
+                        - 2.0 * encodings @ self.matrix.T)
+        nearest = np.argmin(sq_distances, axis=1)
+        distances = np.sqrt(np.maximum(sq_distances[np.arange(len(encodings)), nearest], 0.0))
+        return [(self.names[index] if distance <= max_distance else None, float(distance))
+                for index, distance in zip(nearest, distances)]
+
+
+class EmployeeFilter:
+    """Onaylanan track'lerde yüz kontrolü yapıp çalışanları sayımdan çıkarır"""
+
+    def __init__(self, tracker, gallery=None):
+        """
+        Args:
+            tracker: Track id'lerini veren IouTracker
+            gallery: EmployeeGallery (varsayılan: data/employees)
+        """
+        self.tracker = tracker
+        self.gallery = gallery if gallery is not None else EmployeeGallery()
+        self.logger = get_logger("employees")
+        self.enabled = False
+        self._decisions = {}  # track_id -> [karar, deneme sayısı, sonraki deneme hit sayısı]
+        self.stats = {'face_checks': 0, 'face_check_seconds': 0.0, 'frames': 0, 'filter_seconds': 0.0,
+                      'employee_tracks': 0}
+
+    def load(self):
+        """
+        Galeriyi yükle ve filtreyi etkinleştir.
+
+        Returns:
+            bool: Filtre aktifse True
+        """
+        if face_recognition is None or not getattr(SETTINGS, 'FACE_RECOGNITION_ENABLED', True):
+            self.logger.info("Çalışan filtresi devre dışı (face_recognition yok)")
+            self.enabled = False
+            return False
+        try:
+            self.enabled = self.gallery.load() > 0
+        except Exception as e:
+            self.logger.error(f"Çalışan galerisi yükleme hatası: {e}")
+            self.enabled = False
+        return self.enabled
+
+    def filter(self, frame, detections, track_update):
+        """
+        Sayıma gidecek tespitleri seç.
+
+        Args:
+            frame: Tespitlerin yapıldığı ham frame
+            detections: Tespit listesi
+            track_update: Aynı frame için IouTracker.update() sonucu
+
+        Returns:
+            list: Çalışan olmayan ve kararı verilmiş track'lerin tespitleri
+        """
+        if not self.enabled:
+            return detections
+
+        start = time.perf_counter()
+        with stage_timer('employee_filter'):
+            for track in track_update.ended_tracks:
+                self._decisions.pop(track.track_id, None)
+
+            counted = []
+            for index, track_id in enumerate(track_update.track_ids):
+                decision = self._decisions.get(track_id)
+                if decision is None:
+                    decision = self._decisions[track_id] = [PENDING, 0, self.tracker.confirm_hits]
+
+                if decision[0] == PENDING:
+                    track = self.tracker.tracks.get(track_id)
+                    if track is not None and track.hits >= decision[2]:
+                        self._check_track(track_id, decision, frame, detections[index])
+
+                if decision[0] == VISITOR:
+                    counted.append(detections[index])
+
+        self.stats['frames'] += 1
+        self.stats['filter_seconds'] += time.perf_counter() - start
+        return counted
+
+    def _check_track(self, track_id, decision, frame, detection):
+        """Kişi kutusunun üst kısmında yüz ara ve galeriyle eşleştir"""
+        start = time.perf_counter()
+        decision[1] += 1
+        try:
+            encodings = self._face_encodings(frame, detection_bbox(detection))
+        except Exception as e:
+            self.logger.error(f"Yüz kontrolü hatası: {e}")
+            encodings = []
+        elapsed = time.perf_counter() - start
+
+        FACE_CHECKS.inc()
+        FACE_CHECK_SECONDS.observe(elapsed)
+        self.stats['face_checks'] += 1
+        self.stats['face_check_seconds'] += elapsed
+
+        if len(encodings):
+            matches = [name for name, _ in self.gallery.match(encodings) if name is not None]
+            if matches:
+                decision[0] = EMPLOYEE
+                self.stats['employee_tracks'] += 1
+                EMPLOYEES_FILTERED.inc()
+                self.logger.info(f"👔 Çalışan tanındı: {matches[0]} (track #{track_id}, sayılmadı)")
+            else:
+                decision[0] = VISITOR
+        elif decision[1] >= FACE_MAX_ATTEMPTS:
+            decision[0] = VISITOR  # Yüz görünmüyor: ziyaretçi say
+        else:
+            track = self.tracker.tracks.get(track_id)
+            decision[2] = (track.hits if track is not None else decision[2]) + FACE_RETRY_FRAMES
+
+    @staticmethod
+    def _face_encodings(frame, bbox):
+        """Kutunun üst bölgesinde (küçültülmüş) yüz tespiti + embedding"""
+        x, y, w, h = (int(v) for v in bbox)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame.shape[1]), min(y + int(h * FACE_REGION), frame.shape[0])
+        if x1 - x0 < 20 or y1 - y0 < 20:
+            return []
+
+        region = frame[y0:y1, x0:x1]
+        if region.shape[1] > FACE_SEARCH_WIDTH:
+            scale = FACE_SEARCH_WIDTH / region.shape[1]
+            region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        rgb = np.ascontiguousarray(region[:, :, ::-1])
+
+        locations = face_recognition.face_locations(rgb, number_of_times_to_upsample=1, model='hog')
+        if not locations:
+            return []
+        return face_recognition.face_encodings(rgb, locations)
+
+    def is_employee(self, track_id):
+        """Track çalışan olarak işaretlendi mi"""
+        decision = self._decisions.get(track_id)
+        return decision is not None and decision[0] == EMPLOYEE
+
+    def reset(self):
+        """Track kararlarını temizle"""
+        self._decisions.clear()
+
+    def get_stats(self):
+        """
+        Filtre maliyet raporu.
+
+        Returns:
+            dict: Galeri boyutu, yüz kontrolü ve frame başına filtre süreleri
+        """
+        checks = self.stats['face_checks']
+        frames = self.stats['frames']
+        return {
+            'enabled': self.enabled,
+            'gallery_faces': len(self.gallery),
+            'gallery_people': len(set(self.gallery.names)),
+            'face_checks': checks,
+            'avg_face_check_ms': round(self.stats['face_check_seconds'] / checks * 1000, 2) if checks else 0.0,
+            'avg_filter_ms_per_frame': round(self.stats['filter_seconds'] / frames * 1000, 3) if frames else 0.0,
+            'employee_tracks': self.stats['employee_tracks'],
+            'pending_tracks': sum(1 for decision in self._decisions.values() if decision[0] == PENDING),
+            'active_tracks': len(self._decisions)
+        }
@@ -6,13 +6,41 @@ Mevcut verileri temizleyip daha anlamlı hale getirir
 
 import pandas as pd
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
+from occupancy_heatmap import OccupancyHeatmap
+from reports import ReportEngine
+from zones import ZoneMap, NO_ZONE_NAME, UNKNOWN_ZONE_NAME, backfill_zones
+from db_migrations import migrate
+from src.config.settings import SETTINGS
+
+# Kayıtlı kameralar: kamera indeksinde kamera başına bir arama (tüm tablo taranmaz).
+# camera_index'i boş eski kayıtlar kamera 0 sayılır.
+EXPORT_CAMERAS_QUERY = """
+    WITH RECURSIVE cameras(camera) AS (
+        SELECT MIN(camera_index) FROM visitors
+        UNION ALL
+        SELECT (SELECT MIN(camera_index) FROM visitors WHERE camera_index > camera) FROM cameras
+        WHERE camera IS NOT NULL
+    )
+    SELECT camera FROM cameras WHERE camera IS NOT NULL
+    UNION
+    SELECT 0 WHERE EXISTS (SELECT 1 FROM visitors WHERE camera_index IS NULL)
+"""
+
+# Export tüm kayıtları okur (bölge adı zones tablosundan)
+EXPORT_QUERY = """
+    SELECT v.*, CASE WHEN v.zone_id IS NULL THEN ? ELSE COALESCE(z.name, ?) END AS zone_name
+    FROM visitors v
+    LEFT JOIN zones z ON z.camera_index = COALESCE(v.camera_index, 0) AND z.zone_id = v.zone_id
+    ORDER BY v.entry_time DESC
+"""
+
 def clean_and_export_data():
     """Mevcut verileri temizle ve anlamlı hale getir"""
     
@@ -21,12 +49,16 @@ def clean_and_export_data():
     # Database bağlantısı
     db_path = "data/musteri_analiz.db"
     conn = sqlite3.connect(db_path)
+    migrate(conn)
     
-    # Mevcut verileri oku
-    df = pd.read_sql_query("""
-        SELECT * FROM visitors 
-        ORDER BY entry_time DESC
-    """, conn)
+    # Bölgesi olmayan eski kayıtları bir kez etiketle (sonraki export'larda kutular tekrar okunmaz)
+    cameras = [row[0] for row in conn.execute(EXPORT_CAMERAS_QUERY)]
+    tagged = backfill_zones({camera: ZoneMap.from_file(camera) for camera in cameras}, db_path)
+    if tagged:
+        print(f"🗺️  Bölgesi olmayan {tagged} eski kayıt etiketlendi")
+    
+    # Mevcut verileri oku (bölge adı zones tablosundan)
+    df = pd.read_sql_query(EXPORT_QUERY, conn, params=(UNKNOWN_ZONE_NAME, NO_ZONE_NAME))
     
     print(f"📊 Toplam kayıt: {len(df)}")
     
@@ -79,29 +111,21 @@ def clean_and_export_data():
                 center_x = x + w/2
                 center_y = y + h/2
                 
-                # Kamera bölgesi analizi (1280x720 için)
-                if center_x < 426:
-                    region = "Sol"
-                elif center_x < 854:
-                    region = "Merkez"
-                else:
-                    region = "Sağ"
-                
                 return {
                     'area': area,
                     'center_x': int(center_x),
                     'center_y': int(center_y),
-                    'region': region,
                     'width': w,
                     'height': h
                 }
         except:
             pass
-        return {'area': 0, 'center_x': 0, 'center_y': 0, 'region': 'Bilinmiyor', 'width': 0, 'height': 0}
+        return {'area': 0, 'center_x': 0, 'center_y': 0, 'width': 0, 'height': 0}
     
     bbox_analysis = df_clean['bounding_box'].apply(analyze_bbox)
     df_clean['detection_area'] = [ba['area'] for ba in bbox_analysis]
-    df_clean['detection_region'] = [ba['region'] for ba in bbox_analysis]
+    # Kamera bölgesi kayıt anında (normalize koordinatlarda) belirlenip zone_id olarak saklanır
+    df_clean['detection_region'] = df_clean['zone_name']
     df_clean['person_width'] = [ba['width'] for ba in bbox_analysis]
     df_clean['person_height'] = [ba['height'] for ba in bbox_analysis]
     
@@ -148,6 +172,14 @@ def clean_and_export_data():
     for region, count in region_analysis.items():
         print(f"  {region}: {count} tespit")
     
+    # Isı haritası: giriş anındaki kutu yerine mağazada geçirilen süre (kişi-saniye)
+    camera_index = getattr(SETTINGS, 'CAMERA_INDEX', 0)
+    heatmap_grid = OccupancyHeatmap(camera_id=camera_index).day_grid(datetime.now().date())
+    if heatmap_grid is not None:
+        print("\n🔥 ISI HARİTASI (bugün, geçirilen süre):")
+        for region, share in ZoneMap.from_file(camera_index).grid_shares(heatmap_grid).items():
+            print(f"  {region}: {share:.1%}")
+    
     print("\n⭐ CONFİDENCE KATEGORİLERİ:")
     conf_analysis = df_clean.groupby('confidence_category').size()
     for category, count in conf_analysis.items():
@@ -170,70 +202,19 @@ def clean_and_export_data():
     return export_file
 
 def generate_daily_report():
-    """Günlük rapor oluştur"""
+    """Günlük rapor oluştur (rollup tablolarından, veri değişmediyse önbellekten)"""
     
     print("\n📋 GÜNLÜK RAPOR OLUŞTURULUYOR...")
     
-    db_path = "data/musteri_analiz.db"
-    conn = sqlite3.connect(db_path)
+    result = ReportEngine().generate('daily')
+    report_file = result['files']['txt']
     
-    today = datetime.now().date()
-    yesterday = today - timedelta(days=1)
-    
-    # Bugün ve dün karşılaştırması
-    today_query = f"""
-        SELECT COUNT(*) as count, AVG(confidence_avg) as avg_conf
-        FROM visitors 
-        WHERE DATE(entry_time) = '{today}' AND confidence_avg > 0.0
-    """
-    
-    yesterday_query = f"""
-        SELECT COUNT(*) as count, AVG(confidence_avg) as avg_conf
-        FROM visitors 
-        WHERE DATE(entry_time) = '{yesterday}' AND confidence_avg > 0.0
-    """
-    
-    today_stats = pd.read_sql_query(today_query, conn).iloc[0]
-    yesterday_stats = pd.read_sql_query(yesterday_query, conn).iloc[0]
-    
-    # Saatlik dağılım
-    hourly_query = f"""
-        SELECT strftime('%H', entry_time) as hour, COUNT(*) as count
-        FROM visitors 
-        WHERE DATE(entry_time) = '{today}' AND confidence_avg > 0.0
-        GROUP BY hour
-        ORDER BY hour
-    """
-    
-    hourly_data = pd.read_sql_query(hourly_query, conn)
-    
-    # Rapor dosyası
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    report_file = f"data/csv_backups/daily_report_{timestamp}.txt"
+    if result['changed']:
+        print(f"✅ Günlük rapor kaydedildi: {report_file}")
+    else:
+        print(f"✅ Günlük rapor güncel (veri değişmedi): {report_file}")
+    print(f"🌐 HTML: {result['files']['html']}")
     
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(f"🏪 GÜNLÜK ZİYARETÇİ RAPORU\n")
-        f.write(f"📅 Tarih: {today}\n")
-        f.write(f"🕐 Rapor Zamanı: {datetime.now().strftime('%H:%M:%S')}\n")
-        f.write("="*50 + "\n\n")
-        
-        f.write("📊 GENEL İSTATİSTİKLER:\n")
-        f.write(f"  Bugün Toplam Ziyaretçi: {today_stats['count']}\n")
-        f.write(f"  Dün Toplam Ziyaretçi: {yesterday_stats['count']}\n")
-        
-        if yesterday_stats['count'] > 0:
-            change = ((today_stats['count'] - yesterday_stats['count']) / yesterday_stats['count']) * 100
-            f.write(f"  Değişim: {change:+.1f}%\n")
-        
-        f.write(f"  Bugün Ortalama Confidence: {today_stats['avg_conf']:.1%}\n\n")
-        
-        f.write("🕐 SAATLİK DAĞILIM:\n")
-        for _, row in hourly_data.iterrows():
-            f.write(f"  {row['hour']}:00 - {row['count']} ziyaretçi\n")
-    
-    print(f"✅ Günlük rapor kaydedildi: {report_file}")
-    
-    conn.close()
     return report_file
 
 if __name__ == "__main__":
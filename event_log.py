@@ -0,0 +1,631 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Çökmeye Dayanıklı Olay Günlüğü
+Tespit, track ve ziyaretçi olayları memory-mapped, sadece sona eklenen
+(append-only) segment dosyalarına yazılır. Günün sayımları ve aktif
+track'ler periyodik olarak küçük bir snapshot'a alınır.
+
+Süreç beklenmedik şekilde ölürse yeniden başlarken son snapshot yüklenip
+sonrasındaki kayıtlar oynatılır:
+- bugünün sayımları visitors tablosu taranmadan milisaniyeler içinde gelir,
+- IouTracker'ın aktif track'leri ve id sayacı kaldığı yerden devam eder,
+- veritabanına yazılamadan kalan son ziyaretçiler tamamlanır (aynı süreçte
+  durdurup yeniden başlatmada atlanır: satırlar yazılmış ya da db_manager
+  tamponunda bekliyordur).
+
+Kayıtlar mmap'e yazıldığı anda işletim sisteminin sayfa önbelleğindedir;
+süreç öldürülse (SIGKILL) bile kaybolmaz. Snapshot için durum kilit altında
+kopyalanır; segmentin diske flush edilmesi, snapshot dosyasının yazılması
+(fsync) ve öncesindeki segmentlerin silinmesi arka plan thread'inde yapılır,
+pipeline thread'i disk I/O beklemez. Her kayıt CRC32
+taşır; yarım kalmış son kayıt okumada atlanır, yazma oradan devam eder.
+
+Kayıt formatı (little-endian):
+    başlık:    uint32 payload uzunluğu, uint32 crc32, uint8 tür, float64 zaman
+    FRAME:     uint16 n + n x (uint16 x, y, w, h, uint8 güven %, uint32 track id)
+    ENDED:     uint16 n + n x uint32 track id
+    VISITORS:  uint16 sayı, float32 ortalama güven, uint16 x, y, w, h
+    RESET:     boş (takip sıfırlandı)
+"""
+
+import collections
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import visitor_db
+from detection_channel import BOX
+from detection_format import detection_bbox, detection_confidence
+from metrics import metrics_registry
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+EVENT_LOG_DIR = getattr(SETTINGS, 'EVENT_LOG_DIR', 'data/event_log')
+EVENT_LOG_SEGMENT_SIZE = getattr(SETTINGS, 'EVENT_LOG_SEGMENT_SIZE', 8 * 1024 * 1024)
+EVENT_LOG_SNAPSHOT_SECONDS = getattr(SETTINGS, 'EVENT_LOG_SNAPSHOT_SECONDS', 30.0)
+RECONCILE_SECONDS = 120.0       # Daha eski ziyaretçiler veritabanına yazılmış kabul edilir
+RECONCILE_MARGIN_SECONDS = 2.0  # visitors.entry_time frame zamanıdır; saniye yuvarlaması için pay
+TRACK_RESTORE_SECONDS = 10.0    # Daha uzun kesintiden sonra track'ler geri yüklenmez (id'ler yine devam eder)
+SNAPSHOT_FORMAT = 1
+
+RECORD = struct.Struct('<IIBd')
+RECORD_FIELDS = struct.Struct('<IBd')  # CRC'ye giren başlık alanları
+COUNT = struct.Struct('<H')
+TRACK_ID = struct.Struct('<I')
+VISITORS = struct.Struct('<Hf4H')
+UINT16_MAX = 0xFFFF
+
+EVENT_FRAME = 1
+EVENT_ENDED = 2
+EVENT_VISITORS = 3
+EVENT_RESET = 4
+EVENT_TYPES = (EVENT_FRAME, EVENT_ENDED, EVENT_VISITORS, EVENT_RESET)
+
+# Bugünün saatlik sayımları (giriş zamanı aralığı)
+SEED_HOURLY_QUERY = """
+    SELECT CAST(strftime('%H', entry_time) AS INTEGER), COUNT(*)
+    FROM visitors
+    WHERE entry_time >= ? AND entry_time < ? AND confidence_avg > 0.0
+    GROUP BY 1
+"""
+RECONCILE_COUNT_QUERY = """
+    SELECT COUNT(*) FROM visitors
+    WHERE entry_time >= ? AND entry_time <= ? AND COALESCE(camera_index, 0) = ?
+"""
+
+EVENT_LOG_RECORDS = metrics_registry.counter('event_log_records_total', 'Olay günlüğüne yazılan kayıtlar')
+EVENT_LOG_SNAPSHOTS = metrics_registry.counter('event_log_snapshots_total', 'Yazılan durum snapshot\'ları')
+
+
+def _clamp16(value):
+    return min(max(int(value), 0), UINT16_MAX)
+
+
+def encode_frame(detections, track_ids):
+    """Frame'in kutularını ve track id'lerini paketle"""
+    parts = [COUNT.pack(len(detections))]
+    for detection, track_id in zip(detections, track_ids):
+        x, y, w, h = detection_bbox(detection)
+        confidence = min(max(int(round(detection_confidence(detection) * 100)), 0), 100)
+        parts.append(BOX.pack(_clamp16(x), _clamp16(y), _clamp16(w), _clamp16(h), confidence,
+                              (track_id or 0) & 0xFFFFFFFF))
+    return b''.join(parts)
+
+
+def decode_frame(payload):
+    """
+    Returns:
+        list: [(track_id, [x, y, w, h], güven), ...] (track id'si olmayanlar hariç)
+    """
+    count, = COUNT.unpack_from(payload, 0)
+    boxes = []
+    for offset in range(COUNT.size, COUNT.size + count * BOX.size, BOX.size):
+        x, y, w, h, confidence, track_id = BOX.unpack_from(payload, offset)
+        if track_id:
+            boxes.append((track_id, [x, y, w, h], confidence / 100.0))
+    return boxes
+
+
+def encode_track_ids(track_ids):
+    return COUNT.pack(len(track_ids)) + b''.join(TRACK_ID.pack(t & 0xFFFFFFFF) for t in track_ids)
+
+
+def decode_track_ids(payload):
+    count, = COUNT.unpack_from(payload, 0)
+    return [TRACK_ID.unpack_from(payload, COUNT.size + i * TRACK_ID.size)[0] for i in range(count)]
+
+
+def encode_visitors(count, detections):
+    """Yeni ziyaretçi sayısı, sayılan tespitlerin ortalama güveni ve ilk kutusu"""
+    confidence = (sum(detection_confidence(d) for d in detections) / len(detections)) if detections else 0.0
+    bbox = detection_bbox(detections[0]) if detections else (0, 0, 0, 0)
+    return VISITORS.pack(min(count, UINT16_MAX), confidence, *(_clamp16(v) for v in bbox))
+
+
+def decode_visitors(payload):
+    count, confidence, x, y, w, h = VISITORS.unpack(payload)
+    return count, round(confidence, 4), [x, y, w, h]
+
+
+def iter_records(buffer, offset=0):
+    """
+    Buffer'daki geçerli kayıtlar; ilk boş, bozuk veya yarım kayıtta durur.
+
+    Yields:
+        tuple: (tür, zaman, payload, sonraki kaydın offset'i)
+    """
+    limit = len(buffer)
+    while offset + RECORD.size <= limit:
+        length, crc, kind, timestamp = RECORD.unpack_from(buffer, offset)
+        end = offset + RECORD.size + length
+        if kind not in EVENT_TYPES or end > limit:
+            return
+        payload = bytes(buffer[offset + RECORD.size:end])
+        if zlib.crc32(payload, zlib.crc32(RECORD_FIELDS.pack(length, kind, timestamp))) != crc:
+            return
+        yield kind, timestamp, payload, end
+        offset = end
+
+
+class DayState:
+    """Olaylardan yeniden kurulabilen durum: günün sayımları, aktif track'ler, son ziyaretçiler"""
+
+    def __init__(self):
+        self.date = None
+        self.total = 0
+        self.hourly = [0] * 24
+        self.tracks = {}            # track id -> [x, y, w, h, güven, ilk görülme, son görülme, hits, missed]
+        self.last_track_id = 0
+        self.last_event = 0.0
+        self.recent_visitors = collections.deque()  # (zaman, sayı, güven, bbox)
+
+    def apply(self, kind, timestamp, payload):
+        """Tek kaydı duruma uygula (canlı yazımda ve oynatmada aynı yol)"""
+        self.last_event = max(self.last_event, timestamp)
+        if kind == EVENT_FRAME:
+            seen = set()
+            for track_id, bbox, confidence in decode_frame(payload):
+                seen.add(track_id)
+                track = self.tracks.get(track_id)
+                if track is None:
+                    self.tracks[track_id] = bbox + [confidence, timestamp, timestamp, 1, 0]
+                    self.last_track_id = max(self.last_track_id, track_id)
+                else:
+                    track[0:5] = bbox + [confidence]
+                    track[6] = timestamp
+                    track[7] += 1
+                    track[8] = 0
+            for track_id, track in self.tracks.items():
+                if track_id not in seen:
+                    track[8] += 1
+        elif kind == EVENT_ENDED:
+            for track_id in decode_track_ids(payload):
+                self.tracks.pop(track_id, None)
+        elif kind == EVENT_VISITORS:
+            self._add_visitors(timestamp, *decode_visitors(payload))
+        elif kind == EVENT_RESET:
+            self.tracks.clear()
+
+    def _add_visitors(self, timestamp, count, confidence, bbox):
+        moment = datetime.fromtimestamp(timestamp)
+        date = moment.strftime('%Y-%m-%d')
+        if self.date is None or date > self.date:
+            # Yeni gün: sayımlar sıfırdan başlar
+            self.date = date
+            self.total = 0
+            self.hourly = [0] * 24
+        elif date < self.date:
+            return
+        self.total += count
+        self.hourly[moment.hour] += count
+
+        self.recent_visitors.append((timestamp, count, confidence, bbox))
+        while self.recent_visitors[0][0] < timestamp - RECONCILE_SECONDS:
+            self.recent_visitors.popleft()
+
+    def total_today(self, now=None):
+        """Bugünkü ziyaretçi sayısı (gün değiştiyse 0)"""
+        today = datetime.fromtimestamp(now if now is not None else time.time()).strftime('%Y-%m-%d')
+        return self.total if self.date == today else 0
+
+    def to_dict(self):
+        return {
+            'date': self.date,
+            'total': self.total,
+            'hourly': list(self.hourly),
+            'tracks': {str(track_id): list(track) for track_id, track in self.tracks.items()},
+            'last_track_id': self.last_track_id,
+            'last_event': self.last_event,
+            'recent_visitors': list(self.recent_visitors)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.date = data['date']
+        state.total = data['total']
+        state.hourly = list(data['hourly'])
+        state.tracks = {int(track_id): track for track_id, track in data['tracks'].items()}
+        state.last_track_id = data['last_track_id']
+        state.last_event = data['last_event']
+        state.recent_visitors = collections.deque(tuple(v) for v in data['recent_visitors'])
+        return state
+
+
+class EventLog:
+    """Memory-mapped olay günlüğü, snapshot ve çökme sonrası kurtarma"""
+
+    def __init__(self, directory=EVENT_LOG_DIR, segment_size=EVENT_LOG_SEGMENT_SIZE,
+                 snapshot_interval=EVENT_LOG_SNAPSHOT_SECONDS):
+        self.directory = Path(directory)
+        self.segment_size = segment_size
+        self.snapshot_interval = snapshot_interval
+        self.logger = get_logger("event_log")
+
+        self.state = DayState()
+        self.recovery = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._segment = 0
+        self._offset = 0
+        self._last_snapshot = 0.0
+        self._records = 0
+
+        # Arka plan snapshot yazıcısı: en son istenen snapshot yazılır
+        self._pending_snapshot = None
+        self._snapshot_ready = threading.Event()
+        self._snapshot_thread = None
+        self._write_lock = threading.Lock()
+        self._written_position = (0, 0)
+        self._closed_cleanly = False    # Bu süreçte açılıp close() ile kapatıldı mı
+
+    @property
+    def _snapshot_path(self):
+        return self.directory / 'snapshot.json'
+
+    def _segment_path(self, index):
+        return self.directory / f'segment_{index:06d}.log'
+
+    def _segments(self):
+        return sorted(int(path.stem.split('_')[1]) for path in self.directory.glob('segment_*.log'))
+
+    def open(self, seed_db_path=visitor_db.DB_PATH):
+        """
+        Son snapshot'ı yükle, sonrasındaki kayıtları oynat ve yazmaya hazırlan.
+
+        Args:
+            seed_db_path: Günlük hiç yoksa bugünün sayımlarının bir kez okunacağı veritabanı
+
+        Returns:
+            DayState: Kurtarılan durum
+        """
+        with self._lock:
+            self._close_map()
+            self._closed_cleanly = False
+            started = time.perf_counter()
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            snapshot = self._read_snapshot()
+            segments = self._segments()
+            if snapshot is not None:
+                self.state = DayState.from_dict(snapshot['state'])
+                segment, offset = snapshot['segment'], snapshot['offset']
+                if segment not in segments:
+                    segment, offset = max(segments + [segment]) + 1, 0
+            else:
+                self.state = DayState()
+                segment, offset = (segments[0] if segments else 1), 0
+
+            replayed = 0
+            for index in segments:
+                if index < segment:
+                    continue
+                start = offset if index == segment else 0
+                with open(self._segment_path(index), 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    end = start
+                    for kind, timestamp, payload, end in iter_records(buffer, start):
+                        self.state.apply(kind, timestamp, payload)
+                        replayed += 1
+                segment, offset = index, end
+
+            self._map_segment(segment, offset)
+            self._last_snapshot = self.state.last_event
+            self._written_position = (segment, offset)
+
+            seeded = snapshot is None and not segments
+            if seeded:
+                # İlk çalıştırma: günlükten önce yazılmış ziyaretçiler bir kez sayılır
+                self._seed_from_database(seed_db_path)
+                self._write_snapshot(*self._capture_snapshot(self.state.last_event))
+            self._start_snapshot_thread()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.recovery = {
+                'snapshot': snapshot is not None,
+                'seeded': seeded,
+                'replayed_records': replayed,
+                'elapsed_ms': round(elapsed_ms, 2),
+                'total_today': self.state.total_today(),
+                'active_tracks': len(self.state.tracks)
+            }
+            self.logger.info(f"♻️ Olay günlüğü açıldı: {replayed} kayıt oynatıldı, {elapsed_ms:.1f} ms, "
+                             f"bugün {self.state.total_today()} ziyaretçi, {len(self.state.tracks)} aktif track")
+            return self.state
+
+    def recover(self, tracker=None, db_path=visitor_db.DB_PATH, camera_index=0):
+        """
+        Günlüğü aç, track'leri geri yükle ve eksik ziyaretçi satırlarını tamamla.
+        Günlük bu süreçte düzgün kapatıldıysa (sistem durdurulup yeniden
+        başlatıldı) satırlar kaybolmamıştır, tamamlama yapılmaz.
+
+        Args:
+            tracker: Track'leri geri yüklenecek IouTracker (opsiyonel)
+            db_path: visitors tablosunun veritabanı
+            camera_index: Tamamlanan satırların kamera indeksi
+
+        Returns:
+            DayState: Kurtarılan durum
+        """
+        warm = self._closed_cleanly
+        state = self.open(db_path)
+        if tracker is not None:
+            restore_tracker(tracker, state)
+        self.recovery['warm_restart'] = warm
+        self.recovery['reconciled_visitors'] = 0 if warm else reconcile_visitors(state, db_path, camera_index)
+        return state
+
+    def _read_snapshot(self):
+        try:
+            with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            return snapshot if snapshot.get('format') == SNAPSHOT_FORMAT else None
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            self.logger.warning(f"Olay günlüğü snapshot'ı okunamadı, baştan oynatılacak: {e}")
+            return None
+
+    def _seed_from_database(self, db_path):
+        """Bugünün saatlik sayımlarını visitors tablosundan al (aralık sorgusu)"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            conn = visitor_db.connect(db_path)
+            try:
+                rows = conn.execute(SEED_HOURLY_QUERY, (
+                    today.strftime('%Y-%m-%d %H:%M:%S'),
+                    (today + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Bugünün sayımları okunamadı, sıfırdan başlanıyor: {e}")
+            return
+
+        self.state.date = today.strftime('%Y-%m-%d')
+        for hour, count in rows:
+            self.state.hourly[hour] += count
+            self.state.total += count
+
+    def _map_segment(self, index, offset):
+        """Segment dosyasını (gerekirse oluşturup) eşle ve offset'ten yazmaya hazırlan"""
+        self._close_map()
+        path = self._segment_path(index)
+        with open(path, 'ab') as f:
+            if f.tell() < self.segment_size:
+                f.truncate(self.segment_size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._segment = index
+        self._offset = offset
+
+        # Yarım kalmış kaydın artıkları yeni kayıtlardan sonra geçerli görünmesin
+        if any(self._map[offset:offset + RECORD.size]):
+            self._map[offset:] = bytes(len(self._map) - offset)
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def _append(self, kind, timestamp, payload):
+        """Kaydı yaz ve canlı duruma uygula (kilit tutulurken)"""
+        size = RECORD.size + len(payload)
+        if self._offset + size > len(self._map):
+            self._map_segment(self._segment + 1, 0)
+        crc = zlib.crc32(payload, zlib.crc32(RECORD_FIELDS.pack(len(payload), kind, timestamp)))
+        self._map[self._offset:self._offset + size] = RECORD.pack(len(payload), crc, kind, timestamp) + payload
+        self._offset += size
+        self._records += 1
+        EVENT_LOG_RECORDS.inc()
+        self.state.apply(kind, timestamp, payload)
+
+    def record_frame(self, detections, track_update, timestamp=None):
+        """
+        Frame'in track id'li kutularını ve kapanan track'leri yaz.
+
+        Args:
+            detections: Tespit listesi
+            track_update: IouTracker.update() sonucu
+            timestamp: Frame zamanı (varsayılan: şimdi)
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if self._map is None:
+                return
+            if detections or self.state.tracks:
+                self._append(EVENT_FRAME, timestamp, encode_frame(detections or [], track_update.track_ids))
+            if track_update.ended_tracks:
+                self._append(EVENT_ENDED, timestamp,
+                             encode_track_ids([track.track_id for track in track_update.ended_tracks]))
+            if timestamp - self._last_snapshot >= self.snapshot_interval:
+                self._pending_snapshot = self._capture_snapshot(timestamp)
+                self._snapshot_ready.set()
+
+    def record_visitors(self, count, detections, timestamp=None):
+        """
+        visitor_tracker'ın saydığı yeni ziyaretçileri yaz.
+
+        Args:
+            count: Yeni ziyaretçi sayısı
+            detections: Sayılan tespitler
+            timestamp: Frame zamanı (varsayılan: şimdi)
+        """
+        if count <= 0:
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if self._map is not None:
+                self._append(EVENT_VISITORS, timestamp, encode_visitors(count, detections))
+
+    def snapshot(self):
+        """Durumu hemen snapshot'a al (çağıran thread'de yazılır)"""
+        with self._lock:
+            if self._map is None:
+                return
+            snapshot = self._capture_snapshot(max(time.time(), self.state.last_event))
+        self._write_snapshot(*snapshot)
+
+    def _capture_snapshot(self, timestamp):
+        """
+        Snapshot içeriğini kopyala (kilit tutulurken; disk I/O yok).
+
+        Returns:
+            tuple: (snapshot sözlüğü, flush edilecek segment map'i)
+        """
+        self._last_snapshot = timestamp
+        return ({'format': SNAPSHOT_FORMAT, 'segment': self._segment, 'offset': self._offset,
+                 'state': self.state.to_dict()}, self._map)
+
+    def _write_snapshot(self, snapshot, segment_map):
+        """Segmenti diske yaz, durumu kaydet ve kapsanan eski segmentleri sil (kilit dışında)"""
+        with self._write_lock:
+            position = (snapshot['segment'], snapshot['offset'])
+            if position < self._written_position:
+                return  # Daha yeni bir snapshot zaten yazıldı
+            try:
+                try:
+                    segment_map.flush()
+                except ValueError:
+                    pass  # Segment bu arada kapandı (kapanırken flush edildi)
+                tmp_path = self._snapshot_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._snapshot_path)
+                self._written_position = position
+                EVENT_LOG_SNAPSHOTS.inc()
+
+                for index in self._segments():
+                    if index < snapshot['segment']:
+                        self._segment_path(index).unlink(missing_ok=True)
+            except OSError as e:
+                self.logger.error(f"Olay günlüğü snapshot hatası: {e}")
+
+    def _start_snapshot_thread(self):
+        if self._snapshot_thread is not None:
+            return
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, name='event-log-snapshot', daemon=True)
+        self._snapshot_thread.start()
+
+    def _stop_snapshot_thread(self):
+        thread, self._snapshot_thread = self._snapshot_thread, None
+        if thread is None:
+            return
+        self._snapshot_ready.set()
+        thread.join(timeout=10)
+
+    def _snapshot_loop(self):
+        """İstenen snapshot'ları yaz; durdurulunca bekleyeni yazıp çık"""
+        thread = threading.current_thread()
+        while True:
+            self._snapshot_ready.wait()
+            with self._lock:
+                pending, self._pending_snapshot = self._pending_snapshot, None
+                self._snapshot_ready.clear()
+            if pending is not None:
+                self._write_snapshot(*pending)
+            if self._snapshot_thread is not thread:
+                break
+
+    def close(self):
+        """Takibin sıfırlandığını yaz, son snapshot'ı al ve dosyaları kapat"""
+        with self._lock:
+            if self._map is None:
+                return
+            timestamp = max(time.time(), self.state.last_event)
+            self._append(EVENT_RESET, timestamp, b'')
+            snapshot = self._capture_snapshot(timestamp)
+        self._stop_snapshot_thread()
+        self._write_snapshot(*snapshot)
+        with self._lock:
+            self._close_map()
+            self._closed_cleanly = True
+
+    def get_stats(self):
+        """
+        Günlük durumu ve son kurtarmanın özeti.
+
+        Returns:
+            dict
+        """
+        return {
+            'open': self._map is not None,
+            'segment': self._segment,
+            'offset': self._offset,
+            'records_written': self._records,
+            'snapshot_age_seconds': round(self.state.last_event - self._last_snapshot, 1) if self._last_snapshot else None,
+            'total_today': self.state.total_today(),
+            'active_tracks': len(self.state.tracks),
+            'recovery': self.recovery
+        }
+
+
+def restore_tracker(tracker, state, now=None):
+    """
+    Kurtarılan track'leri IouTracker'a yükle. Kesinti uzunsa sadece id sayacı
+    devam eder (aynı id'ler yeni kişilere verilmez).
+    """
+    now = now if now is not None else time.time()
+    tracks = []
+    if now - state.last_event <= TRACK_RESTORE_SECONDS:
+        tracks = [(track_id, track[0:4], track[4], track[5], track[6], track[7])
+                  for track_id, track in state.tracks.items()]
+    tracker.restore(tracks, state.last_track_id + 1)
+
+
+def reconcile_visitors(state, db_path=visitor_db.DB_PATH, camera_index=0):
+    """
+    Günlükte olup veritabanına yazılamadan kalan son ziyaretçileri ekle.
+
+    Son RECONCILE_SECONDS içinde sayılan ziyaretçiler visitors tablosundaki
+    aynı aralığın satır sayısıyla karşılaştırılır; eksik kalan en yeni
+    ziyaretçiler eklenir. Tekrar çağrılması güvenlidir.
+
+    Returns:
+        int: Eklenen satır sayısı
+    """
+    recent = list(state.recent_visitors)
+    if not recent:
+        return 0
+    logged = sum(count for _, count, _, _ in recent)
+
+    logger = get_logger("event_log")
+    try:
+        conn = visitor_db.connect(db_path)
+        try:
+            stored = conn.execute(RECONCILE_COUNT_QUERY,
+                                  (visitor_db.format_time(recent[0][0]),
+                                   visitor_db.format_time(recent[-1][0] + RECONCILE_MARGIN_SECONDS),
+                                   camera_index)).fetchone()[0]
+            missing = logged - stored
+            if missing <= 0:
+                return 0
+
+            rows = []
+            for timestamp, count, confidence, bbox in reversed(recent):
+                rows.extend([(visitor_db.format_time(timestamp), confidence, json.dumps(bbox), camera_index, 1)]
+                            * min(count, missing - len(rows)))
+                if len(rows) >= missing:
+                    break
+            with conn:
+                conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                                 "detection_count) VALUES (?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Ziyaretçi tamamlama hatası: {e}")
+        return 0
+
+    logger.info(f"🩹 Veritabanına yazılamamış {len(rows)} ziyaretçi olay günlüğünden eklendi")
+    return len(rows)
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+OpenCV Müşteri Analiz Sistemi - Headless Servis Modu
+GUI olmadan kamera, tespit, takip ve kayıt zincirini çalıştırır.
+
+Kullanım:
+    python headless_service.py [--health-port 8765]
+    python main.py --headless
+
+Sağlık durumu ve metrikler:
+    curl http://127.0.0.1:8765/health
+    curl http://127.0.0.1:8765/metrics
+    curl http://127.0.0.1:8765/api/debug/memory
+"""
+
+import argparse
+import json
+import signal
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.core.camera import CameraManager
+from src.core.detector import HumanDetector
+from src.core.visitor_tracker import visitor_tracker
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+from metrics import metrics_registry, stage_timer, CONTENT_TYPE as METRICS_CONTENT_TYPE, FRAMES_PROCESSED
+from sampling_profiler import schedule_profile, instrument_frame_callbacks
+from iou_tracker import IouTracker
+from temporal_filter import TemporalFilter
+from employee_gallery import EmployeeFilter
+from demographics import DemographicsStage
+from occupancy_heatmap import OccupancyHeatmap
+from alert_rules import AlertEngine
+from zones import ZoneMap, ZoneTagger
+from event_log import EventLog
+from store_sync import StoreSync
+from pipeline import Pipeline, FunctionStage, DetectorStage, RoiFilter, wait_for_frame
+from load_shedder import LoadShedder
+from memory_monitor import MemoryMonitor
+from db_migrations import migrate_database
+import visitor_db
+
+# Supervisor ayarları (settings.py içinde tanımlıysa oradan okunur)
+HEALTH_HOST = getattr(SETTINGS, 'HEALTH_HOST', '127.0.0.1')
+HEALTH_PORT = getattr(SETTINGS, 'HEALTH_PORT', 8765)
+RESTART_BACKOFF_INITIAL = getattr(SETTINGS, 'RESTART_BACKOFF_INITIAL', 1.0)
+RESTART_BACKOFF_MAX = getattr(SETTINGS, 'RESTART_BACKOFF_MAX', 60.0)
+FRAME_TIMEOUT_SECONDS = getattr(SETTINGS, 'FRAME_TIMEOUT_SECONDS', 10.0)
+MAX_CONSECUTIVE_ERRORS = getattr(SETTINGS, 'MAX_CONSECUTIVE_ERRORS', 50)
+WATCHDOG_INTERVAL = 1.0
+STABLE_RUN_SECONDS = 60.0
+
+# Görüntü yayını ve yeniden tanıma olmadan işleme hattı (data/pipeline.json ile ayarlanır)
+PIPELINE_DEFINITION = [
+    {'stage': 'motion_gate', 'enabled': False},
+    {'stage': 'detector'},
+    {'stage': 'roi', 'enabled': False},
+    {'stage': 'tracker', 'queue': 8, 'policy': 'block'},
+    {'stage': 'employee_filter', 'mode': 'inline'},
+    {'stage': 'demographics', 'mode': 'inline'},
+    {'stage': 'zones', 'mode': 'inline'},
+    {'stage': 'heatmap', 'mode': 'inline'},
+    {'stage': 'alerts', 'mode': 'inline'},
+    {'stage': 'visitors', 'queue': 16, 'policy': 'block'},
+]
+
+
+class HealthRequestHandler(BaseHTTPRequestHandler):
+    """Sağlık durumunu ve metrikleri döndüren minimal HTTP handler"""
+
+    service = None
+
+    def do_GET(self):
+        """GET /health, /metrics ve /api/debug/memory isteklerini yanıtla"""
+        path = self.path.split('?')[0]
+
+        if path in ('/', '/health'):
+            health = self.service.get_health()
+            self._send(200 if health['healthy'] else 503, 'application/json',
+                       json.dumps(health).encode('utf-8'))
+        elif path == '/metrics':
+            self._send(200, METRICS_CONTENT_TYPE, metrics_registry.render().encode('utf-8'))
+        elif path == '/api/debug/memory':
+            self._send(200, 'application/json',
+                       json.dumps(self.service.memory_monitor.snapshot()).encode('utf-8'))
+        else:
+            self.send_error(404)
+
+    def _send(self, status, content_type, body):
+        """Yanıtı gönder"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """HTTP erişim loglarını sustur (her health check loglanmasın)"""
+        pass
+
+
+class HeadlessService:
+    """GUI'siz, kendini yeniden başlatan müşteri analiz servisi"""
+
+    def __init__(self, health_host=HEALTH_HOST, health_port=HEALTH_PORT):
+        self.health_host = health_host
+        self.health_port = health_port
+
+        # Sistem bileşenleri (her yeniden başlatmada yeniden oluşturulur)
+        self.camera_manager = None
+        self.human_detector = None
+        self.pipeline = None
+        self.load_shedder = None
+        self.load_shedding = getattr(SETTINGS, 'LOAD_SHEDDING_ENABLED', True)
+
+        # Supervisor durumu
+        self.state = 'starting'
+        self.restart_count = 0
+        self.last_error = None
+        self.started_at = time.time()
+        self._stop_event = threading.Event()
+        self._health_server = None
+
+        # Pipeline durumu (kamera thread'i yazar, watchdog okur)
+        self.last_frame_time = 0.0
+        self.frames_processed = 0
+        self.consecutive_errors = 0
+        self.current_detections = 0
+        self.total_today = 0
+
+        # Personel filtresi için frame'ler arası track id
+        self.track_assigner = IouTracker()
+        self.temporal_filter = TemporalFilter(self.track_assigner)
+        self.employee_filter = EmployeeFilter(self.track_assigner)
+        self.visitor_rows = visitor_db.VisitorRows()
+        self.demographics = DemographicsStage(self.track_assigner, exclude=self.employee_filter.is_employee,
+                                              rows=self.visitor_rows)
+        self.zone_map = ZoneMap.from_file(getattr(SETTINGS, 'CAMERA_INDEX', 0))
+        self.zone_tagger = ZoneTagger(self.zone_map, exclude=self.employee_filter.is_employee, rows=self.visitor_rows)
+        self.heatmap = OccupancyHeatmap(camera_id=getattr(SETTINGS, 'CAMERA_INDEX', 0), zone_map=self.zone_map)
+        self.store_sync = StoreSync()
+        self.alert_engine = AlertEngine.from_file(camera_id=getattr(SETTINGS, 'CAMERA_INDEX', 0),
+                                                  on_event=lambda event: self.store_sync.enqueue_event(
+                                                      'alert', event, event.get('timestamp')),
+                                                  zone_map=self.zone_map)
+        self.event_log = EventLog() if getattr(SETTINGS, 'EVENT_LOG_ENABLED', True) else None
+
+        # Bellek raporu (MEMORY_TRACE_FRAMES ayarlıysa tracemalloc açık başlar)
+        self.memory_monitor = MemoryMonitor()
+        self.memory_monitor.register(
+            'pipeline', lambda: self.pipeline.get_memory_info() if self.pipeline is not None else None)
+        self.memory_monitor.register('tracks', lambda: {
+            'tracker': len(self.track_assigner.tracks),
+            'temporal_filter': self.temporal_filter.get_stats()['active_tracks'],
+            'employee_filter': self.employee_filter.get_stats()['active_tracks']
+        })
+        if getattr(SETTINGS, 'MEMORY_TRACE_FRAMES', 0):
+            self.memory_monitor.start_tracing(SETTINGS.MEMORY_TRACE_FRAMES)
+
+        self.logger = get_logger("headless")
+
+    def _start_components(self):
+        """
+        Kamera ve detector'ı başlat.
+
+        Returns:
+            bool: Bileşenler başarıyla başlatılırsa True
+        """
+        try:
+            self.camera_manager = instrument_frame_callbacks(CameraManager())
+            self.human_detector = HumanDetector()
+            self.pipeline = self._build_pipeline()
+            detector = self.pipeline.get_stage('detector')
+            pooled = detector is not None and detector.mode == 'process'
+
+            if not self.camera_manager.initialize_camera():
+                self.last_error = 'Kamera başlatılamadı'
+                return False
+
+            if not pooled and not self.human_detector.initialize():
+                self.last_error = 'AI model yüklenemedi'
+                return False
+
+            self.consecutive_errors = 0
+            self.last_frame_time = time.time()
+            self.track_assigner.reset()
+            self.temporal_filter.reset()
+            if self.event_log is not None:
+                self.event_log.recover(self.track_assigner, camera_index=getattr(SETTINGS, 'CAMERA_INDEX', 0))
+                self.total_today = self.event_log.state.total_today()
+            self.employee_filter.reset()
+            self.employee_filter.load()
+            self.heatmap.load()
+            self.visitor_rows.start()
+            self.zone_tagger.start()
+            if self.demographics.load():
+                self.demographics.start()
+
+            self.camera_manager.start_capture()
+            if not self.pipeline.start(wait_for_frame(self.camera_manager) if pooled else None):
+                self.last_error = 'AI model yüklenemedi'
+                return False
+            self.camera_manager.add_frame_callback(self._process_frame)
+            if self.load_shedding:
+                # Video akışı yok: demografi, sonra tespit hızı azaltılır
+                self.load_shedder = LoadShedder(self.pipeline)
+                self.load_shedder.start()
+
+            self.state = 'running'
+            self.logger.info("✅ Kamera ve detector çalışıyor")
+            return True
+
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Bileşen başlatma hatası: {e}")
+            return False
+
+    def _stop_components(self):
+        """Kamera ve detector'ı güvenli şekilde durdur (zaten durdurulduysa bir şey yapmaz)"""
+        if self.pipeline is None:
+            return
+        try:
+            if self.camera_manager is not None:
+                self.camera_manager.stop_capture()
+        except Exception as e:
+            self.logger.error(f"Kamera durdurma hatası: {e}")
+
+        if self.load_shedder is not None:
+            self.load_shedder.stop()
+            self.load_shedder = None
+
+        try:
+            self.pipeline.stop()
+        except Exception as e:
+            self.logger.error(f"Pipeline durdurma hatası: {e}")
+
+        try:
+            if self.human_detector is not None:
+                self.human_detector.cleanup()
+        except Exception as e:
+            self.logger.error(f"Detector temizleme hatası: {e}")
+
+        if self.event_log is not None:
+            self.event_log.close()
+        self.demographics.stop()
+        self.zone_tagger.stop()
+        self.visitor_rows.stop()
+        self.heatmap.save()
+        self.alert_engine.reset()
+        self.camera_manager = None
+        self.human_detector = None
+        self.pipeline = None
+
+    def _build_pipeline(self):
+        """
+        Aşama tanımından (ve mağaza ayarlarından) işleme hattını kur.
+
+        Returns:
+            Pipeline
+        """
+        factories = {
+            'detector': lambda **options: DetectorStage(self.human_detector, **options),
+            'roi': lambda **options: RoiFilter(zone_map=self.zone_map, **options),
+            'tracker': lambda **options: FunctionStage('tracker', self._track_stage, **options),
+            'employee_filter': lambda **options: FunctionStage('employee_filter', self._employee_stage, **options),
+            'demographics': lambda **options: FunctionStage('demographics', self._demographics_stage, **options),
+            'zones': lambda **options: FunctionStage('zones', self._zone_stage, **options),
+            'heatmap': lambda **options: FunctionStage('heatmap', self._heatmap_stage, **options),
+            'alerts': lambda **options: FunctionStage('alerts', self._alert_stage, **options),
+            'visitors': lambda **options: FunctionStage('visitors', self._visitor_stage, **options),
+        }
+        return Pipeline.from_definition(PIPELINE_DEFINITION, factories, name='headless',
+                                        on_error=self._on_stage_error)
+
+    def _process_frame(self, frame):
+        """Frame işleme callback'i (kutu çizimi yok - render maliyeti yok)"""
+        if self.pipeline is not None:
+            self.pipeline.submit(frame)
+
+    def _on_stage_error(self, stage, error):
+        """Aşama hatası: watchdog ardışık hataları sayar"""
+        self.consecutive_errors += 1
+        self.last_error = f'{stage.name}: {error}'
+
+    def _track_stage(self, packet):
+        """Frame'ler arası kimlik ve zamansal doğrulama (titreyen tespitler sayılmaz)"""
+        FRAMES_PROCESSED.inc()
+        self.current_detections = len(packet.detections)
+        packet.track_update = self.track_assigner.update(packet.detections, packet.timestamp, packet.frame_step)
+        if self.event_log is not None:
+            self.event_log.record_frame(packet.detections, packet.track_update, packet.timestamp)
+        packet.verified, packet.verified_update = self.temporal_filter.apply(packet.detections, packet.track_update)
+        packet.counted = packet.verified
+        return packet
+
+    def _employee_stage(self, packet):
+        """Çalışanlar ve yüz kontrolü bekleyen track'ler sayılmaz"""
+        packet.counted = self.employee_filter.filter(packet.frame, packet.verified, packet.verified_update)
+        return packet
+
+    def _demographics_stage(self, packet):
+        self.demographics.update(packet.frame, packet.verified, packet.verified_update, packet.timestamp)
+        return packet
+
+    def _zone_stage(self, packet):
+        self.zone_tagger.update(packet.frame.shape, packet.verified, packet.verified_update, packet.timestamp)
+        return packet
+
+    def _heatmap_stage(self, packet):
+        self.heatmap.update(packet.frame.shape, packet.counted, packet.timestamp)
+        return packet
+
+    def _alert_stage(self, packet):
+        """Alarm kuralları çalışanlar hariç herkesi sayar"""
+        track_ids = packet.track_update.track_ids
+        visible = [(detection, track_id) for detection, track_id in zip(packet.detections, track_ids)
+                   if not self.employee_filter.is_employee(track_id)]
+        self.alert_engine.update(packet.frame.shape, [d for d, _ in visible], [t for _, t in visible],
+                                 packet.timestamp)
+        return packet
+
+    def _visitor_stage(self, packet):
+        """Ziyaretçi kaydı; hattın sonuna ulaşan frame watchdog'u besler"""
+        counted = packet.counted
+        if counted:
+            with stage_timer('tracking'):
+                tracking_result = visitor_tracker.process_detections(counted, datetime.fromtimestamp(packet.timestamp))
+            self.visitor_rows.counted(tracking_result['new_visitors'], counted, packet.verified,
+                                      packet.verified_update.track_ids, packet.timestamp)
+            self.total_today = tracking_result['current_stats'].get('total_today', self.total_today)
+            if self.event_log is not None:
+                self.event_log.record_visitors(tracking_result['new_visitors'], counted, packet.timestamp)
+                self.total_today = self.event_log.state.total_today(packet.timestamp)
+
+            if tracking_result['new_visitors'] > 0:
+                self.logger.info(f"👥 Yeni ziyaretçi: {tracking_result['new_visitors']} "
+                                 f"(bugün toplam: {self.total_today})")
+
+        self.frames_processed += 1
+        self.consecutive_errors = 0
+        self.last_frame_time = time.time()
+        return packet
+
+    def _is_unhealthy(self):
+        """
+        Pipeline'ın takılıp takılmadığını kontrol et.
+
+        Returns:
+            str: Sorun varsa açıklaması, yoksa None
+        """
+        frame_age = time.time() - self.last_frame_time
+        if frame_age > FRAME_TIMEOUT_SECONDS:
+            return f'{frame_age:.1f} saniyedir frame gelmiyor'
+
+        if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+            return f'{self.consecutive_errors} ardışık frame hatası'
+
+        return None
+
+    def get_health(self):
+        """
+        Servis sağlık durumunu getir.
+
+        Returns:
+            dict: Health endpoint'inin döndürdüğü durum
+        """
+        frame_age = time.time() - self.last_frame_time if self.last_frame_time else None
+        return {
+            'healthy': self.state == 'running' and self._is_unhealthy() is None,
+            'state': self.state,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'restart_count': self.restart_count,
+            'last_error': self.last_error,
+            'last_frame_age_seconds': round(frame_age, 2) if frame_age is not None else None,
+            'frames_processed': self.frames_processed,
+            'current_detections': self.current_detections,
+            'total_today': self.total_today,
+            'pipeline': self.pipeline.get_stats() if self.pipeline is not None else None,
+            'load_shedder': self.load_shedder.get_stats() if self.load_shedder is not None else None,
+            'temporal_filter': self.temporal_filter.get_stats(),
+            'employee_filter': self.employee_filter.get_stats(),
+            'demographics': self.demographics.get_stats(),
+            'visitor_rows': self.visitor_rows.get_stats(),
+            'zones': self.zone_tagger.get_stats(),
+            'alerts': [rule.to_dict() for rule in self.alert_engine.rules if rule.firing],
+            'event_log': self.event_log.get_stats() if self.event_log is not None else None,
+            'sync': self.store_sync.get_stats() if self.store_sync.enabled else None
+        }
+
+    def _start_health_server(self):
+        """Sağlık endpoint'ini arka planda başlat"""
+        handler = type('BoundHealthHandler', (HealthRequestHandler,), {'service': self})
+        self._health_server = ThreadingHTTPServer((self.health_host, self.health_port), handler)
+        self._health_server.daemon_threads = True
+
+        thread = threading.Thread(target=self._health_server.serve_forever,
+                                  name='health-server', daemon=True)
+        thread.start()
+        self.logger.info(f"🩺 Health endpoint: http://{self.health_host}:{self.health_port}/health")
+
+    def _install_signal_handlers(self):
+        """SIGTERM/SIGINT ile graceful shutdown"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle_signal(signum, _frame):
+            self.logger.info(f"Sinyal alındı ({signum}) - servis durduruluyor")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle_signal)
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    def stop(self):
+        """Servisi durdur"""
+        self._stop_event.set()
+
+    def run(self):
+        """
+        Supervisor döngüsü: bileşenleri başlatır, izler ve hata durumunda
+        üstel backoff ile yeniden başlatır.
+
+        Returns:
+            int: Çıkış kodu
+        """
+        self._install_signal_handlers()
+        self._start_health_server()
+        migrate_database()
+        self.store_sync.start()
+        self.logger.info("🚀 Headless servis başlatıldı")
+
+        backoff = RESTART_BACKOFF_INITIAL
+
+        try:
+            while not self._stop_event.is_set():
+                if self._start_components():
+                    run_started = time.time()
+
+                    # Watchdog: pipeline sağlıklı olduğu sürece bekle
+                    while not self._stop_event.wait(WATCHDOG_INTERVAL):
+                        problem = self._is_unhealthy()
+                        if problem:
+                            self.last_error = problem
+                            self.logger.warning(f"⚠️  Pipeline sağlıksız: {problem}")
+                            break
+
+                        # Uzun süre stabil çalıştıysa backoff sıfırlanır
+                        if time.time() - run_started > STABLE_RUN_SECONDS:
+                            backoff = RESTART_BACKOFF_INITIAL
+
+                self._stop_components()
+
+                if self._stop_event.is_set():
+                    break
+
+                self.state = 'restarting'
+                self.restart_count += 1
+                self.logger.warning(f"🔄 Bileşenler {backoff:.0f} saniye sonra yeniden başlatılacak "
+                                    f"(deneme {self.restart_count}, sebep: {self.last_error})")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+        finally:
+            self.state = 'stopped'
+            self._stop_components()     # Döngü içinde durdurulduysa bir şey yapmaz
+            self.store_sync.stop()
+            if self._health_server is not None:
+                self._health_server.shutdown()
+                self._health_server.server_close()
+            self.logger.info("👋 Headless servis durduruldu")
+
+        return 0
+
+
+def run_headless(health_host=HEALTH_HOST, health_port=HEALTH_PORT):
+    """
+    Headless servisi başlat ve bitene kadar bekle.
+
+    Returns:
+        int: Çıkış kodu
+    """
+    SETTINGS.create_directories()
+    service = HeadlessService(health_host=health_host, health_port=health_port)
+    return service.run()
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Müşteri analiz sistemi - headless servis")
+    parser.add_argument('--health-host', default=HEALTH_HOST, help="Health endpoint adresi")
+    parser.add_argument('--health-port', type=int, default=HEALTH_PORT, help="Health endpoint portu")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="Pipeline'ı SECONDS süre profille (logs/profile_*.folded)")
+    parser.add_argument('--profile-delay', type=float, default=30.0, metavar='SECONDS',
+                        help="Profil başlamadan önce beklenecek süre")
+    args = parser.parse_args()
+
+    if args.profile:
+        schedule_profile(args.profile, output_dir=SETTINGS.LOG_DIR, delay=args.profile_delay,
+                         logger=get_logger("headless"))
+
+    return run_headless(health_host=args.health_host, health_port=args.health_port)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
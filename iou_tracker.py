@@ -0,0 +1,201 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Hafif IoU Takipçisi
+Ardışık frame'lerdeki tespitleri kutu örtüşmesine (IoU) göre eşleştirip
+her kişiye kalıcı bir track id verir. Track'in kutusu, son görüldüğünden beri
+geçen süre kadar sabit hızla ilerletilerek karşılaştırılır (kaçırılan
+tespitler ve dedektör örneklemesi hızlı yürüyen kişiyi bölmez).
+
+visitor_tracker ziyaretçi sayımını yapar; bu sınıf sadece frame'ler arası
+kimlik sürekliliği sağlar (overlay, bölge, heatmap gibi özellikler için).
+"""
+
+import itertools
+import math
+import time
+
+from detection_format import detection_bbox, detection_confidence
+
+DEFAULT_IOU_THRESHOLD = 0.3
+DEFAULT_MAX_MISSED = 15  # Bu kadar frame görülmeyen track kapanır
+DEFAULT_CONFIRM_HITS = 3  # Bu kadar frame görülen track "onaylı" sayılır (ikincil analizler için)
+HISTORY_MASK = 0xFFFFFFFF  # Son 32 frame'in görülme geçmişi
+VELOCITY_SMOOTHING = 0.5  # Hız tahmininde son ölçümün ağırlığı
+
+
+def bbox_iou(a, b):
+    """İki [x, y, w, h] kutusunun kesişim/birleşim oranı"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    """Tek kişinin frame'ler arası durumu"""
+
+    __slots__ = ('track_id', 'bbox', 'confidence', 'hits', 'missed', 'first_seen', 'last_seen',
+                 'age', 'history', 'confirmed', 'velocity')
+
+    def __init__(self, track_id, bbox, confidence, timestamp):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.confidence = confidence
+        self.hits = 1
+        self.missed = 0
+        self.age = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.history = 1  # Son frame'lerde görülme bit maskesi (en düşük bit = son frame)
+        self.confirmed = False
+        self.velocity = None  # Kutu hızı (piksel / saniye), iki eşleşmeden sonra
+
+    def predicted(self, timestamp):
+        """Sabit hızla timestamp anındaki tahmini kutu"""
+        if self.velocity is None or timestamp <= self.last_seen:
+            return self.bbox
+        dt = timestamp - self.last_seen
+        x, y, w, h = self.bbox
+        return [x + self.velocity[0] * dt, y + self.velocity[1] * dt, w, h]
+
+    def move(self, bbox, timestamp):
+        """Eşleşen kutuyu kaydet ve hızı güncelle"""
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            velocity = ((bbox[0] - self.bbox[0]) / dt, (bbox[1] - self.bbox[1]) / dt)
+            self.velocity = velocity if self.velocity is None else tuple(
+                old + VELOCITY_SMOOTHING * (new - old) for old, new in zip(self.velocity, velocity))
+        self.bbox = bbox
+        self.last_seen = timestamp
+
+
+class TrackingUpdate:
+    """Bir update() çağrısının sonucu"""
+
+    __slots__ = ('track_ids', 'new_tracks', 'ended_tracks', 'confirmed', 'frame_step')
+
+    def __init__(self, track_ids, new_tracks, ended_tracks, confirmed=(), frame_step=1):
+        self.track_ids = track_ids        # Tespitlerle aynı sırada track id listesi
+        self.new_tracks = new_tracks      # Bu frame'de açılan Track'ler
+        self.ended_tracks = ended_tracks  # Bu frame'de kapanan Track'ler
+        self.confirmed = confirmed        # Bu frame'de onaylanan (tespit indeksi, Track) çiftleri
+        self.frame_step = frame_step      # Tespit örneklemesi (kamera frame'i / update)
+
+
+def per_step(frames, frame_step):
+    """Kamera frame'i cinsinden süreyi tespit örneklemesinde update sayısına çevir (en az 1)"""
+    return max(1, math.ceil(frames / frame_step))
+
+
+class IouTracker:
+    """Açgözlü (greedy) IoU eşleştirmeli çoklu kişi takipçisi"""
+
+    def __init__(self, iou_threshold=DEFAULT_IOU_THRESHOLD, max_missed=DEFAULT_MAX_MISSED,
+                 confirm_hits=DEFAULT_CONFIRM_HITS):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.confirm_hits = confirm_hits
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, detections, timestamp=None, frame_step=1):
+        """
+        Yeni frame'in tespitlerini mevcut track'lerle eşleştir.
+
+        Args:
+            detections: HumanDetector tespit listesi (boş olabilir)
+            timestamp: Frame zamanı (varsayılan: şimdi)
+            frame_step: Dedektöre her kaç kamera frame'inden biri veriliyor (yük
+                azaltma). Kapanma ve onay süreleri aynı gerçek süreye denk gelecek
+                şekilde ölçeklenir; eşleştirme zaten track'in hızıyla o ana
+                taşınmış kutuya göre yapıldığı için seyrek update'lerde de kişiler
+                bölünmez.
+
+        Returns:
+            TrackingUpdate: Track id'leri, açılan ve kapanan track'ler
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        boxes = [detection_bbox(d) for d in detections] if detections else []
+        max_missed = per_step(self.max_missed, frame_step)
+        confirm_hits = per_step(self.confirm_hits, frame_step)
+
+        # Tüm (track, tespit) çiftlerinin IoU'su, büyükten küçüğe
+        candidates = []
+        for track in self.tracks.values():
+            predicted = track.predicted(timestamp)
+            for index, box in enumerate(boxes):
+                iou = bbox_iou(predicted, box)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, track.track_id, index))
+        candidates.sort(reverse=True)
+
+        track_ids = [None] * len(boxes)
+        matched_tracks = set()
+        confirmed = []
+        for _, track_id, index in candidates:
+            if track_id in matched_tracks or track_ids[index] is not None:
+                continue
+            matched_tracks.add(track_id)
+            track_ids[index] = track_id
+
+            track = self.tracks[track_id]
+            track.move(boxes[index], timestamp)
+            track.confidence = detection_confidence(detections[index])
+            track.hits += 1
+            track.missed = 0
+            if not track.confirmed and track.hits >= confirm_hits:
+                track.confirmed = True
+                confirmed.append((index, track))
+
+        # Eşleşmeyen tespitler yeni track açar
+        new_tracks = []
+        for index, box in enumerate(boxes):
+            if track_ids[index] is None:
+                track = Track(next(self._ids), box, detection_confidence(detections[index]), timestamp)
+                self.tracks[track.track_id] = track
+                track_ids[index] = track.track_id
+                matched_tracks.add(track.track_id)
+                new_tracks.append(track)
+                if confirm_hits <= 1:
+                    track.confirmed = True
+                    confirmed.append((index, track))
+
+        # Görülmeyen track'ler yaşlanır, süresi dolanlar kapanır
+        new_ids = {track.track_id for track in new_tracks}
+        ended_tracks = []
+        for track_id, track in list(self.tracks.items()):
+            if track_id in new_ids:
+                continue
+            seen = track_id in matched_tracks
+            track.age += 1
+            track.history = ((track.history << 1) | int(seen)) & HISTORY_MASK
+            if not seen:
+                track.missed += 1
+                if track.missed > max_missed:
+                    ended_tracks.append(self.tracks.pop(track_id))
+
+        return TrackingUpdate(track_ids, new_tracks, ended_tracks, confirmed, frame_step)
+
+    def reset(self):
+        """Tüm track'leri temizle"""
+        self.tracks.clear()
+
+    def restore(self, tracks, next_id):
+        """
+        Kaydedilmiş track'leri geri yükle (çökme sonrası kurtarma).
+
+        Args:
+            tracks: [(track_id, bbox, confidence, first_seen, last_seen, hits), ...]
+            next_id: Yeni açılacak ilk track id'si (önceki id'ler tekrar verilmez)
+        """
+        self.tracks.clear()
+        for track_id, bbox, confidence, first_seen, last_seen, hits in tracks:
+            track = Track(track_id, list(bbox), confidence, first_seen)
+            track.last_seen = last_seen
+            track.hits = track.age = hits
+            track.history = (1 << min(hits, HISTORY_MASK.bit_length())) - 1
+            track.confirmed = hits >= self.confirm_hits
+            self.tracks[track_id] = track
+        self._ids = itertools.count(max([next_id] + [track_id + 1 for track_id in self.tracks]))
@@ -0,0 +1,278 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Yük Altında Kademeli İş Azaltma
+CPU doyduğunda işleme hattı her şeyi aynı anda yavaşlatmasın diye işleri
+tanımlı bir sırayla bırakan denetleyici:
+
+    1. Video akışı FPS'i sınırlanır
+    2. Video akışı kalitesi düşürülür
+    3. Demografi ve yeniden tanıma aşamaları atlanır
+    4. Dedektöre her 2., sonra her 3. frame verilir
+
+Ziyaretçi sayımını yapan aşamalar (takip, zamansal doğrulama, çalışan
+filtresi, ziyaretçi kaydı) hiçbir kademede atlanmaz. Baskı, hattın uçtan
+uca gecikmesi (bütçe aşımı ya da hiç frame bitmemesi) ve 'block' kuyruk
+doluluğundan ölçülür; baskı ESCALATE_SECONDS sürerse bir kademe eklenir,
+yük RECOVER_SECONDS boyunca düşük kalırsa son kademe geri alınır. Her
+kademe değişimi loglanır.
+"""
+
+import threading
+import time
+from collections import deque
+
+from metrics import metrics_registry
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+SHED_LATENCY_BUDGET = getattr(SETTINGS, 'SHED_LATENCY_BUDGET', 1.0)     # Uçtan uca gecikme bütçesi (s)
+SHED_HIGH_WATERMARK = 0.75     # 'block' kuyruk doluluğu bu oranı aşarsa baskı var
+SHED_LOW_WATERMARK = 0.25
+SHED_RECOVER_RATIO = 0.5       # Gecikme bütçenin bu oranının altındaysa yük düşük
+SHED_ESCALATE_SECONDS = getattr(SETTINGS, 'SHED_ESCALATE_SECONDS', 2.0)
+SHED_RECOVER_SECONDS = getattr(SETTINGS, 'SHED_RECOVER_SECONDS', 15.0)
+SHED_INTERVAL = 0.5
+SHED_STREAM_FPS = 5
+SHED_STREAM_QUALITY = 50
+SHED_HISTORY = 50
+
+# Sayım doğruluğu için asla atlanmayan aşamalar
+PROTECTED_STAGES = ('detector', 'tracker', 'employee_filter', 'visitors')
+
+SHED_LEVEL = metrics_registry.gauge('load_shed_level', 'Uygulanan yük azaltma kademesi sayısı')
+SHED_CHANGES = metrics_registry.counter(
+    'load_shed_changes_total', 'Yük azaltma kademe değişimleri', labels=('step', 'action'))
+
+
+class ShedStep:
+    """Uygulanıp geri alınabilen tek yük azaltma kademesi"""
+
+    def __init__(self, name, description, apply, revert):
+        self.name = name
+        self.description = description
+        self.apply = apply
+        self.revert = revert
+
+
+def stream_fps_step(encoder, fps=SHED_STREAM_FPS):
+    def apply():
+        encoder.fps_cap = fps
+
+    def revert():
+        encoder.fps_cap = None
+
+    return ShedStep('stream_fps', f"video akışı {fps} FPS ile sınırlandı", apply, revert)
+
+
+def stream_quality_step(encoder, quality=SHED_STREAM_QUALITY):
+    def apply():
+        encoder.quality_cap = quality
+
+    def revert():
+        encoder.quality_cap = None
+
+    return ShedStep('stream_quality', f"video akışı kalitesi {quality} ile sınırlandı", apply, revert)
+
+
+def bypass_step(pipeline, stage_names, name='analytics'):
+    """
+    Aşamaları atlayan kademe.
+
+    Returns:
+        ShedStep: Hatta bu aşamalardan hiçbiri yoksa None
+    """
+    protected = set(stage_names) & set(PROTECTED_STAGES)
+    if protected:
+        raise ValueError(f"Sayım aşamaları atlanamaz: {sorted(protected)}")
+    present = [stage.name for stage in pipeline.stages if stage.name in stage_names and not stage.bypassed]
+    if not present:
+        return None
+    return ShedStep(name, f"{', '.join(present)} aşamaları atlanıyor",
+                    lambda: pipeline.set_bypass(present, True), lambda: pipeline.set_bypass(present, False))
+
+
+def detection_rate_step(pipeline, every):
+    previous = {}
+
+    def apply():
+        previous['every'] = pipeline.sample_every
+        pipeline.sample_every = every
+
+    def revert():
+        pipeline.sample_every = previous.get('every', 1)
+
+    return ShedStep(f'detection_1_{every}', f"dedektöre her {every} frame'den biri veriliyor", apply, revert)
+
+
+def default_steps(pipeline, encoder=None):
+    """
+    Varsayılan kademe sırası.
+
+    Args:
+        pipeline: Pipeline
+        encoder: RenditionEncoder (video akışı yoksa None)
+
+    Returns:
+        list: ShedStep listesi
+    """
+    steps = []
+    if encoder is not None:
+        steps += [stream_fps_step(encoder), stream_quality_step(encoder)]
+    steps.append(bypass_step(pipeline, ('demographics', 'reid')))
+    steps += [detection_rate_step(pipeline, 2), detection_rate_step(pipeline, 3)]
+    return [step for step in steps if step is not None]
+
+
+class LoadShedder:
+    """Hat gecikmesine ve kuyruk doluluğuna göre kademeli yük azaltma"""
+
+    def __init__(self, pipeline, steps=None, encoder=None, budget=SHED_LATENCY_BUDGET,
+                 escalate_seconds=SHED_ESCALATE_SECONDS, recover_seconds=SHED_RECOVER_SECONDS,
+                 interval=SHED_INTERVAL):
+        """
+        Args:
+            pipeline: İzlenen Pipeline
+            steps: Sıralı ShedStep listesi (None -> default_steps)
+            encoder: Varsayılan kademeler için RenditionEncoder
+            budget: Uçtan uca gecikme bütçesi (saniye)
+            escalate_seconds: Kademe eklemeden önce baskının süreceği süre
+            recover_seconds: Kademe geri almadan önce yükün düşük kalacağı süre
+        """
+        self.pipeline = pipeline
+        self.steps = steps if steps is not None else default_steps(pipeline, encoder)
+        self.budget = budget
+        self.escalate_seconds = escalate_seconds
+        self.recover_seconds = recover_seconds
+        self.interval = interval
+
+        self.level = 0
+        self.history = deque(maxlen=SHED_HISTORY)
+        self.last_sample = {'latency_ms': None, 'queue_fill': 0.0, 'stalled': False, 'pressure': False}
+        self._pressure_since = None
+        self._calm_since = None
+        self._last_counts = (0, 0.0, 0)
+        self._lock = threading.Lock()
+
+        self.logger = get_logger("load_shedder")
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._last_counts = (self.pipeline.completed, self.pipeline.latency_seconds, self._admitted())
+        self._thread = threading.Thread(target=self._loop, name='load-shedder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Döngüyü durdur ve tüm kademeleri geri al"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            while self.level:
+                self._step_down(time.time(), 'durduruldu')
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error(f"Yük denetimi hatası: {e}")
+
+    def _admitted(self):
+        return self.pipeline.submitted - self.pipeline.sampled_out
+
+    def _measure(self, now):
+        """
+        Son kontrolden beri hattın durumu.
+
+        Returns:
+            tuple: (ortalama gecikme saniye veya None, 'block' kuyruk doluluğu, hat takıldı mı)
+        """
+        completed, latency_total, admitted = self.pipeline.completed, self.pipeline.latency_seconds, self._admitted()
+        last_completed, last_latency, last_admitted = self._last_counts
+        self._last_counts = (completed, latency_total, admitted)
+
+        fill = self.pipeline.queue_fill('block')
+        if completed > last_completed:
+            return (latency_total - last_latency) / (completed - last_completed), fill, False
+        # Frame girdiği halde bütçenin iki katı süredir hiçbiri hattın sonuna ulaşmadıysa hat takılmıştır
+        # (hareket kapısının elediği frame'ler yüzünden kısa boşluklar normal)
+        idle = now - (self.pipeline.last_completed_at or now)
+        return None, fill, admitted > last_admitted and idle > self.budget * 2
+
+    def check(self, now=None):
+        """
+        Yükü ölç ve gerekirse bir kademe ekle / geri al.
+
+        Returns:
+            str: 'escalate', 'recover' veya None
+        """
+        now = now if now is not None else time.time()
+        latency, fill, stalled = self._measure(now)
+        pressure = stalled or (latency is not None and latency > self.budget) or fill > SHED_HIGH_WATERMARK
+        calm = not pressure and (latency is None or latency < self.budget * SHED_RECOVER_RATIO) and \
+            fill < SHED_LOW_WATERMARK
+        self.last_sample = {'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+                            'queue_fill': round(fill, 2), 'stalled': stalled, 'pressure': pressure}
+
+        with self._lock:
+            if pressure:
+                self._calm_since = None
+                self._pressure_since = self._pressure_since or now
+                if now - self._pressure_since >= self.escalate_seconds and self.level < len(self.steps):
+                    self._pressure_since = now
+                    reason = 'hat takıldı' if stalled else \
+                        f"gecikme {(latency or 0) * 1000:.0f} ms, kuyruk doluluğu %{fill * 100:.0f}"
+                    self._step_up(now, reason)
+                    return 'escalate'
+            elif calm:
+                self._pressure_since = None
+                self._calm_since = self._calm_since or now
+                if now - self._calm_since >= self.recover_seconds and self.level:
+                    self._calm_since = now
+                    self._step_down(now, f"gecikme {latency * 1000:.0f} ms" if latency else 'yük düşük')
+                    return 'recover'
+            else:
+                self._pressure_since = None
+                self._calm_since = None
+        return None
+
+    def _step_up(self, now, reason):
+        step = self.steps[self.level]
+        step.apply()
+        self.level += 1
+        self._record(now, step, 'apply', reason)
+        self.logger.warning(f"📉 Yük azaltma kademe {self.level}/{len(self.steps)}: {step.description} ({reason})")
+
+    def _step_down(self, now, reason):
+        step = self.steps[self.level - 1]
+        step.revert()
+        self.level -= 1
+        self._record(now, step, 'revert', reason)
+        self.logger.info(f"📈 Yük azaltma geri alındı ({step.name}), kademe {self.level}/{len(self.steps)} "
+                         f"({reason})")
+
+    def _record(self, now, step, action, reason):
+        SHED_LEVEL.set(self.level)
+        SHED_CHANGES.labels(step=step.name, action=action).inc()
+        self.history.append({'timestamp': now, 'step': step.name, 'action': action, 'level': self.level,
+                             'reason': reason})
+
+    def get_stats(self):
+        """
+        Kademe durumu, son ölçüm ve son değişimler.
+
+        Returns:
+            dict
+        """
+        return {
+            'level': self.level,
+            'steps': [step.name for step in self.steps],
+            'active': [step.description for step in self.steps[:self.level]],
+            'budget_ms': round(self.budget * 1000),
+            'last_sample': self.last_sample,
+            'history': list(self.history)[-10:]
+        }
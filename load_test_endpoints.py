@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+İstatistik / analitik / export endpoint yük testi
+traffic_generator.py ile doldurulmuş bir veritabanı üzerinde çalışan web
+uygulamasının sorgu endpoint'lerini eşzamanlı isteklerle zorlar ve endpoint
+başına throughput ve gecikme yüzdeliklerini raporlar. 200 dönüp gövdesinde
+"success": false olan yanıtlar da hata sayılır.
+
+Kullanım:
+    python traffic_generator.py --db data/musteri_analiz.db --days 365 --cameras 20
+    python web_app.py --async
+    python load_test_endpoints.py --url http://127.0.0.1:5000 --concurrency 1 10 50 [--export]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from load_test_web import percentile
+
+EXPORT_PATH = '/api/visitors/export'
+EXPORT_CONCURRENCY = 2      # Export her istekte tüm tabloyu okur; sınırlı eşzamanlılıkla ölçülür
+
+
+def endpoint_paths(days, camera):
+    """
+    Test edilen endpoint'ler (traffic_generator'ın yazdığı aralığa göre).
+
+    Returns:
+        list: (isim, yol)
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    week_ago = (today - timedelta(days=7)).isoformat()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    year_ago = (today - timedelta(days=min(days, 365))).isoformat()
+    now = datetime.now().replace(microsecond=0).isoformat()
+
+    def analytics(**params):
+        return f"/api/analytics/query?{urlencode(params)}"
+
+    return [
+        ('stats.current', '/api/stats/current'),
+        ('stats.hourly', '/api/stats/hourly'),
+        ('stats.weekly', '/api/stats/weekly'),
+        ('visitors.recent', '/api/visitors/recent'),
+        ('analytics.today[hour]', analytics(bucket='hour')),
+        ('analytics.week[hour]', analytics(start=week_ago, end=now, bucket='hour')),
+        ('analytics.month[day,camera]', analytics(start=month_ago, end=now, bucket='day', camera=camera)),
+        ('analytics.year[day]', analytics(start=year_ago, end=now, bucket='day')),
+        ('analytics.year[month,compare]', analytics(start=year_ago, end=now, bucket='month', compare='year')),
+        ('zones.today', '/api/analytics/zones'),
+        ('zones.week[camera]', f"/api/analytics/zones?{urlencode({'start': week_ago, 'end': now, 'camera': camera})}"),
+    ]
+
+
+async def fetch(host, port, path, timeout):
+    """
+    Tek GET isteği (Connection: close).
+
+    Returns:
+        tuple: (HTTP durum kodu, gövde)
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    status = int(data.split(b' ', 2)[1]) if data.startswith(b'HTTP/') else 0
+    return status, data.partition(b'\r\n\r\n')[2]
+
+
+def failed_body(body):
+    """JSON gövdede success: false var mı (JSON olmayan gövdeler - CSV export - başarılı sayılır)"""
+    try:
+        return json.loads(body).get('success') is False
+    except (ValueError, AttributeError):
+        return False
+
+
+async def request_worker(host, port, path, deadline, timeout, latencies, errors):
+    """Süre dolana kadar art arda istek gönder"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status, body = await fetch(host, port, path, timeout)
+            if status == 200 and not failed_body(body):
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+
+async def run_endpoint(host, port, path, concurrency, duration, timeout):
+    """
+    Tek endpoint'i verilen eşzamanlılıkla çalıştır.
+
+    Returns:
+        dict: Sonuç özeti
+    """
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[request_worker(host, port, path, deadline, timeout, latencies, errors)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': max(latencies, default=0.0) * 1000,
+        'errors': len(errors)
+    }
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="İstatistik / analitik endpoint yük testi")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--duration', type=float, default=10.0, help="Endpoint / seviye başına süre (saniye)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--days', type=int, default=365, help="Üretilen verinin gün sayısı")
+    parser.add_argument('--camera', type=int, default=0, help="Kamera filtreli sorgular için kamera")
+    parser.add_argument('--only', nargs='+', help="Sadece bu isimle başlayan endpoint'ler")
+    parser.add_argument('--export', action='store_true', help=f"{EXPORT_PATH} de test edilsin (ağır)")
+    parser.add_argument('--output', help="Sonuçları JSON olarak yaz")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    endpoints = endpoint_paths(args.days, args.camera)
+    if args.only:
+        endpoints = [(name, path) for name, path in endpoints if name.startswith(tuple(args.only))]
+    plan = [(name, path, concurrency) for name, path in endpoints for concurrency in args.concurrency]
+    if args.export:
+        plan.append(('visitors.export', EXPORT_PATH, EXPORT_CONCURRENCY))
+
+    print(f"🔥 Endpoint yük testi: {args.url} ({args.duration:.0f}s / endpoint / seviye)")
+    print(f"{'Endpoint':<32}{'Bağlantı':>9}{'İstek/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}{'Hata':>7}")
+
+    results = []
+    for name, path, concurrency in plan:
+        result = asyncio.run(run_endpoint(host, port, path, concurrency, args.duration, args.timeout))
+        result.update(endpoint=name, path=path)
+        results.append(result)
+        print(f"{name:<32}{concurrency:>9}{result['throughput']:>10.1f}{result['p50']:>9.1f}"
+              f"{result['p95']:>9.1f}{result['p99']:>9.1f}{result['max']:>9.1f}{result['errors']:>7}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({'url': args.url, 'created_at': datetime.now().isoformat(),
+                                                 'results': results}, ensure_ascii=False, indent=2),
+                                     encoding='utf-8')
+        print(f"\n📝 Rapor: {args.output}")
+
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Web dashboard yük testi
+Yerel bir asyncio HTTP client'ı ile eşzamanlı bağlantı açarak
+throughput ve gecikme yüzdeliklerini raporlar. Ek kütüphane gerektirmez.
+
+Kullanım:
+    python web_app.py --async          (veya threading modu için: python web_app.py)
+    python load_test_web.py --url http://127.0.0.1:5000 --concurrency 10 50 200
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlsplit
+
+# Test edilen endpoint'ler
+REQUEST_PATHS = ('/api/stats/current', '/api/camera/snapshot')
+STREAM_PATH = '/video_feed'
+FRAME_BOUNDARY = b'--frame'
+
+
+def percentile(values, pct):
+    """Sıralı listeden yüzdelik değeri (en yakın sıra yöntemi)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+async def http_get(host, port, path, timeout):
+    """
+    Tek GET isteği (Connection: close).
+
+    Returns:
+        tuple: (HTTP durum kodu, gövde uzunluğu)
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    status = int(data.split(b' ', 2)[1]) if data.startswith(b'HTTP/') else 0
+    return status, len(data)
+
+
+async def request_worker(host, port, path, deadline, timeout, latencies, errors):
+    """Süre dolana kadar art arda istek gönder"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status, _ = await http_get(host, port, path, timeout)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+
+async def stream_worker(host, port, deadline, timeout, frame_counts, first_frame_latencies, errors):
+    """MJPEG akışını açık tut ve gelen frame'leri say"""
+    start = time.perf_counter()
+    frames = 0
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(f"GET {STREAM_PATH} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+        await writer.drain()
+
+        tail = b''
+        while time.perf_counter() < deadline:
+            remaining = max(0.1, deadline - time.perf_counter())
+            chunk = await asyncio.wait_for(reader.read(65536), min(timeout, remaining))
+            if not chunk:
+                break
+            data = tail + chunk
+            found = data.count(FRAME_BOUNDARY)
+            if found and frames == 0:
+                first_frame_latencies.append(time.perf_counter() - start)
+            frames += found
+            tail = data[-len(FRAME_BOUNDARY):]
+        writer.close()
+    except asyncio.TimeoutError:
+        pass
+    except Exception as e:
+        errors.append(type(e).__name__)
+    frame_counts.append(frames)
+
+
+async def run_level(host, port, concurrency, duration, timeout):
+    """
+    Bir eşzamanlılık seviyesini çalıştır: bağlantıların yarısı JSON/snapshot
+    istekleri, yarısı video izleyicisi.
+
+    Returns:
+        dict: Sonuç özeti
+    """
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    frame_counts, first_frame_latencies = [], []
+
+    viewers = concurrency // 2
+    requesters = concurrency - viewers
+    tasks = []
+    for i in range(requesters):
+        path = REQUEST_PATHS[i % len(REQUEST_PATHS)]
+        tasks.append(request_worker(host, port, path, deadline, timeout, latencies, errors))
+    for _ in range(viewers):
+        tasks.append(stream_worker(host, port, deadline, timeout, frame_counts, first_frame_latencies, errors))
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'viewers': viewers,
+        'viewer_fps': (sum(frame_counts) / elapsed / viewers) if viewers else 0.0,
+        'first_frame_p95': percentile(first_frame_latencies, 95) * 1000,
+        'errors': len(errors)
+    }
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Web dashboard yük testi")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duration', type=float, default=20.0, help="Seviye başına süre (saniye)")
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    print(f"🔥 Yük testi: {args.url} ({args.duration:.0f}s / seviye)")
+    print(f"{'Bağlantı':>9}{'İstek/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'İzleyici':>10}{'FPS/izl.':>10}{'İlk frame p95':>15}{'Hata':>7}")
+
+    for concurrency in args.concurrency:
+        result = asyncio.run(run_level(host, port, concurrency, args.duration, args.timeout))
+        print(f"{result['concurrency']:>9}{result['throughput']:>10.1f}{result['p50']:>9.1f}"
+              f"{result['p95']:>9.1f}{result['p99']:>9.1f}{result['viewers']:>10}"
+              f"{result['viewer_fps']:>10.1f}{result['first_frame_p95']:>15.1f}{result['errors']:>7}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,7 @@ Bu dosya uygulamanın ana giriş noktasıdır.
 
 Kullanım:
     python main.py
+    python main.py --headless   (GUI'siz servis modu)
 
 Gereksinimler:
     - Python 3.8+
@@ -13,6 +14,7 @@ Gereksinimler:
 
 import sys
 import os
+import argparse
 import traceback
 from pathlib import Path
 
@@ -27,9 +29,6 @@ try:
     # Log sistemini başlat
     from src.utils.logger import log_manager, get_logger
     
-    # Ana pencereyi import et
-    from src.ui.main_window import MainWindow
-    
 except ImportError as e:
     print(f"❌ Kütüphane import hatası: {e}")
     print("\n🔧 Çözüm önerileri:")
@@ -231,8 +230,46 @@ def setup_environment():
     
     logger.info("✅ Sistem ortamı hazırlandı")
 
-def main():
+def parse_arguments(argv=None):
+    """
+    Komut satırı argümanlarını oku.
+    
+    Returns:
+        argparse.Namespace: Okunan argümanlar
+    """
+    parser = argparse.ArgumentParser(description="OpenCV Müşteri Analiz Sistemi")
+    parser.add_argument('--headless', action='store_true',
+                        help="GUI olmadan servis modunda çalıştır (soru sormaz)")
+    parser.add_argument('--health-port', type=int, default=None,
+                        help="Headless modda health endpoint portu")
+    return parser.parse_args(argv)
+
+def run_headless_mode(args):
+    """
+    Headless servis modunu başlat. Etkileşimli soru sorulmaz;
+    kamera hatalarını servis kendi backoff döngüsüyle yönetir.
+    
+    Returns:
+        int: Çıkış kodu
+    """
+    logger = get_logger("main")
+    logger.info("🚀 Headless servis modu başlatılıyor...")
+    
+    setup_environment()
+    
+    if not check_dependencies():
+        logger.error("❌ Kritik sistem gereksinimleri karşılanmıyor - servis başlatılmadı")
+        return 1
+    
+    from headless_service import run_headless, HEALTH_PORT
+    return run_headless(health_port=args.health_port or HEALTH_PORT)
+
+def main(argv=None):
     """Ana fonksiyon"""
+    args = parse_arguments(argv)
+    if args.headless:
+        return run_headless_mode(args)
+    
     # Logo ve başlangıç mesajı
     print("=" * 60)
     print("🏪 OpenCV Müşteri Analiz Sistemi")
@@ -283,6 +320,7 @@ def main():
         
         # 4. Ana pencereyi başlat
         logger.info("🖥️  Ana pencere başlatılıyor...")
+        from src.ui.main_window import MainWindow
         app = MainWindow()
         
         logger.info("✅ Sistem başarıyla hazırlandı")
@@ -331,5 +369,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n💥 Kritik hata: {str(e)}")
         print(traceback.format_exc())
-        input("\nDevam etmek için Enter'a basın...")
+        if '--headless' not in sys.argv:
+            input("\nDevam etmek için Enter'a basın...")
         sys.exit(1) 
\ No newline at end of file
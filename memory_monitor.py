@@ -0,0 +1,200 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Bellek İzleme
+Süreç belleğini (RSS), tracemalloc ile en çok bellek tutan satırları ve
+bileşenlerin bildirdiği buffer / cache / kuyruk boyutlarını tek raporda
+toplar. /api/debug/memory ve test_memory_soak.py bu modülü kullanır.
+
+tracemalloc varsayılan olarak kapalıdır (açıkken Python ayırmaları belirgin
+yavaşlar); MEMORY_TRACE_FRAMES ayarı veya POST /api/debug/memory?trace=1 ile
+açılır (GET sadece rapor döndürür).
+Açıldığı andaki snapshot referans alınır, raporda her satırın o andan beri
+büyümesi de görünür.
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from metrics import metrics_registry
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_TOP = 15
+MAX_TOP = 100
+TRACE_FRAMES = 1            # Ayırma başına saklanan stack derinliği
+MB = 1024 * 1024
+
+# İzleme altyapısının kendi ayırmaları rapora girmez
+IGNORED_TRACES = (tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                  '<frozen importlib._bootstrap_external>', '<unknown>')
+
+
+def rss_bytes():
+    """
+    Sürecin anlık resident set boyutu (psutil yoksa /proc üzerinden).
+
+    Returns:
+        int: Byte, ölçülemiyorsa None
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+metrics_registry.gauge('process_resident_memory_bytes', 'Süreç RSS belleği (byte)',
+                       func=lambda: rss_bytes() or 0)
+
+
+def _short_path(filename):
+    """Proje dosyaları göreli, kütüphaneler son iki parçayla gösterilir"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    if filename.startswith(root):
+        return os.path.relpath(filename, root)
+    return os.path.join(*filename.replace('\\', '/').split('/')[-2:])
+
+
+class MemoryMonitor:
+    """RSS, tracemalloc ve bileşen probe'larından bellek raporu üreten sınıf"""
+
+    def __init__(self):
+        self._probes = {}
+        self._lock = threading.Lock()
+        self._baseline = None       # İzleme başladığındaki snapshot
+        self.started_at = time.time()
+
+    def register(self, name, probe):
+        """
+        Bileşen ekle.
+
+        Args:
+            probe: () -> dict; bileşen kapalıysa None döndürebilir
+        """
+        with self._lock:
+            self._probes[name] = probe
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames=TRACE_FRAMES):
+        """
+        tracemalloc'u başlat ve referans snapshot'ı al.
+
+        Returns:
+            bool: Bu çağrıda başlatıldıysa True (zaten açıksa False)
+        """
+        with self._lock:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            self._baseline = self._take_snapshot()
+            return True
+
+    def stop_tracing(self):
+        """tracemalloc'u durdur (izlenen ayırmaların kaydı silinir)"""
+        with self._lock:
+            self._baseline = None
+            tracemalloc.stop()
+
+    def reset_baseline(self):
+        """Büyümeyi bu andan itibaren ölç (ısınma sonrası)"""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                self._baseline = self._take_snapshot()
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in IGNORED_TRACES])
+
+    def _allocation_stats(self):
+        """Referans varsa StatisticDiff, yoksa Statistic listesi"""
+        snapshot = self._take_snapshot()
+        baseline = self._baseline
+        if baseline is not None:
+            return snapshot.compare_to(baseline, 'lineno')
+        return snapshot.statistics('lineno')
+
+    @staticmethod
+    def _top(stats, limit, by):
+        key = (lambda stat: getattr(stat, 'size_diff', 0)) if by == 'growth' else (lambda stat: stat.size)
+        top = []
+        for stat in sorted(stats, key=key, reverse=True)[:limit]:
+            frame = stat.traceback[0]
+            growth = getattr(stat, 'size_diff', None)
+            top.append({
+                'location': f"{_short_path(frame.filename)}:{frame.lineno}",
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'growth_kb': round(growth / 1024, 1) if growth is not None else None
+            })
+        return top
+
+    def top_allocations(self, limit=DEFAULT_TOP, by='size'):
+        """
+        En çok bellek tutan satırlar.
+
+        Args:
+            by: 'size' (tutulan bellek) veya 'growth' (referanstan beri büyüme)
+
+        Returns:
+            list: {'location', 'size_kb', 'count', 'growth_kb'} sözlükleri (izleme kapalıysa boş)
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        return self._top(self._allocation_stats(), limit, by)
+
+    def components(self):
+        """
+        Kayıtlı bileşenlerin bildirdiği boyutlar (hata veren probe raporu bozmaz).
+
+        Returns:
+            dict: İsim -> probe sonucu
+        """
+        with self._lock:
+            probes = dict(self._probes)
+        report = {}
+        for name, probe in probes.items():
+            try:
+                report[name] = probe()
+            except Exception as e:
+                report[name] = {'error': str(e)}
+        return report
+
+    def snapshot(self, top=DEFAULT_TOP):
+        """
+        Tam bellek raporu.
+
+        Returns:
+            dict
+        """
+        rss = rss_bytes()
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'rss_mb': round(rss / MB, 1) if rss is not None else None,
+            'threads': threading.active_count(),
+            'gc': {'counts': list(gc.get_count()), 'uncollectable': len(gc.garbage)},
+            'tracemalloc': {'tracing': tracemalloc.is_tracing()},
+            'components': self.components()
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stats = self._allocation_stats()
+            report['tracemalloc'].update({
+                'traced_mb': round(current / MB, 1),
+                'peak_mb': round(peak / MB, 1),
+                'top': self._top(stats, top, 'size'),
+                'top_growth': self._top(stats, top, 'growth') if self._baseline is not None else []
+            })
+        return report
@@ -0,0 +1,357 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Performans Metrikleri
+Pipeline aşamaları için Prometheus metin formatında sayaç, gauge ve histogramlar
+
+Thread safety notu:
+    Sayaç ve histogram güncellemeleri kilit kullanmaz. Her thread kendi
+    slotuna yazar (dict anahtarı = thread id), okuma sırasında slotlar
+    toplanır. Böylece kamera thread'i ile Flask thread'leri çekişmez.
+    Biten thread'lerin slotları (istek başına açılan Flask thread'leri gibi)
+    okuma sırasında ve yeni slot açılırken kilit altında taban değere
+    eklenip silinir; slot sözlüğü thread sayısıyla sınırlı kalır.
+"""
+
+import bisect
+import threading
+import time
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Saniye cinsinden histogram sınırları (1ms - 2.5s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Ölçülen pipeline aşamaları. capture sadece ReplayCamera'da ölçülür (CameraManager
+# src/ altında); tracking visitor_tracker'ın ziyaretçi kaydını (db_manager tamponu) da içerir.
+PIPELINE_STAGES = ('capture', 'preprocess', 'inference', 'employee_filter', 'tracking',
+                   'heatmap', 'alerts', 'db_write', 'db_query', 'jpeg_encode')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    """Prometheus label bloğunu oluştur: {a="1",b="2"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _dead_slots(slots):
+    """Artık çalışmayan thread'lerin slot anahtarları"""
+    alive = {thread.ident for thread in threading.enumerate()}
+    return [tid for tid in list(slots) if tid not in alive]
+
+
+class _CounterChild:
+    """Tek label kombinasyonu için kilitsiz sayaç"""
+
+    __slots__ = ('_slots', '_base', '_lock')
+
+    def __init__(self):
+        self._slots = {}    # thread id -> [değer]
+        self._base = 0      # Biten thread'lerden kalan toplam
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Sayacı artır (sadece çağıran thread'in slotu yazılır)"""
+        slot = self._slots.get(threading.get_ident())
+        if slot is None:
+            slot = self._new_slot()
+        slot[0] += amount
+
+    def _new_slot(self):
+        """Thread'in ilk yazımı: biten thread'leri topla, slot aç"""
+        slot = [0]
+        with self._lock:
+            self._fold_dead_threads()
+            self._slots[threading.get_ident()] = slot
+        return slot
+
+    def _fold_dead_threads(self):
+        """Biten thread'lerin slotlarını tabana ekle (kilit altında çağrılır)"""
+        for tid in _dead_slots(self._slots):
+            slot = self._slots.pop(tid, None)
+            if slot is not None:
+                self._base += slot[0]
+
+    @property
+    def value(self):
+        """Tüm thread slotlarının toplamı"""
+        with self._lock:
+            self._fold_dead_threads()
+            return self._base + sum(slot[0] for slot in list(self._slots.values()))
+
+
+class _GaugeChild:
+    """Anlık değer; set() ile yazılır veya okuma anında fonksiyondan alınır"""
+
+    __slots__ = ('_value', '_func')
+
+    def __init__(self, func=None):
+        self._value = 0.0
+        self._func = func
+
+    def set(self, value):
+        """Değeri ayarla"""
+        self._value = value
+
+    @property
+    def value(self):
+        """Güncel değer"""
+        if self._func is not None:
+            try:
+                return self._func()
+            except Exception:
+                return float('nan')
+        return self._value
+
+
+class _HistogramChild:
+    """
+    Tek label kombinasyonu için kilitsiz histogram.
+    Her thread slotu: [bucket_0, ..., bucket_n, +Inf, sum, count]
+    """
+
+    __slots__ = ('_buckets', '_slots', '_base', '_lock', '_sample_every', '_ticks')
+
+    def __init__(self, buckets, sample_every=1):
+        self._buckets = buckets
+        self._slots = {}
+        self._base = self._empty_slot()     # Biten thread'lerden kalan toplamlar
+        self._lock = threading.Lock()
+        self._sample_every = max(1, int(sample_every))
+        self._ticks = {}
+
+    def _empty_slot(self):
+        return [0] * (len(self._buckets) + 1) + [0.0, 0]
+
+    def observe(self, value, weight=1):
+        """Gözlem ekle (örneklemede ağırlık = örnekleme aralığı)"""
+        slot = self._slots.get(threading.get_ident())
+        if slot is None:
+            slot = self._new_slot()
+
+        slot[bisect.bisect_left(self._buckets, value)] += weight
+        slot[-2] += value * weight
+        slot[-1] += weight
+
+    def should_sample(self):
+        """
+        Sıcak yollarda her N çağrıdan sadece birini ölç.
+
+        Returns:
+            bool: Bu çağrı ölçülecekse True
+        """
+        if self._sample_every == 1:
+            return True
+        tid = threading.get_ident()
+        tick = self._ticks.get(tid, 0) + 1
+        self._ticks[tid] = tick
+        return tick % self._sample_every == 0
+
+    def _new_slot(self):
+        """Thread'in ilk gözlemi: biten thread'leri topla, slot aç"""
+        slot = self._empty_slot()
+        with self._lock:
+            self._fold_dead_threads()
+            self._slots[threading.get_ident()] = slot
+        return slot
+
+    def _fold_dead_threads(self):
+        """Biten thread'lerin slotlarını tabana ekle (kilit altında çağrılır)"""
+        for tid in _dead_slots(self._slots):
+            slot = self._slots.pop(tid, None)
+            if slot is not None:
+                for i, amount in enumerate(slot):
+                    self._base[i] += amount
+        for tid in _dead_slots(self._ticks):
+            self._ticks.pop(tid, None)
+
+    def time(self):
+        """Süre ölçen context manager"""
+        return _Timer(self)
+
+    def snapshot(self):
+        """
+        Thread slotlarını birleştir.
+
+        Returns:
+            tuple: (bucket sayıları listesi, toplam süre, gözlem sayısı)
+        """
+        with self._lock:
+            self._fold_dead_threads()
+            merged = list(self._base)
+            for slot in list(self._slots.values()):
+                for i, amount in enumerate(slot):
+                    merged[i] += amount
+        return merged[:-2], merged[-2], merged[-1]
+
+
+class _Timer:
+    """Histogram için hafif zamanlayıcı (örnekleme destekli)"""
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = None
+
+    def __enter__(self):
+        if self._histogram.should_sample():
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            self._histogram.observe(time.perf_counter() - self._start,
+                                    weight=self._histogram._sample_every)
+        return False
+
+
+class _MetricFamily:
+    """Aynı isimli, farklı label değerli metrikler"""
+
+    def __init__(self, kind, name, help_text, label_names, child_factory):
+        self.kind = kind
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._child_factory = child_factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Label değerleri için alt metriği getir (ilk seferde oluşturulur)"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.label_names)
+        else:
+            values = tuple(str(v) for v in values)
+
+        child = self._children.get(values)
+        if child is None:
+            # Oluşturma nadir olduğu için sadece burada kilit kullanılır
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._child_factory()
+                    self._children[values] = child
+        return child
+
+    def __getattr__(self, name):
+        # Label'sız metriklerde family doğrudan child gibi kullanılabilir
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.labels(), name)
+
+    def items(self):
+        """(label değerleri, child) çiftleri"""
+        return list(self._children.items())
+
+
+class MetricsRegistry:
+    """Tüm metrikleri tutan ve Prometheus formatında yazan kayıt defteri"""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family):
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+
+        # Label'sız metrikler ilk gözlemden önce de 0 olarak görünsün
+        if not family.label_names:
+            family.labels()
+        return family
+
+    def counter(self, name, help_text, labels=()):
+        """Sayaç tanımla"""
+        return self._register(_MetricFamily('counter', name, help_text, labels, _CounterChild))
+
+    def gauge(self, name, help_text, labels=(), func=None):
+        """Gauge tanımla (func verilirse değer okuma anında hesaplanır)"""
+        return self._register(_MetricFamily('gauge', name, help_text, labels,
+                                            lambda: _GaugeChild(func)))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, sample_every=1):
+        """Histogram tanımla"""
+        buckets = tuple(sorted(buckets))
+        return self._register(_MetricFamily('histogram', name, help_text, labels,
+                                            lambda: _HistogramChild(buckets, sample_every)))
+
+    def render(self):
+        """
+        Tüm metrikleri Prometheus metin formatına çevir.
+
+        Returns:
+            str: /metrics yanıt gövdesi
+        """
+        lines = []
+        with self._lock:
+            families = list(self._families.values())
+
+        for family in families:
+            lines.append(f'# HELP {family.name} {family.help_text}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+
+            for values, child in family.items():
+                if family.kind == 'histogram':
+                    counts, total, observations = child.snapshot()
+                    cumulative = 0
+                    for bound, count in zip(child._buckets + (float('inf'),), counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        labels = _format_labels(family.label_names, values, f'le="{le}"')
+                        lines.append(f'{family.name}_bucket{labels} {cumulative}')
+                    labels = _format_labels(family.label_names, values)
+                    lines.append(f'{family.name}_sum{labels} {total:.6f}')
+                    lines.append(f'{family.name}_count{labels} {observations}')
+                else:
+                    labels = _format_labels(family.label_names, values)
+                    lines.append(f'{family.name}{labels} {child.value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Global registry (visitor_tracker / db_manager gibi modül seviyesinde tekil)
+metrics_registry = MetricsRegistry()
+
+STAGE_SECONDS = metrics_registry.histogram(
+    'pipeline_stage_seconds', 'Pipeline aşama süreleri (saniye)', labels=('stage',))
+FRAMES_PROCESSED = metrics_registry.counter(
+    'frames_processed_total', 'İşlenen frame sayısı')
+FRAMES_DROPPED = metrics_registry.counter(
+    'frames_dropped_total', 'İşlenemeden atlanan frame sayısı')
+SOCKET_MESSAGES = metrics_registry.counter(
+    'socket_messages_total', 'Gönderilen WebSocket mesajları', labels=('event',))
+DB_QUERIES = metrics_registry.counter(
+    'db_queries_total', 'Çalıştırılan veritabanı sorguları')
+
+# Sıcak yollar (her frame/her izleyici) örneklenerek ölçülür
+HOT_PATH_SAMPLE_EVERY = {'capture': 4, 'jpeg_encode': 4}
+
+
+def stage_timer(stage):
+    """
+    Pipeline aşaması için süre ölçer.
+
+    Kullanım:
+        with stage_timer('inference'):
+            detector.detect_humans(frame)
+    """
+    return _stage_histogram(stage).time()
+
+
+def observe_stage(stage, seconds):
+    """Dışarıda ölçülmüş bir aşama süresini kaydet"""
+    _stage_histogram(stage).observe(seconds)
+
+
+def _stage_histogram(stage):
+    child = STAGE_SECONDS._children.get((stage,))
+    if child is None:
+        child = STAGE_SECONDS.labels(stage=stage)
+        child._sample_every = HOT_PATH_SAMPLE_EVERY.get(stage, 1)
+    return child
@@ -0,0 +1,314 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Doluluk Isı Haritası
+Kamera başına kaba bir numpy ızgarasında, takip edilen kişilerin ayak
+noktalarında geçirilen süre (kişi-saniye) biriktirilir.
+
+- Koordinatlar frame boyutuna bölünerek normalize edilir; ızgara kamera
+  çözünürlüğünden bağımsızdır.
+- Canlı ızgara saat başı yarı ömre göre sönümlenir (eski yoğunluk zamanla
+  silinir); her saatin ham ızgarası ayrıca sıkıştırılmış .npz olarak saklanır.
+- PNG görüntüler ızgara sürümüne göre önbelleklenir; ızgara değişmedikçe
+  tekrar çizilmez.
+
+Dosyalar:
+    data/heatmaps/<kamera>/state.npz          - canlı (sönümlenmiş) ızgara
+    data/heatmaps/<kamera>/YYYYmmdd_HH.npz    - saatlik ham ızgaralar
+"""
+
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from detection_format import detections_to_array
+from metrics import stage_timer
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+HEATMAP_DIR = getattr(SETTINGS, 'HEATMAP_DIR', 'data/heatmaps')
+HEATMAP_GRID = getattr(SETTINGS, 'HEATMAP_GRID', (36, 64))  # (satır, sütun)
+HEATMAP_HALF_LIFE_HOURS = getattr(SETTINGS, 'HEATMAP_HALF_LIFE_HOURS', 24.0)
+HEATMAP_PNG_WIDTH = 640
+MAX_FRAME_STEP = 1.0       # Daha uzun frame aralıkları bu kadar sayılır (takılma sonrası sıçrama olmasın)
+PNG_CACHE_SIZE = 16
+PNG_LEVELS = 32            # Renk kademesi (daha az kademe = daha küçük PNG)
+HOUR_FORMAT = '%Y%m%d_%H'
+
+REGION_NAMES = ('Sol', 'Merkez', 'Sağ')
+
+
+def foot_points(frame_shape, detections):
+    """
+    Kutuların alt orta noktalarını normalize koordinatlarda getir.
+
+    Returns:
+        np.ndarray: float32 (N, 2) -> x, y (0-1 aralığında)
+    """
+    boxes = detections_to_array(detections)
+    height, width = frame_shape[:2]
+    points = np.empty((len(boxes), 2), dtype=np.float32)
+    points[:, 0] = (boxes[:, 0] + boxes[:, 2] * 0.5) / width
+    points[:, 1] = (boxes[:, 1] + boxes[:, 3]) / height
+    return np.clip(points, 0.0, 0.999999, out=points)
+
+
+def grid_region_shares(grid):
+    """
+    Izgaradaki kişi-saniyenin yatay bölgelere dağılımı.
+
+    Returns:
+        dict: {'Sol': oran, 'Merkez': oran, 'Sağ': oran}
+    """
+    columns = grid.sum(axis=0)
+    total = float(columns.sum())
+    bounds = np.linspace(0, len(columns), len(REGION_NAMES) + 1).round().astype(int)
+    return {name: round(float(columns[bounds[i]:bounds[i + 1]].sum()) / total, 3) if total else 0.0
+            for i, name in enumerate(REGION_NAMES)}
+
+
+def hour_floor(timestamp):
+    """Zamanın içinde bulunduğu yerel saatin başlangıcı"""
+    return datetime.fromtimestamp(timestamp).replace(minute=0, second=0, microsecond=0).timestamp()
+
+
+def hour_key(timestamp):
+    """Saatlik dosya adı anahtarı"""
+    return datetime.fromtimestamp(timestamp).strftime(HOUR_FORMAT)
+
+
+class OccupancyHeatmap:
+    """Tek kamera için artımlı güncellenen doluluk ızgarası"""
+
+    def __init__(self, camera_id='0', grid=HEATMAP_GRID, half_life_hours=HEATMAP_HALF_LIFE_HOURS,
+                 directory=HEATMAP_DIR, zone_map=None):
+        """
+        Args:
+            camera_id: Dosya dizini ve API için kamera adı
+            grid: (satır, sütun) hücre sayısı
+            half_life_hours: Canlı ızgaranın yarı ömrü (saat)
+            zone_map: Bölge dağılımı için kameranın ZoneMap'i (None -> Sol / Merkez / Sağ)
+        """
+        self.camera_id = str(camera_id)
+        self.zone_map = zone_map
+        self.rows, self.cols = grid
+        self.decay_per_hour = 0.5 ** (1.0 / half_life_hours) if half_life_hours else 1.0
+        self.directory = Path(directory) / self.camera_id
+        self.logger = get_logger("heatmap")
+
+        self._live = np.zeros(self.rows * self.cols, dtype=np.float32)
+        self._hour = np.zeros(self.rows * self.cols, dtype=np.float32)
+        self._hour_start = None    # Mevcut saatin başlangıcı (unix saniye, saat hizalı)
+        self._last_timestamp = None
+        self._lock = threading.Lock()
+
+        self.version = 0
+        self._png_cache = {}       # (saat, genişlik) -> (sürüm, png)
+
+    def load(self):
+        """Kayıtlı canlı ızgarayı yükle ve aradan geçen saatler kadar sönümle"""
+        path = self.directory / 'state.npz'
+        if not path.exists():
+            return False
+        try:
+            with np.load(path) as data:
+                live = data['live']
+                hour = data['hour']
+                hour_start = float(data['hour_start'])
+            if live.shape != self._live.shape:
+                self.logger.info(f"Isı haritası ızgarası değişti, kayıt atlandı: {path}")
+                return False
+            with self._lock:
+                self._live[:] = live
+                self._hour[:] = hour
+                self._hour_start = hour_start
+                self._roll_hour(time.time())
+                self.version += 1
+            return True
+        except Exception as e:
+            self.logger.error(f"Isı haritası yükleme hatası: {e}")
+            return False
+
+    def update(self, frame_shape, detections, timestamp=None):
+        """
+        Frame'deki kişilerin ayak noktalarına frame süresi kadar ağırlık ekle.
+
+        Args:
+            frame_shape: Tespitlerin yapıldığı frame'in şekli
+            detections: Takip edilen kişilerin tespitleri
+            timestamp: Frame zamanı (unix saniye)
+        """
+        now = timestamp if timestamp is not None else time.time()
+        step = 0.0 if self._last_timestamp is None else min(max(now - self._last_timestamp, 0.0), MAX_FRAME_STEP)
+        self._last_timestamp = now
+
+        with stage_timer('heatmap'), self._lock:
+            if self._hour_start is None or now >= self._hour_start + 3600:
+                self._roll_hour(now)
+            if not detections or step == 0.0:
+                return
+
+            points = foot_points(frame_shape, detections)
+            cells = (points[:, 1] * self.rows).astype(np.intp) * self.cols + (points[:, 0] * self.cols).astype(np.intp)
+            np.add.at(self._live, cells, step)
+            np.add.at(self._hour, cells, step)
+            self.version += 1
+
+    def _roll_hour(self, now):
+        """Saat değiştiyse biten saati diske yaz ve canlı ızgarayı sönümle (kilit tutulurken)"""
+        current_start = hour_floor(now)
+        if self._hour_start is not None:
+            if current_start <= self._hour_start:
+                return
+            if self._hour.any():
+                self._write_hour(self._hour_start, self._hour)
+            elapsed_hours = (current_start - self._hour_start) / 3600
+            self._live *= self.decay_per_hour ** elapsed_hours
+            self._hour[:] = 0.0
+            self.version += 1
+            self._write_state(current_start)
+        self._hour_start = current_start
+
+    def _write_hour(self, hour_start, grid):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(self.directory / f"{hour_key(hour_start)}.npz",
+                                grid=grid.reshape(self.rows, self.cols), hour_start=hour_start)
+        except Exception as e:
+            self.logger.error(f"Saatlik ısı haritası kaydetme hatası: {e}")
+
+    def _write_state(self, hour_start):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(self.directory / 'state.npz', live=self._live, hour=self._hour,
+                                hour_start=hour_start)
+        except Exception as e:
+            self.logger.error(f"Isı haritası durum kaydetme hatası: {e}")
+
+    def save(self):
+        """Canlı ızgarayı ve yarım kalan saati kaydet (durdururken)"""
+        with self._lock:
+            if self._hour_start is None:
+                return
+            if self._hour.any():
+                self._write_hour(self._hour_start, self._hour)
+            self._write_state(self._hour_start)
+
+    def list_hours(self):
+        """Kaydedilmiş saatlik ızgaralar (eskiden yeniye)"""
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob('*_*.npz'))
+
+    def grid(self, hour=None):
+        """
+        Izgaranın kopyası.
+
+        Args:
+            hour: 'YYYYmmdd_HH' verilirse o saatin ham ızgarası, yoksa canlı ızgara
+
+        Returns:
+            np.ndarray: (satır, sütun) kişi-saniye veya None
+        """
+        if hour is None or (self._hour_start is not None and hour == hour_key(self._hour_start)):
+            with self._lock:
+                source = self._live if hour is None else self._hour
+                return source.reshape(self.rows, self.cols).copy()
+
+        try:
+            datetime.strptime(hour, HOUR_FORMAT)
+        except ValueError:
+            return None
+        path = self.directory / f"{hour}.npz"
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return data['grid'].astype(np.float32)
+
+    def _grid_version(self, hour):
+        """PNG önbelleği için ızgara sürümü (saatlik dosyalar değişmez)"""
+        if hour is None or (self._hour_start is not None and hour == hour_key(self._hour_start)):
+            return self.version
+        return 0
+
+    def render_png(self, width=HEATMAP_PNG_WIDTH, hour=None):
+        """
+        Izgarayı yarı saydam renkli PNG'ye çevir (kamera görüntüsü üzerine bindirilebilir).
+
+        Returns:
+            tuple: (png byte'ları, sürüm) veya (None, None)
+        """
+        cache_key = (hour, width)
+        version = self._grid_version(hour)
+        cached = self._png_cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            return cached[1], version
+
+        grid = self.grid(hour)
+        if grid is None:
+            return None, None
+
+        peak = float(grid.max())
+        normalized = np.sqrt(grid / peak) if peak > 0 else grid
+        height = max(int(round(width * self.rows / self.cols)), 1)
+        smooth = cv2.resize(normalized, (width, height), interpolation=cv2.INTER_CUBIC)
+        step = 256 // PNG_LEVELS
+        levels = (np.clip(smooth * 255, 0, 255).astype(np.uint8) // step) * step
+
+        image = cv2.cvtColor(cv2.applyColorMap(levels, cv2.COLORMAP_JET), cv2.COLOR_BGR2BGRA)
+        image[:, :, 3] = np.minimum(levels.astype(np.uint16) * 3 // 4 + 32 * (levels > 0), 255)
+        ok, png = cv2.imencode('.png', image)
+        if not ok:
+            return None, None
+
+        if len(self._png_cache) >= PNG_CACHE_SIZE:
+            self._png_cache.pop(next(iter(self._png_cache)))
+        self._png_cache[cache_key] = (version, png.tobytes())
+        return png.tobytes(), version
+
+    def region_shares(self, hour=None):
+        """
+        Canlı (veya saatlik) ızgaranın bölge dağılımı.
+
+        Returns:
+            dict: {bölge adı: oran}
+        """
+        grid = self.grid(hour)
+        if grid is None:
+            return {}
+        return self.zone_map.grid_shares(grid) if self.zone_map is not None else grid_region_shares(grid)
+
+    def day_grid(self, day):
+        """
+        Bir günün saatlik ızgaralarının toplamı.
+
+        Args:
+            day: datetime.date
+
+        Returns:
+            np.ndarray veya None (kayıt yoksa)
+        """
+        prefix = day.strftime('%Y%m%d')
+        grids = [self.grid(hour) for hour in self.list_hours() if hour.startswith(prefix)]
+        grids = [grid for grid in grids if grid is not None and grid.shape == (self.rows, self.cols)]
+        return np.sum(grids, axis=0) if grids else None
+
+    def get_stats(self):
+        """
+        Harita durumu.
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            total = float(self._live.sum())
+        return {
+            'camera_id': self.camera_id,
+            'grid': [self.rows, self.cols],
+            'version': self.version,
+            'live_person_seconds': round(total, 1),
+            'hours': self.list_hours(),
+            'regions': self.region_shares()
+        }
@@ -0,0 +1,742 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Yapılandırılabilir İşleme Hattı
+Kamera frame'lerini sıralı aşamalardan (kaynak -> filtreler -> dedektör ->
+takip -> çıkışlar) geçiren, aşamaları kendi thread'lerinde çalıştıran hat.
+
+- Hat, sıralı aşama tanımlarından kurulur; mağaza başına data/pipeline.json
+  aşamaları kapatıp açabilir ve kuyruk / politika / mod ayarlarını değiştirir:
+      {"motion_gate": {"enabled": true, "threshold": 0.02},
+       "demographics": {"enabled": false},
+       "detector": {"queue": 1}}
+- Aşama modları: 'thread' (kendi thread'i ve sınırlı kuyruğu), 'inline'
+  (önceki aşamanın thread'inde) ve 'process' (DetectorPool worker'ları).
+- Kuyruk dolunca politika: 'drop_oldest' (en eski frame atılır, canlı
+  görüntü için), 'drop_newest' (gelen atılır) veya 'block' (üretici bekler;
+  sayım gibi kayıp istenmeyen aşamalar için). Kamera thread'i hiçbir zaman
+  bloklanmaz: ilk kuyruklu aşama 'block' olsa bile submit() frame'i atlar.
+- Her aşamanın işlediği / elediği / attığı frame sayısı, meşguliyeti ve
+  kuyruk derinliği get_stats() ve Prometheus metrikleriyle izlenir.
+- Yük altında aşamalar atlanabilir (set_bypass) ve dedektöre her N
+  frame'den biri verilebilir (sample_every); bkz. load_shedder.
+- Dal aşamaları ('branch': true, örn. canlı yayın) ana hattın dışındadır:
+  hareket kapısı ve örneklemeden önce her kamera frame'ini alırlar, çıktıları
+  ana hatta dönmez.
+"""
+
+import abc
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from metrics import metrics_registry, stage_timer, FRAMES_DROPPED
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+PIPELINE_FILE = getattr(SETTINGS, 'PIPELINE_FILE', 'data/pipeline.json')
+DEFAULT_QUEUE_SIZE = 4
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+MODES = ('thread', 'inline', 'process')
+BLOCK_POLL_SECONDS = 0.1
+
+# Hareket kapısı: küçültülmüş gri frame'de değişen piksel oranı
+MOTION_SCALE_WIDTH = 160
+MOTION_PIXEL_DELTA = 25
+MOTION_THRESHOLD = getattr(SETTINGS, 'MOTION_THRESHOLD', 0.01)
+MOTION_MAX_SKIP = getattr(SETTINGS, 'MOTION_MAX_SKIP', 30)
+
+PIPELINE_ITEMS = metrics_registry.counter(
+    'pipeline_items_total', 'Aşama başına frame sonuçları', labels=('stage', 'result'))
+PIPELINE_BUSY_SECONDS = metrics_registry.counter(
+    'pipeline_stage_busy_seconds_total', 'Aşamaların frame işlemekle geçirdiği süre', labels=('stage',))
+PIPELINE_QUEUE_DEPTH = metrics_registry.gauge(
+    'pipeline_queue_depth', 'Aşama kuyruğunda bekleyen frame', labels=('stage',))
+PIPELINE_LATENCY = metrics_registry.histogram(
+    'pipeline_latency_seconds', 'Frame yakalamadan hattın sonuna kadar geçen süre')
+
+
+class Packet:
+    """Hat boyunca taşınan frame ve aşamaların eklediği sonuçlar"""
+
+    __slots__ = ('seq', 'timestamp', 'frame', 'owned', 'frame_step', 'detections', 'track_update',
+                 'verified', 'verified_update', 'counted')
+
+    def __init__(self, seq, timestamp, frame, frame_step=1):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self.owned = False          # Frame kameradan kopyalandı mı
+        self.frame_step = frame_step    # Kabul edildiğinde dedektöre her kaç frame'den biri veriliyordu
+        self.detections = []
+        self.track_update = None
+        self.verified = []
+        self.verified_update = None
+        self.counted = []
+
+
+class StageQueue:
+    """Sınırlı, politikalı aşama kuyruğu"""
+
+    def __init__(self, size=DEFAULT_QUEUE_SIZE, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError(f"Geçersiz kuyruk politikası: {policy}")
+        self.size = max(1, int(size))
+        self.policy = policy
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, item, block=True):
+        """
+        Kuyruğa ekle.
+
+        Args:
+            item: Eklenecek paket
+            block: False ise 'block' politikasında da beklenmez (kuyruk doluysa atılır)
+
+        Returns:
+            int: Bu ekleme yüzünden atılan paket sayısı (0 veya 1)
+        """
+        with self._condition:
+            if self._closed:
+                return 1
+            if len(self._items) >= self.size:
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self._items.append(item)
+                    self._condition.notify()
+                    return 1
+                if self.policy == 'drop_newest' or not block:
+                    return 1
+                while len(self._items) >= self.size and not self._closed:
+                    self._condition.wait(BLOCK_POLL_SECONDS)
+                if self._closed:
+                    return 1
+            self._items.append(item)
+            self._condition.notify_all()
+            return 0
+
+    def get(self):
+        """
+        Sıradaki paketi al (gelene kadar bekler).
+
+        Returns:
+            Packet: Kuyruk kapatılıp boşaldıysa None
+        """
+        with self._condition:
+            while not self._items:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """Yeni paket kabul etme; bekleyenler işlenince get() None döner"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Stage:
+    """
+    Hat aşaması. Alt sınıflar process() yazar: paketi (değiştirerek)
+    döndürür ya da None döndürerek frame'i hattan çıkarır.
+    """
+
+    def __init__(self, name, mode='thread', queue_size=DEFAULT_QUEUE_SIZE, policy='block', branch=False):
+        """
+        Args:
+            name: Aşama adı (istatistik ve metrik etiketi)
+            mode: 'thread', 'inline' veya 'process'
+            queue_size: Kuyruk uzunluğu (thread modu)
+            policy: Kuyruk doluyken davranış
+            branch: True ise ana hattın dışında, her kamera frame'iyle çalışan dal
+        """
+        if mode not in MODES:
+            raise ValueError(f"Geçersiz aşama modu: {mode}")
+        if policy not in POLICIES:
+            raise ValueError(f"Geçersiz kuyruk politikası: {policy}")
+        if mode == 'process' and (branch or not isinstance(self, ProcessStage)):
+            raise ValueError(f"'process' modu dal olmayan bir ProcessStage gerektirir: {name}")
+        self.name = name
+        self.mode = mode
+        self.queue_size = queue_size
+        self.policy = policy
+        self.branch = branch
+        self.bypassed = False       # True ise paketler aşamaya uğramadan geçer
+        self.stats = {'processed': 0, 'filtered': 0, 'dropped': 0, 'errors': 0, 'busy_seconds': 0.0}
+
+    def setup(self, sample_frame=None):
+        """
+        Hat başlarken çağrılır.
+
+        Returns:
+            bool: Aşama çalışmaya hazırsa True
+        """
+        return True
+
+    def teardown(self):
+        """Hat durunca çağrılır"""
+
+    def process(self, packet):
+        return packet
+
+    def get_memory_info(self):
+        """Aşamanın kuyruk dışında tuttuğu paketler / buffer'lar (yoksa None)"""
+        return None
+
+
+class ProcessStage(Stage, abc.ABC):
+    """'process' modunda çalışabilen aşama: paketler worker'lara gönderilir, sonuçlar geri çağrıyla döner"""
+
+    @abc.abstractmethod
+    def submit(self, packet, downstream):
+        """
+        Paketi gönder (beklenmez); sonuç gelince downstream(packet) çağrılır.
+
+        Returns:
+            bool: Paket kabul edilmediyse False (frame atlandı)
+        """
+
+
+class FunctionStage(Stage):
+    """Tek fonksiyonluk aşama: func(packet) -> packet veya None"""
+
+    def __init__(self, name, func, **options):
+        super().__init__(name, **options)
+        self.func = func
+
+    def process(self, packet):
+        return self.func(packet)
+
+
+class DetectorStage(ProcessStage):
+    """
+    HumanDetector aşaması. workers > 0 ise 'process' modunda çalışır:
+    frame'ler DetectorPool worker'larına gider, sonuçlar sırayla döner.
+    """
+
+    def __init__(self, detector=None, workers=0, **options):
+        if workers:
+            options['mode'] = 'process'
+        options.setdefault('queue_size', 2)
+        options.setdefault('policy', 'drop_oldest')
+        super().__init__(options.pop('name', 'detector'), **options)
+        self.detector = detector
+        self.workers = workers
+        self.pool = None
+        self._packets = {}
+        self._downstream = None
+        self._lock = threading.Lock()
+
+    def setup(self, sample_frame=None):
+        if self.mode != 'process':
+            return True
+        if sample_frame is None:
+            get_logger("pipeline").error("Detector havuzu için örnek frame gerekli")
+            return False
+
+        from detector_pool import DetectorPool
+
+        self.pool = DetectorPool(self.workers, on_result=self._on_result)
+        if not self.pool.start(sample_frame.shape, sample_frame.dtype):
+            self.pool = None
+            return False
+        return True
+
+    def teardown(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self._packets.clear()
+
+    def process(self, packet):
+        with stage_timer('inference'):
+            detections, _ = self.detector.detect_humans(packet.frame, draw_boxes=False)
+        packet.detections = detections or []
+        return packet
+
+    def submit(self, packet, downstream):
+        """
+        Frame'i havuza gönder (shared memory'ye kopyalanır, beklenmez).
+
+        Returns:
+            bool: Boş slot yoksa False (frame atlandı)
+        """
+        if self.pool is None:
+            return False
+        self._downstream = downstream
+        with self._lock:
+            seq = self.pool.submit(packet.frame)
+            if seq is None:
+                return False
+            self._packets[seq] = (packet, time.perf_counter())
+        return True
+
+    def _on_result(self, seq, frame, detections):
+        """Havuz sonucu (sırayla): paketi tamamla ve sonraki aşamaya geç"""
+        with self._lock:
+            packet, submitted_at = self._packets.pop(seq, (None, 0.0))
+            # Daha küçük sıra numaralı paketlerin sonucu kayıp (havuz atladı)
+            for lost in [s for s in self._packets if s < seq]:
+                self._packets.pop(lost)
+        if packet is None or frame is None:
+            return
+        self.stats['processed'] += 1
+        self.stats['busy_seconds'] += time.perf_counter() - submitted_at
+        PIPELINE_ITEMS.labels(stage=self.name, result='processed').inc()
+        packet.detections = detections or []
+        self._downstream(packet)
+
+    def get_memory_info(self):
+        return {'in_flight': len(self._packets),
+                'pool': self.pool.get_memory_info() if self.pool is not None else None}
+
+
+class MotionGate(Stage):
+    """
+    Hareket kapısı: son geçen frame'e göre yeterince değişmeyen frame'ler
+    dedektöre gitmez. Durağan sahnede bile her max_skip frame'de bir frame
+    geçer (track'ler yaşlanır, alarmlar güncellenir).
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_skip=MOTION_MAX_SKIP,
+                 scale_width=MOTION_SCALE_WIDTH, **options):
+        options.setdefault('mode', 'inline')
+        super().__init__(options.pop('name', 'motion_gate'), **options)
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.scale_width = scale_width
+        self._reference = None
+        self._skipped = 0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.scale_width, max(1, height * self.scale_width // width))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(cv2.resize(gray, size, interpolation=cv2.INTER_AREA), (5, 5), 0)
+
+    def process(self, packet):
+        small = self._small_gray(packet.frame)
+        if self._reference is not None and self._reference.shape == small.shape and \
+                self._skipped < self.max_skip:
+            changed = np.count_nonzero(cv2.absdiff(small, self._reference) > MOTION_PIXEL_DELTA)
+            if changed < self.threshold * small.size:
+                self._skipped += 1
+                return None
+        self._reference = small
+        self._skipped = 0
+        return packet
+
+    def teardown(self):
+        self._reference = None
+        self._skipped = 0
+
+
+class RoiFilter(Stage):
+    """
+    İlgi alanı filtresi: ayak noktası normalize dikdörtgen veya isimli
+    bölgeler dışında kalan tespitler sonraki aşamalara gitmez (vitrin
+    önünden geçenler, dış kapı camı vb.). Frame'ler hattan çıkarılmaz.
+    """
+
+    def __init__(self, rect=None, zones=None, zone_map=None, **options):
+        options.setdefault('mode', 'inline')
+        super().__init__(options.pop('name', 'roi'), **options)
+        self.rect = tuple(rect) if rect else None
+        self.zone_map = zone_map
+        self.zone_ids = None
+        if zones:
+            if zone_map is None:
+                raise ValueError("Bölge adıyla ilgi alanı için bölge haritası gerekli")
+            self.zone_ids = [zone_map.zone_id(name) for name in zones]
+
+    def process(self, packet):
+        if not packet.detections or (self.rect is None and self.zone_ids is None):
+            return packet
+
+        from occupancy_heatmap import foot_points
+
+        keep = np.ones(len(packet.detections), dtype=bool)
+        if self.rect is not None:
+            points = foot_points(packet.frame.shape, packet.detections)
+            x0, y0, x1, y1 = self.rect
+            keep &= ((points[:, 0] >= x0) & (points[:, 0] <= x1) &
+                     (points[:, 1] >= y0) & (points[:, 1] <= y1))
+        if self.zone_ids is not None:
+            keep &= np.isin(self.zone_map.assign(packet.frame.shape, packet.detections), self.zone_ids)
+        packet.detections = [detection for detection, inside in zip(packet.detections, keep) if inside]
+        return packet
+
+
+# Uygulamaya bağlı olmayan aşama tipleri
+STAGE_TYPES = {
+    'motion_gate': MotionGate,
+    'roi': RoiFilter,
+}
+
+
+def wait_for_frame(camera_manager, timeout=5.0):
+    """
+    Kameranın ilk frame'ini bekle (process modundaki dedektörün frame boyutu için).
+
+    Returns:
+        np.ndarray: Frame, zamanında gelmezse None
+    """
+    deadline = time.time() + timeout
+    frame = camera_manager.get_current_frame()
+    while frame is None and time.time() < deadline:
+        time.sleep(0.05)
+        frame = camera_manager.get_current_frame()
+    return frame
+
+
+def load_overrides(path=PIPELINE_FILE):
+    """
+    Mağazanın aşama ayarlarını oku.
+
+    Returns:
+        dict: {aşama adı: ayarlar} (dosya yoksa boş)
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return {str(name): dict(options) for name, options in json.loads(path.read_text(encoding='utf-8')).items()}
+    except Exception as e:
+        get_logger("pipeline").error(f"Pipeline dosyası okuma hatası: {e}")
+        return {}
+
+
+class Pipeline:
+    """Aşamaları sırayla bağlayan, thread'li işleme hattı"""
+
+    def __init__(self, stages, name='pipeline', on_error=None):
+        """
+        Args:
+            stages: Sıralı Stage listesi
+            name: Thread adlarının ön eki
+            on_error: Aşama hatasında on_error(stage, exception) (watchdog sayaçları için)
+        """
+        self.stages = list(stages)
+        self.branches = [index for index, stage in enumerate(self.stages) if stage.branch]
+        self.name = name
+        self.on_error = on_error
+        self._queues = {}
+        self._threads = []
+        self._seq = 0
+        self._accepting = False
+        self.started_at = None
+
+        # Yük azaltma: dedektöre her N frame'den biri verilir
+        self.sample_every = 1
+        self.sampled_out = 0
+
+        # Hattın sonuna ulaşan frame'ler ve toplam gecikmeleri
+        self.completed = 0
+        self.latency_seconds = 0.0
+        self.last_completed_at = None
+        self.logger = get_logger("pipeline")
+
+    @classmethod
+    def from_definition(cls, definition, factories=None, overrides=None, **kwargs):
+        """
+        Tanımdan hat kur.
+
+        Args:
+            definition: Sıralı aşama tanımları [{'stage': 'tracker', 'queue': 8, ...}, ...]
+            factories: {aşama adı: factory(**ayarlar)} uygulamaya bağlı aşamalar
+            overrides: {aşama adı: ayarlar} mağaza ayarları (None -> data/pipeline.json)
+
+        Returns:
+            Pipeline
+        """
+        factories = dict(STAGE_TYPES, **(factories or {}))
+        overrides = load_overrides() if overrides is None else overrides
+        unknown = set(overrides) - {spec['stage'] for spec in definition}
+        if unknown:
+            get_logger("pipeline").error(f"Pipeline ayarında bilinmeyen aşamalar: {sorted(unknown)}")
+
+        stages = []
+        for spec in definition:
+            spec = dict(spec, **overrides.get(spec['stage'], {}))
+            kind = spec.pop('stage')
+            if not spec.pop('enabled', True):
+                continue
+            if 'queue' in spec:
+                spec['queue_size'] = spec.pop('queue')
+            if kind not in factories:
+                raise ValueError(f"Bilinmeyen aşama: {kind}")
+            stages.append(factories[kind](**spec))
+        return cls(stages, **kwargs)
+
+    @property
+    def submitted(self):
+        """Hatta verilen frame sayısı"""
+        return self._seq
+
+    def get_stage(self, name):
+        """İsimli aşama (hatta yoksa None)"""
+        return next((stage for stage in self.stages if stage.name == name), None)
+
+    def start(self, sample_frame=None):
+        """
+        Aşamaları hazırla ve thread'lerini başlat.
+
+        Args:
+            sample_frame: Örnek kamera frame'i (process modundaki dedektör için)
+
+        Returns:
+            bool: Tüm aşamalar hazırsa True
+        """
+        ready = []
+        for stage in self.stages:
+            if not stage.setup(sample_frame):
+                self.logger.error(f"Aşama başlatılamadı: {stage.name}")
+                for started in ready:
+                    started.teardown()
+                return False
+            ready.append(stage)
+
+        for index, stage in enumerate(self.stages):
+            if stage.mode != 'thread':
+                continue
+            self._queues[index] = StageQueue(stage.queue_size, stage.policy)
+            thread = threading.Thread(target=self._run_stage, args=(index,),
+                                      name=f'{self.name}-{stage.name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self._accepting = True
+        self.started_at = self.last_completed_at = time.time()
+        chain = ' -> '.join(f'{s.name}[{s.mode}]' for s in self.stages if not s.branch)
+        branches = ', '.join(f'{s.name}[{s.mode}]' for s in self.stages if s.branch)
+        self.logger.info(f"🔗 Pipeline: {chain}" + (f" | dal: {branches}" if branches else ''))
+        return True
+
+    def stop(self, timeout=5.0):
+        """Yeni frame kabul etme, kuyruktakileri sırayla bitir ve aşamaları kapat"""
+        self._accepting = False
+        deadline = time.time() + timeout
+        threads = dict(zip(sorted(self._queues), self._threads))
+        closed = set()
+        for index, stage in enumerate(self.stages):
+            if index in threads:
+                self._queues[index].close()
+                threads[index].join(timeout=max(0.1, deadline - time.time()))
+            elif stage.mode == 'process':
+                # Havuz kapanınca sonraki aşamalara yeni sonuç gelmez
+                self._teardown(stage)
+                closed.add(index)
+        for index, stage in enumerate(self.stages):
+            if index not in closed:
+                self._teardown(stage)
+        self._queues = {}
+        self._threads = []
+
+    def _teardown(self, stage):
+        try:
+            stage.teardown()
+        except Exception as e:
+            self.logger.error(f"Aşama kapatma hatası ({stage.name}): {e}")
+
+    def submit(self, frame, timestamp=None):
+        """
+        Kamera frame'ini hatta ver (kamera thread'i bloklanmaz).
+
+        Returns:
+            bool: Frame kabul edildiyse True (kapı / kuyruk tarafından atılmadıysa)
+        """
+        if frame is None or not self._accepting:
+            return False
+        self._seq += 1
+        timestamp = timestamp if timestamp is not None else time.time()
+        # Dallar (canlı yayın) hareket kapısı ve örneklemeden önce her frame'i alır
+        for index in self.branches:
+            self._dispatch_branch(index, Packet(self._seq, timestamp, frame))
+        if self.sample_every > 1 and self._seq % self.sample_every:
+            self.sampled_out += 1
+            return False
+        return self._dispatch(0, Packet(self._seq, timestamp, frame, self.sample_every), block=False)
+
+    def _dispatch_branch(self, index, packet):
+        """Paketi dal aşamasına ver (kamera thread'i beklemez, çıktı ana hatta dönmez)"""
+        stage = self.stages[index]
+        if stage.bypassed:
+            return
+        if stage.mode == 'inline':
+            self._run(stage, packet)
+            return
+        packet.frame = packet.frame.copy()
+        packet.owned = True
+        queue = self._queues.get(index)
+        dropped = queue.put(packet, block=False) if queue is not None else 1
+        PIPELINE_QUEUE_DEPTH.labels(stage=stage.name).set(len(queue) if queue is not None else 0)
+        if dropped:
+            self._drop(stage)
+
+    def _dispatch(self, index, packet, block=True):
+        """Paketi index'teki aşamadan itibaren ilerlet (kuyruklu aşamaya kadar bu thread'de)"""
+        while index < len(self.stages):
+            stage = self.stages[index]
+            if stage.bypassed or stage.branch:
+                index += 1
+                continue
+            if stage.mode != 'inline' and not packet.owned:
+                # Kamera tamponu bir sonraki frame'de değişebilir
+                packet.frame = packet.frame.copy()
+                packet.owned = True
+
+            if stage.mode == 'thread':
+                queue = self._queues.get(index)
+                dropped = queue.put(packet, block=block) if queue is not None else 1
+                PIPELINE_QUEUE_DEPTH.labels(stage=stage.name).set(len(queue) if queue is not None else 0)
+                if dropped:
+                    self._drop(stage)
+                return not dropped or stage.policy == 'drop_oldest'
+
+            if stage.mode == 'process':
+                if not stage.submit(packet, lambda result, i=index: self._dispatch(i + 1, result)):
+                    self._drop(stage)
+                    return False
+                return True
+
+            packet = self._run(stage, packet)
+            if packet is None:
+                return False
+            index += 1
+
+        self.last_completed_at = time.time()
+        latency = self.last_completed_at - packet.timestamp
+        self.completed += 1
+        self.latency_seconds += latency
+        PIPELINE_LATENCY.observe(latency)
+        return True
+
+    def set_bypass(self, names, bypassed=True):
+        """
+        Aşamaları atla veya geri aç.
+
+        Returns:
+            list: Hatta bulunan ve durumu değişen aşama adları
+        """
+        changed = []
+        for stage in self.stages:
+            if stage.name in names and stage.bypassed != bypassed:
+                stage.bypassed = bypassed
+                changed.append(stage.name)
+        return changed
+
+    def queue_fill(self, policy='block'):
+        """
+        Verilen politikadaki kuyrukların en yüksek doluluk oranı.
+
+        Returns:
+            float: 0-1 (kuyruk yoksa 0)
+        """
+        fills = [len(queue) / queue.size for queue in self._queues.values() if queue.policy == policy]
+        return max(fills) if fills else 0.0
+
+    def _drop(self, stage):
+        stage.stats['dropped'] += 1
+        PIPELINE_ITEMS.labels(stage=stage.name, result='dropped').inc()
+        FRAMES_DROPPED.inc()
+
+    def _run(self, stage, packet):
+        """Aşamayı tek paket için çalıştır ve ölç"""
+        started = time.perf_counter()
+        try:
+            result = stage.process(packet)
+        except Exception as e:
+            result = None
+            stage.stats['errors'] += 1
+            PIPELINE_ITEMS.labels(stage=stage.name, result='error').inc()
+            self.logger.error(f"Aşama hatası ({stage.name}): {e}")
+            if self.on_error is not None:
+                self.on_error(stage, e)
+        else:
+            outcome = 'processed' if result is not None else 'filtered'
+            stage.stats[outcome] += 1
+            PIPELINE_ITEMS.labels(stage=stage.name, result=outcome).inc()
+        elapsed = time.perf_counter() - started
+        stage.stats['busy_seconds'] += elapsed
+        PIPELINE_BUSY_SECONDS.labels(stage=stage.name).inc(elapsed)
+        return result
+
+    def _run_stage(self, index):
+        """Kuyruklu aşamanın thread döngüsü"""
+        stage = self.stages[index]
+        queue = self._queues[index]
+        while True:
+            packet = queue.get()
+            if packet is None:
+                break
+            PIPELINE_QUEUE_DEPTH.labels(stage=stage.name).set(len(queue))
+            packet = self._run(stage, packet)
+            if packet is not None and not stage.branch:
+                self._dispatch(index + 1, packet)
+
+    def get_memory_info(self):
+        """
+        Kuyruklarda bekleyen ve aşamaların tuttuğu paketler.
+
+        Returns:
+            dict
+        """
+        queues = {}
+        stages = {}
+        for index, stage in enumerate(self.stages):
+            queue = self._queues.get(index)
+            if queue is not None:
+                queues[stage.name] = {'depth': len(queue), 'size': queue.size}
+            info = stage.get_memory_info()
+            if info is not None:
+                stages[stage.name] = info
+        return {'queued_packets': sum(queue['depth'] for queue in queues.values()),
+                'queues': queues, 'stages': stages}
+
+    def get_stats(self):
+        """
+        Aşama başına throughput, meşguliyet ve kuyruk durumu.
+
+        Returns:
+            dict
+        """
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        stages = []
+        for index, stage in enumerate(self.stages):
+            stats = stage.stats
+            handled = stats['processed'] + stats['filtered'] + stats['errors']
+            queue = self._queues.get(index)
+            stages.append({
+                'name': stage.name,
+                'mode': stage.mode,
+                'branch': stage.branch,
+                'policy': stage.policy if stage.mode == 'thread' else None,
+                'queue_size': stage.queue_size if stage.mode == 'thread' else None,
+                'queue_depth': len(queue) if queue is not None else 0,
+                'processed': stats['processed'],
+                'filtered': stats['filtered'],
+                'dropped': stats['dropped'],
+                'errors': stats['errors'],
+                'bypassed': stage.bypassed,
+                'fps': round(handled / elapsed, 2) if elapsed else 0.0,
+                'avg_ms': round(stats['busy_seconds'] / handled * 1000, 2) if handled else 0.0,
+                # process modunda gönderimden sonuca geçen süre (worker'lar paralel)
+                'utilization': round(stats['busy_seconds'] / elapsed, 3) if elapsed and stage.mode != 'process'
+                else None
+            })
+        return {'running': self._accepting, 'uptime_seconds': round(elapsed, 1),
+                'submitted': self._seq, 'sample_every': self.sample_every, 'sampled_out': self.sampled_out,
+                'completed': self.completed,
+                'avg_latency_ms': round(self.latency_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+                'stages': stages}
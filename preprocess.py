@@ -0,0 +1,162 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Model Girdisi Hazırlama (Letterbox)
+Frame'i tespit modelinin girdisine dönüştürür: en-boy oranı korunarak
+yeniden boyutlandırma + kenar doldurma (letterbox) + BGR->RGB + 0-1
+ölçekleme + HWC->CHW. Her frame'de yeni dizi ayrılmaz:
+
+- Yeniden boyutlandırılmış görüntü ve (1, 3, H, W) float32 girdi tamponu
+  frame boyutu değişene kadar tekrar kullanılır; cv2.resize(dst=...) tampona
+  yazar.
+- Kanal değişimi, transpoze ve ölçekleme tek numpy ufunc çağrısıyla
+  doğrudan girdi tamponunun içerik bölgesine yazılır (ara kopya yok).
+- Dolgu bölgesi sadece geometri değişince doldurulur.
+- Model çıktısındaki kutular to_frame() ile frame koordinatlarına
+  geri çevrilir.
+
+Girdi tamponu bir sonraki çağrıda üzerine yazılır; model çağrısı
+bitmeden aynı Letterbox tekrar çağrılmamalıdır (dedektör başına bir tane).
+"""
+
+import cv2
+import numpy as np
+
+from metrics import stage_timer
+from src.config.settings import SETTINGS
+
+PROCESS_SIZE = (getattr(SETTINGS, 'PROCESS_WIDTH', 640), getattr(SETTINGS, 'PROCESS_HEIGHT', 480))
+MODEL_STRIDE = 32          # YOLO girdileri bu sayının katı olmalı
+LETTERBOX_VALUE = 114      # Dolgu rengi (YOLO eğitimindeki gri)
+INPUT_SCALE = np.float32(1.0 / 255.0)
+
+
+def letterbox_geometry(frame_shape, size, stride=MODEL_STRIDE):
+    """
+    Letterbox ölçeği ve yerleşimi.
+
+    Args:
+        frame_shape: (yükseklik, genişlik, ...) frame şekli
+        size: (genişlik, yükseklik) hedef boyut (stride katına yuvarlanır)
+
+    Returns:
+        tuple: (ölçek, (içerik genişliği, içerik yüksekliği), (sol dolgu, üst dolgu), (girdi genişliği, yüksekliği))
+    """
+    height, width = frame_shape[:2]
+    input_w = -(-size[0] // stride) * stride
+    input_h = -(-size[1] // stride) * stride
+    scale = min(size[0] / width, size[1] / height)
+    content_w = min(int(round(width * scale)), input_w)
+    content_h = min(int(round(height * scale)), input_h)
+    return scale, (content_w, content_h), ((input_w - content_w) // 2, (input_h - content_h) // 2), (input_w, input_h)
+
+
+class Letterbox:
+    """Tampon tekrar kullanan frame -> model girdisi dönüştürücü"""
+
+    def __init__(self, size=PROCESS_SIZE, stride=MODEL_STRIDE, interpolation=cv2.INTER_LINEAR):
+        """
+        Args:
+            size: (genişlik, yükseklik) hedef boyut (ör. PROCESS_WIDTH x PROCESS_HEIGHT)
+            stride: Girdi boyutlarının katı olacağı sayı
+            interpolation: cv2.resize yöntemi
+        """
+        self.size = (int(size[0]), int(size[1]))
+        self.stride = stride
+        self.interpolation = interpolation
+
+        self.frame_shape = None
+        self.scale = 1.0
+        self.pad = (0, 0)
+        self.blob = None
+        self._resized = None
+        self._content = None
+        self._content_size = None
+
+    def _configure(self, frame_shape):
+        """Yeni frame boyutu için tamponları ayır ve dolguyu doldur"""
+        self.scale, self._content_size, self.pad, (input_w, input_h) = letterbox_geometry(
+            frame_shape, self.size, self.stride)
+        content_w, content_h = self._content_size
+        pad_x, pad_y = self.pad
+
+        if self.blob is None or self.blob.shape[2:] != (input_h, input_w):
+            self.blob = np.empty((1, 3, input_h, input_w), dtype=np.float32)
+        self.blob.fill(LETTERBOX_VALUE * INPUT_SCALE)
+        self._content = self.blob[0, :, pad_y:pad_y + content_h, pad_x:pad_x + content_w]
+        same_size = (content_w, content_h) == (frame_shape[1], frame_shape[0])
+        self._resized = None if same_size else np.empty((content_h, content_w, 3), dtype=np.uint8)
+        self.frame_shape = frame_shape
+
+    def __call__(self, frame):
+        """
+        Frame'i model girdisine dönüştür.
+
+        Args:
+            frame: BGR uint8 (H, W, 3) frame
+
+        Returns:
+            np.ndarray: (1, 3, H, W) float32 RGB 0-1 girdi (kalıcı tampon)
+        """
+        with stage_timer('preprocess'):
+            if frame.shape != self.frame_shape:
+                self._configure(frame.shape)
+            image = frame
+            if self._resized is not None:
+                image = cv2.resize(frame, self._content_size, dst=self._resized, interpolation=self.interpolation)
+            # BGR->RGB (kanalları ters oku) + HWC->CHW + ölçekleme tek geçişte tampona
+            np.multiply(image.transpose(2, 0, 1)[::-1], INPUT_SCALE, out=self._content)
+        return self.blob
+
+    def to_frame(self, boxes, xyxy=False):
+        """
+        Girdi koordinatlarındaki kutuları frame koordinatlarına çevir (yerinde).
+
+        Args:
+            boxes: (N, >=4) float dizi; ilk 4 kolon x, y, w, h (veya xyxy=True ise x0, y0, x1, y1)
+            xyxy: Köşe koordinatlı kutular
+
+        Returns:
+            np.ndarray: Aynı dizi (frame sınırlarına kırpılmış)
+        """
+        if self.frame_shape is None or not len(boxes):
+            return boxes
+        height, width = self.frame_shape[:2]
+        pad_x, pad_y = self.pad
+        coords = boxes[:, :4]
+        if xyxy:
+            coords -= (pad_x, pad_y, pad_x, pad_y)
+            coords /= self.scale
+            np.clip(coords[:, 0::2], 0, width, out=coords[:, 0::2])
+            np.clip(coords[:, 1::2], 0, height, out=coords[:, 1::2])
+        else:
+            coords[:, :2] -= (pad_x, pad_y)
+            coords /= self.scale
+            # Kutunun frame dışına taşan kısmı kırpılır
+            x1 = np.minimum(coords[:, 0] + coords[:, 2], width)
+            y1 = np.minimum(coords[:, 1] + coords[:, 3], height)
+            np.maximum(coords[:, :2], 0, out=coords[:, :2])
+            coords[:, 2] = np.maximum(x1 - coords[:, 0], 0)
+            coords[:, 3] = np.maximum(y1 - coords[:, 1], 0)
+        return boxes
+
+    def to_input(self, boxes):
+        """Frame koordinatlı x, y, w, h kutuları girdi koordinatlarına çevir (yerinde)"""
+        if self.frame_shape is None or not len(boxes):
+            return boxes
+        boxes[:, :4] *= self.scale
+        boxes[:, :2] += self.pad
+        return boxes
+
+    def get_info(self):
+        """
+        Mevcut geometri.
+
+        Returns:
+            dict
+        """
+        return {
+            'size': list(self.size),
+            'frame_shape': list(self.frame_shape) if self.frame_shape is not None else None,
+            'input_shape': list(self.blob.shape) if self.blob is not None else None,
+            'scale': round(self.scale, 4),
+            'pad': list(self.pad)
+        }
@@ -0,0 +1,551 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Tekrar Gelen Müşteri Tanıma (Re-ID)
+Onaylanan her track için kompakt bir görünüm vektörü (embedding) çıkarılır,
+float16 olarak memory-mapped dosyada saklanır ve yaklaşık en yakın komşu
+(IVF) indeksiyle önceki ziyaretlerle karşılaştırılır.
+
+- Embedding: models/ altında ONNX re-ID modeli (ör. OSNet) varsa cv2.dnn ile,
+  yoksa üst/alt beden HSV renk histogramı (model gerektirmez).
+- Depolama: data/reid/embeddings.f16 (N x D float16), person_ids.i64, seen_at.f64
+- İndeks: küresel k-means ile nlist kümeye bölünür, sorguda en yakın nprobe
+  kümenin vektörleri taranır. Centroid'ler ve küme atamaları index.npz'de
+  saklanır; yeniden başlatmada eğitim tekrarlanmaz.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from metrics import metrics_registry
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+REID_DIR = getattr(SETTINGS, 'REID_DIR', 'data/reid')
+REID_MODEL_PATH = getattr(SETTINGS, 'REID_MODEL_PATH', 'models/osnet_x0_25.onnx')
+REID_MATCH_THRESHOLD = getattr(SETTINGS, 'REID_MATCH_THRESHOLD', 0.85)  # Kosinüs benzerliği
+REID_MIN_GAP_SECONDS = getattr(SETTINGS, 'REID_MIN_GAP_SECONDS', 1800)  # Daha yakın eşleşme = aynı ziyaret
+REID_NPROBE = getattr(SETTINGS, 'REID_NPROBE', 8)
+
+MODEL_INPUT_SIZE = (128, 256)  # (genişlik, yükseklik)
+HIST_BINS = (16, 4)            # Hue x Saturation
+HIST_DIM = 2 * HIST_BINS[0] * HIST_BINS[1]
+
+INITIAL_CAPACITY = 4096
+IVF_TRAIN_MIN = 2048           # Bu sayıdan az vektörde tam tarama yapılır
+RETRAIN_GROWTH = 4             # Vektör sayısı eğitimdekinin bu katına çıkınca yeniden eğit
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE = 50000
+SERVICE_QUEUE_SIZE = 64
+SAVE_EVERY = 200
+
+REID_LOOKUP_SECONDS = metrics_registry.histogram('reid_lookup_seconds', 'Re-ID indeks sorgu süresi',
+                                                 buckets=(0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.05))
+RETURNING_VISITORS = metrics_registry.counter('reid_returning_visitors_total', 'Tekrar gelen olarak tanınan ziyaretçiler')
+REID_DROPPED = metrics_registry.counter('reid_dropped_total', 'Kuyruk dolu olduğu için atlanan re-ID istekleri')
+
+
+def _normalize(vectors):
+    """Satırları birim uzunluğa getir (kosinüs benzerliği = iç çarpım)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class AppearanceEmbedder:
+    """Kişi kesitinden (crop) görünüm vektörü çıkarır"""
+
+    def __init__(self, model_path=REID_MODEL_PATH):
+        self.logger = get_logger("reid")
+        self.net = None
+        self.dim = HIST_DIM
+
+        if model_path and os.path.exists(model_path):
+            try:
+                self.net = cv2.dnn.readNetFromONNX(model_path)
+                probe = np.zeros((MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0], 3), dtype=np.uint8)
+                self.dim = int(self._forward([probe]).shape[1])
+                self.logger.info(f"Re-ID modeli yüklendi: {model_path} ({self.dim} boyut)")
+            except Exception as e:
+                self.net = None
+                self.dim = HIST_DIM
+                self.logger.warning(f"Re-ID modeli yüklenemedi, renk histogramı kullanılacak: {e}")
+
+    @property
+    def name(self):
+        return 'onnx' if self.net is not None else 'hsv_hist'
+
+    def _forward(self, crops):
+        blob = cv2.dnn.blobFromImages(crops, scalefactor=1 / 57.5, size=MODEL_INPUT_SIZE,
+                                      mean=(123.7, 116.3, 103.5), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        return self.net.forward().reshape(len(crops), -1)
+
+    @staticmethod
+    def _histogram(crop):
+        """Üst ve alt beden için ayrı Hue-Saturation histogramı (kıyafet renkleri)"""
+        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+        height = hsv.shape[0]
+        # Baş bölgesi (üst %15) arka plan/saç içerdiği için atlanır
+        halves = (hsv[int(height * 0.15):height // 2], hsv[height // 2:])
+        parts = []
+        for half in halves:
+            hist = cv2.calcHist([half], [0, 1], None, list(HIST_BINS), [0, 180, 0, 256]).ravel()
+            parts.append(np.sqrt(hist / max(hist.sum(), 1.0)))  # Hellinger çekirdeği
+        return np.concatenate(parts)
+
+    def embed_batch(self, crops):
+        """
+        Kesitlerin embedding'leri.
+
+        Returns:
+            np.ndarray: float32 (N, dim), satırlar birim uzunlukta
+        """
+        crops = [crop for crop in crops if crop is not None and crop.size]
+        if not crops:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self.net is not None:
+            vectors = self._forward(crops)
+        else:
+            vectors = np.stack([self._histogram(crop) for crop in crops])
+        return _normalize(vectors.astype(np.float32))
+
+    def embed(self, crop):
+        """Tek kesitin embedding'i"""
+        vectors = self.embed_batch([crop])
+        return vectors[0] if len(vectors) else None
+
+
+class EmbeddingStore:
+    """Embedding'leri float16 memory-mapped dosyalarda tutan, büyüyebilen depo"""
+
+    def __init__(self, directory, dim):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.logger = get_logger("reid")
+        self._meta_path = self.directory / 'meta.json'
+
+        self.count = 0
+        capacity = INITIAL_CAPACITY
+        if self._meta_path.exists():
+            with open(self._meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('dim') == dim:
+                self.count = meta['count']
+                capacity = meta['capacity']
+            else:
+                self.logger.warning(f"Embedding boyutu değişti ({meta.get('dim')} -> {dim}), depo sıfırlanıyor")
+                for name in ('embeddings.f16', 'person_ids.i64', 'seen_at.f64', 'index.npz'):
+                    (self.directory / name).unlink(missing_ok=True)
+
+        self.capacity = 0
+        self._map(capacity)
+
+    def _map(self, capacity):
+        """Dosyaları verilen kapasiteye büyütüp yeniden eşle"""
+        specs = (('vectors', 'embeddings.f16', np.float16, (capacity, self.dim)),
+                 ('person_ids', 'person_ids.i64', np.int64, (capacity,)),
+                 ('seen_at', 'seen_at.f64', np.float64, (capacity,)))
+        for attr, filename, dtype, shape in specs:
+            old = getattr(self, attr, None)
+            if old is not None:
+                old.flush()
+                setattr(self, attr, None)
+                del old
+
+            path = self.directory / filename
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            setattr(self, attr, np.memmap(path, dtype=dtype, mode='r+', shape=shape))
+        self.capacity = capacity
+
+    def append(self, vector, person_id, timestamp):
+        """
+        Vektör ekle.
+
+        Returns:
+            int: Satır numarası
+        """
+        if self.count >= self.capacity:
+            self._map(self.capacity * 2)
+        row = self.count
+        self.vectors[row] = vector
+        self.person_ids[row] = person_id
+        self.seen_at[row] = timestamp
+        self.count += 1
+        return row
+
+    def flush(self):
+        """Memmap'leri ve meta veriyi diske yaz"""
+        self.vectors.flush()
+        self.person_ids.flush()
+        self.seen_at.flush()
+        tmp_path = self._meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'count': self.count, 'capacity': self.capacity}, f)
+        os.replace(tmp_path, self._meta_path)
+
+
+class _InvertedList:
+    """Tek kümenin satır numaraları ve (tarama için float32) vektörleri"""
+
+    __slots__ = ('rows', 'vectors', 'size')
+
+    def __init__(self, dim, rows=None, vectors=None):
+        if rows is None:
+            rows = np.empty(16, dtype=np.int64)
+            vectors = np.empty((16, dim), dtype=np.float32)
+            self.size = 0
+        else:
+            self.size = len(rows)
+        self.rows = rows
+        self.vectors = vectors
+
+    def append(self, row, vector):
+        if self.size == len(self.rows):
+            capacity = max(16, len(self.rows) * 2)
+            self.rows = np.resize(self.rows, capacity)
+            vectors = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            vectors[:self.size] = self.vectors[:self.size]
+            self.vectors = vectors
+        self.rows[self.size] = row
+        self.vectors[self.size] = vector
+        self.size += 1
+
+
+class IVFIndex:
+    """Inverted-file yaklaşık en yakın komşu indeksi (kosinüs benzerliği)"""
+
+    def __init__(self, dim, nprobe=REID_NPROBE):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.trained_count = 0
+        self._lists = []
+        self._flat = _InvertedList(dim)  # Eğitim öncesi tam tarama listesi
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    @staticmethod
+    def suggested_nlist(count):
+        """Küme sayısı: ~4*sqrt(N)"""
+        return int(min(4096, max(16, 4 * np.sqrt(count))))
+
+    def train(self, vectors, nlist, seed=0):
+        """
+        Küresel k-means ile centroid'leri öğren.
+
+        Args:
+            vectors: float32 (N, dim) birim vektörler (örneklem)
+            nlist: Küme sayısı
+        """
+        rng = np.random.default_rng(seed)
+        if len(vectors) > KMEANS_SAMPLE:
+            vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+        nlist = min(nlist, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            labels = self._nearest_centroid(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Boş kümeleri rastgele vektörlerle yeniden başlat
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids.astype(np.float32)
+
+    @staticmethod
+    def _nearest_centroid(vectors, centroids, chunk=8192):
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk):
+            labels[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        return labels
+
+    def rebuild(self, vectors, assignments=None):
+        """
+        Tüm listeleri yeniden oluştur (eğitim sonrası veya yüklemede).
+
+        Args:
+            vectors: float16/float32 (N, dim) depodaki tüm vektörler
+            assignments: Kayıtlı küme atamaları (yoksa hesaplanır)
+        """
+        count = len(vectors)
+        if assignments is None or len(assignments) != count:
+            assignments = np.empty(count, dtype=np.int32)
+            for start in range(0, count, 65536):
+                chunk = np.asarray(vectors[start:start + 65536], dtype=np.float32)
+                assignments[start:start + 65536] = self._nearest_centroid(chunk, self.centroids)
+
+        self.assignments = assignments.astype(np.int32)
+        order = np.argsort(self.assignments, kind='stable')
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self._lists = []
+        for cluster in range(len(self.centroids)):
+            rows = order[bounds[cluster]:bounds[cluster + 1]].astype(np.int64)
+            self._lists.append(_InvertedList(self.dim, rows, np.asarray(vectors[rows], dtype=np.float32)))
+        self._flat = _InvertedList(self.dim)
+        self.trained_count = count
+
+    def add(self, row, vector):
+        """Yeni vektörü kümesine ekle"""
+        if not self.is_trained:
+            self._flat.append(row, vector)
+            return
+        cluster = int(np.argmax(self.centroids @ vector))
+        self._lists[cluster].append(row, vector)
+        if row >= len(self.assignments):
+            self.assignments = np.resize(self.assignments, max(row + 1, len(self.assignments) * 2))
+        self.assignments[row] = cluster
+
+    def search(self, query, k=5, nprobe=None):
+        """
+        En benzer k vektör.
+
+        Returns:
+            tuple: (satır numaraları, benzerlikler) - benzerliğe göre azalan
+        """
+        if self.is_trained:
+            nprobe = min(nprobe or self.nprobe, len(self._lists))
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            lists = [self._lists[cluster] for cluster in probe]
+        else:
+            lists = [self._flat]
+
+        rows, scores = [], []
+        for inverted in lists:
+            if inverted.size:
+                rows.append(inverted.rows[:inverted.size])
+                scores.append(inverted.vectors[:inverted.size] @ query)
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores)
+        return rows[order], scores[order]
+
+
+class ReidIndex:
+    """Embedding deposu + IVF indeksi; kişi kimliği ve son görülme zamanı tutar"""
+
+    def __init__(self, directory=REID_DIR, dim=HIST_DIM, nprobe=REID_NPROBE):
+        self.directory = Path(directory)
+        self.logger = get_logger("reid")
+        self.store = EmbeddingStore(directory, dim)
+        self.index = IVFIndex(dim, nprobe)
+        self._lock = threading.Lock()
+        self._index_path = self.directory / 'index.npz'
+        # Kişi başına son görülme zamanı ("tekrar gelen" kararı buna göre verilir)
+        count = self.store.count
+        self._last_seen = {}
+        for person_id, seen_at in zip(self.store.person_ids[:count].tolist(), self.store.seen_at[:count].tolist()):
+            if seen_at > self._last_seen.get(person_id, 0.0):
+                self._last_seen[person_id] = seen_at
+        self._next_person_id = max(self._last_seen, default=0) + 1
+        self._load_index()
+
+    def _load_index(self):
+        """Kayıtlı centroid ve atamaları yükle; yoksa mevcut vektörlerden kur"""
+        count = self.store.count
+        vectors = self.store.vectors[:count]
+        if self._index_path.exists():
+            try:
+                data = np.load(self._index_path)
+                if data['centroids'].shape[1] == self.store.dim:
+                    self.index.centroids = data['centroids']
+                    assignments = data['assignments'][:count]
+                    self.index.rebuild(vectors, assignments)
+                    self.index.trained_count = int(data['trained_count'])
+                    self.logger.info(f"Re-ID indeksi yüklendi: {count} vektör, {len(self.index.centroids)} küme")
+                    return
+            except Exception as e:
+                self.logger.warning(f"Re-ID indeksi okunamadı, yeniden kurulacak: {e}")
+
+        for row in range(count):
+            self.index.add(row, np.asarray(vectors[row], dtype=np.float32))
+        self._maybe_retrain()
+
+    def _maybe_retrain(self):
+        """Yeterli vektör birikince (veya çok büyüyünce) k-means'i yeniden çalıştır"""
+        count = self.store.count
+        if count < IVF_TRAIN_MIN:
+            return
+        if self.index.is_trained and count < self.index.trained_count * RETRAIN_GROWTH:
+            return
+
+        start = time.perf_counter()
+        vectors = self.store.vectors[:count]
+        rng = np.random.default_rng(count)
+        sample_rows = np.sort(rng.choice(count, min(count, KMEANS_SAMPLE), replace=False))
+        self.index.train(np.asarray(vectors[sample_rows], dtype=np.float32), IVFIndex.suggested_nlist(count))
+        self.index.rebuild(vectors)
+        self.logger.info(f"Re-ID indeksi eğitildi: {count} vektör, {len(self.index.centroids)} küme "
+                         f"({time.perf_counter() - start:.1f}s)")
+
+    def __len__(self):
+        return self.store.count
+
+    def add(self, vector, person_id=None, timestamp=None):
+        """
+        Embedding ekle.
+
+        Returns:
+            tuple: (satır numarası, kişi id)
+        """
+        with self._lock:
+            if person_id is None:
+                person_id = self._next_person_id
+                self._next_person_id += 1
+            timestamp = timestamp if timestamp is not None else time.time()
+            row = self.store.append(vector, person_id, timestamp)
+            self._last_seen[person_id] = max(timestamp, self._last_seen.get(person_id, 0.0))
+            self.index.add(row, vector)
+            self._maybe_retrain()
+            return row, person_id
+
+    def search(self, vector, k=5, nprobe=None):
+        """
+        En benzer k kayıt.
+
+        Returns:
+            list: [(kişi id, benzerlik, son görülme zamanı), ...]
+        """
+        start = time.perf_counter()
+        with self._lock:
+            rows, scores = self.index.search(vector, k, nprobe)
+            results = [(int(self.store.person_ids[row]), float(score), float(self.store.seen_at[row]))
+                       for row, score in zip(rows, scores)]
+        REID_LOOKUP_SECONDS.observe(time.perf_counter() - start)
+        return results
+
+    def identify(self, vector, timestamp=None, threshold=REID_MATCH_THRESHOLD):
+        """
+        Kişiyi tanı ve kaydet.
+
+        Returns:
+            tuple: (kişi id, tekrar gelen mi, benzerlik)
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        matches = self.search(vector, k=1)
+        if matches and matches[0][1] >= threshold:
+            person_id, similarity, _ = matches[0]
+            returning = timestamp - self._last_seen.get(person_id, timestamp) >= REID_MIN_GAP_SECONDS
+            self.add(vector, person_id, timestamp)
+            return person_id, returning, similarity
+
+        _, person_id = self.add(vector, None, timestamp)
+        return person_id, False, matches[0][1] if matches else 0.0
+
+    def save(self):
+        """Depoyu ve indeksi diske yaz"""
+        with self._lock:
+            self.store.flush()
+            if self.index.is_trained:
+                tmp_path = self._index_path.with_suffix('.tmp.npz')
+                np.savez(tmp_path, centroids=self.index.centroids,
+                         assignments=self.index.assignments[:self.store.count],
+                         trained_count=self.index.trained_count)
+                os.replace(tmp_path, self._index_path)
+
+
+class ReidService:
+    """Onaylanan track kesitlerini arka planda tanıyan servis"""
+
+    def __init__(self, index=None, embedder=None, on_result=None):
+        """
+        Args:
+            on_result: on_result(track_id, person_id, returning, similarity) callback'i
+        """
+        self.embedder = embedder if embedder is not None else AppearanceEmbedder()
+        self.index = index if index is not None else ReidIndex(dim=self.embedder.dim)
+        self.on_result = on_result
+        self.logger = get_logger("reid")
+        self._queue = queue.Queue(maxsize=SERVICE_QUEUE_SIZE)
+        self._thread = None
+        self._added_since_save = 0
+
+    def start(self):
+        """Worker thread'ini başlat"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker_loop, name='reid', daemon=True)
+        self._thread.start()
+        self.logger.info(f"🔁 Re-ID aktif ({self.embedder.name}, {len(self.index)} kayıtlı görünüm)")
+
+    def stop(self):
+        """Kuyruğu bitir, indeksi kaydet"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+        self.index.save()
+
+    def submit(self, track_id, crop, timestamp=None):
+        """
+        Kesiti kuyruğa ekle (bloklamaz).
+
+        Returns:
+            bool: Kuyruğa alındıysa True
+        """
+        try:
+            self._queue.put_nowait((track_id, crop, timestamp if timestamp is not None else time.time()))
+            return True
+        except queue.Full:
+            REID_DROPPED.inc()
+            return False
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            track_id, crop, timestamp = item
+            try:
+                vector = self.embedder.embed(crop)
+                if vector is None:
+                    continue
+                person_id, returning, similarity = self.index.identify(vector, timestamp)
+                if returning:
+                    RETURNING_VISITORS.inc()
+                if self.on_result is not None:
+                    self.on_result(track_id, person_id, returning, similarity)
+
+                self._added_since_save += 1
+                if self._added_since_save >= SAVE_EVERY:
+                    self._added_since_save = 0
+                    self.index.save()
+            except Exception as e:
+                self.logger.error(f"Re-ID hatası: {e}")
+
+
+def crop_detection(frame, bbox):
+    """
+    Tespit kutusunu frame sınırları içinde kes (kopya).
+
+    Returns:
+        np.ndarray veya None
+    """
+    x, y, w, h = (int(v) for v in bbox)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+    if x1 - x0 < 8 or y1 - y0 < 16:
+        return None
+    return frame[y0:y1, x0:x1].copy()
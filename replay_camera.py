@@ -0,0 +1,169 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Video Tekrar Oynatma Kaynağı
+Kayıtlı bir video dosyasını CameraManager arayüzüyle oynatır.
+
+Test, benchmark ve soak testlerinde gerçek kamera yerine kullanılır:
+    camera = ReplayCamera("data/replay/magaza.mp4")
+    camera.initialize_camera()
+    camera.add_frame_callback(process_frame)
+    camera.start_capture()
+"""
+
+import threading
+import time
+
+import cv2
+
+from metrics import FRAMES_DROPPED, stage_timer
+from src.utils.logger import get_logger
+
+
+class ReplayCamera:
+    """Video dosyasını kamera gibi sunan kaynak (CameraManager ile aynı metotlar)"""
+
+    def __init__(self, video_path, loop=True, speed=1.0, realtime=True, max_frames=None):
+        """
+        Args:
+            video_path: Oynatılacak video dosyası
+            loop: Video bitince başa sar
+            speed: Oynatma hızı çarpanı (2.0 = iki kat hızlı)
+            realtime: True ise video FPS'ine uyulur ve geride kalınırsa frame atlanır,
+                False ise her frame sırayla ve beklemeden işlenir (benchmark modu)
+            max_frames: Bu kadar frame okunduktan sonra dur (None = sınırsız)
+        """
+        self.video_path = str(video_path)
+        self.loop = loop
+        self.speed = speed
+        self.realtime = realtime
+        self.max_frames = max_frames
+
+        self.cap = None
+        self.source_fps = 30.0
+        self.frame_count = 0
+        self.dropped_frames = 0
+
+        self.current_frame = None
+        self.frame_lock = threading.Lock()
+        self.frame_callbacks = []
+        self.callback_lock = threading.Lock()
+
+        self.is_running = False
+        self.finished = threading.Event()
+        self._thread = None
+
+        self.logger = get_logger("replay")
+
+    def initialize_camera(self):
+        """
+        Video dosyasını aç.
+
+        Returns:
+            bool: Dosya açılabilirse True
+        """
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            self.logger.error(f"❌ Video açılamadı: {self.video_path}")
+            return False
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.source_fps = fps
+
+        self.logger.info(f"🎞️  Replay kaynağı hazır: {self.video_path} ({self.source_fps:.1f} FPS)")
+        return True
+
+    def add_frame_callback(self, callback):
+        """Frame callback'i ekle"""
+        with self.callback_lock:
+            if callback not in self.frame_callbacks:
+                self.frame_callbacks.append(callback)
+
+    def remove_frame_callback(self, callback):
+        """Frame callback'i çıkar"""
+        with self.callback_lock:
+            if callback in self.frame_callbacks:
+                self.frame_callbacks.remove(callback)
+
+    def get_current_frame(self):
+        """Son okunan frame'in kopyası"""
+        with self.frame_lock:
+            return None if self.current_frame is None else self.current_frame.copy()
+
+    def start_capture(self):
+        """Oynatma thread'ini başlat"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._capture_loop, name='replay-capture', daemon=True)
+        self._thread.start()
+
+    def stop_capture(self):
+        """Oynatmayı durdur ve dosyayı kapat"""
+        self.is_running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _read_frame(self):
+        """Sıradaki frame'i oku (loop modunda başa sarar)"""
+        with stage_timer('capture'):
+            ret, frame = self.cap.read()
+
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+
+        return frame if ret else None
+
+    def _capture_loop(self):
+        """Frame okuma ve callback döngüsü"""
+        frame_interval = 1.0 / (self.source_fps * self.speed)
+        next_frame_time = time.perf_counter()
+
+        try:
+            while self.is_running:
+                if self.max_frames is not None and self.frame_count >= self.max_frames:
+                    break
+
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                self.frame_count += 1
+
+                with self.frame_lock:
+                    self.current_frame = frame
+
+                with self.callback_lock:
+                    callbacks = list(self.frame_callbacks)
+
+                for callback in callbacks:
+                    try:
+                        callback(frame)
+                    except Exception as e:
+                        self.logger.error(f"Frame callback hatası: {e}")
+
+                if not self.realtime:
+                    continue
+
+                # Gerçek zamanlı oynatma: geride kalındıysa frame atla
+                next_frame_time += frame_interval
+                behind = time.perf_counter() - next_frame_time
+                if behind > 0:
+                    skip = int(behind / frame_interval)
+                    for _ in range(skip):
+                        if not self.cap.grab():
+                            break
+                    if skip:
+                        self.dropped_frames += skip
+                        FRAMES_DROPPED.inc(skip)
+                    next_frame_time += skip * frame_interval
+                else:
+                    time.sleep(-behind)
+
+        finally:
+            self.is_running = False
+            self.finished.set()
+            self.logger.info(f"🎞️  Replay bitti: {self.frame_count} frame, {self.dropped_frames} atlandı")
@@ -0,0 +1,381 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Rapor Üretimi
+Günlük / haftalık / aylık raporlar rollup tablolarından üretilir ve
+dönem bazında diske önbelleklenir.
+
+- Rapor verisi (saatlik dağılım, en yoğun saatler, gün serisi, önceki dönem
+  ve geçen yılla karşılaştırma, ortalama kalış süresi) rollup sorgularıyla
+  hesaplanır; ham visitors tablosu taranmaz.
+- Verinin parmak izi (sha1) önceki üretimle aynıysa rapor tekrar yazılmaz.
+- Çıktılar: metin, CSV ve grafikli (satır içi SVG) HTML.
+
+Dosyalar:
+    data/reports/<tür>/<dönem>.txt | .csv | .html | .json
+    dönem: günlük 2025-07-21, haftalık 2025-W30, aylık 2025-07
+"""
+
+import csv
+import hashlib
+import html
+import io
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from analytics_rollups import RollupStore, next_bucket
+from occupancy_heatmap import OccupancyHeatmap
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+REPORT_DIR = getattr(SETTINGS, 'REPORT_DIR', 'data/reports')
+REPORT_INTERVAL_SECONDS = getattr(SETTINGS, 'REPORT_INTERVAL_SECONDS', 900)
+REPORT_FORMAT_VERSION = 1      # Şablon değişince tüm raporlar yeniden üretilir
+REPORT_KINDS = ('daily', 'weekly', 'monthly')
+REPORT_FORMATS = ('txt', 'csv', 'html')
+PEAK_HOURS = 3
+
+KIND_TITLES = {'daily': 'GÜNLÜK', 'weekly': 'HAFTALIK', 'monthly': 'AYLIK'}
+DAY_NAMES = ('Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma', 'Cumartesi', 'Pazar')
+
+
+def period_range(kind, period):
+    """
+    Dönem adının [başlangıç, bitiş) aralığı.
+
+    Args:
+        kind: daily | weekly | monthly
+        period: '2025-07-21' | '2025-W30' | '2025-07'
+
+    Returns:
+        tuple: (datetime, datetime)
+    """
+    if kind == 'daily':
+        start = datetime.strptime(period, '%Y-%m-%d')
+        return start, start + timedelta(days=1)
+    if kind == 'weekly':
+        start = datetime.strptime(period + '-1', '%G-W%V-%u')
+        return start, start + timedelta(days=7)
+    if kind == 'monthly':
+        start = datetime.strptime(period, '%Y-%m')
+        return start, next_bucket(start, 'month')
+    raise ValueError(f"Geçersiz rapor türü: {kind}")
+
+
+def period_name(kind, moment):
+    """Zamanın içinde bulunduğu dönemin adı"""
+    if kind == 'daily':
+        return moment.strftime('%Y-%m-%d')
+    if kind == 'weekly':
+        return moment.strftime('%G-W%V')
+    if kind == 'monthly':
+        return moment.strftime('%Y-%m')
+    raise ValueError(f"Geçersiz rapor türü: {kind}")
+
+
+def previous_period(kind, period):
+    """Bir önceki dönemin adı"""
+    start, _ = period_range(kind, period)
+    return period_name(kind, start - timedelta(days=1))
+
+
+def percent_change(current, previous):
+    return round((current - previous) / previous * 100, 1) if previous else None
+
+
+class ReportEngine:
+    """Rapor verisini hesaplayan, çizen ve dönem bazında önbellekleyen sınıf"""
+
+    def __init__(self, rollups=None, heatmap=None, directory=REPORT_DIR):
+        """
+        Args:
+            rollups: RollupStore (varsayılan: ana veritabanı)
+            heatmap: Kalış süresi için OccupancyHeatmap (saatlik ızgaralar)
+        """
+        self.rollups = rollups if rollups is not None else RollupStore()
+        self.heatmap = heatmap if heatmap is not None else OccupancyHeatmap()
+        self.directory = Path(directory)
+        self.logger = get_logger("reports")
+        self.stats = {'generated': 0, 'unchanged': 0, 'last_seconds': 0.0}
+
+    def _totals(self, start, end):
+        """Aralığın toplam ziyaretçisi (gün rollup'larından)"""
+        series = self.rollups.query(start, end, 'day')['series']
+        return sum(point['value'] for point in series)
+
+    def _person_seconds(self, start, end):
+        """Isı haritası saatlik ızgaralarından toplam kişi-saniye (yoksa None)"""
+        start_key, end_key = start.strftime('%Y%m%d_%H'), end.strftime('%Y%m%d_%H')
+        hours = [hour for hour in self.heatmap.list_hours() if start_key <= hour < end_key]
+        if not hours:
+            return None
+        total = 0.0
+        for hour in hours:
+            grid = self.heatmap.grid(hour)
+            if grid is not None:
+                total += float(grid.sum())
+        return total
+
+    def build(self, kind, period):
+        """
+        Rapor verisini hesapla.
+
+        Returns:
+            dict: Rapor verisi (çizimden bağımsız)
+        """
+        start, end = period_range(kind, period)
+        hourly = self.rollups.query(start, end, 'hour')['series']
+        confidence = self.rollups.query(start, end, 'day', metric='avg_confidence')['series']
+        daily = self.rollups.query(start, end, 'day')['series']
+
+        # Günün saatlerine göre dağılım (hafta/ay için günler toplanır)
+        by_hour = [0] * 24
+        for point in hourly:
+            by_hour[int(point['bucket'][11:13])] += point['value']
+        total = sum(by_hour)
+
+        weighted = sum(c['value'] * d['value'] for c, d in zip(confidence, daily))
+        peaks = sorted(range(24), key=lambda h: by_hour[h], reverse=True)[:PEAK_HOURS]
+
+        previous = previous_period(kind, period)
+        previous_total = self._totals(*period_range(kind, previous))
+        last_year_start = start.replace(year=start.year - 1) if not (start.month == 2 and start.day == 29) \
+            else start.replace(year=start.year - 1, day=28)
+        last_year_total = self._totals(last_year_start, last_year_start + (end - start))
+
+        person_seconds = self._person_seconds(start, end)
+        busiest = max(daily, key=lambda point: point['value']) if daily else None
+
+        return {
+            'kind': kind,
+            'period': period,
+            'start': start.strftime('%Y-%m-%d'),
+            'end': (end - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'total_visitors': total,
+            'avg_confidence': round(weighted / total, 3) if total else 0.0,
+            'hourly': by_hour,
+            'peak_hours': [{'hour': h, 'visitors': by_hour[h]} for h in peaks if by_hour[h] > 0],
+            'daily': [{'date': point['bucket'], 'visitors': point['value']} for point in daily],
+            'busiest_day': busiest['bucket'] if busiest and busiest['value'] > 0 else None,
+            'previous': {'period': previous, 'total_visitors': previous_total,
+                         'change_percent': percent_change(total, previous_total)},
+            'last_year': {'total_visitors': last_year_total,
+                          'change_percent': percent_change(total, last_year_total)},
+            'avg_dwell_seconds': round(person_seconds / total, 1) if person_seconds and total else None
+        }
+
+    @staticmethod
+    def fingerprint(report):
+        """Rapor verisinin parmak izi (değişmediyse yeniden çizilmez)"""
+        payload = json.dumps([REPORT_FORMAT_VERSION, report], sort_keys=True).encode('utf-8')
+        return hashlib.sha1(payload).hexdigest()
+
+    def generate(self, kind, period=None, force=False):
+        """
+        Dönemin raporunu üret; veri değişmediyse önbellektekini kullan.
+
+        Args:
+            kind: daily | weekly | monthly
+            period: Dönem adı (varsayılan: içinde bulunulan dönem)
+            force: Parmak izi aynı olsa da yeniden yaz
+
+        Returns:
+            dict: {'kind', 'period', 'changed', 'files': {format: yol}}
+        """
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Geçersiz rapor türü: {kind}")
+        period = period or period_name(kind, datetime.now())
+        started = time.perf_counter()
+
+        report = self.build(kind, period)
+        digest = self.fingerprint(report)
+        folder = self.directory / kind
+        files = {fmt: folder / f"{period}.{fmt}" for fmt in REPORT_FORMATS}
+        meta_path = folder / f"{period}.json"
+
+        changed = True
+        if not force and meta_path.exists() and all(path.exists() for path in files.values()):
+            try:
+                changed = json.loads(meta_path.read_text(encoding='utf-8')).get('fingerprint') != digest
+            except (OSError, ValueError):
+                changed = True
+
+        if changed:
+            folder.mkdir(parents=True, exist_ok=True)
+            files['txt'].write_text(self.render_text(report), encoding='utf-8')
+            files['csv'].write_text(self.render_csv(report), encoding='utf-8')
+            files['html'].write_text(self.render_html(report), encoding='utf-8')
+            meta = {'fingerprint': digest, 'generated_at': datetime.now().isoformat(timespec='seconds'),
+                    'report': report}
+            meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+            self.stats['generated'] += 1
+        else:
+            self.stats['unchanged'] += 1
+
+        self.stats['last_seconds'] = round(time.perf_counter() - started, 4)
+        return {'kind': kind, 'period': period, 'changed': changed,
+                'files': {fmt: str(path) for fmt, path in files.items()}}
+
+    def generate_current(self):
+        """
+        İçinde bulunulan ve bir önceki dönemlerin raporlarını güncelle
+        (geç gelen veriler önceki dönemi de değiştirebilir).
+
+        Returns:
+            list: generate() sonuçları
+        """
+        now = datetime.now()
+        results = []
+        for kind in REPORT_KINDS:
+            current = period_name(kind, now)
+            for period in (previous_period(kind, current), current):
+                try:
+                    results.append(self.generate(kind, period))
+                except Exception as e:
+                    self.logger.error(f"Rapor üretme hatası ({kind} {period}): {e}")
+        return results
+
+    def list_reports(self):
+        """Diskteki raporlar: {tür: [dönem, ...]} (yeniden eskiye)"""
+        return {kind: sorted((path.stem for path in (self.directory / kind).glob('*.json')), reverse=True)
+                for kind in REPORT_KINDS}
+
+    # --- Çizim ---
+
+    def render_text(self, report):
+        """Metin rapor"""
+        lines = [
+            f"🏪 {KIND_TITLES[report['kind']]} ZİYARETÇİ RAPORU",
+            f"📅 Dönem: {report['period']} ({report['start']} - {report['end']})",
+            f"🕐 Rapor Zamanı: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "=" * 50,
+            "",
+            "📊 GENEL İSTATİSTİKLER:",
+            f"  Toplam Ziyaretçi: {report['total_visitors']}",
+            f"  Önceki Dönem ({report['previous']['period']}): {report['previous']['total_visitors']}",
+        ]
+        if report['previous']['change_percent'] is not None:
+            lines.append(f"  Değişim: {report['previous']['change_percent']:+.1f}%")
+        if report['last_year']['change_percent'] is not None:
+            lines.append(f"  Geçen Yıl Aynı Dönem: {report['last_year']['total_visitors']} "
+                         f"({report['last_year']['change_percent']:+.1f}%)")
+        lines.append(f"  Ortalama Confidence: {report['avg_confidence']:.1%}")
+        if report['avg_dwell_seconds'] is not None:
+            lines.append(f"  Ortalama Kalış Süresi: {report['avg_dwell_seconds'] / 60:.1f} dakika")
+
+        lines += ["", "🔥 EN YOĞUN SAATLER:"]
+        lines += [f"  {peak['hour']:02d}:00 - {peak['visitors']} ziyaretçi" for peak in report['peak_hours']]
+
+        lines += ["", "🕐 SAATLİK DAĞILIM:"]
+        lines += [f"  {hour:02d}:00 - {count} ziyaretçi" for hour, count in enumerate(report['hourly']) if count]
+
+        if report['kind'] != 'daily':
+            lines += ["", "📅 GÜNLÜK DAĞILIM:"]
+            for point in report['daily']:
+                day = DAY_NAMES[datetime.strptime(point['date'], '%Y-%m-%d').weekday()]
+                lines.append(f"  {point['date']} {day:<10} - {point['visitors']} ziyaretçi")
+        return "\n".join(lines) + "\n"
+
+    def render_csv(self, report):
+        """CSV rapor: bölüm, anahtar, değer satırları"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['section', 'key', 'value'])
+        writer.writerow(['summary', 'period', report['period']])
+        writer.writerow(['summary', 'total_visitors', report['total_visitors']])
+        writer.writerow(['summary', 'avg_confidence', report['avg_confidence']])
+        writer.writerow(['summary', 'previous_total', report['previous']['total_visitors']])
+        writer.writerow(['summary', 'last_year_total', report['last_year']['total_visitors']])
+        writer.writerow(['summary', 'avg_dwell_seconds', report['avg_dwell_seconds'] or ''])
+        for hour, count in enumerate(report['hourly']):
+            writer.writerow(['hourly', f"{hour:02d}", count])
+        for point in report['daily']:
+            writer.writerow(['daily', point['date'], point['visitors']])
+        return output.getvalue()
+
+    def render_html(self, report):
+        """Satır içi SVG grafikli HTML rapor (harici kütüphane yok)"""
+        def row(label, value):
+            return f"<tr><th>{html.escape(label)}</th><td>{html.escape(str(value))}</td></tr>"
+
+        previous = report['previous']
+        summary = [
+            row('Toplam ziyaretçi', report['total_visitors']),
+            row(f"Önceki dönem ({previous['period']})", previous['total_visitors']),
+            row('Değişim', f"{previous['change_percent']:+.1f}%" if previous['change_percent'] is not None else '-'),
+            row('Geçen yıl aynı dönem', report['last_year']['total_visitors']),
+            row('Ortalama confidence', f"{report['avg_confidence']:.1%}"),
+            row('Ortalama kalış', f"{report['avg_dwell_seconds'] / 60:.1f} dk"
+                if report['avg_dwell_seconds'] is not None else '-'),
+            row('En yoğun saatler', ', '.join(f"{p['hour']:02d}:00" for p in report['peak_hours']) or '-'),
+        ]
+
+        charts = [f"<h2>Saatlik dağılım</h2>{svg_bar_chart(report['hourly'], [f'{h:02d}' for h in range(24)])}"]
+        if report['kind'] != 'daily':
+            charts.append("<h2>Günlük dağılım</h2>" + svg_bar_chart(
+                [p['visitors'] for p in report['daily']], [p['date'][5:] for p in report['daily']]))
+
+        title = f"{KIND_TITLES[report['kind']].capitalize()} rapor - {report['period']}"
+        return (
+            "<!DOCTYPE html><html lang=\"tr\"><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title>"
+            "<style>body{font-family:sans-serif;margin:24px;color:#222}table{border-collapse:collapse}"
+            "th,td{padding:4px 12px;border-bottom:1px solid #ddd;text-align:left}"
+            "svg text{font-size:10px;fill:#555}</style></head><body>"
+            f"<h1>{html.escape(title)}</h1><p>{report['start']} - {report['end']}</p>"
+            f"<table>{''.join(summary)}</table>{''.join(charts)}</body></html>"
+        )
+
+
+def svg_bar_chart(values, labels, width=720, height=200):
+    """Basit SVG çubuk grafik"""
+    count = max(len(values), 1)
+    peak = max(values) if values and max(values) > 0 else 1
+    slot = width / count
+    chart_height = height - 20
+    step = max(1, count // 24)  # Etiketler üst üste binmesin
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">']
+    for i, value in enumerate(values):
+        bar = chart_height * value / peak
+        parts.append(f'<rect x="{i * slot + 1:.1f}" y="{chart_height - bar:.1f}" width="{max(slot - 2, 1):.1f}" '
+                     f'height="{bar:.1f}" fill="#4e79a7"><title>{html.escape(labels[i])}: {value}</title></rect>')
+        if i % step == 0:
+            parts.append(f'<text x="{i * slot + slot / 2:.1f}" y="{height - 5}" text-anchor="middle">'
+                         f'{html.escape(labels[i])}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+class ReportScheduler:
+    """Raporları arka planda periyodik olarak güncel tutar"""
+
+    def __init__(self, engine, interval=REPORT_INTERVAL_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self.logger = get_logger("reports")
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='reports', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            results = self.engine.generate_current()
+            changed = [f"{r['kind']} {r['period']}" for r in results if r['changed']]
+            if changed:
+                self.logger.info(f"📋 Raporlar güncellendi: {', '.join(changed)}")
+            self._stop_event.wait(self.interval)
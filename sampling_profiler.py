@@ -0,0 +1,212 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Örnekleyici Profiler
+Çalışan pipeline thread'lerinin stack'lerini periyodik olarak örnekler ve
+flamegraph araçlarının (flamegraph.pl, speedscope) okuduğu "collapsed stack"
+formatında çıktı üretir.
+
+Yük altında güvenlik notları:
+    - Aynı anda sadece bir profil çalışır (ikinci istek reddedilir)
+    - Süre MAX_PROFILE_SECONDS ile sınırlıdır
+    - Örnekleme sadece sys._current_frames() okur; izlenen thread'ler durdurulmaz
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from metrics import metrics_registry
+
+DEFAULT_INTERVAL = 0.005      # 5 ms (~200 örnek/saniye)
+MAX_PROFILE_SECONDS = 60
+MAX_STACK_DEPTH = 64
+
+# Aynı anda tek profil
+_profile_lock = threading.Lock()
+
+CALLBACK_SECONDS = metrics_registry.histogram(
+    'frame_callback_seconds', 'Kamera frame callback süreleri (saniye)', labels=('callback',))
+
+
+class SamplingProfiler:
+    """sys._current_frames() tabanlı düşük maliyetli örnekleyici profiler"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_filter=None):
+        """
+        Args:
+            interval: Örnekleme aralığı (saniye)
+            thread_filter: Sadece adı bu metni içeren thread'ler örneklenir (None = hepsi)
+        """
+        if not math.isfinite(interval):
+            raise ValueError(f"Geçersiz örnekleme aralığı: {interval}")
+        self.interval = max(0.001, interval)
+        self.thread_filter = thread_filter
+        self.samples = Counter()
+        self.sample_count = 0
+
+    @staticmethod
+    def _frame_label(frame):
+        """Stack elemanı etiketi: dosya:fonksiyon"""
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _collapse(self, frame):
+        """Frame zincirini kökten yaprağa ';' ile birleştir"""
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self._frame_label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _take_sample(self, own_ident):
+        """Tüm (filtreye uyan) thread'lerden tek örnek al"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            name = names.get(ident, f'thread-{ident}')
+            if self.thread_filter and self.thread_filter not in name:
+                continue
+            self.samples[f"{name};{self._collapse(frame)}"] += 1
+        self.sample_count += 1
+
+    def run(self, seconds):
+        """
+        Belirtilen süre boyunca örnekle (çağıran thread'de çalışır).
+
+        Returns:
+            str: Collapsed stack çıktısı ("a;b;c 42" satırları)
+        """
+        if not math.isfinite(seconds):
+            raise ValueError(f"Geçersiz profil süresi: {seconds}")
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        own_ident = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            self._take_sample(own_ident)
+            # Takılma sonrası kaçırılan örnekler art arda alınmaz
+            next_sample = max(next_sample + self.interval, time.perf_counter())
+
+        return self.to_collapsed()
+
+    def to_collapsed(self):
+        """Örnekleri flamegraph formatına çevir (en sık stack başta)"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common()) + '\n'
+
+
+def run_profile(seconds, interval=DEFAULT_INTERVAL, thread_filter=None):
+    """
+    Tek seferlik profil çalıştır.
+
+    Returns:
+        str: Collapsed stack çıktısı, başka bir profil çalışıyorsa None
+
+    Raises:
+        ValueError: Süre veya aralık sonlu bir sayı değilse (kilit alınmadan)
+    """
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        raise ValueError("Profil süresi ve aralığı sonlu olmalı")
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler(interval, thread_filter).run(seconds)
+    finally:
+        _profile_lock.release()
+
+
+def schedule_profile(seconds, output_dir='logs', delay=0.0, interval=DEFAULT_INTERVAL,
+                     thread_filter=None, logger=None):
+    """
+    Arka planda profil çalıştırıp sonucu dosyaya yaz (CLI --profile bayrağı için).
+
+    Returns:
+        threading.Thread: Profil thread'i
+    """
+    def worker():
+        if delay > 0:
+            time.sleep(delay)
+        output = run_profile(seconds, interval, thread_filter)
+        if output is None:
+            if logger:
+                logger.warning("Profil atlandı: başka bir profil zaten çalışıyor")
+            return
+
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(output_dir, f"profile_{timestamp}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(output)
+        if logger:
+            logger.info(f"🔬 Profil kaydedildi: {path}")
+
+    thread = threading.Thread(target=worker, name='profiler', daemon=True)
+    thread.start()
+    return thread
+
+
+def timed_callback(callback, name=None):
+    """
+    Frame callback'ini süre ölçen bir sarmalayıcıya al.
+
+    Returns:
+        callable: frame_callback_seconds{callback=...} histogramına yazan callback
+    """
+    if getattr(callback, '_is_timed_callback', False):
+        return callback
+
+    name = name or getattr(callback, '__qualname__', None) or repr(callback)
+    histogram = CALLBACK_SECONDS.labels(callback=name)
+
+    def wrapper(frame):
+        start = time.perf_counter()
+        try:
+            return callback(frame)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    wrapper._is_timed_callback = True
+    wrapper.__wrapped__ = callback
+    return wrapper
+
+
+def instrument_frame_callbacks(camera_manager):
+    """
+    Kamera yöneticisine eklenen tüm frame callback'lerinin süresini ölç.
+    add_frame_callback / remove_frame_callback bu instance için sarmalanır;
+    çağıranlar orijinal fonksiyonla eklemeye/çıkarmaya devam edebilir.
+    """
+    if getattr(camera_manager, '_callbacks_instrumented', False):
+        return camera_manager
+
+    wrappers = {}
+    original_add = camera_manager.add_frame_callback
+    original_remove = getattr(camera_manager, 'remove_frame_callback', None)
+
+    def add_frame_callback(callback):
+        wrapper = wrappers.get(callback)
+        if wrapper is None:
+            wrapper = timed_callback(callback)
+            wrappers[callback] = wrapper
+        return original_add(wrapper)
+
+    camera_manager.add_frame_callback = add_frame_callback
+
+    if original_remove is not None:
+        def remove_frame_callback(callback):
+            return original_remove(wrappers.pop(callback, callback))
+
+        camera_manager.remove_frame_callback = remove_frame_callback
+
+    camera_manager._callbacks_instrumented = True
+    return camera_manager
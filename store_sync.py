@@ -0,0 +1,301 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Mağaza Senkronizasyonu
+Her mağaza kendi veritabanındaki yeni ziyaretçileri saatlik rollup
+farkları (delta) olarak ve olayları (alarm vb.) merkezdeki
+aggregation_server'a gönderir.
+
+- Ziyaretçiler id sırasıyla gönderilir: sunucunun onayladığı son id'den
+  sonraki en fazla SYNC_BATCH_VISITORS satır (saat x kamera) farklarına
+  toplanır. Kaynak visitors tablosunun kendisi olduğu için çevrimdışı
+  dönemlerde ayrı kuyruk gerekmez; bağlantı gelince kalınan yerden devam edilir.
+- Olaylar sync_outbox tablosunda (şema: db_migrations) bekler; en fazla SYNC_OUTBOX_MAX
+  gönderilmemiş kayıt tutulur, dolarsa en eskiler atılır. Onaylanan kayıtlar
+  bir senkronizasyon daha saklanır: sunucu onayı sonradan geri alırsa
+  (ör. yedekten dönüş) oradan tekrar gönderilebilir.
+- İstek gövdesi gzip'li JSON'dur; sunucu her cevapta kendi son id'lerini
+  döndürür. Tekrar gönderilen paketler sunucuda iki kez sayılmaz.
+
+Protokol (POST /api/sync):
+    {'store', 'from_id', 'to_id',
+     'rollups': {'bucket': [...], 'camera': [...], 'visitors': [...], 'confidence_sum': [...]},
+     'events': [[seq, tür, zaman, veri], ...]}
+    -> {'success': True, 'data': {'visitor_id': int, 'event_seq': int}}
+"""
+
+import gzip
+import json
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import visitor_db
+from db_migrations import migrate
+from metrics import metrics_registry
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+SYNC_SERVER_URL = getattr(SETTINGS, 'SYNC_SERVER_URL', None)   # Örn. http://merkez:8770 (None = kapalı)
+STORE_ID = getattr(SETTINGS, 'STORE_ID', None) or socket.gethostname()
+SYNC_TOKEN = getattr(SETTINGS, 'SYNC_TOKEN', None)
+SYNC_INTERVAL_SECONDS = getattr(SETTINGS, 'SYNC_INTERVAL_SECONDS', 60.0)
+SYNC_BATCH_VISITORS = getattr(SETTINGS, 'SYNC_BATCH_VISITORS', 20000)
+SYNC_BATCH_EVENTS = 500
+SYNC_OUTBOX_MAX = getattr(SETTINGS, 'SYNC_OUTBOX_MAX', 10000)
+SYNC_TIMEOUT_SECONDS = 15.0
+SYNC_BACKOFF_MAX = 600.0
+MAX_BATCHES_PER_SYNC = 100
+SYNC_BUCKET_FORMAT = '%Y-%m-%d %H:00'
+
+# Onaylanan id'den sonraki ziyaretçilerin saat x kamera farkları (id aralığı, birincil anahtar)
+SYNC_ROLLUP_QUERY = f"""
+    SELECT strftime('{SYNC_BUCKET_FORMAT}', entry_time), COALESCE(camera_index, 0),
+           COUNT(*), SUM(confidence_avg)
+    FROM visitors
+    WHERE id > ? AND id <= ? AND confidence_avg > 0.0
+    GROUP BY 1, 2
+"""
+PENDING_VISITORS_QUERY = "SELECT COUNT(*) FROM visitors WHERE id > ?"
+
+SYNC_BATCHES = metrics_registry.counter('sync_batches_total', 'Merkeze gönderilen senkronizasyon paketleri')
+SYNC_BYTES = metrics_registry.counter('sync_bytes_total', 'Gönderilen sıkıştırılmış byte')
+SYNC_FAILURES = metrics_registry.counter('sync_failures_total', 'Başarısız senkronizasyon denemeleri')
+SYNC_EVENTS_DROPPED = metrics_registry.counter('sync_events_dropped_total',
+                                               'Kuyruk dolu olduğu için atılan olaylar')
+
+def encode_payload(payload):
+    """Paketi gzip'li JSON'a çevir"""
+    return gzip.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+
+
+def decode_payload(body):
+    """gzip'li JSON paketini çöz"""
+    return json.loads(gzip.decompress(body).decode('utf-8'))
+
+
+class StoreSync:
+    """Mağaza veritabanından merkeze artımlı senkronizasyon"""
+
+    def __init__(self, server_url=SYNC_SERVER_URL, store_id=STORE_ID, db_path=visitor_db.DB_PATH,
+                 token=SYNC_TOKEN, interval=SYNC_INTERVAL_SECONDS, batch_visitors=SYNC_BATCH_VISITORS,
+                 outbox_max=SYNC_OUTBOX_MAX):
+        self.server_url = server_url.rstrip('/') if server_url else None
+        self.store_id = str(store_id)
+        self.db_path = db_path
+        self.token = token
+        self.interval = interval
+        self.batch_visitors = batch_visitors
+        self.outbox_max = outbox_max
+        self.logger = get_logger("store_sync")
+
+        self.stats = {'batches': 0, 'bytes_sent': 0, 'raw_bytes': 0, 'failures': 0, 'dropped_events': 0,
+                      'last_success': None, 'last_error': None}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._schema_ready = False
+
+    @property
+    def enabled(self):
+        return self.server_url is not None
+
+    def _connect(self):
+        conn = visitor_db.connect(self.db_path)
+        if not self._schema_ready:
+            migrate(conn)
+            self._schema_ready = True
+        return conn
+
+    def enqueue_event(self, kind, data, timestamp=None):
+        """
+        Olayı merkeze gönderilmek üzere kuyruğa al (en eskiler atılarak sınırlı).
+
+        Args:
+            kind: Olay türü (ör. 'alert')
+            data: JSON'a çevrilebilir olay verisi
+            timestamp: Olay zamanı (varsayılan: şimdi)
+        """
+        if not self.enabled:
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+        try:
+            # Gönderim sürerken de çağrılabilir (kilit yok, sqlite bekler)
+            conn = self._connect()
+            try:
+                with conn:
+                    confirmed = self._state(conn)[1]
+                    conn.execute("INSERT INTO sync_outbox (kind, timestamp, payload) VALUES (?, ?, ?)",
+                                 (kind, timestamp, json.dumps(data, default=str)))
+                    # Sınır gönderilmemiş olaylar içindir; onaylanıp saklananlar atılmış sayılmaz
+                    dropped = conn.execute("""
+                        DELETE FROM sync_outbox WHERE seq > ? AND seq <= (
+                            SELECT seq FROM sync_outbox WHERE seq > ? ORDER BY seq DESC LIMIT 1 OFFSET ?)
+                    """, (confirmed, confirmed, self.outbox_max)).rowcount
+            finally:
+                conn.close()
+            if dropped > 0:
+                self.stats['dropped_events'] += dropped
+                SYNC_EVENTS_DROPPED.inc(dropped)
+        except sqlite3.Error as e:
+            self.logger.error(f"Olay kuyruğa alma hatası: {e}")
+
+    def _state(self, conn):
+        state = dict(conn.execute("SELECT name, value FROM sync_state").fetchall())
+        return state.get('visitor_id', 0), state.get('event_seq', 0)
+
+    def _build_batch(self, conn, visitor_id, event_seq):
+        """Onaylanan id'lerden sonraki ziyaretçi farkları ve olaylar"""
+        max_id = conn.execute(visitor_db.MAX_VISITOR_ID_QUERY).fetchone()[0] or 0
+        to_id = min(max_id, visitor_id + self.batch_visitors)
+        rollups = {'bucket': [], 'camera': [], 'visitors': [], 'confidence_sum': []}
+        if to_id > visitor_id:
+            rows = conn.execute(SYNC_ROLLUP_QUERY, (visitor_id, to_id)).fetchall()
+            for bucket, camera, visitors, confidence_sum in rows:
+                rollups['bucket'].append(bucket)
+                rollups['camera'].append(camera)
+                rollups['visitors'].append(visitors)
+                rollups['confidence_sum'].append(round(confidence_sum, 4))
+
+        events = [[seq, kind, timestamp, json.loads(payload)] for seq, kind, timestamp, payload in conn.execute(
+            "SELECT seq, kind, timestamp, payload FROM sync_outbox WHERE seq > ? ORDER BY seq LIMIT ?",
+            (event_seq, SYNC_BATCH_EVENTS))]
+
+        return {'store': self.store_id, 'from_id': visitor_id, 'to_id': max(to_id, visitor_id),
+                'rollups': rollups, 'events': events}
+
+    def _post(self, payload):
+        """
+        Paketi gönder.
+
+        Returns:
+            dict: Sunucunun onayladığı {'visitor_id', 'event_seq'}
+        """
+        body = encode_payload(payload)
+        request = urllib.request.Request(f"{self.server_url}/api/sync", data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip'
+        })
+        if self.token:
+            request.add_header('X-Sync-Token', self.token)
+        with urllib.request.urlopen(request, timeout=SYNC_TIMEOUT_SECONDS) as response:
+            result = json.loads(response.read().decode('utf-8'))
+        if not result.get('success'):
+            raise ValueError(result.get('message', 'Sunucu paketi reddetti'))
+
+        SYNC_BATCHES.inc()
+        SYNC_BYTES.inc(len(body))
+        self.stats['batches'] += 1
+        self.stats['bytes_sent'] += len(body)
+        self.stats['raw_bytes'] += len(json.dumps(payload, separators=(',', ':')))
+        return result['data']
+
+    def sync_once(self):
+        """
+        Merkezle yakalanana kadar (en fazla MAX_BATCHES_PER_SYNC paket) senkronize et.
+
+        Returns:
+            bool: Başarılıysa True (bağlantı yoksa False)
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            conn = self._connect()
+            try:
+                visitor_id, event_seq = self._state(conn)
+                for _ in range(MAX_BATCHES_PER_SYNC):
+                    payload = self._build_batch(conn, visitor_id, event_seq)
+                    acked = self._post(payload)
+
+                    # Sunucunun id'leri esas alınır: gerideyse (ör. veri kaybı) oradan tekrar gönderilir.
+                    # Olaylar ancak iki onayda birden varsa silinir; son onaylananlar tekrar gönderim için kalır.
+                    progressed = (acked['visitor_id'], acked['event_seq']) != (visitor_id, event_seq)
+                    events = payload['events']
+                    sent_seq = events[-1][0] if events else event_seq
+                    confirmed = min(event_seq, acked['event_seq'])
+                    visitor_id, event_seq = acked['visitor_id'], acked['event_seq']
+                    with conn:
+                        conn.executemany("INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)",
+                                         [('visitor_id', visitor_id), ('event_seq', event_seq)])
+                        conn.execute("DELETE FROM sync_outbox WHERE seq <= ?", (confirmed,))
+
+                    accepted = visitor_id >= payload['to_id'] and event_seq >= sent_seq
+                    if not accepted:
+                        if not progressed:
+                            raise ValueError("Sunucu paketi kabul etmedi")
+                        continue
+                    if payload['to_id'] - payload['from_id'] < self.batch_visitors and len(events) < SYNC_BATCH_EVENTS:
+                        break
+            except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+                SYNC_FAILURES.inc()
+                self.stats['failures'] += 1
+                self.stats['last_error'] = str(e)
+                self.logger.warning(f"Merkez senkronizasyonu başarısız: {e}")
+                return False
+            except sqlite3.Error as e:
+                self.stats['last_error'] = str(e)
+                self.logger.error(f"Senkronizasyon veritabanı hatası: {e}")
+                return False
+            finally:
+                conn.close()
+
+        self.stats['last_success'] = time.time()
+        self.stats['last_error'] = None
+        return True
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='store-sync', daemon=True)
+        self._thread.start()
+        self.logger.info(f"🔗 Merkez senkronizasyonu: {self.server_url} (mağaza {self.store_id})")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=SYNC_TIMEOUT_SECONDS + 5)
+        self._thread = None
+
+    def _loop(self):
+        """Periyodik senkronizasyon; bağlantı yoksa bekleme süresi üstel artar"""
+        wait = self.interval
+        while not self._stop_event.is_set():
+            if self.sync_once():
+                wait = self.interval
+            else:
+                wait = min(wait * 2, max(SYNC_BACKOFF_MAX, self.interval))
+            self._stop_event.wait(wait)
+
+    def get_stats(self):
+        """
+        Senkronizasyon durumu ve bekleyen veri.
+
+        Returns:
+            dict
+        """
+        pending_visitors = pending_events = None
+        try:
+            conn = self._connect()
+            try:
+                visitor_id, event_seq = self._state(conn)
+                pending_visitors = conn.execute(PENDING_VISITORS_QUERY, (visitor_id,)).fetchone()[0]
+                pending_events = conn.execute("SELECT COUNT(*) FROM sync_outbox WHERE seq > ?",
+                                              (event_seq,)).fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+        sent, raw = self.stats['bytes_sent'], self.stats['raw_bytes']
+        return {
+            'enabled': self.enabled,
+            'store_id': self.store_id,
+            'server_url': self.server_url,
+            'pending_visitors': pending_visitors,
+            'pending_events': pending_events,
+            'compression_ratio': round(raw / sent, 1) if sent else None,
+            **self.stats
+        }
@@ -0,0 +1,356 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Çoklu Çözünürlüklü Video Akışı
+Her frame, izlenen her rendition (çözünürlük + kalite) için sadece bir kez
+encode edilir ve o rendition'ı izleyen tüm client'lar aynı byte'ları paylaşır.
+
+Rendition'lar:
+    full  - kamera çözünürlüğü
+    640   - 640 px genişlik
+    320   - 320 px genişlik (mobil)
+
+Yavaş client'lar (soketi frame aralığından yavaş boşalanlar) otomatik olarak
+bir alt rendition'a, en altta da daha düşük kaliteye düşürülür. Sunucu yük
+altındayken (load_shedder) tüm izleyiciler için FPS ve kalite sınırlanabilir.
+
+Varsayılan akış ham frame'dir; kutular tespit kanalı (detection_channel)
+üzerinden gönderilir. ?overlay=1 isteyen izleyiciler için kutular frame başına
+bir kez, küçültülmüş görüntü üzerine çizilip ayrı cache'lenir.
+"""
+
+import threading
+import time
+
+import cv2
+
+from detection_format import draw_detections
+from metrics import metrics_registry, stage_timer
+
+# Rendition adı -> hedef genişlik (None = orijinal)
+RENDITIONS = {'full': None, '640': 640, '320': 320}
+RENDITION_ORDER = ('full', '640', '320')
+QUALITY_LEVELS = (85, 70, 50)
+DEFAULT_QUALITY = 85
+
+# Adaptif akış: yazma süresi frame aralığının bu oranını aşarsa "yavaş" sayılır
+SLOW_DRAIN_RATIO = 0.8
+SLOW_FRAMES_TO_DOWNGRADE = 5
+FAST_SECONDS_TO_UPGRADE = 30.0
+NOMINAL_FRAME_INTERVAL = 1.0 / 15  # FPS sınırı yoksa referans aralık
+
+BANDWIDTH_WINDOW = 10.0
+
+STREAM_BYTES = metrics_registry.counter(
+    'stream_bytes_sent_total', 'Video akışında gönderilen byte', labels=('rendition',))
+STREAM_ENCODE_SECONDS = metrics_registry.histogram(
+    'stream_encode_seconds', 'Rendition başına JPEG encode süresi', labels=('rendition',))
+STREAM_DOWNGRADES = metrics_registry.counter(
+    'stream_downgrades_total', 'Yavaş client nedeniyle yapılan kalite düşürmeleri')
+
+
+def mjpeg_part(seq, jpeg):
+    """
+    Multipart akış parçası. X-Frame-Seq başlığı, client'ın tespit kanalındaki
+    kutuları doğru frame ile eşleştirmesini sağlar.
+    """
+    return (b'--frame\r\nContent-Type: image/jpeg\r\nX-Frame-Seq: ' + str(seq).encode() +
+            b'\r\n\r\n' + jpeg + b'\r\n')
+
+
+def snap_quality(quality):
+    """İstenen kaliteyi en yakın hazır seviyeye yuvarla (cache paylaşımı için)"""
+    return min(QUALITY_LEVELS, key=lambda level: abs(level - quality))
+
+
+class RenditionEncoder:
+    """Frame başına, rendition başına tek encode yapan paylaşımlı cache"""
+
+    def __init__(self, frame_source):
+        """
+        Args:
+            frame_source: () -> (frame sıra numarası, ham frame, (tespitler, track id'leri))
+                döndüren fonksiyon
+        """
+        self.frame_source = frame_source
+        self._cache = {}          # (rendition, quality, overlay) -> (seq, bytes)
+        self._resized = {}        # rendition -> (seq, frame)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+        # Rendition istatistikleri
+        self._stats_lock = threading.Lock()
+        self.started_at = time.time()
+        self.stats = {name: self._empty_stats() for name in RENDITION_ORDER}
+        self.viewers = {name: 0 for name in RENDITION_ORDER}
+
+        # Tüm oturumlar için üst sınırlar (None = sınırsız; yük azaltma ayarlar)
+        self.fps_cap = None
+        self.quality_cap = None
+
+    @staticmethod
+    def _empty_stats():
+        return {'encodes': 0, 'encode_seconds': 0.0, 'encoded_bytes': 0,
+                'sent_bytes': 0, 'window_bytes': 0, 'window_start': time.time(), 'bandwidth_bps': 0.0}
+
+    def _lock_for(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def _resize(self, rendition, seq, frame):
+        """Frame'i rendition genişliğine küçült (aynı frame için bir kez)"""
+        width = RENDITIONS[rendition]
+        if width is None or frame.shape[1] <= width:
+            return frame
+
+        cached = self._resized.get(rendition)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+
+        height = int(round(frame.shape[0] * width / frame.shape[1]))
+        resized = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        self._resized[rendition] = (seq, resized)
+        return resized
+
+    def get(self, rendition='full', quality=DEFAULT_QUALITY, overlay=False):
+        """
+        Güncel frame'in istenen rendition'daki JPEG'i.
+
+        Args:
+            overlay: True ise tespit kutuları görüntüye çizilir
+
+        Returns:
+            tuple: (frame sıra numarası, JPEG bytes veya None)
+        """
+        seq, frame, annotations = self.frame_source()
+        if frame is None:
+            return seq, None
+
+        key = (rendition, quality, overlay)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == seq:
+            return cached
+
+        with self._lock_for(key):
+            # Kilidi beklerken başka bir izleyici encode etmiş olabilir
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == seq:
+                return cached
+
+            start = time.perf_counter()
+            with stage_timer('jpeg_encode'):
+                image = self._resize(rendition, seq, frame)
+                if overlay and annotations:
+                    detections, track_ids = annotations
+                    scale = image.shape[1] / frame.shape[1]
+                    image = draw_detections(image.copy(), detections, scale, track_ids)
+                _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            elapsed = time.perf_counter() - start
+
+            cached = (seq, buffer.tobytes())
+            self._cache[key] = cached
+
+        STREAM_ENCODE_SECONDS.labels(rendition=rendition).observe(elapsed)
+        with self._stats_lock:
+            stats = self.stats[rendition]
+            stats['encodes'] += 1
+            stats['encode_seconds'] += elapsed
+            stats['encoded_bytes'] += len(cached[1])
+        return cached
+
+    def record_sent(self, rendition, nbytes):
+        """Client'a gönderilen byte'ları bant genişliği istatistiğine ekle"""
+        STREAM_BYTES.labels(rendition=rendition).inc(nbytes)
+        with self._stats_lock:
+            stats = self.stats[rendition]
+            stats['sent_bytes'] += nbytes
+            stats['window_bytes'] += nbytes
+            now = time.time()
+            window = now - stats['window_start']
+            if window >= BANDWIDTH_WINDOW:
+                stats['bandwidth_bps'] = stats['window_bytes'] * 8 / window
+                stats['window_bytes'] = 0
+                stats['window_start'] = now
+
+    def viewer_changed(self, rendition, delta):
+        """Rendition izleyici sayısını güncelle"""
+        with self._stats_lock:
+            self.viewers[rendition] = max(0, self.viewers[rendition] + delta)
+
+    def get_stats(self):
+        """
+        Rendition başına encode CPU'su ve bant genişliği raporu.
+
+        Returns:
+            dict: Rendition adı -> istatistikler
+        """
+        uptime = max(time.time() - self.started_at, 1e-6)
+        report = {}
+        with self._stats_lock:
+            for name in RENDITION_ORDER:
+                stats = self.stats[name]
+                encodes = stats['encodes']
+                report[name] = {
+                    'viewers': self.viewers[name],
+                    'frames_encoded': encodes,
+                    'avg_encode_ms': round(stats['encode_seconds'] / encodes * 1000, 2) if encodes else 0.0,
+                    'encode_cpu_percent': round(stats['encode_seconds'] / uptime * 100, 2),
+                    'avg_frame_kb': round(stats['encoded_bytes'] / encodes / 1024, 1) if encodes else 0.0,
+                    'sent_mb': round(stats['sent_bytes'] / (1024 * 1024), 2),
+                    'bandwidth_kbps': round(stats['bandwidth_bps'] / 1000, 1)
+                }
+        return report
+
+    def get_memory_info(self):
+        """
+        Encode cache'i ve küçültülmüş frame'lerin tuttuğu bellek.
+
+        Returns:
+            dict
+        """
+        cached = list(self._cache.values())
+        resized = list(self._resized.values())
+        return {
+            'cached_jpegs': len(cached),
+            'cached_jpeg_kb': round(sum(len(jpeg) for _, jpeg in cached if jpeg) / 1024, 1),
+            'resized_frames': len(resized),
+            'resized_frame_kb': round(sum(frame.nbytes for _, frame in resized) / 1024, 1),
+            'locks': len(self._locks),
+            'viewers': sum(self.viewers.values())
+        }
+
+
+class StreamSession:
+    """Tek izleyicinin rendition, kalite, FPS sınırı ve adaptasyon durumu"""
+
+    def __init__(self, encoder, rendition='full', quality=DEFAULT_QUALITY, max_fps=None,
+                 adaptive=True, logger=None, overlay=False):
+        self.encoder = encoder
+        self.overlay = overlay
+        self.rendition = rendition if rendition in RENDITIONS else 'full'
+        self.quality = snap_quality(quality)
+        self.max_fps = max_fps if max_fps and max_fps > 0 else None
+        self.adaptive = adaptive
+        self.logger = logger
+
+        # En iyi ayar: upgrade bu seviyenin üstüne çıkmaz
+        self._ceiling = (RENDITION_ORDER.index(self.rendition), QUALITY_LEVELS.index(self.quality))
+        self._slow_frames = 0
+        self._fast_since = time.time()
+        self._last_sent_at = 0.0
+
+        encoder.viewer_changed(self.rendition, +1)
+
+    @classmethod
+    def from_request_args(cls, encoder, args, user_agent='', logger=None, overlay_default=False):
+        """
+        Query parametrelerinden oturum oluştur:
+            ?rendition=640&quality=70&fps=10&adaptive=0&overlay=1
+        Rendition verilmezse mobil tarayıcılara 640 px gönderilir.
+        """
+        default_rendition = '640' if 'Mobi' in (user_agent or '') else 'full'
+        try:
+            quality = int(args.get('quality', DEFAULT_QUALITY))
+        except (TypeError, ValueError):
+            quality = DEFAULT_QUALITY
+        try:
+            max_fps = float(args.get('fps', 0))
+        except (TypeError, ValueError):
+            max_fps = 0
+        adaptive = str(args.get('adaptive', '1')).lower() not in ('0', 'false', 'no')
+        overlay = str(args.get('overlay', '1' if overlay_default else '0')).lower() in ('1', 'true', 'yes')
+
+        return cls(encoder, args.get('rendition', default_rendition), quality, max_fps, adaptive, logger,
+                   overlay)
+
+    @property
+    def effective_fps(self):
+        """İzleyicinin ve sunucunun FPS sınırlarından küçüğü (None = sınırsız)"""
+        limits = [fps for fps in (self.max_fps, self.encoder.fps_cap) if fps]
+        return min(limits) if limits else None
+
+    @property
+    def frame_interval(self):
+        """Hedef frame aralığı (saniye)"""
+        fps = self.effective_fps
+        return 1.0 / fps if fps else NOMINAL_FRAME_INTERVAL
+
+    def wait_time(self):
+        """FPS sınırı için bir sonraki frame'e kadar beklenecek süre"""
+        if not self.effective_fps:
+            return 0.0
+        return max(0.0, self._last_sent_at + self.frame_interval - time.perf_counter())
+
+    def next_frame(self):
+        """
+        Oturumun rendition/kalitesinde güncel JPEG.
+
+        Returns:
+            tuple: (frame sıra numarası, JPEG bytes veya None)
+        """
+        quality = self.quality
+        if self.encoder.quality_cap is not None:
+            quality = min(quality, snap_quality(self.encoder.quality_cap))
+        return self.encoder.get(self.rendition, quality, self.overlay)
+
+    def record_sent(self, nbytes, write_seconds):
+        """
+        Gönderim sonrası çağrılır. write_seconds, sunucunun parçayı sokete
+        yazması için geçen süredir (generator'ın yield'de beklediği süre).
+        """
+        self._last_sent_at = time.perf_counter()
+        self.encoder.record_sent(self.rendition, nbytes)
+
+        if not self.adaptive:
+            return
+
+        if write_seconds > self.frame_interval * SLOW_DRAIN_RATIO:
+            self._slow_frames += 1
+            self._fast_since = time.time()
+            if self._slow_frames >= SLOW_FRAMES_TO_DOWNGRADE:
+                self._slow_frames = 0
+                self._step(+1)
+        else:
+            self._slow_frames = 0
+            if time.time() - self._fast_since > FAST_SECONDS_TO_UPGRADE:
+                self._fast_since = time.time()
+                self._step(-1)
+
+    def _step(self, direction):
+        """Bir kademe düşür (+1) veya yükselt (-1): önce çözünürlük, sonra kalite"""
+        r_index = RENDITION_ORDER.index(self.rendition)
+        q_index = QUALITY_LEVELS.index(self.quality)
+
+        if direction > 0:
+            if r_index < len(RENDITION_ORDER) - 1:
+                r_index += 1
+            elif q_index < len(QUALITY_LEVELS) - 1:
+                q_index += 1
+            else:
+                return
+            STREAM_DOWNGRADES.inc()
+        else:
+            ceiling_r, ceiling_q = self._ceiling
+            if q_index > ceiling_q and r_index == len(RENDITION_ORDER) - 1:
+                q_index -= 1
+            elif r_index > ceiling_r:
+                r_index -= 1
+            elif q_index > ceiling_q:
+                q_index -= 1
+            else:
+                return
+
+        old = (self.rendition, self.quality)
+        self.encoder.viewer_changed(self.rendition, -1)
+        self.rendition = RENDITION_ORDER[r_index]
+        self.quality = QUALITY_LEVELS[q_index]
+        self.encoder.viewer_changed(self.rendition, +1)
+
+        if self.logger:
+            action = "düşürüldü" if direction > 0 else "yükseltildi"
+            self.logger.info(f"📉 Video akışı {action}: {old[0]}@{old[1]} -> {self.rendition}@{self.quality}")
+
+    def close(self):
+        """İzleyici ayrıldığında çağrılır"""
+        self.encoder.viewer_changed(self.rendition, -1)
@@ -0,0 +1,147 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Zamansal Tespit Doğrulama
+HumanDetector ile visitor_tracker arasında, titreyen (tek tük frame'de
+görünen) tespitlerin ziyaretçi kaydı oluşturmasını engelleyen aşama.
+
+- Bir track, son N frame'in en az K'sında görülmeden (IouTracker görülme
+  geçmişi) ve güven skorunun üstel hareketli ortalaması (EMA) eşiği
+  geçmeden sayıma gönderilmez. Doğrulanan track kapanana kadar geçer.
+- Yer tutucu kutular ([0, 0, 100, 100]) ve sıfır güvenli tespitler hiçbir
+  zaman geçmez; export sırasında sonradan temizlenmeleri gerekmez.
+- Geçen tespitlerin güveni EMA ile yumuşatılır (confidence_avg daha kararlı).
+- N, K ve EMA katsayısı kamera frame'i cinsindendir; dedektör örneklemesinde
+  (TrackingUpdate.frame_step) aynı gerçek süreye denk gelecek şekilde ölçeklenir.
+
+Çıktı, sayım tarafındaki aşamaların (çalışan filtresi, demografi, bölge,
+yeniden tanıma) kullandığı TrackingUpdate'in doğrulanmış alt kümesidir;
+`confirmed` bu frame'de doğrulanan track'leri içerir.
+"""
+
+from detection_format import detection_bbox, detection_confidence
+from iou_tracker import TrackingUpdate, HISTORY_MASK, per_step
+from metrics import metrics_registry
+from src.config.settings import SETTINGS
+
+TEMPORAL_WINDOW = getattr(SETTINGS, 'TEMPORAL_WINDOW', 8)           # N: son kaç frame'e bakılır
+TEMPORAL_MIN_HITS = getattr(SETTINGS, 'TEMPORAL_MIN_HITS', 5)       # K: bunların kaçında görülmeli
+TEMPORAL_EMA_ALPHA = getattr(SETTINGS, 'TEMPORAL_EMA_ALPHA', 0.3)
+TEMPORAL_MIN_CONFIDENCE = getattr(SETTINGS, 'TEMPORAL_MIN_CONFIDENCE', 0.5)
+PLACEHOLDER_BBOX = (0.0, 0.0, 100.0, 100.0)
+
+DETECTIONS_SUPPRESSED = metrics_registry.counter(
+    'temporal_filter_suppressed_total', 'Sayıma gönderilmeyen tespitler', labels=('reason',))
+TRACKS_VERIFIED = metrics_registry.counter(
+    'temporal_filter_verified_tracks_total', 'Zamansal olarak doğrulanan track\'ler')
+
+
+def is_placeholder(detection):
+    """Yer tutucu kutu veya sıfır güvenli tespit mi"""
+    return detection_confidence(detection) <= 0.0 or detection_bbox(detection) == PLACEHOLDER_BBOX
+
+
+class TemporalFilter:
+    """K / N görülme + güven EMA'sı ile track doğrulama"""
+
+    def __init__(self, tracker, window=TEMPORAL_WINDOW, min_hits=TEMPORAL_MIN_HITS,
+                 alpha=TEMPORAL_EMA_ALPHA, min_confidence=TEMPORAL_MIN_CONFIDENCE):
+        """
+        Args:
+            tracker: Görülme geçmişini tutan IouTracker
+            window: N (en fazla 32 frame)
+            min_hits: K (1 -> filtre kapalı, sadece yer tutucular atılır)
+            alpha: EMA katsayısı (büyük = son frame'lere daha duyarlı)
+            min_confidence: Doğrulama için gereken en düşük EMA güveni
+        """
+        if not 1 <= min_hits <= window <= HISTORY_MASK.bit_length():
+            raise ValueError(f"Geçersiz K / N: {min_hits} / {window}")
+        self.tracker = tracker
+        self.window = window
+        self.min_hits = min_hits
+        self.alpha = alpha
+        self.min_confidence = min_confidence
+        self._window_mask = (1 << window) - 1
+
+        self._ema = {}         # track_id -> yumuşatılmış güven
+        self._verified = set()
+        self.stats = {'frames': 0, 'detections': 0, 'passed': 0, 'placeholder': 0, 'unstable': 0,
+                      'low_confidence': 0, 'verified_tracks': 0}
+
+    def apply(self, detections, track_update):
+        """
+        Doğrulanmış track'lerin tespitlerini seç.
+
+        Args:
+            detections: Tespit listesi
+            track_update: Aynı frame için IouTracker.update() sonucu
+
+        Returns:
+            tuple: (doğrulanmış tespitler, bunlara ait TrackingUpdate)
+        """
+        for track in track_update.ended_tracks:
+            self._ema.pop(track.track_id, None)
+            self._verified.discard(track.track_id)
+
+        self.stats['frames'] += 1
+        step = track_update.frame_step
+        window_mask = self._window_mask if step == 1 else (1 << per_step(self.window, step)) - 1
+        min_hits = per_step(self.min_hits, step)
+        alpha = 1 - (1 - self.alpha) ** step
+        kept, kept_ids, verified_now = [], [], []
+        for index, track_id in enumerate(track_update.track_ids):
+            detection = detections[index]
+            if is_placeholder(detection):
+                self._suppress('placeholder')
+                continue
+
+            confidence = detection_confidence(detection)
+            ema = self._ema.get(track_id)
+            ema = confidence if ema is None else ema + alpha * (confidence - ema)
+            self._ema[track_id] = ema
+
+            if track_id not in self._verified:
+                track = self.tracker.tracks.get(track_id)
+                hits = bin(track.history & window_mask).count('1') if track is not None else 1
+                if hits < min_hits:
+                    self._suppress('unstable')
+                    continue
+                if ema < self.min_confidence:
+                    self._suppress('low_confidence')
+                    continue
+                self._verified.add(track_id)
+                self.stats['verified_tracks'] += 1
+                TRACKS_VERIFIED.inc()
+                if track is not None:
+                    verified_now.append((len(kept), track))
+
+            kept.append(dict(detection, confidence=round(ema, 4)) if isinstance(detection, dict) else detection)
+            kept_ids.append(track_id)
+
+        self.stats['detections'] += len(track_update.track_ids)
+        self.stats['passed'] += len(kept)
+        kept_set = set(kept_ids)
+        update = TrackingUpdate(kept_ids, [track for track in track_update.new_tracks if track.track_id in kept_set],
+                                track_update.ended_tracks, verified_now, step)
+        return kept, update
+
+    def _suppress(self, reason):
+        self.stats[reason] += 1
+        DETECTIONS_SUPPRESSED.labels(reason=reason).inc()
+
+    def is_verified(self, track_id):
+        return track_id in self._verified
+
+    def reset(self):
+        """Track durumlarını temizle (sistem durdurulunca)"""
+        self._ema.clear()
+        self._verified.clear()
+
+    def get_stats(self):
+        """
+        Filtre ayarları ve sayaçlar.
+
+        Returns:
+            dict
+        """
+        detections = self.stats['detections']
+        return dict(self.stats, window=self.window, min_hits=self.min_hits, min_confidence=self.min_confidence,
+                    active_tracks=len(self._ema), pass_rate=round(self.stats['passed'] / detections, 3) if detections else 0.0)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Alarm kuralları test scripti
+Sentetik tespitlerle (simüle edilmiş zaman, 10 FPS) kayan pencere
+kurallarını çalıştırır; webhook'ları yerel bir http.server taklidine
+gönderip alarm / çözülme / cooldown davranışını ve kural başına
+değerlendirme maliyetini doğrular. Kamera veya model gerekmez.
+
+Kullanım:
+    python test_alert_rules.py [--rules 48]
+"""
+
+import argparse
+import json
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from alert_rules import AlertEngine, AlertRule, RollingWindow
+
+FRAME_SHAPE = (720, 1280, 3)
+FPS = 10
+COUNTER_ZONE = [0.6, 0.5, 1.0, 1.0]
+
+
+class WebhookRecorder(BaseHTTPRequestHandler):
+    """Gelen webhook gövdelerini kaydeden yerel sunucu"""
+
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.received.append(json.loads(body))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def people_at_counter(count, first_track=1):
+    """Kasa bölgesinde ayakta duran kişiler (ayak noktası bölge içinde)"""
+    detections = [{'bbox': [900 + 40 * i, 400, 60, 250], 'confidence': 0.9} for i in range(count)]
+    return detections, list(range(first_track, first_track + count))
+
+
+def test_rolling_window():
+    """Pencere toplamları tam hesapla aynı olmalı"""
+    print("🪟 Kayan pencere testi...")
+    window = RollingWindow(5.0)
+    samples = []
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9, 3, 2, 3, 8, 4]
+    for i, value in enumerate(values):
+        window.push(i * 0.5, value)
+        samples.append((i * 0.5, value))
+        inside = [v for t, v in samples if t >= i * 0.5 - 5.0]
+        expected = (min(inside), max(inside), sum(inside) / len(inside))
+        actual = (window.value('min'), window.value('max'), window.value('avg'))
+        assert all(abs(a - e) <= 1e-9 for a, e in zip(actual, expected)), f"t={i * 0.5}: {actual} != {expected}"
+    print("✅ min / max / ortalama tam hesapla aynı")
+
+
+def test_alert_lifecycle():
+    """Kuyruk kuralı: alarm, çözülme, cooldown ve webhook teslimi"""
+    print("🚨 Alarm yaşam döngüsü testi...")
+    WebhookRecorder.received = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookRecorder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook = f"http://127.0.0.1:{server.server_address[1]}/hook"
+
+    rules = [
+        AlertRule('Kasa kuyruğu', COUNTER_ZONE, aggregate='min', window=120, op='>', threshold=4,
+                  cooldown=300, webhook=webhook),
+        AlertRule('Kasaya giriş', COUNTER_ZONE, aggregate='entries', window=45, op='>=', threshold=6,
+                  cooldown=600),
+    ]
+    socket_events = []
+    engine = AlertEngine(rules, on_event=socket_events.append)
+
+    # (süre saniye, kasadaki kişi sayısı)
+    phases = [(60, 2), (150, 5), (30, 1), (130, 5), (130, 5)]
+    now = 1_700_000_000.0
+    track = 1
+    for seconds, count in phases:
+        track += 10  # Her aşamada yeni kişiler
+        detections, track_ids = people_at_counter(count, track)
+        for _ in range(seconds * FPS):
+            now += 1.0 / FPS
+            engine.update(FRAME_SHAPE, detections, track_ids, now)
+
+    engine.flush()
+    server.shutdown()
+
+    start = 1_700_000_000.0
+    queue_events = [(e['state'], round(e['timestamp'] - start)) for e in socket_events if e['rule'] == 'Kasa kuyruğu']
+    expected = [('firing', 180), ('resolved', 210), ('firing', 480)]
+    assert queue_events == expected, f"Kuyruk olayları: {queue_events}, beklenen {expected}"
+    print(f"✅ Kuyruk olayları: {queue_events}")
+
+    hooks = [(e['state'], round(e['timestamp'] - start)) for e in WebhookRecorder.received]
+    assert hooks == expected, f"Webhook istekleri: {hooks}, beklenen {expected}"
+    print(f"✅ Webhook teslim edildi: {len(hooks)} istek")
+
+    # 210. saniyede 1, 240. saniyede 5 yeni kişi: 45 saniyelik pencerede 6 giriş
+    entries = [(e['state'], round(e['timestamp'] - start)) for e in socket_events if e['rule'] == 'Kasaya giriş']
+    expected_entries = [('firing', 240), ('resolved', 255)]
+    assert entries == expected_entries, f"Giriş kuralı: {entries}, beklenen {expected_entries}"
+    print(f"✅ Giriş kuralı: {entries}")
+
+
+def test_rule_cost(rule_count=48, people=10, frames=3000):
+    """Kamera başına çok kural: frame başına değerlendirme süresi"""
+    print(f"⏱️  {rule_count} kural, {people} kişi maliyet testi...")
+    aggregates = ('current', 'avg', 'max', 'min', 'entries')
+    rules = []
+    for i in range(rule_count):
+        x = (i % 8) / 8
+        rules.append(AlertRule(f'kural_{i}', [x, 0.0, x + 0.25, 1.0], aggregate=aggregates[i % len(aggregates)],
+                               window=(30, 60, 120)[i % 3], op='>', threshold=1000))
+    engine = AlertEngine(rules)
+
+    detections = [{'bbox': [100 * i, 300, 60, 250], 'confidence': 0.9} for i in range(people)]
+    track_ids = list(range(people))
+    now = time.time()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        now += 1.0 / 30
+        engine.update(FRAME_SHAPE, detections, track_ids, now)
+    per_frame = (time.perf_counter() - t0) / frames
+
+    budget = 1.0 / 30
+    summary = (f"Frame başına {per_frame * 1e6:.0f} µs ({engine.get_status()['windows']} paylaşılan pencere, "
+               f"30 FPS bütçesinin %{per_frame / budget * 100:.2f}'i)")
+    assert per_frame < budget * 0.03, summary
+    print(f"✅ {summary}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alarm kuralları testi")
+    parser.add_argument('--rules', type=int, default=48, help="Maliyet testi için kural sayısı")
+    args = parser.parse_args()
+
+    try:
+        test_rolling_window()
+        test_alert_lifecycle()
+        test_rule_cost(args.rules)
+    except AssertionError as error:
+        print(f"❌ {error}")
+        sys.exit(1)
@@ -6,12 +6,15 @@ Tespit sistemi manuel test scripti
 import cv2
 import sys
 import os
+import threading
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.core.camera import CameraManager
 from src.core.detector import HumanDetector
 from src.core.visitor_tracker import visitor_tracker
 from datetime import datetime
+from detection_format import draw_detections
+from pipeline import Pipeline, FunctionStage, DetectorStage
 
 def test_detection_system():
     """Tespit sistemini test et"""
@@ -33,33 +36,43 @@ def test_detection_system():
     
     print("✅ Kamera ve model hazır - 'q' tuşuna basarak çıkış yapın")
     
-    # Kamera yakalamayı başlat
+    # Son işlenen frame (pencere ana thread'de gösterilir)
+    latest = {'frame': None, 'count': 0}
+    latest_lock = threading.Lock()
+    
+    def visitor_sink(packet):
+        # Sonuçları göster
+        if packet.detections:
+            print(f"🎯 Frame {packet.seq}: {len(packet.detections)} kişi tespit edildi!")
+            
+            # Visitor tracker'a gönder
+            result = visitor_tracker.process_detections(packet.detections, datetime.now())
+            print(f"👥 Yeni ziyaretçi: {result['new_visitors']}")
+            print(f"📊 Toplam bugün: {result['current_stats']['total_today']}")
+        
+        with latest_lock:
+            latest['frame'] = draw_detections(packet.frame, packet.detections)
+            latest['count'] += 1
+        return packet
+    
+    # Kamera -> dedektör (en eski frame atılır) -> ziyaretçi kaydı
+    pipeline = Pipeline([DetectorStage(detector),
+                         FunctionStage('visitors', visitor_sink, queue_size=8)], name='test')
+    pipeline.start()
+    
+    # Kamera yakalamayı başlat (her yeni frame hatta verilir, tespit hattın thread'lerinde)
     camera.start_capture()
+    camera.add_frame_callback(pipeline.submit)
     
     try:
-        frame_count = 0
+        shown = 0
         while True:
-            # Frame al
-            frame = camera.get_current_frame()
-            if frame is None:
-                continue
-            
-            frame_count += 1
-            
-            # Tespit yap
-            detections, processed_frame = detector.detect_humans(frame, draw_boxes=True)
-            
-            # Sonuçları göster
-            if detections:
-                print(f"🎯 Frame {frame_count}: {len(detections)} kişi tespit edildi!")
-                
-                # Visitor tracker'a gönder
-                result = visitor_tracker.process_detections(detections, datetime.now())
-                print(f"👥 Yeni ziyaretçi: {result['new_visitors']}")
-                print(f"📊 Toplam bugün: {result['current_stats']['total_today']}")
-            
             # Görüntüyü göster
-            cv2.imshow("Test - Tespit Sistemi", processed_frame)
+            with latest_lock:
+                processed_frame, count = latest['frame'], latest['count']
+            if processed_frame is not None and count != shown:
+                shown = count
+                cv2.imshow("Test - Tespit Sistemi", processed_frame)
             
             # Çıkış kontrolü
             if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -70,6 +83,10 @@ def test_detection_system():
     
     finally:
         camera.stop_capture()
+        pipeline.stop()
+        for stage in pipeline.get_stats()['stages']:
+            print(f"🔗 {stage['name']}: {stage['processed']} frame, {stage['dropped']} atlandı, "
+                  f"ort. {stage['avg_ms']} ms")
         detector.cleanup()
         cv2.destroyAllWindows()
     
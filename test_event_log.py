@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Olay günlüğü hata enjeksiyonu testi
+Ayrı bir worker process'i sentetik kişi akışını IouTracker ve olay
+günlüğüyle işler, ziyaretçileri (db_manager gibi) tamponlayarak
+veritabanına yazar. Test, worker'ı akışın ortasında öldürür (SIGKILL) ve
+yeniden açılışta bugünün sayımlarının, aktif track'lerin ve yazılamadan
+kalan ziyaretçilerin kurtarıldığını doğrular. Kamera veya model gerekmez.
+
+Kullanım:
+    python test_event_log.py [--kills 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from event_log import EventLog, RECORD, iter_records, reconcile_visitors
+from iou_tracker import IouTracker
+
+FPS = 10
+DB_FLUSH_EVERY = 7          # Worker ziyaretçileri bu kadar biriktirip yazar (tamponlu db_manager)
+SEGMENT_SIZE = 64 * 1024    # Segment geçişleri ve budama da test edilsin
+SNAPSHOT_SECONDS = 5.0
+MAX_RECOVERY_MS = 100.0
+
+
+def create_visitors_table(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS visitors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_time TIMESTAMP,
+            confidence_avg REAL,
+            bounding_box TEXT,
+            camera_index INTEGER,
+            detection_count INTEGER
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def count_visitors(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM visitors").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def walking_people(frame_index):
+    """Her saniye soldan giren, 4 saniyede sahneyi geçen kişiler"""
+    detections = []
+    for person in range(max(0, frame_index // FPS - 4), frame_index // FPS + 1):
+        progress = frame_index - person * FPS
+        if 0 <= progress < 4 * FPS:
+            detections.append({'bbox': [40 + progress * 28, 200 + (person % 3) * 120, 80, 220],
+                               'confidence': 0.8 + (person % 5) * 0.03})
+    return detections
+
+
+def run_worker(directory, db_path):
+    """Öldürülene kadar sentetik akışı işle; her ziyaretçiden sonra sayıyı yaz"""
+    event_log = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=SNAPSHOT_SECONDS)
+    tracker = IouTracker()
+    event_log.recover(tracker, db_path)
+
+    conn = sqlite3.connect(db_path)
+    pending = []
+    total = event_log.state.total
+    now = max(time.time(), event_log.state.last_event)
+    frame_index = 0
+    while True:
+        frame_index += 1
+        now += 1.0 / FPS
+        detections = walking_people(frame_index)
+        track_update = tracker.update(detections, now)
+        event_log.record_frame(detections, track_update, now)
+
+        # visitor_tracker yerine: onaylanan her track bir ziyaretçi
+        if track_update.confirmed:
+            counted = [detections[index] for index, _ in track_update.confirmed]
+            event_log.record_visitors(len(counted), counted, now)
+            total += len(counted)
+            pending.extend(datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S.%f') for _ in counted)
+            print(total, flush=True)
+
+            if len(pending) >= DB_FLUSH_EVERY:
+                conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                                 "detection_count) VALUES (?, 0.85, '[]', 0, 1)", [(t,) for t in pending])
+                conn.commit()
+                pending = []
+
+
+def start_worker(directory, db_path):
+    return subprocess.Popen([sys.executable, __file__, '--worker', directory, db_path],
+                            stdout=subprocess.PIPE, text=True)
+
+
+def test_kill_and_recover(kills=5, seed=0):
+    """Worker'ı rastgele anlarda öldür; her açılışta sayım, track ve DB kurtarılmalı"""
+    print(f"💥 Hata enjeksiyonu: worker {kills} kez öldürülüyor...")
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        log_dir = os.path.join(directory, 'event_log')
+        db_path = os.path.join(directory, 'test.db')
+        create_visitors_table(db_path)
+
+        acknowledged = 0
+        for attempt in range(1, kills + 1):
+            target = acknowledged + rng.randint(20, 120)
+            worker = start_worker(log_dir, db_path)
+            for line in worker.stdout:
+                acknowledged = int(line)
+                if acknowledged >= target:
+                    worker.kill()
+                    break
+            worker.wait()
+            for line in worker.stdout:
+                acknowledged = int(line)
+            worker.stdout.close()
+
+            stored = count_visitors(db_path)
+            tracker = IouTracker()
+            event_log = EventLog(log_dir, segment_size=SEGMENT_SIZE, snapshot_interval=SNAPSHOT_SECONDS)
+            state = event_log.recover(tracker, db_path, camera_index=0)
+            event_log.close()
+            recovery = event_log.recovery
+            repaired = count_visitors(db_path)
+
+            # Ziyaretçi kaydı yazılıp sayı basılmadan öldürülmüş olabilir (+ en fazla bir frame)
+            counts_ok = acknowledged <= state.total <= acknowledged + 3 and repaired == state.total
+            fast = recovery['elapsed_ms'] < MAX_RECOVERY_MS
+            tracks_ok = bool(tracker.tracks) and all(track_id <= state.last_track_id for track_id in tracker.tracks)
+            new_id = tracker.update([{'bbox': [1000, 10, 50, 50], 'confidence': 0.9}]).track_ids[0]
+            ids_ok = new_id > state.last_track_id
+
+            ok = counts_ok and fast and ids_ok and (tracks_ok or recovery['replayed_records'] == 0)
+            print(f"{'✅' if ok else '❌'} #{attempt}: basılan {acknowledged}, kurtarılan {state.total}, "
+                  f"DB {stored} -> {repaired} (+{recovery['reconciled_visitors']}), "
+                  f"{recovery['replayed_records']} kayıt {recovery['elapsed_ms']:.1f} ms, "
+                  f"{len(tracker.tracks)} track, yeni id {new_id}")
+            assert not recovery['warm_restart'], "Öldürülen worker sıcak başlatma sayıldı"
+            assert counts_ok, f"Sayım kurtarılamadı: basılan {acknowledged}, kurtarılan {state.total}, DB {repaired}"
+            assert fast, f"Kurtarma çok yavaş: {recovery['elapsed_ms']:.1f} ms"
+            assert ids_ok, f"Yeni track id'si ({new_id}) eski id'lerle çakışıyor"
+            assert tracks_ok or recovery['replayed_records'] == 0, "Aktif track'ler geri yüklenmedi"
+
+            # Bir sonraki worker kapanıştaki (temiz) durumdan devam eder
+            acknowledged = state.total
+
+        segments = len([name for name in os.listdir(log_dir) if name.startswith('segment_')])
+        print(f"🗂️  Kalan segment sayısı: {segments}")
+
+
+def test_torn_tail():
+    """Yarım yazılmış son kayıt atlanmalı, yazma oradan devam etmeli"""
+    print("✂️  Yarım kayıt testi...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'test.db')
+        create_visitors_table(db_path)
+        event_log = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=1e9)
+        event_log.open(db_path)
+        tracker = IouTracker()
+        now = time.time()
+        for index in range(10):
+            detections = [{'bbox': [100, 100, 80, 200], 'confidence': 0.9}]
+            event_log.record_frame(detections, tracker.update(detections, now + index), now + index)
+        event_log.record_visitors(1, detections, now + 10)
+        event_log.record_visitors(1, detections, now + 11)
+
+        # Son kaydın son byte'larını boz (yazım ortasında ölmüş gibi)
+        offset = event_log._offset
+        event_log._map[offset - 3:offset] = b'\xff\xff\xff'
+        event_log._map.flush()
+        event_log._map = None  # close() çağrılmadan bırak (çökme)
+
+        recovered = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=1e9)
+        state = recovered.open(db_path)
+        first_ok = state.total == 1
+        recovered.record_visitors(2, detections, now + 12)
+        recovered._map.flush()
+
+        with open(os.path.join(directory, 'segment_000001.log'), 'rb') as f:
+            records = list(iter_records(f.read()))
+        again = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=1e9).open(db_path)
+
+    assert first_ok, f"Bozuk kayıt atlanmadı: {state.total} ziyaretçi"
+    assert again.total == 3, f"Bozuk kayıttan sonra yazılan okunmadı: {again.total} ziyaretçi"
+    assert len(records) == 12 and records[-1][3] - records[-2][3] > RECORD.size, \
+        f"Yeni kayıt bozuk kaydın üzerine yazıldı ({len(records)} kayıt)"
+    print(f"✅ Bozuk kayıt atlandı (1 ziyaretçi), sonrasına yazılan kayıt okundu "
+          f"({again.total} ziyaretçi, {len(records)} kayıt)")
+
+
+def test_reconcile_other_camera():
+    """Aynı anda başka kameranın yazdığı satırlar bu kameranın eksiklerini kapatmamalı"""
+    print("📷 Kamera ayrımı testi...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'test.db')
+        create_visitors_table(db_path)
+        event_log = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=1e9)
+        event_log.open(db_path)
+        now = time.time()
+        detections = [{'bbox': [100, 100, 80, 200], 'confidence': 0.9}]
+        for index in range(3):
+            event_log.record_visitors(1, detections, now + index)
+
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                         "detection_count) VALUES (?, 0.85, '[]', 1, 1)",
+                         [(datetime.fromtimestamp(now + index).strftime('%Y-%m-%d %H:%M:%S.%f'),)
+                          for index in range(3)])
+        conn.commit()
+        conn.close()
+
+        added = reconcile_visitors(event_log.state, db_path, camera_index=0)
+        again = reconcile_visitors(event_log.state, db_path, camera_index=0)
+        event_log.close()
+
+    assert added == 3, f"Kamera 1'in satırları sayıldı: {added} satır eklendi"
+    assert again == 0, f"Tamamlama tekrarında {again} satır daha eklendi"
+    print(f"✅ Kamera 1'in satırları sayılmadı: {added} satır eklendi, tekrar {again}")
+
+
+def test_warm_restart():
+    """Aynı süreçte close() sonrası recover(), tampondaki satırları tekrar eklememeli"""
+    print("🔁 Sıcak yeniden başlatma testi...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'test.db')
+        create_visitors_table(db_path)
+        event_log = EventLog(directory, segment_size=SEGMENT_SIZE, snapshot_interval=1e9)
+        event_log.recover(IouTracker(), db_path)
+        cold = event_log.recovery['warm_restart']
+
+        # Satırlar henüz db_manager tamponunda: veritabanında yoklar
+        now = time.time()
+        detections = [{'bbox': [100, 100, 80, 200], 'confidence': 0.9}]
+        for index in range(3):
+            event_log.record_visitors(1, detections, now + index)
+        event_log.close()
+
+        state = event_log.recover(IouTracker(), db_path)
+        event_log.close()
+        rows = count_visitors(db_path)
+
+    assert not cold, "İlk açılış sıcak başlatma sayıldı"
+    assert event_log.recovery['warm_restart'], "close() sonrası açılış sıcak başlatma sayılmadı"
+    assert state.total == 3 and rows == 0, f"Sıcak başlatmada {rows} satır eklendi"
+    print(f"✅ Sıcak başlatmada tamamlama atlandı: {state.total} ziyaretçi, {rows} satır eklendi")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Olay günlüğü hata enjeksiyonu testi")
+    parser.add_argument('--kills', type=int, default=5, help="Worker'ın öldürüleceği sayı")
+    parser.add_argument('--worker', nargs=2, metavar=('DIR', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+
+    try:
+        test_torn_tail()
+        test_reconcile_other_camera()
+        test_warm_restart()
+        test_kill_and_recover(args.kills)
+    except AssertionError as error:
+        print(f"❌ {error}")
+        sys.exit(1)
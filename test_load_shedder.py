@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Yük azaltma test scripti
+Görüntüyü CPU'su kısıtlanmış bir worker üzerinde tekrar oynatır: dedektör ve
+analiz aşamalarının her çalışması --throttle katı kadar CPU yakar (yavaş
+işlemci gibi). Önce kısıtsız bir referans, sonra yük azaltma kapalı ve açık
+kısıtlı çalışmalar yapılır ve şunlar doğrulanır:
+
+  - Kısıtlı worker'da yük azaltma yokken gecikme bütçeyi aşıyor
+  - LoadShedder kademeleri tanımlı sırayla uyguluyor ve her birini logluyor
+  - Son kademeden sonra uçtan uca gecikme bütçenin altına iniyor
+  - Sayım aşamaları hiç atlanmıyor / frame kaybetmiyor ve sayılan
+    ziyaretçiler referansla uyuşuyor
+  - Dedektör örneklemesi (her 2. / 3. frame) zorlandığında takip kişileri
+    bölmüyor: track ve ziyaretçi sayısı referansla uyuşuyor
+  - stop() sonrasında akış sınırları, atlanan aşamalar ve örnekleme geri alınıyor
+
+Varsayılan görüntü bench_temporal_filter'ın sentetik sahnesidir (gerçek
+kişiler bilindiği için sayım doğruluğu ölçülür); --video ile kayıtlı görüntü
+ReplayCamera ve HumanDetector üzerinden oynatılır.
+
+Kullanım:
+    python test_load_shedder.py [--seconds 30] [--throttle 3] [--budget 1.0]
+    python test_load_shedder.py --video data/replay/magaza.mp4 --throttle 4 --cores 1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from bench_pipeline import camera
+from bench_temporal_filter import synthetic_scene, FPS
+from iou_tracker import IouTracker
+from temporal_filter import TemporalFilter
+from pipeline import Pipeline, FunctionStage, DetectorStage
+from stream_renditions import RenditionEncoder
+from load_shedder import LoadShedder, PROTECTED_STAGES, detection_rate_step
+
+
+SAMPLED_RATES = (2, 3)      # detection_1_2 ve detection_1_3 kademeleri
+
+
+def burn(seconds):
+    """CPU'yu meşgul ederek bekle (sleep GIL'i bırakırdı, kısıtlı CPU'yu taklit etmezdi)"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ThrottledWorker:
+    """Sarılan dedektörün her çağrısını throttle katı kadar uzatan worker"""
+
+    def __init__(self, detector, throttle):
+        self.detector = detector
+        self.throttle = throttle
+
+    def detect_humans(self, frame, draw_boxes=False):
+        t0 = time.perf_counter()
+        result = self.detector.detect_humans(frame, draw_boxes=draw_boxes)
+        burn((time.perf_counter() - t0) * (self.throttle - 1))
+        return result
+
+
+class SceneDetector:
+    """Frame'in ilk pikseline yazılmış sıra numarasından sahnenin tespitlerini döndürür"""
+
+    def __init__(self, scene, seconds):
+        self.scene = scene
+        self.seconds = seconds
+
+    def detect_humans(self, frame, draw_boxes=False):
+        burn(self.seconds)
+        index = scene_index(frame)
+        return [dict(detection, truth=truth) for detection, truth in self.scene[index]], frame
+
+
+def scene_frames(count):
+    """Sıra numarasını taşıyan küçük frame'ler"""
+    frames = []
+    for index in range(count):
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        frame[0, 0] = (index % 256, index // 256 % 256, index // 65536)
+        frames.append(frame)
+    return frames
+
+
+def scene_index(frame):
+    b, g, r = (int(value) for value in frame[0, 0])
+    return b + g * 256 + r * 65536
+
+
+class Replay:
+    """Kısıtlanmış worker'lı tek çalışma: hat + (isteğe bağlı) LoadShedder"""
+
+    def __init__(self, args, detector, throttle, shed, sample_every=1):
+        self.args = args
+        self.throttle = throttle
+        self.sample_every = sample_every
+        self.tracker = IouTracker()
+        self.temporal_filter = TemporalFilter(self.tracker)
+        self.counted = {}       # track id -> gerçek kişi (sentetik sahne) veya None
+
+        self.pipeline = Pipeline([
+            DetectorStage(ThrottledWorker(detector, throttle)),
+            FunctionStage('tracker', self._track, queue_size=8, policy='block'),
+            FunctionStage('demographics', self._analysis, mode='inline'),
+            FunctionStage('reid', self._analysis, mode='inline'),
+            FunctionStage('visitors', self._visitors, queue_size=16, policy='block'),
+        ], name='shed-test')
+        self.encoder = RenditionEncoder(lambda: (0, None, None))
+        self.shedder = LoadShedder(self.pipeline, encoder=self.encoder, budget=args.budget,
+                                   escalate_seconds=args.escalate, recover_seconds=args.recover,
+                                   interval=0.25) if shed else None
+
+    def _track(self, packet):
+        update = self.tracker.update(packet.detections, packet.timestamp, packet.frame_step)
+        packet.verified, packet.verified_update = self.temporal_filter.apply(packet.detections, update)
+        return packet
+
+    def _analysis(self, packet):
+        # Demografi / re-ID: doğrulanan kişi başına model çalıştırması
+        burn(self.args.analysis_ms / 1000 * max(1, len(packet.verified)) * self.throttle)
+        return packet
+
+    def _visitors(self, packet):
+        for index, track_id in enumerate(packet.verified_update.track_ids):
+            self.counted.setdefault(track_id, packet.verified[index].get('truth'))
+        return packet
+
+    def run(self, source):
+        """
+        Görüntüyü oynat.
+
+        Returns:
+            dict: Gecikme, kademe geçmişi ve sayım sonuçları
+        """
+        self.pipeline.start()
+        if self.shedder is not None:
+            self.shedder.start()
+        # Yük azaltmanın son kademeleri: dedektöre her N frame'den biri
+        forced = detection_rate_step(self.pipeline, self.sample_every) if self.sample_every > 1 else None
+        if forced is not None:
+            forced.apply()
+
+        marks = []
+        source(self.pipeline.submit, lambda: marks.append((self.pipeline.completed, self.pipeline.latency_seconds)))
+
+        shed_stats = self.shedder.get_stats() if self.shedder is not None else None
+        bypassed = [stage.name for stage in self.pipeline.stages if stage.bypassed]
+        if self.shedder is not None:
+            self.shedder.stop()
+        if forced is not None:
+            forced.revert()
+        self.pipeline.stop()
+
+        stats = self.pipeline.get_stats()
+        (done_a, latency_a), (done_b, latency_b) = marks
+        return {
+            'stats': stats,
+            'shed': shed_stats,
+            'bypassed_at_end': bypassed,
+            'tail_latency': (latency_b - latency_a) / (done_b - done_a) if done_b > done_a else float('inf'),
+            'counted': self.counted,
+            'restored': self.encoder.fps_cap is None and self.encoder.quality_cap is None and
+            self.pipeline.sample_every == 1 and not any(stage.bypassed for stage in self.pipeline.stages),
+        }
+
+
+def synthetic_source(args, frames):
+    """Sahneyi FPS hızında ver; son çeyreğin başında ve sonunda ölçüm al"""
+    def source(submit, mark):
+        camera(submit, FPS, args.seconds * 0.75, frames)
+        mark()
+        camera(submit, FPS, args.seconds * 0.25, frames[int(FPS * args.seconds * 0.75):])
+        mark()
+    return source
+
+
+def video_source(args):
+    from replay_camera import ReplayCamera
+
+    def source(submit, mark):
+        replay = ReplayCamera(args.video, loop=True, realtime=True)
+        if not replay.initialize_camera():
+            raise SystemExit(f"Video açılamadı: {args.video}")
+        replay.add_frame_callback(submit)
+        replay.start_capture()
+        time.sleep(args.seconds * 0.75)
+        mark()
+        time.sleep(args.seconds * 0.25)
+        mark()
+        replay.stop_capture()
+    return source
+
+
+def people_found(counted):
+    return len({truth for truth in counted.values() if truth is not None})
+
+
+def report(name, result):
+    stats = result['stats']
+    shed = result['shed']
+    visitors = next(stage for stage in stats['stages'] if stage['name'] == 'visitors')
+    print(f"{name:>12}{stats['completed']:>9}{stats['avg_latency_ms']:>10.0f}{result['tail_latency'] * 1000:>10.0f}"
+          f"{(shed['level'] if shed else 0):>8}{stats['sampled_out']:>9}{visitors['dropped']:>11}"
+          f"{len(result['counted']):>8}")
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Yük azaltma testi (CPU kısıtlı worker'da replay)")
+    parser.add_argument('--video', help="Kayıtlı görüntü (HumanDetector gerekir)")
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--throttle', type=float, default=3.0, help="Worker'ın kaç kat yavaş olduğu")
+    parser.add_argument('--cores', type=int, help="Process'i bu kadar çekirdeğe sabitle (Linux)")
+    parser.add_argument('--detector-ms', type=float, default=30.0, help="Sentetik dedektör süresi")
+    parser.add_argument('--analysis-ms', type=float, default=15.0, help="Kişi başına demografi / re-ID süresi")
+    parser.add_argument('--budget', type=float, default=1.0, help="Uçtan uca gecikme bütçesi (s)")
+    parser.add_argument('--escalate', type=float, default=1.0)
+    parser.add_argument('--recover', type=float, default=60.0, help="Test süresince kademeler geri alınmasın")
+    args = parser.parse_args()
+
+    if args.cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, set(sorted(os.sched_getaffinity(0))[:args.cores]))
+
+    if args.video:
+        from src.core.detector import HumanDetector
+
+        detector = HumanDetector()
+        if not detector.initialize():
+            print("❌ AI model yüklenemedi")
+            return False
+        source = video_source(args)
+        print(f"🎬 {args.video}: {args.seconds:.0f} s, worker {args.throttle:.1f}x yavaş")
+    else:
+        scene, _ = synthetic_scene(int(FPS * args.seconds))
+        detector = SceneDetector(scene, args.detector_ms / 1000)
+        source = synthetic_source(args, scene_frames(len(scene)))
+        print(f"🎬 Sentetik sahne: {len(scene)} frame ({FPS} fps), worker {args.throttle:.1f}x yavaş")
+
+    reference = Replay(args, detector, 1.0, shed=False).run(source)
+    overloaded = Replay(args, detector, args.throttle, shed=False).run(source)
+    shedding = Replay(args, detector, args.throttle, shed=True)
+    shed = shedding.run(source)
+    sampled = {every: Replay(args, detector, 1.0, shed=False, sample_every=every).run(source)
+               for every in SAMPLED_RATES}
+
+    print(f"{'Çalışma':>12}{'Biten':>9}{'ort. ms':>10}{'son ms':>10}{'Kademe':>8}{'Örnekl.':>9}"
+          f"{'Sayım kaybı':>11}{'Track':>8}")
+    for name, result in (('referans', reference), ('kısıtlı', overloaded), ('yük azaltma', shed)):
+        report(name, result)
+    for every, result in sampled.items():
+        report(f"1/{every} tespit", result)
+
+    print("\n📉 Kademeler")
+    for change in shed['shed']['history']:
+        print(f"   {change['action']:>7} {change['step']:<16} kademe {change['level']} ({change['reason']})")
+
+    # Kademeler tanımlı sırayla, arada geri alma olmadan uygulanmalı
+    applied = [change['step'] for change in shed['shed']['history'] if change['action'] == 'apply']
+    ok_order = applied == shed['shed']['steps'][:len(applied)] and len(applied) > 0
+    ok_overload = overloaded['tail_latency'] > args.budget
+    ok_latency = shed['tail_latency'] <= args.budget
+
+    # Sayım aşamaları hiçbir kademede atlanmamalı ve frame kaybetmemeli
+    visitors = next(stage for stage in shed['stats']['stages'] if stage['name'] == 'visitors')
+    ok_protected = not set(shed['bypassed_at_end']) & set(PROTECTED_STAGES) and visitors['dropped'] == 0
+    if args.video:
+        # Gerçek kişi sayısı bilinmez: referansa göre en fazla %10 sapma
+        expected = len(reference['counted'])
+        ok_count = abs(len(shed['counted']) - expected) <= max(1, expected * 0.1)
+        count_text = f"{len(shed['counted'])} track (referans {expected})"
+    else:
+        expected = people_found(reference['counted'])
+        found = people_found(shed['counted'])
+        ok_count = found >= expected - 1
+        count_text = f"{found} gerçek ziyaretçi (referans {expected})"
+
+    # Örneklemede kişiler bölünmemeli (fazla track) ve kaybolmamalı
+    tracks = len(reference['counted'])
+    ok_sampled = all(abs(len(result['counted']) - tracks) <= max(1, tracks * 0.1) and
+                     (args.video or people_found(result['counted']) >= people_found(reference['counted']) - 1)
+                     for result in sampled.values())
+    sampled_text = ', '.join(f"1/{every}: {len(result['counted'])}" for every, result in sampled.items())
+
+    print(f"\n{'✅' if ok_overload else '❌'} Yük azaltma olmadan son gecikme "
+          f"{overloaded['tail_latency'] * 1000:.0f} ms (bütçe {args.budget * 1000:.0f} ms)")
+    print(f"{'✅' if ok_order else '❌'} Kademeler sırayla uygulandı: {' -> '.join(applied) or '-'}")
+    print(f"{'✅' if ok_latency else '❌'} Yük azaltma ile son gecikme {shed['tail_latency'] * 1000:.0f} ms")
+    print(f"{'✅' if ok_protected else '❌'} Sayım aşamaları atlanmadı, frame kaybı yok")
+    print(f"{'✅' if ok_count else '❌'} Sayım: {count_text}")
+    print(f"{'✅' if ok_sampled else '❌'} Örneklemeli sayım: {sampled_text} track (referans {tracks})")
+    print(f"{'✅' if shed['restored'] else '❌'} stop() sonrası tüm kademeler geri alındı")
+    return ok_overload and ok_order and ok_latency and ok_protected and ok_count and ok_sampled and shed['restored']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Bellek soak testi
+Web uygulamasının tam işleme hattını kayıtlı bir video üzerinde hızlandırılmış
+olarak saatlerce çalıştırır ve belleğin zamanla büyümediğini doğrular:
+
+  - Kamera yerine döngüdeki ReplayCamera kullanılır; --hours saatlik video
+    --speed katı hızla (--hours * 3600 / --speed saniyede) oynatılır
+  - Aynı anda dashboard trafiği taklit edilir: WebSocket client'ları bağlanıp
+    kopar, video akışı açılıp kapanır, istatistik endpoint'leri çağrılır
+  - --interval saniyede bir RSS, tracemalloc'un en çok büyüyen satırları ve
+    /api/debug/memory bileşenleri (track'ler, kuyruklar, cache'ler, client'lar)
+    örneklenir
+  - Isınmadan (--warmup) sonraki RSS büyümesi --max-growth-mb'yi aşarsa ya da
+    bir bileşen sayısı sürekli artıyorsa test başarısız olur
+
+Sayımlar data/ veritabanına değil, test süresince geçici bir veritabanına
+yazılır (visitor_db ve db_manager yönlendirilir); test bitince silinir.
+
+Kullanım:
+    python test_memory_soak.py --video data/replay/magaza.mp4 --hours 4 --speed 8
+    python test_memory_soak.py --video data/replay/magaza.mp4 --hours 1 --no-trace --output logs/memory_soak.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from replay_camera import ReplayCamera
+from sampling_profiler import instrument_frame_callbacks
+from memory_monitor import DEFAULT_TOP
+
+TRAFFIC_INTERVAL = 0.5      # Dashboard trafiği turları arası (saniye)
+STREAM_PARTS = 5            # Açılan her video akışından okunacak parça
+STREAM_EVERY = 10           # Her N turda bir video akışı açılır
+COMPONENT_GROWTH = 1.5      # Bileşen sayısı: son üçte birin en küçüğü ilk üçte birin en büyüğünün bu katını ...
+COMPONENT_MIN_DELTA = 20    # ... ve bu kadar fazlasını aşarsa sızıntı
+# Tasarım gereği büyüyen sayaçlar (sızıntı sayılmaz); byte boyutları (_kb) RSS ile değerlendirilir
+GROWING_BY_DESIGN = ('frames.frame_seq', 'reid.indexed_appearances')
+TRAFFIC_PATHS = ('/api/stats/current', '/api/stats/hourly', '/api/analytics/query?bucket=hour',
+                 '/api/stream/stats', '/api/pipeline', '/api/debug/memory')
+
+
+def flatten(data, prefix=''):
+    """İç içe bileşen raporundaki sayısal değerler: 'tracks.tracker' -> 12"""
+    values = {}
+    for key, value in (data or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def use_temp_database(directory):
+    """
+    Sayımları geçici veritabanına yönlendir. db_path varsayılanlarını import
+    anında alan modüller (web_app ve bileşenleri) bundan sonra import edilmeli.
+
+    Returns:
+        str: Veritabanı yolu, db_manager yönlendirilemezse None
+    """
+    import visitor_db
+    from src.models.database import db_manager
+
+    visitor_db.DB_PATH = os.path.join(directory, 'musteri_analiz.db')
+    # visitor_tracker satırları db_manager üzerinden yazar
+    if not hasattr(db_manager, 'db_path'):
+        return None
+    db_manager.db_path = visitor_db.DB_PATH
+    return visitor_db.DB_PATH
+
+
+def dashboard_traffic(app, stop, counters):
+    """Dashboard kullanıcıları: WebSocket bağlan / kop, video akışı ve API istekleri"""
+    client = app.app.test_client()
+    round_index = 0
+    while not stop.is_set():
+        round_index += 1
+        try:
+            socket_client = app.socketio.test_client(app.app)
+            socket_client.emit('request_stats')
+            socket_client.emit('request_hourly_data')
+            socket_client.get_received()
+            socket_client.disconnect()
+            counters['socket_sessions'] += 1
+
+            for path in TRAFFIC_PATHS:
+                response = client.get(path)
+                counters['requests'] += 1
+                if response.status_code != 200:
+                    counters['errors'] += 1
+                response.close()
+
+            # Akış generator'ı frame yokken beklediği için sadece frame varken açılır
+            if round_index % STREAM_EVERY == 0 and app.current_frame is not None:
+                response = client.get('/video_feed?rendition=640', buffered=False)
+                for _ in zip(range(STREAM_PARTS), response.response):
+                    pass
+                response.close()
+                counters['streams'] += 1
+        except Exception as e:
+            counters['errors'] += 1
+            counters['last_error'] = str(e)
+        stop.wait(TRAFFIC_INTERVAL)
+
+
+def growth(values):
+    """İlk ve son üçte bir: (ilk üçte birin en büyüğü, son üçte birin en küçüğü)"""
+    third = max(1, len(values) // 3)
+    return max(values[:third]), min(values[-third:])
+
+
+def evaluate(samples, max_growth_mb):
+    """
+    Isınma sonrası örneklerden sızıntı kararı.
+
+    Returns:
+        dict: RSS büyümesi, eğim ve sürekli büyüyen bileşenler
+    """
+    rss = [sample['rss_mb'] for sample in samples if sample['rss_mb'] is not None]
+    hours = [sample['video_hours'] for sample in samples if sample['rss_mb'] is not None]
+    result = {'samples': len(samples), 'rss_growth_mb': None, 'rss_mb_per_video_hour': None, 'leaks': []}
+    if len(rss) >= 3:
+        result['rss_growth_mb'] = round(float(np.median(rss[-3:]) - np.median(rss[:3])), 1)
+        if hours[-1] > hours[0]:
+            result['rss_mb_per_video_hour'] = round(float(np.polyfit(hours, rss, 1)[0]), 2)
+
+    names = set().union(*(sample['components'] for sample in samples)) if samples else set()
+    for name in sorted(names):
+        if name in GROWING_BY_DESIGN or name.endswith('_kb'):
+            continue
+        values = [sample['components'].get(name, 0) for sample in samples]
+        if len(values) < 3:
+            continue
+        first, last = growth(values)
+        if last > first * COMPONENT_GROWTH and last - first > COMPONENT_MIN_DELTA:
+            result['leaks'].append({'component': name, 'from': first, 'to': last})
+
+    rss_failed = result['rss_growth_mb'] is not None and result['rss_growth_mb'] > max_growth_mb
+    result['passed'] = not rss_failed and not result['leaks']
+    return result
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Bellek soak testi")
+    parser.add_argument('--video', default=os.path.join('data', 'replay', 'test.mp4'))
+    parser.add_argument('--hours', type=float, default=4.0, help="Oynatılacak video süresi (saat)")
+    parser.add_argument('--speed', type=float, default=8.0, help="Oynatma hızı çarpanı")
+    parser.add_argument('--interval', type=float, default=60.0, help="Örnekleme aralığı (saniye)")
+    parser.add_argument('--warmup', type=float, default=300.0,
+                        help="Büyümenin ölçülmeye başlanacağı an (saniye; model, cache ve buffer'lar dolar)")
+    parser.add_argument('--max-growth-mb', type=float, default=50.0, help="Isınma sonrası izin verilen RSS artışı")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="Raporlanacak tracemalloc satırı")
+    parser.add_argument('--trace-frames', type=int, default=1, help="tracemalloc stack derinliği")
+    parser.add_argument('--no-trace', action='store_true', help="tracemalloc kapalı (sadece RSS ve bileşenler)")
+    parser.add_argument('--no-traffic', action='store_true', help="Dashboard trafiği taklit edilmesin")
+    parser.add_argument('--output', default='logs/memory_soak.json')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.video):
+        print(f"❌ Video bulunamadı: {args.video}")
+        return False
+
+    db_dir = tempfile.TemporaryDirectory(prefix='memory_soak_')
+    db_path = use_temp_database(db_dir.name)
+    if db_path is None:
+        print("❌ db_manager veritabanı yolu yönlendirilemedi; gerçek veritabanına yazmamak için durduruldu")
+        db_dir.cleanup()
+        return False
+
+    from web_app import ModernWebApp
+
+    duration = args.hours * 3600 / args.speed
+    print(f"🧪 Bellek soak testi: {args.video}, {args.hours:g} saat video, {args.speed:g}x "
+          f"({duration / 60:.0f} dk), örnek aralığı {args.interval:g} s, geçici veritabanı {db_path}")
+
+    app = ModernWebApp()
+    app.camera_manager = instrument_frame_callbacks(ReplayCamera(args.video, loop=True, speed=args.speed))
+    monitor = app.memory_monitor
+    if not args.no_trace:
+        monitor.start_tracing(args.trace_frames)
+
+    client = app.app.test_client()
+    started = client.post('/api/system/start').get_json()
+    if not started.get('success'):
+        print(f"❌ Sistem başlatılamadı: {started.get('message')}")
+        return False
+    app.report_scheduler.start()
+
+    stop = threading.Event()
+    counters = {'requests': 0, 'errors': 0, 'socket_sessions': 0, 'streams': 0, 'last_error': None}
+    traffic = None
+    if not args.no_traffic:
+        traffic = threading.Thread(target=dashboard_traffic, args=(app, stop, counters),
+                                   name='soak-traffic', daemon=True)
+        traffic.start()
+
+    print(f"\n{'Süre':>7}{'Video sa':>10}{'RSS MB':>9}{'Traced MB':>11}{'Track':>7}"
+          f"{'Kuyruk':>8}{'Client':>8}{'İstek':>8}")
+    samples = []
+    warmed = False
+    last_report = None
+    t0 = time.perf_counter()
+    try:
+        while True:
+            elapsed = time.perf_counter() - t0
+            if elapsed >= duration:
+                break
+            time.sleep(min(args.interval, duration - elapsed))
+            elapsed = time.perf_counter() - t0
+
+            # Toplanabilir çöp sızıntı sayılmasın
+            gc.collect()
+            report = last_report = monitor.snapshot(args.top)
+            components = flatten(report['components'])
+            sample = {
+                'elapsed_seconds': round(elapsed, 1),
+                'video_hours': round(elapsed * args.speed / 3600, 3),
+                'rss_mb': report['rss_mb'],
+                'traced_mb': report['tracemalloc'].get('traced_mb'),
+                'components': components
+            }
+
+            if not warmed and elapsed >= args.warmup:
+                # tracemalloc büyümesi de bu andan itibaren ölçülür
+                monitor.reset_baseline()
+                warmed = True
+            if warmed:
+                samples.append(sample)
+
+            mark = ' ' if warmed else '~'
+            traced = f"{sample['traced_mb']:.1f}" if sample['traced_mb'] is not None else '-'
+            print(f"{mark}{elapsed / 60:>5.0f}dk{sample['video_hours']:>10.2f}{sample['rss_mb'] or 0:>9.1f}"
+                  f"{traced:>11}{components.get('tracks.tracker', 0):>7}"
+                  f"{components.get('pipeline.queued_packets', 0):>8}{components.get('sockets.clients', 0):>8}"
+                  f"{counters['requests']:>8}")
+    except KeyboardInterrupt:
+        print("\n⏹️  Erken durduruldu")
+    finally:
+        stop.set()
+        if traffic is not None:
+            traffic.join(timeout=10)
+        client.post('/api/system/stop')
+        app.report_scheduler.stop()
+        db_dir.cleanup()
+
+    result = evaluate(samples, args.max_growth_mb)
+    top_growth = last_report['tracemalloc'].get('top_growth', []) if last_report else []
+
+    print(f"\n📈 RSS artışı (ısınma sonrası): {result['rss_growth_mb']} MB "
+          f"(sınır {args.max_growth_mb:g} MB), eğim {result['rss_mb_per_video_hour']} MB / video saati")
+    print(f"🌐 Trafik: {counters['requests']} istek, {counters['socket_sessions']} WebSocket oturumu, "
+          f"{counters['streams']} video akışı, {counters['errors']} hata")
+    if counters['last_error']:
+        print(f"   Son hata: {counters['last_error']}")
+    if top_growth:
+        print("\n🔍 En çok büyüyen ayırmalar (ısınmadan beri):")
+        for entry in top_growth:
+            print(f"   {entry['growth_kb']:>10.1f} KB  {entry['count']:>8} blok  {entry['location']}")
+    for leak in result['leaks']:
+        print(f"❌ Sürekli büyüyen bileşen: {leak['component']} {leak['from']} -> {leak['to']}")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(json.dumps({
+        'created_at': datetime.now().isoformat(), 'video': args.video, 'hours': args.hours, 'speed': args.speed,
+        'result': result, 'traffic': counters, 'top_growth': top_growth, 'samples': samples
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n📝 Rapor: {args.output}")
+
+    if len(samples) < 3:
+        print("❌ Isınmadan sonra yeterli örnek yok (--hours / --interval / --warmup)")
+        return False
+    print(f"{'✅' if result['passed'] else '❌'} Bellek {'sabit' if result['passed'] else 'büyüyor'}")
+    return result['passed']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
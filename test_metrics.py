@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Metrik sistemi test scripti
+Sentetik gözlemlerle beslenen ayrı bir kayıt defterinin /metrics çıktısını
+doğrular: Prometheus formatı, sayaç ve histogram değerleri, sıcak yol
+örneklemesi ve biten thread'lerin slotlarının toplanması. Video verilirse
+ayrıca kayıtlı videoyu tespit ve takip zincirinden geçirir.
+
+Kullanım:
+    python test_metrics.py [data/replay/magaza.mp4] [--frames 300]
+"""
+
+import argparse
+import re
+import sys
+import os
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from metrics import MetricsRegistry, metrics_registry, stage_timer, FRAMES_PROCESSED
+
+# Prometheus metin formatı satırı: isim{label="değer"} sayı
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? [-+0-9.eEinfINFaN]+$')
+
+
+def validate_exposition(text):
+    """
+    Prometheus metin formatını doğrula.
+
+    Returns:
+        list: Hatalı satırlar
+    """
+    invalid = []
+    for line in text.splitlines():
+        if not line or line.startswith('# HELP ') or line.startswith('# TYPE '):
+            continue
+        if not SAMPLE_LINE.match(line):
+            invalid.append(line)
+    return invalid
+
+
+def samples(text):
+    """Çıktıdaki örnekler: {'isim{label}': değer}"""
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            result[name] = float(value)
+    return result
+
+
+def test_exposition():
+    """Sentetik sayaç, gauge ve histogram değerleri çıktıda birebir görünmeli"""
+    print("📈 Prometheus çıktısı...")
+    registry = MetricsRegistry()
+    messages = registry.counter('socket_messages_total', 'Mesajlar', labels=('event',))
+    registry.counter('frames_processed_total', 'Frame')
+    registry.gauge('queue_depth', 'Kuyruk', func=lambda: 7)
+    stages = registry.histogram('pipeline_stage_seconds', 'Aşamalar', labels=('stage',),
+                                buckets=(0.01, 0.1, 1.0))
+
+    messages.labels(event='visitor_update').inc()
+    messages.labels(event='visitor_update').inc(2)
+    messages.labels(event='system_status').inc()
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        stages.labels(stage='inference').observe(value)
+
+    output = registry.render()
+    invalid = validate_exposition(output)
+    assert not invalid, f"{len(invalid)} satır Prometheus formatına uymuyor: {invalid[:3]}"
+    values = samples(output)
+
+    assert values['socket_messages_total{event="visitor_update"}'] == 3
+    assert values['socket_messages_total{event="system_status"}'] == 1
+    assert values['frames_processed_total'] == 0, "Label'sız sayaç ilk gözlemden önce 0 görünmeli"
+    assert values['queue_depth'] == 7
+    buckets = [values[f'pipeline_stage_seconds_bucket{{stage="inference",le="{le}"}}']
+               for le in ('0.01', '0.1', '1.0', '+Inf')]
+    assert buckets == [1, 3, 4, 5], f"Kümülatif bucket sayıları hatalı: {buckets}"
+    assert values['pipeline_stage_seconds_count{stage="inference"}'] == 5
+    assert abs(values['pipeline_stage_seconds_sum{stage="inference"}'] - 5.605) < 1e-6
+    assert '# TYPE pipeline_stage_seconds histogram' in output
+    print("✅ Format geçerli; sayaç, gauge ve histogram değerleri doğru")
+
+
+def test_sampled_timer():
+    """Örneklenen sıcak yolda her N çağrıdan biri ölçülür, sayım yine toplam çağrıyı verir"""
+    print("⏱️  Örnekleme...")
+    registry = MetricsRegistry()
+    child = registry.histogram('capture_seconds', 'Okuma', sample_every=4).labels()
+    for _ in range(40):
+        with child.time():
+            pass
+
+    counts, total, observations = child.snapshot()
+    assert observations == 40, f"Ağırlıklı gözlem sayısı {observations}, beklenen 40"
+    assert sum(counts) == 40 and total >= 0.0
+    print(f"✅ 40 çağrıdan 10'u ölçüldü, ağırlıklı sayım {observations}")
+
+
+def test_dead_thread_slots(threads=50, increments=100):
+    """Biten thread'lerin sayımları kaybolmamalı, slotları birikmemeli"""
+    print("🧵 Thread slotları...")
+    registry = MetricsRegistry()
+    counter = registry.counter('db_queries_total', 'Sorgular').labels()
+    histogram = registry.histogram('db_query_seconds', 'Süre', sample_every=2).labels()
+
+    def work():
+        for _ in range(increments):
+            counter.inc()
+            with histogram.time():
+                pass
+
+    for _ in range(threads):
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+
+    assert counter.value == threads * increments, f"Sayaç {counter.value}, beklenen {threads * increments}"
+    observations = histogram.snapshot()[2]
+    assert observations == threads * increments, f"Histogram {observations}, beklenen {threads * increments}"
+    assert len(counter._slots) == 0 and len(histogram._slots) == 0, \
+        f"Biten thread slotları kaldı: {len(counter._slots)} / {len(histogram._slots)}"
+    assert len(histogram._ticks) == 0
+    print(f"✅ {threads} thread x {increments} artış korundu, slot kalmadı")
+
+
+def replay_metrics(video_path, max_frames=300):
+    """Replay video ile global kayıt defterini besle (model ve video gerekir)"""
+    print("🎞️  Replay video ile metrikler...")
+
+    from src.core.detector import HumanDetector
+    from src.core.visitor_tracker import visitor_tracker
+    from replay_camera import ReplayCamera
+
+    camera = ReplayCamera(video_path, loop=False, realtime=False, max_frames=max_frames)
+    detector = HumanDetector()
+    assert camera.initialize_camera(), f"Video açılamadı: {video_path}"
+    assert detector.initialize(), "YOLOv8 modeli yüklenemedi!"
+
+    def process_frame(frame):
+        with stage_timer('inference'):
+            detections, _ = detector.detect_humans(frame, draw_boxes=False)
+        FRAMES_PROCESSED.inc()
+        if detections:
+            with stage_timer('tracking'):
+                visitor_tracker.process_detections(detections, datetime.now())
+
+    camera.add_frame_callback(process_frame)
+    camera.start_capture()
+    camera.finished.wait()
+    camera.stop_capture()
+    detector.cleanup()
+
+    output = metrics_registry.render()
+    invalid = validate_exposition(output)
+    assert not invalid, f"{len(invalid)} satır Prometheus formatına uymuyor: {invalid[:3]}"
+    processed = FRAMES_PROCESSED.value
+    assert processed == camera.frame_count and processed > 0, \
+        f"frames_processed_total = {processed}, beklenen {camera.frame_count}"
+    for stage in ('capture', 'inference'):
+        assert f'pipeline_stage_seconds_count{{stage="{stage}"}}' in output, f"{stage} histogramı boş"
+    print(f"✅ {processed} frame; capture ve inference histogramları dolu")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metrik testi")
+    parser.add_argument('video', nargs='?', help="Tekrar oynatılacak video dosyası (opsiyonel)")
+    parser.add_argument('--frames', type=int, default=300, help="İşlenecek frame sayısı")
+    args = parser.parse_args()
+
+    try:
+        test_exposition()
+        test_sampled_timer()
+        test_dead_thread_slots()
+        if args.video:
+            replay_metrics(args.video, args.frames)
+    except AssertionError as error:
+        print(f"❌ {error}")
+        sys.exit(1)
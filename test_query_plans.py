@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Sorgu planı regresyon testi
+Geçici bir veritabanına traffic_generator ile ~1 milyon satırlık sentetik
+ziyaretçi yazar (şema db_migrations ile son sürümdedir) ve üretimde çalışan
+her sorgu için:
+
+  - EXPLAIN QUERY PLAN çıktısında büyük tablolarda tam tarama (SCAN) olmadığını
+    doğrular. İstisnalar: ORDER BY ... LIMIT sorgusunun indeksi sırayla taraması
+    (LIMIT'te durur) ve export'un bilinçli olarak tüm satırları okuması.
+  - Gecikmeyi ölçer (--repeats çalıştırmanın medyanı) ve raporu JSON olarak
+    yazar; --baseline ile önceki rapora göre belirgin yavaşlama hata sayılır.
+
+Sorgular sahibi olan modüllerden alınır (kopyası burada tutulmaz); yeni bir
+sorgu eklendiğinde production_queries() listesine, gereken indeks de
+db_migrations.py'ye eklenir. db_manager (src/models/database.py) sorguları bu
+ağacın dışında olduğu için listede yoktur.
+
+Kullanım:
+    python test_query_plans.py [--rows 1000000] [--days 365] [--output logs/query_plans.json]
+    python test_query_plans.py --baseline logs/query_plans.json
+
+--output verilmezse rapor sistemin geçici dizinine (query_plans.json) yazılır.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+import visitor_db
+from analytics_rollups import (ROLLUP_GRANULARITIES, OLDEST_NEW_VISITOR_QUERY, floor_bucket,
+                               rollup_insert_query, rollup_range_query)
+from db_migrations import LATEST_VERSION, list_indexes
+from enhanced_data_export import EXPORT_CAMERAS_QUERY, EXPORT_QUERY
+from event_log import SEED_HOURLY_QUERY, RECONCILE_COUNT_QUERY
+from store_sync import SYNC_ROLLUP_QUERY, PENDING_VISITORS_QUERY
+from zones import BACKFILL_QUERY, TAG_VISITOR_QUERY, zone_breakdown_query
+from traffic_generator import generate
+
+CAMERAS = 2
+
+# Tam taraması kabul edilemeyen (satır sayısı ziyaretçiyle büyüyen) tablolar
+LARGE_TABLES = ('visitors', 'visitor_rollups')
+SQL_KEYWORDS = {'WHERE', 'LEFT', 'INNER', 'JOIN', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'UNION'}
+SLOWDOWN_FACTOR = 2.0       # --baseline: bu kattan fazla yavaşlama ...
+SLOWDOWN_MIN_MS = 5.0       # ... ve bu kadar ms'den fazla fark hata
+
+
+def production_queries(max_id):
+    """
+    Üretim sorguları ve gerçekçi parametreleri.
+
+    Returns:
+        list: (isim, sql, parametreler, izin) - izin: None, 'ordered_limit' veya 'export'
+    """
+    today = floor_bucket(datetime.now(), 'day')
+    week_ago = today - timedelta(days=7)
+    noon = today + timedelta(hours=12)
+    fmt = '%Y-%m-%d %H:%M:%S'
+    near = ((noon - timedelta(seconds=3)).strftime(fmt), (noon + timedelta(seconds=3)).strftime(fmt))
+    batch_from = max(0, max_id - 20000)
+
+    queries = [
+        ('web_app.recent_visitors', visitor_db.RECENT_VISITORS_QUERY, (20,), 'ordered_limit'),
+        ('visitor_db.max_id', visitor_db.MAX_VISITOR_ID_QUERY, (), None),
+        ('visitor_db.new_visitor_ids', visitor_db.NEW_VISITOR_IDS_QUERY, (max_id - 10, 16), None),
+        ('visitor_db.update_visitors', visitor_db.update_query(['age_group', 'gender']),
+         ('25-34', 'K', max_id // 2), None),
+        ('zones.zone_breakdown', zone_breakdown_query(), (week_ago.strftime(fmt), today.strftime(fmt)), None),
+        ('zones.zone_breakdown[camera]', zone_breakdown_query(1),
+         (week_ago.strftime(fmt), today.strftime(fmt), 1), None),
+        ('zones.backfill', BACKFILL_QUERY, (0, noon.strftime(fmt), 5000), None),
+        ('zones.tag_visitor', TAG_VISITOR_QUERY, (1, max_id // 2), None),
+        ('event_log.seed_hourly', SEED_HOURLY_QUERY,
+         (today.strftime(fmt), (today + timedelta(days=1)).strftime(fmt)), None),
+        ('event_log.reconcile_count', RECONCILE_COUNT_QUERY, (*near, 0), None),
+        ('store_sync.rollup_batch', SYNC_ROLLUP_QUERY, (batch_from, max_id), None),
+        ('store_sync.pending_visitors', PENDING_VISITORS_QUERY, (batch_from,), None),
+        ('analytics_rollups.oldest_new', OLDEST_NEW_VISITOR_QUERY, (batch_from, max_id), None),
+        ('analytics_rollups.range', rollup_range_query(),
+         ('hour', week_ago.strftime('%Y-%m-%d %H:00'), today.strftime('%Y-%m-%d %H:00')), None),
+        ('analytics_rollups.range[camera]', rollup_range_query(1),
+         ('day', (today - timedelta(days=365)).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'), 1), None),
+        ('enhanced_data_export.cameras', EXPORT_CAMERAS_QUERY, (), None),
+        ('enhanced_data_export.export', EXPORT_QUERY, ('Bilinmiyor', 'Bölge dışı'), 'export'),
+    ]
+    for granularity, bucket_format in ROLLUP_GRANULARITIES.items():
+        queries.append((f'analytics_rollups.refresh[{granularity}]', rollup_insert_query(bucket_format),
+                        (granularity, batch_from, max_id), None))
+    return queries
+
+
+def table_aliases(conn, sql):
+    """FROM / JOIN'deki tablolar ve takma adları -> tablo adı"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        if table in tables:
+            aliases[table] = table
+            if alias and alias.upper() not in SQL_KEYWORDS:
+                aliases[alias] = table
+    return aliases
+
+
+def check_plan(conn, sql, params, allowance):
+    """
+    Returns:
+        tuple: (plan satırları, izin verilmeyen tam taramalar)
+    """
+    aliases = table_aliases(conn, sql)
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    violations = []
+    for detail in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if not match or aliases.get(match.group(1)) not in LARGE_TABLES:
+            continue
+        if allowance == 'export':
+            continue
+        if allowance == 'ordered_limit' and 'INDEX' in detail and re.search(r'\bLIMIT\b', sql, re.I):
+            continue
+        violations.append(detail)
+    return plan, violations
+
+
+def time_query(conn, sql, params, repeats):
+    """Medyan süre (ms); yazma sorguları geri alınır"""
+    times = []
+    for _ in range(repeats):
+        conn.execute("BEGIN")
+        try:
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            times.append(time.perf_counter() - t0)
+        finally:
+            conn.execute("ROLLBACK")
+    return float(np.median(times)) * 1000
+
+
+def compare(report, baseline_path):
+    """Önceki rapora göre yavaşlayan sorgular"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))['queries']
+    slower = []
+    for name, result in report.items():
+        before = baseline.get(name)
+        if before is None or result['allowance'] == 'export':
+            continue
+        if result['median_ms'] > before['median_ms'] * SLOWDOWN_FACTOR and \
+                result['median_ms'] - before['median_ms'] > SLOWDOWN_MIN_MS:
+            slower.append((name, before['median_ms'], result['median_ms']))
+    return slower
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Sorgu planı regresyon testi")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'query_plans.json'),
+                        help="Plan ve gecikme raporu (varsayılan: geçici dizin)")
+    parser.add_argument('--baseline', help="Karşılaştırılacak önceki rapor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'musteri_analiz.db')
+        t0 = time.perf_counter()
+        generate(path, args.days, CAMERAS, args.rows / ((args.days + 1) * CAMERAS))
+
+        conn = visitor_db.connect(path)
+        conn.isolation_level = None
+        try:
+            total = conn.execute("SELECT COUNT(*) FROM visitors").fetchone()[0]
+            max_id = conn.execute(visitor_db.MAX_VISITOR_ID_QUERY).fetchone()[0]
+            print(f"🗄️  {total:,} ziyaretçi, {args.days + 1} gün, {CAMERAS} kamera "
+                  f"({time.perf_counter() - t0:.0f} s); şema sürümü {LATEST_VERSION}")
+            indexes = [f"{name}({', '.join(columns)})" for name, columns in list_indexes(conn).items()]
+            print(f"📇 İndeksler: {', '.join(indexes)}")
+
+            report = {}
+            failed = []
+            print(f"\n{'Sorgu':<42}{'ms':>9}  Plan")
+            for name, sql, params, allowance in production_queries(max_id):
+                plan, violations = check_plan(conn, sql, params, allowance)
+                median_ms = time_query(conn, sql, params, 1 if allowance == 'export' else args.repeats)
+                report[name] = {'median_ms': round(median_ms, 3), 'plan': plan, 'allowance': allowance}
+                mark = '❌' if violations else '✅'
+                print(f"{mark} {name:<40}{median_ms:>9.2f}  {' | '.join(plan)}")
+                if violations:
+                    failed.append((name, violations))
+        finally:
+            conn.close()
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(json.dumps({'rows': total, 'created_at': datetime.now().isoformat(),
+                                             'queries': report}, ensure_ascii=False, indent=2),
+                                 encoding='utf-8')
+    print(f"\n📝 Rapor: {args.output}")
+
+    slower = compare(report, args.baseline) if args.baseline else []
+    for name, violations in failed:
+        print(f"❌ {name}: tam tarama -> {'; '.join(violations)}")
+    for name, before, after in slower:
+        print(f"❌ {name}: {before:.2f} ms -> {after:.2f} ms")
+    ok = not failed and not slower
+    print(f"{'✅' if ok else '❌'} {len(report)} sorgu, {len(failed)} tam tarama, {len(slower)} yavaşlama")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Mağaza senkronizasyonu test scripti
+Tek makinede birkaç sentetik mağaza veritabanı ve yerel bir toplama
+sunucusu çalıştırır. Birleşik sorguların mağazaların kendi sayımlarıyla
+aynı olduğunu; sunucu kapalıyken olay kuyruğunun sınırlı kaldığını ve
+bağlantı gelince kalınan yerden devam edildiğini; tekrar gönderilen
+paketlerin iki kez sayılmadığını ve merkezin geri aldığı olayların
+tekrar gönderildiğini doğrular. Kamera veya model gerekmez.
+
+Kullanım:
+    python test_store_sync.py [--stores 3] [--days 30]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from aggregation_server import AggregationStore, create_server
+from analytics_rollups import RollupStore, floor_bucket
+from bench_analytics_query import create_database
+from store_sync import StoreSync
+
+PER_DAY = 300
+OUTBOX_MAX = 20
+
+
+class Harness:
+    """Yerel toplama sunucusu + mağaza senkronizasyonları"""
+
+    def __init__(self, directory, store_count, days):
+        self.directory = directory
+        self.days = days
+        self.center = AggregationStore(os.path.join(directory, 'merkez.db'))
+        self.server = None
+        self.port = 0
+        self.start_server()
+
+        self.stores = []
+        for index in range(store_count):
+            db_path = os.path.join(directory, f'magaza_{index}.db')
+            create_database(db_path, days, PER_DAY, seed=index)
+            self.stores.append(StoreSync(f"http://127.0.0.1:{self.port}", f'magaza_{index}', db_path,
+                                         interval=1.0, batch_visitors=2000, outbox_max=OUTBOX_MAX))
+
+    def start_server(self):
+        self.server = create_server(self.center, '127.0.0.1', self.port)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop_server(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sync_all(self):
+        """Tüm mağazaları paralel senkronize et"""
+        results = [None] * len(self.stores)
+
+        def run(index):
+            results[index] = self.stores[index].sync_once()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(len(self.stores))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def range(self):
+        today = floor_bucket(datetime.now(), 'day')
+        return today - timedelta(days=self.days), today + timedelta(days=1)
+
+    def compare(self):
+        """Merkezin mağaza bazlı ve toplam serileri mağazaların kendi rollup'larıyla aynı mı"""
+        start, end = self.range()
+        merged = self.center.query(start, end, 'day', group_by_store=True)
+        expected_total = None
+        for store in self.stores:
+            local = RollupStore(store.db_path)
+            local.refresh(force=True)
+            expected = [point['value'] for point in local.query(start, end, 'day')['series']]
+            actual = [point['value'] for point in merged['stores'].get(store.store_id, [])]
+            assert actual == expected, f"{store.store_id}: merkez {sum(actual)} != mağaza {sum(expected)}"
+            expected_total = expected if expected_total is None else [a + b for a, b in zip(expected_total, expected)]
+        actual_total = [point['value'] for point in merged['series']]
+        assert actual_total == expected_total, \
+            f"Toplam: merkez {sum(actual_total)} != mağazalar {sum(expected_total)}"
+
+
+def add_visitors(db_path, count, moment=None):
+    """Mağazaya yeni ziyaretçi satırları ekle"""
+    moment = moment or datetime.now()
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, "
+                     "detection_count) VALUES (?, 0.8, '[]', ?, 1)",
+                     [(moment.strftime('%Y-%m-%d %H:%M:%S.%f'), i % 2) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def check_initial_sync(harness):
+    print("🔗 İlk senkronizasyon...")
+    results = harness.sync_all()
+    assert all(results), f"İlk senkronizasyon başarısız: {results}"
+    harness.compare()
+    sent = sum(store.stats['bytes_sent'] for store in harness.stores)
+    raw = sum(store.stats['raw_bytes'] for store in harness.stores)
+    visitors = len(harness.stores) * (harness.days + 1) * PER_DAY
+    batches = sum(store.stats['batches'] for store in harness.stores)
+    print(f"✅ {visitors} ziyaretçi, {batches} paket, {sent / 1024:.1f} KB gönderildi "
+          f"(sıkıştırma {raw / sent:.1f}x, ziyaretçi başına {sent / visitors:.2f} byte)")
+
+
+def check_offline(harness):
+    print("📴 Çevrimdışı dönem...")
+    harness.stop_server()
+    for store in harness.stores:
+        add_visitors(store.db_path, 500)
+        for index in range(50):
+            store.enqueue_event('alert', {'rule': 'Kasa kuyruğu', 'state': 'firing', 'n': index})
+    offline_results = harness.sync_all()
+    assert not any(offline_results), "Sunucu kapalıyken senkronizasyon başarılı göründü"
+    assert all(store.get_stats()['pending_events'] == OUTBOX_MAX for store in harness.stores), \
+        "Olay kuyruğu sınırlı kalmadı"
+    pending = [store.get_stats()['pending_visitors'] for store in harness.stores]
+
+    harness.start_server()
+    results = harness.sync_all()
+    assert all(results), f"Bağlantı sonrası senkronizasyon başarısız: {results}"
+    events = harness.center.events(kind='alert', limit=1000)
+    assert all(store.get_stats()['pending_events'] == 0 and store.get_stats()['pending_visitors'] == 0
+               for store in harness.stores), "Bağlantı sonrası bekleyen veri kaldı"
+    harness.compare()
+    assert len(events) == OUTBOX_MAX * len(harness.stores), f"Merkezde {len(events)} olay var"
+    assert all(event['data']['n'] >= 50 - OUTBOX_MAX for event in events), "Kuyruktan yeni olaylar atıldı"
+    print(f"✅ Çevrimdışı: bekleyen ziyaretçi {pending}, kuyruk {OUTBOX_MAX} ile sınırlı "
+          f"(atılan {sum(store.stats['dropped_events'] for store in harness.stores)}); "
+          f"bağlantı sonrası {len(events)} olay alındı, sayımlar eşit")
+
+
+def check_duplicate_and_late(harness):
+    print("🔁 Tekrar gönderim ve geç gelen veri...")
+    store = harness.stores[0]
+
+    # Onay cevabı kaybolmuş gibi: mağaza eski id'den tekrar gönderir
+    conn = sqlite3.connect(store.db_path)
+    conn.execute("UPDATE sync_state SET value = value - 700 WHERE name = 'visitor_id'")
+    conn.commit()
+    conn.close()
+    assert store.sync_once(), "Tekrar gönderim başarısız"
+    harness.compare()
+
+    # 10 gün önceye ait geç gelen ziyaretçiler doğru güne eklenir
+    late_day = floor_bucket(datetime.now(), 'day') - timedelta(days=10)
+    before = harness.center.query(late_day, late_day + timedelta(days=1), 'day', store.store_id)['series'][0]['value']
+    add_visitors(store.db_path, 7, late_day + timedelta(hours=15))
+    store.sync_once()
+    after = harness.center.query(late_day, late_day + timedelta(days=1), 'day', store.store_id)['series'][0]['value']
+    assert after - before == 7, f"Geç gelen ziyaretçiler güne eklenmedi ({before} -> {after})"
+    harness.compare()
+    print(f"✅ Tekrar gönderilen paket sayılmadı; geç gelen 7 ziyaretçi "
+          f"{late_day:%Y-%m-%d} gününe eklendi ({before} -> {after})")
+
+
+def check_event_resend(harness):
+    print("♻️  Sunucu onayı geri alınınca olayların tekrar gönderimi...")
+    store = harness.stores[1]
+    for index in range(5):
+        store.enqueue_event('alert', {'rule': 'Giriş yoğunluğu', 'state': 'firing', 'n': 100 + index})
+    assert store.sync_once(), "Olaylar gönderilemedi"
+
+    # Merkez son paketi kaybetmiş gibi (ör. yedekten dönüş): onay 5 olay geri gider
+    conn = sqlite3.connect(harness.center.db_path)
+    conn.execute("UPDATE store_state SET event_seq = event_seq - 5 WHERE store_id = ?", (store.store_id,))
+    conn.execute("DELETE FROM store_events WHERE store_id = ? AND seq > "
+                 "(SELECT event_seq FROM store_state WHERE store_id = ?)", (store.store_id, store.store_id))
+    conn.commit()
+    conn.close()
+
+    assert store.sync_once(), "Tekrar gönderim başarısız"
+    resent = [event['data']['n'] for event in harness.center.events(store=store.store_id, kind='alert', limit=1000)
+              if event['data']['n'] >= 100]
+    assert sorted(resent) == list(range(100, 105)), f"Geri alınan olaylar tekrar gönderilmedi: {resent}"
+    assert store.get_stats()['pending_events'] == 0, "Tekrar gönderim sonrası bekleyen olay kaldı"
+    print(f"✅ Onayı geri alınan {len(resent)} olay mağazadan tekrar gönderildi")
+
+
+def test_store_sync(stores=3, days=30):
+    """Paylaşılan sunucu ve mağazalarla adımları sırayla çalıştır"""
+    with tempfile.TemporaryDirectory() as directory:
+        harness = Harness(directory, stores, days)
+        try:
+            check_initial_sync(harness)
+            check_offline(harness)
+            check_duplicate_and_late(harness)
+            check_event_resend(harness)
+        finally:
+            harness.stop_server()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mağaza senkronizasyonu testi")
+    parser.add_argument('--stores', type=int, default=3)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    try:
+        test_store_sync(args.stores, args.days)
+    except AssertionError as error:
+        print(f"❌ {error}")
+        sys.exit(1)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+OpenCV Müşteri Analiz Sistemi - Sentetik Trafik Üreteci
+Ölçek testleri için visitors tablosunu gerçekçi bir trafikle doldurur;
+gerçek kamera gerekmez.
+
+- Gün içi dağılım: mağaza saatlerinde öğle ve akşam tepeleri
+- Haftalık ve mevsimsel desen: hafta sonu ve aralık daha yoğun
+- Kamera başına farklı yoğunluk (giriş kamerası ile arka reyon farklı)
+- Kişi oranlarında kutular, güven dağılımı, tespit sayısı, bölge,
+  demografi; istenirse eski sürümlerin yer tutucu kayıtları
+- Satırlar gün gün üretilir ve büyük transaction'larda executemany ile
+  yazılır; ardından rollup tabloları ve senkronizasyon olay kuyruğu
+  (alarm olayları) doldurulur
+
+Kullanım:
+    python traffic_generator.py --db data/musteri_analiz.db --days 365 --cameras 20 --per-camera-day 400
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+import visitor_db
+from analytics_rollups import RollupStore, floor_bucket
+from db_migrations import migrate
+from demographics import AGE_GROUPS, GENDERS
+from store_sync import SYNC_OUTBOX_MAX
+from zones import ZoneMap
+
+FRAME_SIZE = (1280, 720)
+OPEN_HOUR, CLOSE_HOUR = 10, 22
+# Gün içi karışım: (ortalama saat, standart sapma, ağırlık); kalan ağırlık açık saatlere eşit dağılır
+DAY_PEAKS = ((13.0, 1.0, 0.3), (18.5, 1.5, 0.45))
+WEEKDAY_WEIGHTS = (0.85, 0.8, 0.85, 0.9, 1.05, 1.35, 1.2)     # Pazartesi .. Pazar
+SEASON_AMPLITUDE = 0.15                                        # Aralık tepesi, haziran dibi
+PLACEHOLDER_BOX = '[[0, 0, 100, 100]]'
+ALERT_RULE = 'kasa_kuyrugu'
+
+INSERT_QUERY = ("INSERT INTO visitors (entry_time, confidence_avg, bounding_box, camera_index, detection_count, "
+                "zone_id, age_group, gender, demographics_confidence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def day_factor(date):
+    """Haftanın günü ve mevsim çarpanı"""
+    season = 1.0 + SEASON_AMPLITUDE * np.cos(2 * np.pi * (date.timetuple().tm_yday - 350) / 365.0)
+    return WEEKDAY_WEIGHTS[date.weekday()] * season
+
+
+def arrival_seconds(rng, count):
+    """Gün başından itibaren giriş saniyeleri (açık saatlere kırpılmış, sıralı)"""
+    open_s, close_s = OPEN_HOUR * 3600, CLOSE_HOUR * 3600
+    weights = [weight for _, _, weight in DAY_PEAKS]
+    component = rng.choice(len(DAY_PEAKS) + 1, size=count, p=weights + [1.0 - sum(weights)])
+    seconds = rng.uniform(open_s, close_s, count)
+    for index, (hour, sigma, _) in enumerate(DAY_PEAKS):
+        chosen = component == index
+        seconds[chosen] = rng.normal(hour * 3600, sigma * 3600, int(chosen.sum()))
+    return np.sort(np.clip(seconds, open_s, close_s - 1))
+
+
+def person_boxes(rng, count):
+    """Kişi oranlarında kutular: (N, 4) x, y, w, h"""
+    width, height = FRAME_SIZE
+    w = rng.uniform(60, 150, count)
+    h = np.minimum(w * rng.uniform(2.2, 2.9, count), height - 1)
+    x = rng.uniform(0, 1, count) * (width - w)
+    y = rng.uniform(0, 1, count) * (height - h)
+    return np.stack([x, y, w, h], axis=1).astype(np.int32)
+
+
+class TrafficGenerator:
+    """Gün gün sentetik ziyaretçi satırları üreten sınıf"""
+
+    def __init__(self, cameras=2, per_camera_day=400, seed=0, demographics_ratio=0.7, placeholder_ratio=0.01):
+        """
+        Args:
+            cameras: Kamera sayısı
+            per_camera_day: Ortalama bir günde kamera başına ziyaretçi
+            demographics_ratio: Yaş / cinsiyet sonucu olan ziyaretçi oranı
+            placeholder_ratio: Eski sürümlerin yazdığı yer tutucu kayıt oranı
+        """
+        self.rng = np.random.default_rng(seed)
+        self.cameras = cameras
+        self.per_camera_day = per_camera_day
+        self.demographics_ratio = demographics_ratio
+        self.placeholder_ratio = placeholder_ratio
+        # Kamera yoğunlukları: ortalaması 1 olan log-normal çarpanlar
+        weights = self.rng.lognormal(0.0, 0.5, cameras)
+        self.camera_weights = weights / weights.mean()
+        self.zone_maps = [ZoneMap(camera) for camera in range(cameras)]
+
+    def day_rows(self, date):
+        """
+        Bir günün satırları (giriş zamanına göre sıralı, INSERT_QUERY sırasıyla).
+
+        Returns:
+            list: Satır tuple'ları
+        """
+        rng = self.rng
+        factor = day_factor(date)
+        columns = []
+        for camera in range(self.cameras):
+            count = int(rng.poisson(self.per_camera_day * self.camera_weights[camera] * factor))
+            if not count:
+                continue
+            boxes = person_boxes(rng, count)
+            feet = np.stack([(boxes[:, 0] + boxes[:, 2] / 2) / FRAME_SIZE[0],
+                             np.minimum((boxes[:, 1] + boxes[:, 3]) / FRAME_SIZE[1], 0.999)], axis=1)
+            columns.append({
+                'seconds': arrival_seconds(rng, count),
+                'confidence': np.round(0.4 + 0.58 * rng.beta(6, 2.5, count), 4),
+                'boxes': boxes,
+                'camera': np.full(count, camera),
+                'detections': 1 + rng.poisson(4, count),
+                'zone': self.zone_maps[camera].lookup(feet),
+                'age': rng.integers(0, len(AGE_GROUPS), count),
+                'gender': rng.integers(0, len(GENDERS), count),
+                'has_demographics': rng.random(count) < self.demographics_ratio,
+                'demographics_confidence': np.round(rng.uniform(0.5, 0.95, count), 3),
+                'placeholder': rng.random(count) < self.placeholder_ratio,
+            })
+        if not columns:
+            return []
+
+        merged = {key: np.concatenate([column[key] for column in columns]) for key in columns[0]}
+        order = np.argsort(merged['seconds'], kind='stable')
+        rows = []
+        for i in order:
+            entry_time = (date + timedelta(seconds=float(merged['seconds'][i]))).strftime('%Y-%m-%d %H:%M:%S.%f')
+            if merged['placeholder'][i]:
+                # Eski sürümler: yer tutucu kutu, sıfır güven, bölge / demografi yok
+                rows.append((entry_time, 0.0, PLACEHOLDER_BOX, int(merged['camera'][i]), 1, None, None, None, None))
+                continue
+            demographics = merged['has_demographics'][i]
+            rows.append((
+                entry_time, float(merged['confidence'][i]), json.dumps([merged['boxes'][i].tolist()]),
+                int(merged['camera'][i]), int(merged['detections'][i]), int(merged['zone'][i]),
+                AGE_GROUPS[merged['age'][i]] if demographics else None,
+                GENDERS[merged['gender'][i]] if demographics else None,
+                float(merged['demographics_confidence'][i]) if demographics else None,
+            ))
+        return rows
+
+    def alert_events(self, date, rows):
+        """
+        Günün en yoğun saatinde kasa kuyruğu alarmı (firing / resolved).
+
+        Returns:
+            list: (tür, zaman, JSON) sync_outbox satırları
+        """
+        if not rows:
+            return []
+        peak = int(np.bincount([int(row[0][11:13]) for row in rows], minlength=24).argmax())
+        camera = int(self.rng.integers(0, self.cameras))
+        start = (date + timedelta(hours=peak, minutes=float(self.rng.uniform(0, 40)))).timestamp()
+        events = []
+        for state, timestamp in (('firing', start), ('resolved', start + float(self.rng.uniform(120, 900)))):
+            events.append(('alert', timestamp, json.dumps({
+                'rule': ALERT_RULE, 'state': state, 'camera_id': camera, 'aggregate': 'max', 'window': 60,
+                'value': round(float(self.rng.uniform(5, 9)), 2), 'threshold': 5, 'timestamp': timestamp})))
+        return events
+
+
+def generate(db_path=visitor_db.DB_PATH, days=365, cameras=2, per_camera_day=400, seed=0, batch_rows=200000,
+             end=None, demographics_ratio=0.7, placeholder_ratio=0.01, rollups=True, progress=None):
+    """
+    Veritabanını sentetik trafikle doldur (şema db_migrations ile hazırlanır).
+
+    Args:
+        days: Bugünden (veya end'den) geriye gün sayısı
+        batch_rows: Transaction başına satır
+        end: Son gün (varsayılan bugün; bugünün sadece şu ana kadarki kısmı yazılır)
+        rollups: Rollup tablolarını da güncelle
+        progress: (yazılan satır, gün) -> None
+
+    Returns:
+        dict: Yazılan satırlar, olaylar ve süreler
+    """
+    started = time.perf_counter()
+    now = datetime.now()
+    last_day = floor_bucket(end or now, 'day')
+    generator = TrafficGenerator(cameras, per_camera_day, seed, demographics_ratio, placeholder_ratio)
+
+    conn = visitor_db.connect(db_path)
+    written = 0
+    events = []
+    try:
+        migrate(conn)
+        for zone_map in generator.zone_maps:
+            zone_map.save_names(conn)
+        # Toplu yükleme: her satırda fsync beklenmez (bağlantıya özel)
+        conn.execute("PRAGMA synchronous = OFF")
+
+        pending = []
+        for offset in range(days, -1, -1):
+            date = last_day - timedelta(days=offset)
+            rows = generator.day_rows(date)
+            if end is None and date == last_day:
+                cutoff = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+                rows = [row for row in rows if row[0] <= cutoff]
+            events.extend(generator.alert_events(date, rows))
+            pending.extend(rows)
+            if len(pending) >= batch_rows or offset == 0:
+                with conn:
+                    conn.executemany(INSERT_QUERY, pending)
+                written += len(pending)
+                pending = []
+                if progress is not None:
+                    progress(written, days - offset + 1)
+
+        # Olay kuyruğu sınırlı: en yeni SYNC_OUTBOX_MAX olay kalır
+        events = events[-SYNC_OUTBOX_MAX:]
+        with conn:
+            conn.executemany("INSERT INTO sync_outbox (kind, timestamp, payload) VALUES (?, ?, ?)", events)
+    finally:
+        conn.close()
+    insert_seconds = time.perf_counter() - started
+
+    rollup_seconds = 0.0
+    if rollups:
+        t0 = time.perf_counter()
+        RollupStore(db_path).refresh(force=True)
+        rollup_seconds = time.perf_counter() - t0
+
+    return {'rows': written, 'events': len(events), 'days': days + 1, 'cameras': cameras,
+            'insert_seconds': round(insert_seconds, 2), 'rows_per_second': round(written / insert_seconds),
+            'rollup_seconds': round(rollup_seconds, 2)}
+
+
+def main():
+    """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="Sentetik ziyaretçi trafiği üreteci")
+    parser.add_argument('--db', default=visitor_db.DB_PATH)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--cameras', type=int, default=20)
+    parser.add_argument('--per-camera-day', type=float, default=400.0, help="Ortalama gün / kamera ziyaretçisi")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-rows', type=int, default=200000, help="Transaction başına satır")
+    parser.add_argument('--demographics', type=float, default=0.7, help="Demografi sonucu olan oran")
+    parser.add_argument('--placeholders', type=float, default=0.01, help="Yer tutucu (eski sürüm) kayıt oranı")
+    parser.add_argument('--no-rollups', action='store_true')
+    parser.add_argument('--append', action='store_true', help="Dolu veritabanına ekle")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.append:
+        conn = visitor_db.connect(args.db)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            existing = conn.execute("SELECT COUNT(*) FROM visitors").fetchone()[0] if 'visitors' in tables else 0
+        finally:
+            conn.close()
+        if existing:
+            print(f"❌ {args.db} içinde {existing:,} ziyaretçi var; eklemek için --append")
+            return 1
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+
+    expected = (args.days + 1) * args.cameras * args.per_camera_day
+    print(f"🏭 {args.db}: {args.days + 1} gün x {args.cameras} kamera (~{expected:,.0f} ziyaretçi)")
+
+    def progress(rows, days):
+        print(f"   {days:>4} gün, {rows:>12,} satır", end='\r', flush=True)
+
+    result = generate(args.db, args.days, args.cameras, args.per_camera_day, args.seed, args.batch_rows,
+                      demographics_ratio=args.demographics, placeholder_ratio=args.placeholders,
+                      rollups=not args.no_rollups, progress=progress)
+    print(f"\n✅ {result['rows']:,} ziyaretçi ({result['rows_per_second']:,} satır/s, {result['insert_seconds']} s), "
+          f"{result['events']} alarm olayı, rollup {result['rollup_seconds']} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
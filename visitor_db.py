@@ -0,0 +1,200 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Ziyaretçi Tablosu Yardımcıları
+İkincil analizlerin (demografi vb.) visitors tablosuna sonradan eklediği
+kolonlar ve satır güncellemeleri için ortak fonksiyonlar.
+"""
+
+import collections
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import stage_timer
+
+DB_PATH = 'data/musteri_analiz.db'
+BUSY_TIMEOUT_SECONDS = 5.0
+ROW_BIND_SECONDS = 60.0    # Bu sürede satırı yazılmayan sayım bağlanmadan atılır
+ROW_KEEP_SECONDS = 900.0   # Bağlanan satır id'leri (ve sayılmış track'ler) bu süre tutulur
+
+# Dashboard'daki son ziyaretçiler (giriş zamanı indeksi ters sırayla taranır, LIMIT'te durur)
+RECENT_VISITORS_QUERY = """
+    SELECT entry_time, confidence_avg, detection_count
+    FROM visitors
+    WHERE confidence_avg > 0.0
+    ORDER BY entry_time DESC
+    LIMIT ?
+"""
+MAX_VISITOR_ID_QUERY = "SELECT MAX(id) FROM visitors"
+# Son bağlanan satırdan sonra yazılan satırlar (birincil anahtar aralığı)
+NEW_VISITOR_IDS_QUERY = "SELECT id FROM visitors WHERE id > ? ORDER BY id LIMIT ?"
+
+
+def connect(db_path=None):
+    """
+    Ziyaretçi veritabanına bağlan (pipeline yazarken kilitlenmeyi bekler).
+
+    Args:
+        db_path: Veritabanı dosyası (None -> çağrı anındaki DB_PATH)
+
+    Returns:
+        sqlite3.Connection
+    """
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def ensure_columns(conn, columns, table='visitors', commit=True):
+    """
+    Eksik kolonları ekle (mevcut veritabanları için).
+
+    Args:
+        columns: {kolon adı: SQL tipi}
+        commit: False ise çağıranın transaction'ı içinde kalır (migration'lar)
+    """
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, sql_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+    if commit:
+        conn.commit()
+
+
+def format_time(timestamp):
+    """Unix zamanını visitors.entry_time formatına çevir"""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def update_visitors(conn, column_names, rows):
+    """
+    Birden fazla satırı tek transaction'da güncelle.
+
+    Args:
+        column_names: Güncellenecek kolonlar
+        rows: [(değer1, değer2, ..., satır id), ...]
+    """
+    if not rows:
+        return
+    with stage_timer('db_write'), conn:
+        conn.executemany(update_query(column_names), rows)
+
+
+def update_query(column_names):
+    """update_visitors sorgusu (parametreler: kolon değerleri, satır id'si)"""
+    assignments = ', '.join(f"{name} = ?" for name in column_names)
+    return f"UPDATE visitors SET {assignments} WHERE id = ?"
+
+
+class VisitorRows:
+    """
+    Sayılan track'leri visitors satır id'lerine bağlar.
+
+    Satırları visitor_tracker (db_manager tamponu üzerinden) sayım sırasıyla
+    yazar ama id döndürmez. Ziyaretçi aşaması her sayımı track id'siyle
+    kaydeder; sonradan yazılan satırlar id sırasıyla bekleyen sayımlara
+    verilir. Eşleştirme zamana değil yazılma sırasına dayanır, aynı anda
+    giren iki kişinin satırları karışmaz.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        self._pending = collections.deque()  # (track id veya None, sayılma zamanı); satır başına bir kayıt
+        self._rows = {}                      # track id -> (satır id'si, bağlanma zamanı)
+        self._counted = {}                   # Satırı yazılmış / bekleyen track id -> sayılma zamanı
+        self._last_id = None
+        self._lock = threading.Lock()
+        self._bind_lock = threading.Lock()
+        self.stats = {'bound': 0, 'expired': 0}
+
+    def start(self):
+        """Mevcut son satırdan itibaren izle (olay günlüğü tamamlamasından sonra çağrılır)"""
+        conn = connect(self.db_path)
+        try:
+            last_id = conn.execute(MAX_VISITOR_ID_QUERY).fetchone()[0] or 0
+        finally:
+            conn.close()
+        with self._lock:
+            self._last_id = last_id
+            self._pending.clear()
+            self._rows.clear()
+            self._counted.clear()
+
+    def stop(self):
+        """Eşleştirmeyi bırak (sistem durdurulurken); start() ile yeniden başlar"""
+        with self._lock:
+            self._last_id = None
+            self._pending.clear()
+            self._rows.clear()
+            self._counted.clear()
+
+    def counted(self, count, counted, detections, track_ids, timestamp=None):
+        """
+        Ziyaretçi aşamasından: visitor_tracker'ın bu frame'de saydığı ziyaretçiler.
+
+        Daha önce sayılmamış track'ler tespit sırasıyla yeni satırlara
+        eşlenir; track'i belirlenemeyen sayımlar da sırayı korumak için
+        (track id'siz) kuyruğa girer.
+
+        Args:
+            count: Yeni ziyaretçi sayısı (yazılacak satır sayısı)
+            counted: visitor_tracker'a verilen tespitler
+            detections / track_ids: Aynı frame'in tüm tespitleri ve track id'leri
+        """
+        if count <= 0:
+            return
+        now = timestamp if timestamp is not None else time.time()
+        by_detection = {id(detection): track_id for detection, track_id in zip(detections, track_ids)}
+        with self._lock:
+            if self._last_id is None:
+                return
+            new_tracks = []
+            for detection in counted:
+                track_id = by_detection.get(id(detection))
+                if track_id is not None and track_id not in self._counted and track_id not in new_tracks:
+                    new_tracks.append(track_id)
+            new_tracks = new_tracks[:count]
+            for track_id in new_tracks:
+                self._counted[track_id] = now
+            self._pending.extend((track_id, now) for track_id in new_tracks + [None] * (count - len(new_tracks)))
+
+    def bind(self, conn):
+        """Yazılmış yeni satırları bekleyen sayımlara ver (arka plan thread'lerinden)"""
+        with self._bind_lock:
+            with self._lock:
+                last_id, waiting = self._last_id, len(self._pending)
+            if last_id is None:
+                return
+            row_ids = [row[0] for row in conn.execute(NEW_VISITOR_IDS_QUERY, (last_id, waiting))] if waiting else []
+
+            now = time.time()
+            with self._lock:
+                for row_id in row_ids:
+                    track_id, _ = self._pending.popleft()
+                    if track_id is not None:
+                        self._rows[track_id] = (row_id, now)
+                    self._last_id = row_id
+                self.stats['bound'] += len(row_ids)
+
+                # Satırı hiç yazılmayan sayım sonraki satırları kaydırmasın
+                while self._pending and now - self._pending[0][1] > ROW_BIND_SECONDS:
+                    self._pending.popleft()
+                    self.stats['expired'] += 1
+                cutoff = now - ROW_KEEP_SECONDS
+                self._rows = {track_id: entry for track_id, entry in self._rows.items() if entry[1] >= cutoff}
+                self._counted = {track_id: at for track_id, at in self._counted.items() if at >= cutoff}
+
+    def row_id(self, track_id):
+        """
+        Track'in ziyaretçi satırı.
+
+        Returns:
+            int: Satır id'si; track sayılmadıysa veya satırı henüz yazılmadıysa None
+        """
+        with self._lock:
+            entry = self._rows.get(track_id)
+        return entry[0] if entry else None
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending), rows=len(self._rows))
@@ -5,7 +5,6 @@ Gelişmiş web dashboard ile uzaktan erişim ve mobile support
 
 from flask import Flask, render_template, request, jsonify, Response, send_file
 from flask_socketio import SocketIO, emit
-import cv2
 import base64
 import threading
 import json
@@ -26,6 +25,58 @@ from src.models.database import db_manager
 from src.utils.logger import get_logger
 from src.config.settings import SETTINGS
 
+# Performans metrikleri
+from metrics import (metrics_registry, stage_timer, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+                     FRAMES_PROCESSED, SOCKET_MESSAGES, DB_QUERIES)
+from stream_renditions import RenditionEncoder, StreamSession, mjpeg_part
+from detection_channel import build_detection_event, encode_for_channel
+from iou_tracker import IouTracker
+from temporal_filter import TemporalFilter
+from clip_recorder import ClipRecorder
+from reid_index import ReidService, crop_detection
+from employee_gallery import EmployeeFilter
+from demographics import DemographicsStage
+from occupancy_heatmap import OccupancyHeatmap, HEATMAP_PNG_WIDTH
+from alert_rules import AlertEngine
+from zones import ZoneMap, ZoneTagger, zone_breakdown
+from analytics_rollups import RollupStore, floor_bucket, parse_time, shift_years
+from reports import ReportEngine, ReportScheduler, REPORT_KINDS, REPORT_FORMATS
+from event_log import EventLog
+from store_sync import StoreSync
+from detection_format import detection_bbox
+import visitor_db
+from db_migrations import migrate_database
+from pipeline import Pipeline, FunctionStage, DetectorStage, RoiFilter, wait_for_frame
+from load_shedder import LoadShedder
+from sampling_profiler import (run_profile, schedule_profile, instrument_frame_callbacks,
+                               DEFAULT_INTERVAL as PROFILE_INTERVAL)
+from memory_monitor import MemoryMonitor, DEFAULT_TOP as MEMORY_TOP, MAX_TOP as MEMORY_MAX_TOP
+
+# Video akışı JPEG kaliteleri
+STREAM_JPEG_QUALITY = 85
+SNAPSHOT_JPEG_QUALITY = 95
+
+# Kapanmış analitik aralıkları tarayıcıda bu kadar (saniye) yeniden doğrulanmadan kullanılır
+ANALYTICS_CLOSED_MAX_AGE = 300
+
+# İşleme hattı: kamera -> (hareket kapısı) -> dedektör -> (ilgi alanı) -> takip -> çıkışlar.
+# Canlı yayın, kapı ve örneklemeden önce ayrılan bir daldır (her kamera frame'i yayınlanır).
+# Mağaza başına data/pipeline.json ile aşamalar açılıp kapatılabilir, kuyruklar ayarlanabilir.
+PIPELINE_DEFINITION = [
+    {'stage': 'stream', 'branch': True, 'queue': 1, 'policy': 'drop_oldest'},
+    {'stage': 'motion_gate', 'enabled': False},
+    {'stage': 'detector'},
+    {'stage': 'roi', 'enabled': False},
+    {'stage': 'tracker', 'queue': 8, 'policy': 'block'},
+    {'stage': 'employee_filter', 'mode': 'inline'},
+    {'stage': 'reid', 'mode': 'inline'},
+    {'stage': 'heatmap', 'queue': 8, 'policy': 'block'},
+    {'stage': 'alerts', 'mode': 'inline'},
+    {'stage': 'demographics', 'mode': 'inline'},
+    {'stage': 'zones', 'mode': 'inline'},
+    {'stage': 'visitors', 'queue': 16, 'policy': 'block'},
+]
+
 class ModernWebApp:
     """Modern Flask Web Application for Customer Analytics"""
     
@@ -39,18 +90,95 @@ class ModernWebApp:
         # WebSocket support
         self.socketio = SocketIO(self.app, cors_allowed_origins="*", async_mode='threading')
         
+        # Veritabanı şemasını son sürüme getir (eksik indeksler eklenir)
+        migrate_database()
+        
         # System components
-        self.camera_manager = CameraManager()
+        self.camera_manager = instrument_frame_callbacks(CameraManager())
         self.human_detector = HumanDetector()
         self.is_system_running = False
         
+        # Çok çekirdekli CPU'larda tespit ayrı process'lerde (0 = aynı process)
+        self.detector_workers = getattr(SETTINGS, 'DETECTOR_WORKERS', 0)
+        
+        # Frame işleme hattı (her başlatmada data/pipeline.json ile yeniden kurulur)
+        self.pipeline = None
+        
+        # Hat geride kalınca önce akış, sonra demografi / re-ID, en son tespit hızı azaltılır
+        self.load_shedding = getattr(SETTINGS, 'LOAD_SHEDDING_ENABLED', True)
+        self.load_shedder = None
+        
         # Video streaming
         self.current_frame = None
+        self.current_annotations = None
+        self.latest_annotations = None     # Takibin son kutuları (yayın dalı her frame'e ekler)
+        self.frame_seq = 0
         self.frame_lock = threading.Lock()
+        self.stream_encoder = RenditionEncoder(self._get_frame_with_seq)
+        
+        # Kutular sunucuda çizilmez; WebSocket tespit kanalıyla gönderilir
+        # (?overlay=1 ile eski, kutuları işlenmiş akış istenebilir)
+        self.stream_overlay_default = getattr(SETTINGS, 'STREAM_OVERLAY', False)
+        self.detection_channel_format = getattr(SETTINGS, 'DETECTION_CHANNEL_FORMAT', 'json')
+        self.track_assigner = IouTracker()
+        
+        # Titreyen tespitler (K / N frame'de görülmeyen) ziyaretçi kaydı oluşturmaz
+        self.temporal_filter = TemporalFilter(self.track_assigner)
+        
+        # Personel sayımdan çıkarılır (data/employees galerisi varsa)
+        self.employee_filter = EmployeeFilter(self.track_assigner)
+        
+        # Sayılan track'lerin ziyaretçi satır id'leri (ikincil analizler satıra id ile yazar)
+        self.visitor_rows = visitor_db.VisitorRows()
+        
+        # Yaş / cinsiyet analizi: track başına bir kesit, düşük öncelikli toplu işleme
+        self.demographics = DemographicsStage(self.track_assigner, exclude=self.employee_filter.is_employee,
+                                              rows=self.visitor_rows)
+        
+        # Kameranın isimli bölgeleri (data/zones.json); her ziyaretçinin bölgesi kayda yazılır
+        self.zone_map = ZoneMap.from_file(getattr(SETTINGS, 'CAMERA_INDEX', 0))
+        self.zone_tagger = ZoneTagger(self.zone_map, exclude=self.employee_filter.is_employee, rows=self.visitor_rows)
+        
+        # Sayılan kişilerin ayak noktalarından doluluk ısı haritası
+        self.heatmap = OccupancyHeatmap(camera_id=getattr(SETTINGS, 'CAMERA_INDEX', 0), zone_map=self.zone_map)
+        
+        # Bölge bazlı kuyruk / doluluk alarmları (data/alert_rules.json)
+        self.alert_engine = AlertEngine.from_file(camera_id=getattr(SETTINGS, 'CAMERA_INDEX', 0),
+                                                  on_event=self._on_alert_event, zone_map=self.zone_map)
+        
+        # Yeni ziyaretçide öncesi/sonrası ile klip kaydı
+        self.clip_recorder = ClipRecorder(self.stream_encoder) if getattr(SETTINGS, 'CLIP_RECORDING', False) else None
+        
+        # Tekrar gelen müşteri tanıma (onaylanan her track için bir kez); varsayılan kapalı,
+        # görünüm vektörü saklandığı için mağaza ayarında REID_ENABLED = True ile açılır
+        self.reid_service = None
+        if getattr(SETTINGS, 'REID_ENABLED', False):
+            self.reid_service = ReidService(on_result=self._on_reid_result)
+        
+        # Async sunucu modunda WebSocket yayınları bu fonksiyona yönlendirilir
+        self.external_emitter = None
+        
+        # Geçmiş dönem sorguları için dakika/saat/gün özetleri
+        self.rollups = RollupStore()
+        
+        # Günlük / haftalık / aylık raporlar (veri değişen dönemler yeniden üretilir)
+        self.report_engine = ReportEngine(self.rollups, self.heatmap)
+        self.report_scheduler = ReportScheduler(self.report_engine)
         
-        # Analytics data
-        self.hourly_stats = {}
-        self.daily_trends = []
+        # Yeni ziyaretçi farkları ve alarmlar merkeze gönderilir (SYNC_SERVER_URL ayarlıysa)
+        self.store_sync = StoreSync()
+        
+        # Çökme sonrası bugünün sayımları ve aktif track'ler olay günlüğünden geri gelir
+        self.event_log = EventLog() if getattr(SETTINGS, 'EVENT_LOG_ENABLED', True) else None
+        
+        # Bağlı WebSocket client'ları (disconnect'te çıkarılır)
+        self.socket_clients = set()
+        
+        # Bellek raporu: RSS, tracemalloc ve bileşenlerin buffer / cache / kuyruk boyutları
+        self.memory_monitor = MemoryMonitor()
+        self._register_memory_probes()
+        if getattr(SETTINGS, 'MEMORY_TRACE_FRAMES', 0):
+            self.memory_monitor.start_tracing(SETTINGS.MEMORY_TRACE_FRAMES)
         
         # Logging
         self.logger = get_logger("webapp")
@@ -87,22 +215,51 @@ class ModernWebApp:
                 if self.is_system_running:
                     return jsonify({'success': False, 'message': 'Sistem zaten çalışıyor'})
                 
+                # Önceki çalışmanın sayımlarını ve track'lerini geri yükle
+                if self.event_log is not None:
+                    self.event_log.recover(self.track_assigner, camera_index=getattr(SETTINGS, 'CAMERA_INDEX', 0))
+                
                 # Kamera başlat
                 if not self.camera_manager.initialize_camera():
                     return jsonify({'success': False, 'message': 'Kamera başlatılamadı'})
                 
-                # Detector başlat
-                if not self.human_detector.initialize():
+                # Detector başlat (havuz modunda model worker'larda yüklenir)
+                self.pipeline = self._build_pipeline()
+                self.latest_annotations = None
+                pooled = self._detector_pooled()
+                if not pooled and not self.human_detector.initialize():
                     return jsonify({'success': False, 'message': 'AI model yüklenemedi'})
                 
                 # Kamera yakalamayı başlat
                 self.camera_manager.start_capture()
+                
+                # Havuz, ilk kamera frame'inin boyutuyla shared memory ayırır
+                if not self.pipeline.start(wait_for_frame(self.camera_manager) if pooled else None):
+                    self.camera_manager.stop_capture()
+                    return jsonify({'success': False, 'message': 'AI model yüklenemedi'})
+                
+                # Frame'ler callback kaydından itibaren akar: çalışan galerisi ve diğer
+                # bileşenler önce hazır olmalı (yoksa ilk personel ziyaretçi sayılır)
+                self.employee_filter.load()
+                self.heatmap.load()
+                self.visitor_rows.start()
+                self.zone_tagger.start()
+                if self.demographics.load():
+                    self.demographics.start()
+                if self.clip_recorder is not None:
+                    self.clip_recorder.start()
+                if self.reid_service is not None:
+                    self.reid_service.start()
+                
                 self.camera_manager.add_frame_callback(self._process_frame)
+                if self.load_shedding:
+                    self.load_shedder = LoadShedder(self.pipeline, encoder=self.stream_encoder)
+                    self.load_shedder.start()
                 
                 self.is_system_running = True
                 
                 # WebSocket ile durumu bildir
-                self.socketio.emit('system_status', {
+                self._emit('system_status', {
                     'running': True, 
                     'message': 'Sistem başlatıldı'
                 })
@@ -121,11 +278,34 @@ class ModernWebApp:
                     return jsonify({'success': False, 'message': 'Sistem zaten durdurulmuş'})
                 
                 self.camera_manager.stop_capture()
-                self.human_detector.cleanup()
+                
+                # Kademeler geri alınır (akış sınırları kalkar)
+                if self.load_shedder is not None:
+                    self.load_shedder.stop()
+                    self.load_shedder = None
+                
+                # Kuyruktaki frame'ler işlenip sayılır, havuz kapanır
+                self.pipeline.stop()
+                if not self._detector_pooled():
+                    self.human_detector.cleanup()
+                self.track_assigner.reset()
+                self.temporal_filter.reset()
+                self.employee_filter.reset()
+                if self.event_log is not None:
+                    self.event_log.close()
+                self.demographics.stop()
+                self.zone_tagger.stop()
+                self.visitor_rows.stop()
+                self.heatmap.save()
+                self.alert_engine.reset()
+                if self.clip_recorder is not None:
+                    self.clip_recorder.stop()
+                if self.reid_service is not None:
+                    self.reid_service.stop()
                 self.is_system_running = False
                 
                 # WebSocket ile durumu bildir
-                self.socketio.emit('system_status', {
+                self._emit('system_status', {
                     'running': False, 
                     'message': 'Sistem durduruldu'
                 })
@@ -140,22 +320,7 @@ class ModernWebApp:
         def get_current_stats():
             """Mevcut istatistikleri getir"""
             try:
-                stats = visitor_tracker.get_current_stats()
-                
-                # Ek istatistikler ekle
-                today_visitors = db_manager.get_today_stats()
-                
-                response_data = {
-                    'total_today': today_visitors.get('total_visitors', 0),
-                    'avg_confidence': today_visitors.get('avg_confidence', 0.0),
-                    'last_visit': today_visitors.get('last_visit'),
-                    'system_running': self.is_system_running,
-                    'current_detections': getattr(self, 'current_detections', 0),
-                    'hourly_data': self._get_hourly_distribution(),
-                    'weekly_trend': self._get_weekly_trend()
-                }
-                
-                return jsonify({'success': True, 'data': response_data})
+                return jsonify({'success': True, 'data': self.get_dashboard_stats()})
                 
             except Exception as e:
                 self.logger.error(f"Stats getirme hatası: {e}")
@@ -179,21 +344,74 @@ class ModernWebApp:
             except Exception as e:
                 return jsonify({'success': False, 'message': str(e)})
         
+        @self.app.route('/api/analytics/query')
+        def analytics_query():
+            """
+            Aralık sorgusu: ?start=2025-01-01&end=2025-07-01&bucket=day&camera=0&metric=visitors
+            (&compare=year ile bir önceki yılın aynı aralığı da döner)
+            """
+            try:
+                bucket = request.args.get('bucket', 'hour')
+                metric = request.args.get('metric', 'visitors')
+                camera = request.args.get('camera', type=int)
+                end = parse_time(request.args['end']) if 'end' in request.args else datetime.now()
+                start = parse_time(request.args['start']) if 'start' in request.args else floor_bucket(end, 'day')
+                
+                result = self.rollups.query(start, end, bucket, camera, metric)
+                data = {'bucket': bucket, 'metric': metric, 'camera': camera, 'series': result['series']}
+                etag = result['etag']
+                immutable = result['immutable']
+                
+                if request.args.get('compare') == 'year':
+                    previous = self.rollups.query(shift_years(start, -1), shift_years(end, -1),
+                                                  bucket, camera, metric)
+                    data['compare'] = previous['series']
+                    etag += previous['etag']
+                
+                etag = f'"{etag}"'
+                if request.headers.get('If-None-Match') == etag:
+                    return Response(status=304, headers={'ETag': etag})
+                
+                response = jsonify({'success': True, 'data': data})
+                response.headers['ETag'] = etag
+                # Kapanmış aralıklar kısa süre cache'lenir (geç gelen veri, rollup yeniden
+                # hesaplaması ETag'i değiştirebilir); açık kovaya dokunanlar her seferinde doğrulanır
+                response.headers['Cache-Control'] = (f'public, max-age={ANALYTICS_CLOSED_MAX_AGE}' if immutable
+                                                     else 'no-cache')
+                return response
+                
+            except (ValueError, KeyError) as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            except Exception as e:
+                self.logger.error(f"Analytics sorgu hatası: {e}")
+                return jsonify({'success': False, 'message': str(e)})
+        
+        @self.app.route('/api/reports')
+        def list_reports():
+            """Üretilmiş raporlar"""
+            return jsonify({'success': True, 'data': self.report_engine.list_reports()})
+        
+        @self.app.route('/api/reports/<kind>/<period>.<fmt>')
+        def get_report(kind, period, fmt):
+            """Dönem raporu (txt / csv / html); veri değiştiyse önce yeniden üretilir"""
+            try:
+                if kind not in REPORT_KINDS or fmt not in REPORT_FORMATS:
+                    return jsonify({'success': False, 'message': 'Geçersiz rapor'}), 404
+                result = self.report_engine.generate(kind, period)
+                mimetypes = {'txt': 'text/plain', 'csv': 'text/csv', 'html': 'text/html'}
+                return send_file(os.path.abspath(result['files'][fmt]), mimetype=mimetypes[fmt])
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            except Exception as e:
+                self.logger.error(f"Rapor hatası: {e}")
+                return jsonify({'success': False, 'message': str(e)})
+        
         @self.app.route('/api/visitors/recent')
         def get_recent_visitors():
             """Son ziyaretçileri getir"""
             try:
                 # Son 20 ziyaretçiyi getir
-                conn = sqlite3.connect('data/musteri_analiz.db')
-                query = """
-                    SELECT entry_time, confidence_avg, detection_count 
-                    FROM visitors 
-                    WHERE confidence_avg > 0.0 
-                    ORDER BY entry_time DESC 
-                    LIMIT 20
-                """
-                df = pd.read_sql_query(query, conn)
-                conn.close()
+                df = self._read_sql(visitor_db.RECENT_VISITORS_QUERY, (20,))
                 
                 visitors = []
                 for _, row in df.iterrows():
@@ -232,27 +450,192 @@ class ModernWebApp:
         
         @self.app.route('/video_feed')
         def video_feed():
-            """Video stream endpoint"""
-            return Response(self._generate_frames(),
+            """Video stream endpoint (?rendition=full|640|320&quality=85&fps=15&adaptive=1&overlay=0)"""
+            session = StreamSession.from_request_args(self.stream_encoder, request.args,
+                                                      request.headers.get('User-Agent', ''), self.logger,
+                                                      self.stream_overlay_default)
+            return Response(self._generate_frames(session),
                           mimetype='multipart/x-mixed-replace; boundary=frame')
         
+        @self.app.route('/api/stream/stats')
+        def stream_stats():
+            """Rendition başına izleyici, encode CPU'su ve bant genişliği"""
+            return jsonify({'success': True, 'data': self.stream_encoder.get_stats()})
+        
         @self.app.route('/api/camera/snapshot')
         def camera_snapshot():
             """Anlık kamera görüntüsü"""
             try:
-                if self.current_frame is not None:
-                    with self.frame_lock:
-                        frame = self.current_frame.copy()
-                    
-                    # JPEG encode
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    
-                    return Response(buffer.tobytes(), mimetype='image/jpeg')
+                jpeg = self.get_snapshot_jpeg()
+                if jpeg is not None:
+                    return Response(jpeg, mimetype='image/jpeg')
                 else:
                     return jsonify({'success': False, 'message': 'Kamera aktif değil'})
                     
             except Exception as e:
                 return jsonify({'success': False, 'message': str(e)})
+        
+        @self.app.route('/api/pipeline')
+        def pipeline_stats():
+            """Aşama başına throughput, kuyruk derinliği ve atılan frame'ler"""
+            if self.pipeline is None:
+                return jsonify({'success': False, 'message': 'Pipeline başlatılmadı'})
+            return jsonify({'success': True, 'data': self.pipeline.get_stats()})
+        
+        @self.app.route('/api/load_shedder')
+        def load_shedder_stats():
+            """Uygulanan yük azaltma kademeleri ve son değişimler"""
+            if self.load_shedder is None:
+                return jsonify({'success': False, 'message': 'Yük azaltma etkin değil'})
+            return jsonify({'success': True, 'data': self.load_shedder.get_stats()})
+        
+        @self.app.route('/api/temporal_filter/stats')
+        def temporal_filter_stats():
+            """Zamansal doğrulamanın elediği tespitler"""
+            return jsonify({'success': True, 'data': self.temporal_filter.get_stats()})
+        
+        @self.app.route('/api/employees/stats')
+        def employee_stats():
+            """Çalışan filtresi durumu ve maliyeti"""
+            return jsonify({'success': True, 'data': self.employee_filter.get_stats()})
+        
+        @self.app.route('/api/demographics/stats')
+        def demographics_stats():
+            """Demografik analiz kuyruğu ve throughput"""
+            return jsonify({'success': True, 'data': self.demographics.get_stats()})
+        
+        @self.app.route('/api/alerts')
+        def alert_status():
+            """Alarm kuralları, güncel değerleri ve son olaylar"""
+            return jsonify({'success': True, 'data': self.alert_engine.get_status()})
+        
+        @self.app.route('/api/sync/stats')
+        def sync_stats():
+            """Merkez senkronizasyonu durumu ve bekleyen veri"""
+            return jsonify({'success': True, 'data': self.store_sync.get_stats()})
+        
+        @self.app.route('/api/event_log/stats')
+        def event_log_stats():
+            """Olay günlüğü ve son kurtarmanın özeti"""
+            if self.event_log is None:
+                return jsonify({'success': False, 'message': 'Olay günlüğü kapalı'})
+            return jsonify({'success': True, 'data': self.event_log.get_stats()})
+        
+        @self.app.route('/api/analytics/zones')
+        def zone_analytics():
+            """Bölge kırılımı: ?start=2025-01-01&end=2025-02-01&camera=0 (varsayılan bugün)"""
+            try:
+                camera = request.args.get('camera', type=int)
+                end = parse_time(request.args['end']) if 'end' in request.args else datetime.now()
+                start = parse_time(request.args['start']) if 'start' in request.args else floor_bucket(end, 'day')
+                
+                return jsonify({'success': True, 'data': {
+                    'zones': self.zone_map.to_dict(),
+                    'breakdown': zone_breakdown(start, end, camera),
+                    'tagger': self.zone_tagger.get_stats()
+                }})
+                
+            except Exception as e:
+                return jsonify({'success': False, 'message': str(e)})
+        
+        @self.app.route('/api/analytics/heatmap')
+        def heatmap_info():
+            """Isı haritası durumu, kayıtlı saatler ve bölge dağılımı"""
+            return jsonify({'success': True, 'data': self.heatmap.get_stats()})
+        
+        @self.app.route('/api/analytics/heatmap.png')
+        def heatmap_png():
+            """Isı haritası görüntüsü (?hour=YYYYmmdd_HH ile saatlik, ?width= ile boyut)"""
+            try:
+                hour = request.args.get('hour')
+                width = min(max(int(request.args.get('width', HEATMAP_PNG_WIDTH)), 64), 1920)
+                
+                png, version = self.heatmap.render_png(width, hour)
+                if png is None:
+                    return jsonify({'success': False, 'message': 'Isı haritası bulunamadı'}), 404
+                
+                # Izgara değişmediyse tarayıcı önbelleğindeki görüntü kullanılır
+                etag = f'"{self.heatmap.camera_id}-{hour or "live"}-{version}-{width}"'
+                if request.headers.get('If-None-Match') == etag:
+                    return Response(status=304, headers={'ETag': etag})
+                
+                response = Response(png, mimetype='image/png')
+                response.headers['ETag'] = etag
+                response.headers['Cache-Control'] = 'public, max-age=86400' if hour and not version else 'no-cache'
+                return response
+                
+            except Exception as e:
+                return jsonify({'success': False, 'message': str(e)})
+        
+        @self.app.route('/api/clips')
+        def list_clips():
+            """Kayıtlı ziyaret klipleri"""
+            if self.clip_recorder is None:
+                return jsonify({'success': False, 'message': 'Klip kaydı kapalı'})
+            return jsonify({'success': True, 'data': self.clip_recorder.list_clips()})
+        
+        @self.app.route('/api/clips/<name>')
+        def download_clip(name):
+            """Klibi indir (?play=1 ile tarayıcıda kayıt hızında oynat)"""
+            path = self.clip_recorder.clip_path(name) if self.clip_recorder is not None else None
+            if path is None:
+                return jsonify({'success': False, 'message': 'Klip bulunamadı'}), 404
+            if request.args.get('play') == '1':
+                return Response(self.clip_recorder.iter_playback(name),
+                                mimetype='multipart/x-mixed-replace; boundary=frame')
+            return send_file(str(path.resolve()), mimetype='video/x-motion-jpeg', as_attachment=True)
+        
+        @self.app.route('/metrics')
+        def prometheus_metrics():
+            """Prometheus formatında performans metrikleri"""
+            return Response(metrics_registry.render(), mimetype=METRICS_CONTENT_TYPE)
+        
+        @self.app.route('/api/debug/profile')
+        def debug_profile():
+            """Pipeline thread'lerini örnekleyip flamegraph uyumlu çıktı döndür"""
+            try:
+                seconds = float(request.args.get('seconds', 10))
+                interval = float(request.args.get('interval_ms', PROFILE_INTERVAL * 1000)) / 1000.0
+                thread_filter = request.args.get('threads')
+                
+                output = run_profile(seconds, interval, thread_filter)
+                if output is None:
+                    return jsonify({'success': False, 'message': 'Başka bir profil zaten çalışıyor'}), 409
+                
+                filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+                return Response(output, mimetype='text/plain',
+                                headers={'Content-Disposition': f'attachment; filename={filename}'})
+                
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Geçersiz parametre'}), 400
+            except Exception as e:
+                self.logger.error(f"Profil hatası: {e}")
+                return jsonify({'success': False, 'message': str(e)})
+        
+        @self.app.route('/api/debug/memory', methods=['GET', 'POST'])
+        def debug_memory():
+            """
+            Bellek raporu: ?top=15 (en çok bellek tutan satırlar).
+            tracemalloc sadece POST ile açılır / kapatılır: trace=1 / trace=0
+            """
+            try:
+                top = min(max(int(request.args.get('top', MEMORY_TOP)), 1), MEMORY_MAX_TOP)
+                if request.method == 'POST':
+                    trace = request.values.get('trace')
+                    if trace == '1':
+                        self.memory_monitor.start_tracing()
+                    elif trace == '0':
+                        self.memory_monitor.stop_tracing()
+                    else:
+                        raise ValueError(trace)
+                
+                return jsonify({'success': True, 'data': self.memory_monitor.snapshot(top)})
+                
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Geçersiz parametre'}), 400
+            except Exception as e:
+                self.logger.error(f"Bellek raporu hatası: {e}")
+                return jsonify({'success': False, 'message': str(e)})
     
     def _setup_websockets(self):
         """Setup WebSocket events"""
@@ -261,25 +644,23 @@ class ModernWebApp:
         def handle_connect():
             """Client bağlandığında"""
             self.logger.info(f"Web client bağlandı: {request.sid}")
-            emit('connection_status', {'status': 'connected'})
+            self.socket_clients.add(request.sid)
+            self._reply('connection_status', {'status': 'connected'})
             
             # Mevcut durumu gönder
-            stats = visitor_tracker.get_current_stats()
-            emit('stats_update', stats)
+            self._reply('stats_update', visitor_tracker.get_current_stats())
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
             """Client bağlantısı kesildiğinde"""
             self.logger.info(f"Web client bağlantısı kesildi: {request.sid}")
+            self.socket_clients.discard(request.sid)
         
         @self.socketio.on('request_stats')
         def handle_stats_request():
             """İstatistik güncellemesi istendi"""
             try:
-                stats = visitor_tracker.get_current_stats()
-                stats['current_detections'] = getattr(self, 'current_detections', 0)
-                stats['system_running'] = self.is_system_running
-                emit('stats_update', stats)
+                self._reply('stats_update', self.get_live_stats())
             except Exception as e:
                 self.logger.error(f"Stats gönderme hatası: {e}")
         
@@ -288,92 +669,314 @@ class ModernWebApp:
             """Saatlik veri istendi"""
             try:
                 hourly_data = self._get_hourly_distribution()
-                emit('hourly_update', hourly_data)
+                self._reply('hourly_update', hourly_data)
             except Exception as e:
                 self.logger.error(f"Hourly data gönderme hatası: {e}")
     
+    def _register_memory_probes(self):
+        """/api/debug/memory bileşenleri: frame'ler, cache'ler, buffer'lar, kuyruklar ve track durumları"""
+        monitor = self.memory_monitor
+        
+        def frames():
+            frame = self.current_frame
+            return {'current_frame_kb': round(frame.nbytes / 1024, 1) if frame is not None else 0.0,
+                    'frame_seq': self.frame_seq}
+        
+        def tracks():
+            # Biten track'ler her bileşenden silinmeli; bu sayılar zamanla büyümemeli
+            return {
+                'tracker': len(self.track_assigner.tracks),
+                'temporal_filter': self.temporal_filter.get_stats()['active_tracks'],
+                'employee_filter': self.employee_filter.get_stats()['active_tracks'],
+                'event_log': self.event_log.get_stats()['active_tracks'] if self.event_log is not None else None
+            }
+        
+        def demographics():
+            stats = self.demographics.get_stats()
+            return {'queue_depth': stats['queue_depth'], 'collecting_tracks': stats['collecting_tracks'],
+                    'awaiting_rows': stats['awaiting_rows']}
+        
+        def visitor_rows():
+            stats = self.visitor_rows.get_stats()
+            return {'pending': stats['pending'], 'rows': stats['rows']}
+        
+        monitor.register('frames', frames)
+        monitor.register('stream', self.stream_encoder.get_memory_info)
+        monitor.register('pipeline', lambda: self.pipeline.get_memory_info() if self.pipeline is not None else None)
+        monitor.register('sockets', lambda: {'clients': len(self.socket_clients)})
+        monitor.register('tracks', tracks)
+        monitor.register('demographics', demographics)
+        monitor.register('visitor_rows', visitor_rows)
+        if self.clip_recorder is not None:
+            monitor.register('clip_recorder', self.clip_recorder.get_memory_info)
+        if self.reid_service is not None:
+            monitor.register('reid', lambda: {'indexed_appearances': len(self.reid_service.index)})
+    
+    def get_live_stats(self):
+        """Anlık takip istatistikleri (WebSocket stats_update içeriği)"""
+        stats = visitor_tracker.get_current_stats()
+        if self.event_log is not None:
+            stats['total_today'] = self.event_log.state.total_today()
+        stats['current_detections'] = getattr(self, 'current_detections', 0)
+        stats['system_running'] = self.is_system_running
+        return stats
+    
+    def get_dashboard_stats(self):
+        """Dashboard özet istatistikleri (/api/stats/current içeriği)"""
+        today_visitors = db_manager.get_today_stats()
+        
+        return {
+            'total_today': today_visitors.get('total_visitors', 0),
+            'avg_confidence': today_visitors.get('avg_confidence', 0.0),
+            'last_visit': today_visitors.get('last_visit'),
+            'system_running': self.is_system_running,
+            'current_detections': getattr(self, 'current_detections', 0),
+            'hourly_data': self._get_hourly_distribution(),
+            'weekly_trend': self._get_weekly_trend()
+        }
+    
+    def _get_frame_with_seq(self):
+        """Son işlenmiş ham frame, sıra numarası ve kutuları (rendition encoder kaynağı)"""
+        with self.frame_lock:
+            return self.frame_seq, self.current_frame, self.current_annotations
+    
+    def get_jpeg_frame(self, quality=STREAM_JPEG_QUALITY, overlay=False):
+        """
+        Son işlenmiş frame'in tam çözünürlüklü JPEG hali. Her frame her kalite
+        için bir kez encode edilir ve tüm izleyiciler aynı byte'ları paylaşır.
+        
+        Returns:
+            tuple: (frame sıra numarası, JPEG bytes veya None)
+        """
+        return self.stream_encoder.get('full', quality, overlay)
+    
+    def get_snapshot_jpeg(self):
+        """Snapshot için yüksek kaliteli, kutuları çizilmiş JPEG (kamera kapalıysa None)"""
+        return self.get_jpeg_frame(SNAPSHOT_JPEG_QUALITY, overlay=True)[1]
+    
+    def _emit(self, event, data):
+        """Tüm client'lara WebSocket mesajı gönder (sayaçlı)"""
+        SOCKET_MESSAGES.labels(event=event).inc()
+        if self.external_emitter is not None:
+            self.external_emitter(event, data)
+        else:
+            self.socketio.emit(event, data)
+    
+    def _reply(self, event, data):
+        """Sadece isteği yapan client'a WebSocket mesajı gönder (sayaçlı)"""
+        SOCKET_MESSAGES.labels(event=event).inc()
+        emit(event, data)
+    
+    def _read_sql(self, query, params=None):
+        """
+        Veritabanı sorgusunu çalıştır ve DataFrame döndür.
+        
+        Returns:
+            pd.DataFrame: Sorgu sonucu
+        """
+        DB_QUERIES.inc()
+        with stage_timer('db_query'):
+            conn = sqlite3.connect(visitor_db.DB_PATH)
+            try:
+                return pd.read_sql_query(query, conn, params=params)
+            finally:
+                conn.close()
+    
+    def _build_pipeline(self):
+        """
+        Aşama tanımından (ve mağaza ayarlarından) işleme hattını kur.
+        
+        Returns:
+            Pipeline
+        """
+        factories = {
+            'detector': lambda **options: DetectorStage(
+                self.human_detector, **dict({'workers': self.detector_workers}, **options)),
+            'roi': lambda **options: RoiFilter(zone_map=self.zone_map, **options),
+            'tracker': lambda **options: FunctionStage('tracker', self._track_stage, **options),
+            'stream': lambda **options: FunctionStage('stream', self._stream_stage, **options),
+            'employee_filter': lambda **options: FunctionStage('employee_filter', self._employee_stage, **options),
+            'reid': lambda **options: FunctionStage('reid', self._reid_stage, **options),
+            'heatmap': lambda **options: FunctionStage('heatmap', self._heatmap_stage, **options),
+            'alerts': lambda **options: FunctionStage('alerts', self._alert_stage, **options),
+            'demographics': lambda **options: FunctionStage('demographics', self._demographics_stage, **options),
+            'zones': lambda **options: FunctionStage('zones', self._zone_stage, **options),
+            'visitors': lambda **options: FunctionStage('visitors', self._visitor_stage, **options),
+        }
+        return Pipeline.from_definition(PIPELINE_DEFINITION, factories, name='webapp')
+    
+    def _detector_pooled(self):
+        """Tespit worker process'lerinde mi yapılıyor"""
+        detector = self.pipeline.get_stage('detector') if self.pipeline is not None else None
+        return detector is not None and detector.mode == 'process'
+    
     def _process_frame(self, frame):
-        """Frame işleme callback'i"""
-        if frame is None:
-            return
+        """Frame işleme callback'i (frame hatta verilip hemen dönülür)"""
+        if self.pipeline is not None:
+            self.pipeline.submit(frame)
+    
+    def _track_stage(self, packet):
+        """Frame'ler arası kimlik, olay günlüğü ve zamansal doğrulama"""
+        FRAMES_PROCESSED.inc()
         
-        try:
-            # İnsan tespiti yap
-            detections, processed_frame = self.human_detector.detect_humans(frame, draw_boxes=True)
-            
-            # Anlık tespit sayısını güncelle
-            self.current_detections = len(detections) if detections else 0
-            
-            # Processed frame'i sakla
-            with self.frame_lock:
-                self.current_frame = processed_frame.copy()
-            
-            # Ziyaretçi takibi
-            if detections and len(detections) > 0:
-                tracking_result = visitor_tracker.process_detections(detections, datetime.now())
-                
-                # Yeni ziyaretçi varsa WebSocket ile bildir
-                if tracking_result['new_visitors'] > 0:
-                    self.socketio.emit('new_visitor', {
-                        'count': tracking_result['new_visitors'],
-                        'total_today': tracking_result['current_stats']['total_today']
-                    })
-                
-                # Stats güncelle
-                stats = tracking_result['current_stats']
-                stats['current_detections'] = self.current_detections
-                stats['system_running'] = self.is_system_running
-                
-                self.socketio.emit('stats_update', stats)
-            
-        except Exception as e:
-            self.logger.error(f"Frame işleme hatası: {e}")
+        # Anlık tespit sayısını güncelle
+        self.current_detections = len(packet.detections)
+        
+        # Frame'ler arası kimlik (overlay etiketleri için)
+        packet.track_update = self.track_assigner.update(packet.detections, packet.timestamp, packet.frame_step)
+        self.latest_annotations = (packet.detections, packet.track_update.track_ids)
+        if self.event_log is not None:
+            self.event_log.record_frame(packet.detections, packet.track_update, packet.timestamp)
+        
+        # Sayım tarafı sadece zamansal olarak doğrulanmış track'leri görür
+        packet.verified, packet.verified_update = self.temporal_filter.apply(packet.detections, packet.track_update)
+        packet.counted = packet.verified
+        return packet
+    
+    def _stream_stage(self, packet):
+        """Ham kamera frame'ini takibin son kutularıyla sakla, kutuları tespit kanalına gönder"""
+        detections, track_ids = self.latest_annotations or ([], [])
+        with self.frame_lock:
+            self.current_frame = packet.frame
+            self.current_annotations = (detections, track_ids)
+            self.frame_seq += 1
+            seq = self.frame_seq
+        
+        # Kutuları frame sırasıyla tespit kanalına gönder
+        event = build_detection_event(seq, packet.timestamp, packet.frame.shape, detections, track_ids)
+        for name, payload in encode_for_channel(event, self.detection_channel_format):
+            self._emit(name, payload)
+        return packet
+    
+    def _employee_stage(self, packet):
+        """Çalışanlar ve yüz kontrolü bekleyen track'ler sayılmaz"""
+        packet.counted = self.employee_filter.filter(packet.frame, packet.verified, packet.verified_update)
+        return packet
+    
+    def _reid_stage(self, packet):
+        """Doğrulanan track'lerin görünümü arka planda önceki ziyaretlerle karşılaştırılır"""
+        if self.reid_service is not None:
+            for index, track in packet.verified_update.confirmed:
+                crop = crop_detection(packet.frame, detection_bbox(packet.verified[index]))
+                if crop is not None:
+                    self.reid_service.submit(track.track_id, crop, packet.timestamp)
+        return packet
+    
+    def _heatmap_stage(self, packet):
+        self.heatmap.update(packet.frame.shape, packet.counted, packet.timestamp)
+        return packet
+    
+    def _alert_stage(self, packet):
+        """Alarm kuralları çalışanlar hariç herkesi sayar (onay bekleyenler dahil)"""
+        track_ids = packet.track_update.track_ids
+        visible = [(detection, track_id) for detection, track_id in zip(packet.detections, track_ids)
+                   if not self.employee_filter.is_employee(track_id)]
+        self.alert_engine.update(packet.frame.shape, [d for d, _ in visible], [t for _, t in visible],
+                                 packet.timestamp)
+        return packet
+    
+    def _demographics_stage(self, packet):
+        """En iyi kesit seçimi (analiz worker thread'inde)"""
+        self.demographics.update(packet.frame, packet.verified, packet.verified_update, packet.timestamp)
+        return packet
+    
+    def _zone_stage(self, packet):
+        """Doğrulanan track'lerin bölgesi (maske erişimi; DB'ye arka planda yazılır)"""
+        self.zone_tagger.update(packet.frame.shape, packet.verified, packet.verified_update, packet.timestamp)
+        return packet
+    
+    def _visitor_stage(self, packet):
+        """Ziyaretçi takibi, günlük sayım ve WebSocket bildirimleri"""
+        counted = packet.counted
+        if not counted:
+            return packet
+        
+        with stage_timer('tracking'):
+            tracking_result = visitor_tracker.process_detections(counted, datetime.fromtimestamp(packet.timestamp))
+        self.visitor_rows.counted(tracking_result['new_visitors'], counted, packet.verified,
+                                  packet.verified_update.track_ids, packet.timestamp)
+        
+        # Bugünün sayımı yeniden başlatmalarda kaybolmasın
+        if self.event_log is not None:
+            self.event_log.record_visitors(tracking_result['new_visitors'], counted, packet.timestamp)
+            tracking_result['current_stats']['total_today'] = self.event_log.state.total_today(packet.timestamp)
+        
+        # Yeni ziyaretçi varsa WebSocket ile bildir ve klip kaydını tetikle
+        if tracking_result['new_visitors'] > 0:
+            visitor_event = {
+                'count': tracking_result['new_visitors'],
+                'total_today': tracking_result['current_stats']['total_today']
+            }
+            self._emit('new_visitor', visitor_event)
+            if self.clip_recorder is not None:
+                self.clip_recorder.trigger('new_visitor', visitor_event, packet.timestamp)
+        
+        # Stats güncelle
+        stats = tracking_result['current_stats']
+        stats['current_detections'] = self.current_detections
+        stats['system_running'] = self.is_system_running
+        
+        self._emit('stats_update', stats)
+        return packet
+    
+    def _on_alert_event(self, event):
+        """Alarm olayı: dashboard'a bildir ve merkeze gönderilmek üzere kuyruğa al"""
+        self._emit('alert', event)
+        self.store_sync.enqueue_event('alert', event, event.get('timestamp'))
+    
+    def _on_reid_result(self, track_id, person_id, returning, similarity):
+        """Re-ID sonucu: tekrar gelen müşteriyi dashboard'a bildir"""
+        if returning:
+            self.logger.info(f"🔁 Tekrar gelen müşteri: track #{track_id} -> kişi {person_id} "
+                             f"(benzerlik {similarity:.2f})")
+            self._emit('returning_visitor', {
+                'track_id': track_id,
+                'person_id': person_id,
+                'similarity': round(similarity, 3)
+            })
     
-    def _generate_frames(self):
+    def _generate_frames(self, session):
         """Video stream generator"""
-        while True:
-            try:
-                if self.current_frame is not None:
-                    with self.frame_lock:
-                        frame = self.current_frame.copy()
-                    
-                    # JPEG encode
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        last_seq = None
+        try:
+            while True:
+                try:
+                    wait = session.wait_time()
+                    if wait > 0:
+                        time.sleep(wait)
                     
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                else:
-                    # Placeholder image
+                    seq, jpeg = session.next_frame()
+                    if jpeg is not None and seq != last_seq:
+                        last_seq = seq
+                        part = mjpeg_part(seq, jpeg)
+                        
+                        # yield'den dönüş süresi = parçanın sokete yazılma süresi
+                        yielded_at = time.perf_counter()
+                        yield part
+                        session.record_sent(len(part), time.perf_counter() - yielded_at)
+                    elif jpeg is not None:
+                        # Yeni frame bekleniyor (aynı frame tekrar encode edilmez)
+                        time.sleep(0.01)
+                    else:
+                        # Placeholder image
+                        time.sleep(0.1)
+                        
+                except GeneratorExit:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Frame generation hatası: {e}")
                     time.sleep(0.1)
-                    
-            except Exception as e:
-                self.logger.error(f"Frame generation hatası: {e}")
-                time.sleep(0.1)
+        finally:
+            session.close()
     
     def _get_hourly_distribution(self):
         """Saatlik dağılım verilerini getir"""
         try:
-            conn = sqlite3.connect('data/musteri_analiz.db')
-            today = datetime.now().date()
-            
-            query = """
-                SELECT strftime('%H', entry_time) as hour, COUNT(*) as count
-                FROM visitors 
-                WHERE DATE(entry_time) = ? AND confidence_avg > 0.0
-                GROUP BY hour
-                ORDER BY hour
-            """
-            
-            df = pd.read_sql_query(query, conn, params=[str(today)])
-            conn.close()
-            
-            # 24 saatlik veri hazırla
-            hourly_data = {str(i).zfill(2): 0 for i in range(24)}
+            today = floor_bucket(datetime.now(), 'day')
+            result = self.rollups.query(today, today + timedelta(days=1), 'hour')
             
-            for _, row in df.iterrows():
-                hourly_data[row['hour']] = row['count']
-            
-            return hourly_data
+            # 24 saatlik veri ('YYYY-mm-dd HH:00' -> 'HH')
+            return {point['bucket'][11:13]: point['value'] for point in result['series']}
             
         except Exception as e:
             self.logger.error(f"Hourly distribution hatası: {e}")
@@ -382,35 +985,17 @@ class ModernWebApp:
     def _get_weekly_trend(self):
         """Haftalık trend verilerini getir"""
         try:
-            conn = sqlite3.connect('data/musteri_analiz.db')
-            
-            # Son 7 günün verilerini al
-            query = """
-                SELECT DATE(entry_time) as date, COUNT(*) as count
-                FROM visitors 
-                WHERE entry_time >= date('now', '-7 days') AND confidence_avg > 0.0
-                GROUP BY DATE(entry_time)
-                ORDER BY date
-            """
+            # Son 7 gün (bugün dahil)
+            today = floor_bucket(datetime.now(), 'day')
+            result = self.rollups.query(today - timedelta(days=6), today + timedelta(days=1), 'day')
             
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            # 7 günlük veri hazırla
             weekly_data = []
-            for i in range(7):
-                date = (datetime.now() - timedelta(days=6-i)).date()
-                date_str = str(date)
-                
-                count = 0
-                matching_row = df[df['date'] == date_str]
-                if not matching_row.empty:
-                    count = matching_row.iloc[0]['count']
-                
+            for point in result['series']:
+                date = datetime.strptime(point['bucket'], '%Y-%m-%d')
                 weekly_data.append({
-                    'date': date_str,
+                    'date': point['bucket'],
                     'day': date.strftime('%A'),
-                    'count': count
+                    'count': point['value']
                 })
             
             return weekly_data
@@ -426,8 +1011,32 @@ class ModernWebApp:
 
 def main():
     """Ana fonksiyon"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Müşteri analiz web dashboard")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help="ASGI/asyncio sunucu modu (uvicorn, izleyici başına thread yok)")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="Başlangıçtan sonra pipeline'ı SECONDS süre profille (logs/profile_*.folded)")
+    parser.add_argument('--profile-delay', type=float, default=30.0, metavar='SECONDS',
+                        help="Profil başlamadan önce beklenecek süre")
+    args = parser.parse_args()
+    
     app = ModernWebApp()
-    app.run()
+    app.report_scheduler.start()
+    app.store_sync.start()
+    
+    if args.profile:
+        schedule_profile(args.profile, output_dir=SETTINGS.LOG_DIR, delay=args.profile_delay,
+                         logger=app.logger)
+    
+    if args.async_mode:
+        from asgi_app import run_async
+        run_async(app, host=args.host, port=args.port)
+    else:
+        app.run(host=args.host, port=args.port)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,409 @@
+"""
+OpenCV Müşteri Analiz Sistemi - Kamera Bölgeleri
+Kamera başına isimli bölgeler normalize koordinatlarda (0-1) tanımlanır;
+kamera çözünürlüğü değişse veya yeni kamera eklense de bölgeler geçerli
+kalır.
+
+- Bölgeler açılışta ZONE_MASK_SIZE boyutunda bir uint8 etiket maskesine
+  çizilir; bir ayak noktasının bölgesi tek dizi erişimiyle bulunur (O(1)),
+  bölge sayısı ve poligon karmaşıklığı maliyeti değiştirmez.
+- Onaylanan her track'in bölgesi, track'in sayıldığı ziyaretçi satırının
+  (VisitorRows'un bağladığı satır id'si) zone_id kolonuna yazılır; bölge
+  kırılımları JSON kutular yeniden okunmadan (entry_time, zone_id)
+  indeksi üzerinde GROUP BY ile alınır. Kolon, zones tablosu ve indeks
+  db_migrations'tan gelir (uygulama açılışta migrate_database() çağırır).
+- Bölge dosyası yoksa eski Sol / Merkez / Sağ üçe bölme kullanılır.
+
+Bölge dosyası (data/zones.json), kamera index'i -> bölge listesi:
+    {"0": [{"id": 1, "name": "Giriş", "rect": [0.0, 0.6, 0.3, 1.0]},
+           {"id": 2, "name": "Kasa", "polygon": [[0.6, 0.5], [1.0, 0.5], [1.0, 1.0], [0.7, 1.0]]}]}
+
+    id: 1-255 arası, kamera içinde tekil (0 = bölge dışı)
+    Çakışan bölgelerde listede önce gelen geçerlidir.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import visitor_db
+from metrics import metrics_registry
+from occupancy_heatmap import REGION_NAMES, foot_points
+from src.utils.logger import get_logger
+from src.config.settings import SETTINGS
+
+ZONES_FILE = getattr(SETTINGS, 'ZONES_FILE', 'data/zones.json')
+ZONE_MASK_SIZE = (180, 320)    # (satır, sütun); ~%0.3 çözünürlük
+ZONE_FLUSH_SECONDS = 5.0       # Bölge etiketleri bu aralıkla toplu yazılır
+ZONE_MATCH_SECONDS = visitor_db.ROW_BIND_SECONDS  # Bu sürede ziyaretçi satırı bağlanmayan etiket atılır
+ZONE_PENDING_MAX = 4096
+# Eski kayıtların bounding_box'ları bu çözünürlükte alınmıştı (frame boyutu saklanmıyor)
+LEGACY_FRAME_SHAPE = (getattr(SETTINGS, 'CAMERA_HEIGHT', 720), getattr(SETTINGS, 'CAMERA_WIDTH', 1280))
+
+NO_ZONE = 0
+NO_ZONE_NAME = 'Bölge dışı'
+UNKNOWN_ZONE_NAME = 'Bilinmiyor'
+ZONE_COLUMNS = {'zone_id': 'INTEGER'}
+DEFAULT_ZONES = [{'id': i + 1, 'name': name, 'rect': [i / len(REGION_NAMES), 0.0, (i + 1) / len(REGION_NAMES), 1.0]}
+                 for i, name in enumerate(REGION_NAMES)]
+
+# Bölgesi olmayan eski satırlar id sırasıyla parça parça (birincil anahtar aralığı)
+BACKFILL_QUERY = """
+    SELECT id, bounding_box, COALESCE(camera_index, 0) AS camera FROM visitors
+    WHERE id > ? AND zone_id IS NULL AND entry_time < ? ORDER BY id LIMIT ?
+"""
+TAG_VISITOR_QUERY = "UPDATE visitors SET zone_id = ? WHERE id = ?"
+
+ZONES_TAGGED = metrics_registry.counter('zones_tagged_total', 'Bölgesi yazılan ziyaretçiler', labels=('result',))
+
+
+def load_zone_config(path=ZONES_FILE):
+    """
+    Bölge dosyasını oku.
+
+    Returns:
+        dict: {kamera: [bölge tanımı, ...]} (dosya yoksa boş)
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return {str(camera): zones for camera, zones in json.loads(path.read_text(encoding='utf-8')).items()}
+    except Exception as e:
+        get_logger("zones").error(f"Bölge dosyası okuma hatası: {e}")
+        return {}
+
+
+class ZoneMap:
+    """Tek kameranın bölgeleri ve önceden çizilmiş etiket maskesi"""
+
+    def __init__(self, camera_id='0', zones=None, mask_size=ZONE_MASK_SIZE):
+        """
+        Args:
+            camera_id: Kamera index'i
+            zones: Bölge tanımları (None -> Sol / Merkez / Sağ)
+            mask_size: (satır, sütun) maske çözünürlüğü
+        """
+        self.camera_id = str(camera_id)
+        self.zones = list(zones) if zones else DEFAULT_ZONES
+        self.names = {}
+        for zone in self.zones:
+            zone_id = int(zone['id'])
+            if not 0 < zone_id < 256 or zone_id in self.names:
+                raise ValueError(f"Geçersiz bölge id'si: {zone_id}")
+            if 'rect' not in zone and 'polygon' not in zone:
+                raise ValueError(f"Bölge şekli eksik: {zone.get('name', zone_id)}")
+            self.names[zone_id] = zone['name']
+        self._ids = {name: zone_id for zone_id, name in self.names.items()}
+
+        rows, cols = mask_size
+        self.mask = np.full(mask_size, NO_ZONE, dtype=np.uint8)
+        # Sondan başa çizilir: çakışmada listede önce gelen bölge üstte kalır
+        for zone in reversed(self.zones):
+            zone_id = int(zone['id'])
+            if 'rect' in zone:
+                x0, y0, x1, y1 = zone['rect']
+                self.mask[int(round(y0 * rows)):int(round(y1 * rows)),
+                          int(round(x0 * cols)):int(round(x1 * cols))] = zone_id
+            else:
+                points = np.round(np.asarray(zone['polygon'], dtype=np.float64) * (cols, rows)).astype(np.int32)
+                cv2.fillPoly(self.mask, [points], zone_id)
+        self._grid_labels = {}  # Izgara boyutu -> yeniden örneklenmiş maske
+
+    @classmethod
+    def from_file(cls, camera_id='0', path=ZONES_FILE):
+        """Bölge dosyasından oluştur (kamera tanımlı değilse varsayılan bölgeler)"""
+        try:
+            return cls(camera_id, load_zone_config(path).get(str(camera_id)))
+        except Exception as e:
+            get_logger("zones").error(f"Bölge tanımı hatası (kamera {camera_id}): {e}")
+            return cls(camera_id)
+
+    def lookup(self, points):
+        """
+        Normalize noktaların bölge id'leri.
+
+        Args:
+            points: (N, 2) x, y dizisi (0-1 aralığında)
+
+        Returns:
+            np.ndarray: uint8 (N,) bölge id'leri (0 = bölge dışı)
+        """
+        rows, cols = self.mask.shape
+        return self.mask[(points[:, 1] * rows).astype(np.intp), (points[:, 0] * cols).astype(np.intp)]
+
+    def assign(self, frame_shape, detections):
+        """
+        Tespitlerin ayak noktalarının bölge id'leri.
+
+        Returns:
+            np.ndarray: uint8 (N,)
+        """
+        if not detections:
+            return np.zeros(0, dtype=np.uint8)
+        return self.lookup(foot_points(frame_shape, detections))
+
+    def zone_id(self, name):
+        """Bölge adının id'si (tanımlı değilse ValueError)"""
+        if name not in self._ids:
+            raise ValueError(f"Kamera {self.camera_id} için tanımsız bölge: {name}")
+        return self._ids[name]
+
+    def name(self, zone_id):
+        """Bölge id'sinin adı"""
+        if zone_id is None:
+            return UNKNOWN_ZONE_NAME
+        return self.names.get(int(zone_id), NO_ZONE_NAME)
+
+    def grid_shares(self, grid):
+        """
+        Isı haritası ızgarasındaki kişi-saniyenin bölgelere dağılımı.
+
+        Returns:
+            dict: {bölge adı: oran}
+        """
+        labels = self._grid_labels.get(grid.shape)
+        if labels is None:
+            labels = cv2.resize(self.mask, (grid.shape[1], grid.shape[0]), interpolation=cv2.INTER_NEAREST)
+            self._grid_labels[grid.shape] = labels
+        sums = np.bincount(labels.ravel(), weights=grid.ravel(), minlength=256)
+        total = float(sums.sum())
+        return {name: round(float(sums[zone_id]) / total, 3) if total else 0.0
+                for zone_id, name in self.names.items()}
+
+    def save_names(self, conn):
+        """Bölge isimlerini zones tablosuna yaz (kırılım sorguları için)"""
+        camera = int(self.camera_id)
+        with conn:
+            conn.execute("DELETE FROM zones WHERE camera_index = ?", (camera,))
+            conn.executemany("INSERT INTO zones (camera_index, zone_id, name) VALUES (?, ?, ?)",
+                             [(camera, zone_id, name) for zone_id, name in self.names.items()])
+
+    def to_dict(self):
+        return {'camera_id': self.camera_id, 'zones': self.zones}
+
+
+def zone_breakdown(start, end, camera=None, db_path=visitor_db.DB_PATH):
+    """
+    Aralıktaki ziyaretçilerin bölge kırılımı (indeksli GROUP BY).
+
+    Args:
+        start, end: datetime aralığı [start, end)
+        camera: Kamera index'i (None -> tümü)
+
+    Returns:
+        list: [{'camera': int, 'zone_id': int, 'name': str, 'visitors': int}, ...]
+    """
+    params = [start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')]
+    if camera is not None:
+        params.append(int(camera))
+
+    conn = visitor_db.connect(db_path)
+    try:
+        rows = conn.execute(zone_breakdown_query(camera), params).fetchall()
+    finally:
+        conn.close()
+
+    result = []
+    for row in rows:
+        if row['zone_id'] is None:
+            name = UNKNOWN_ZONE_NAME
+        else:
+            name = row['name'] or NO_ZONE_NAME
+        result.append({'camera': row['camera'], 'zone_id': row['zone_id'], 'name': name,
+                       'visitors': row['visitors']})
+    return result
+
+
+def zone_breakdown_query(camera=None):
+    """zone_breakdown sorgusu (parametreler: başlangıç, bitiş[, kamera])"""
+    query = """
+        SELECT COALESCE(v.camera_index, 0) AS camera, v.zone_id, z.name, COUNT(*) AS visitors
+        FROM visitors v
+        LEFT JOIN zones z ON z.camera_index = COALESCE(v.camera_index, 0) AND z.zone_id = v.zone_id
+        WHERE v.entry_time >= ? AND v.entry_time < ? AND v.confidence_avg > 0.0
+    """
+    if camera is not None:
+        query += " AND COALESCE(v.camera_index, 0) = ?"
+    return query + " GROUP BY camera, v.zone_id ORDER BY camera, visitors DESC"
+
+
+def backfill_zones(zone_maps, db_path=visitor_db.DB_PATH, frame_shape=LEGACY_FRAME_SHAPE,
+                   min_age_seconds=ZONE_MATCH_SECONDS, chunk_size=5000):
+    """
+    Bölgesi olmayan eski satırları bounding_box'larından bir kez etiketle.
+
+    Canlı etiketleyicinin henüz işlemediği yeni satırlara dokunulmaz.
+
+    Args:
+        zone_maps: {kamera index'i: ZoneMap}
+        frame_shape: Eski kutuların alındığı frame boyutu
+
+    Returns:
+        int: Etiketlenen satır sayısı
+    """
+    cutoff = visitor_db.format_time(time.time() - min_age_seconds)
+    conn = visitor_db.connect(db_path)
+    tagged = 0
+    try:
+        for zone_map in zone_maps.values():
+            zone_map.save_names(conn)
+        last_id = 0
+        while True:
+            rows = conn.execute(BACKFILL_QUERY, (last_id, cutoff, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            updates = []
+            for row in rows:
+                zone_map = zone_maps.get(row['camera'])
+                try:
+                    boxes = json.loads(row['bounding_box'] or '[]')
+                except ValueError:
+                    boxes = []
+                if zone_map is None or not boxes or boxes[0] == [0, 0, 100, 100]:
+                    zone_id = NO_ZONE
+                else:
+                    zone_id = int(zone_map.assign(frame_shape, [{'bbox': boxes[0]}])[0])
+                updates.append((zone_id, row['id']))
+            visitor_db.update_visitors(conn, list(ZONE_COLUMNS), updates)
+            tagged += len(updates)
+    finally:
+        conn.close()
+    return tagged
+
+
+class ZoneTagger:
+    """Onaylanan track'lerin bölgesini ziyaretçi satırlarına toplu yazan aşama"""
+
+    def __init__(self, zone_map, db_path=visitor_db.DB_PATH, exclude=None, interval=ZONE_FLUSH_SECONDS, rows=None):
+        """
+        Args:
+            zone_map: Kameranın ZoneMap'i
+            exclude: exclude(track_id) True dönerse track yazılmaz (ör. çalışanlar)
+            interval: Yazma aralığı (saniye)
+            rows: Sayılan track'lerin satır id'lerini veren VisitorRows (None -> etiket yazılmaz)
+        """
+        self.zone_map = zone_map
+        self.db_path = db_path
+        self.exclude = exclude
+        self.interval = interval
+        self.rows = rows
+        self.logger = get_logger("zones")
+
+        self._pending = []     # (track id, onaylanma zamanı, bölge id'si); pipeline thread'i ekler
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {'tagged': 0, 'unmatched': 0, 'dropped': 0}
+
+    def start(self):
+        """Bölge isimlerini kaydet ve yazma thread'ini başlat"""
+        if self._thread is not None:
+            return
+        try:
+            conn = visitor_db.connect(self.db_path)
+            try:
+                self.zone_map.save_names(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.error(f"Bölge tablosu hatası: {e}")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='zones', daemon=True)
+        self._thread.start()
+        self.logger.info(f"🗺️  Bölge etiketleme aktif: {', '.join(self.zone_map.names.values())}")
+
+    def stop(self):
+        """Bekleyen etiketleri yaz ve thread'i durdur"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+        self.flush()
+
+    def update(self, frame_shape, detections, track_update, timestamp=None):
+        """
+        Bu frame'de onaylanan track'lerin bölgesini kuyruğa al.
+
+        Args:
+            frame_shape: Tespitlerin yapıldığı frame'in şekli
+            detections: Tespit listesi
+            track_update: Aynı frame için IouTracker.update() sonucu
+        """
+        if self.rows is None or not track_update.confirmed:
+            return
+        now = timestamp if timestamp is not None else time.time()
+        confirmed = [(index, track) for index, track in track_update.confirmed
+                     if self.exclude is None or not self.exclude(track.track_id)]
+        if not confirmed:
+            return
+        zone_ids = self.zone_map.assign(frame_shape, [detections[index] for index, _ in confirmed])
+        with self._lock:
+            if len(self._pending) + len(confirmed) > ZONE_PENDING_MAX:
+                self.stats['dropped'] += len(confirmed)
+                ZONES_TAGGED.labels(result='dropped').inc(len(confirmed))
+                return
+            self._pending.extend((track.track_id, now, int(zone_id))
+                                 for (_, track), zone_id in zip(confirmed, zone_ids))
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Bekleyen etiketleri track'lerin ziyaretçi satırlarına (satır id'siyle) tek
+        transaction'da yaz. Track'i henüz sayılmamış veya satırı henüz yazılmamış
+        (db_manager tamponunda) etiketler bir sonraki turda tekrar denenir.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        retry = []
+        now = time.time()
+        try:
+            conn = visitor_db.connect(self.db_path)
+            try:
+                self.rows.bind(conn)
+                with conn:
+                    for track_id, confirmed_at, zone_id in pending:
+                        row_id = self.rows.row_id(track_id)
+                        if row_id is not None:
+                            conn.execute(TAG_VISITOR_QUERY, (zone_id, row_id))
+                            self.stats['tagged'] += 1
+                            ZONES_TAGGED.labels(result='tagged').inc()
+                        elif now - confirmed_at < ZONE_MATCH_SECONDS:
+                            retry.append((track_id, confirmed_at, zone_id))
+                        else:
+                            self.stats['unmatched'] += 1
+                            ZONES_TAGGED.labels(result='unmatched').inc()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.error(f"Bölge yazma hatası: {e}")
+            retry = [item for item in pending if now - item[1] < ZONE_MATCH_SECONDS]
+
+        if retry:
+            with self._lock:
+                self._pending[:0] = retry
+
+    def get_stats(self):
+        """
+        Etiketleme durumu.
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.stats, pending=pending, zones=self.zone_map.names)